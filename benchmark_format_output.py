@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+翻译输出格式化微基准
+对比单遍状态机实现与重写前的逐行正则实现在工作流输出上的耗时，并确认两者输出一致
+
+用法:
+    python benchmark_format_output.py
+    python benchmark_format_output.py --size-kb 20 --repeat 200
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+from src.services.output_formatter import format_translation_output
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "test_data", "format_output", "09_large_workflow.md")
+
+
+def legacy_format_translation_output(text: str) -> str:
+    """
+    重写前的逐行正则实现（原 vivogpt.format_translation_output），作为性能基线与输出对照
+    
+    Args:
+        text (str): 原始翻译输出文本（包含Markdown格式）
+        
+    Returns:
+        str: 格式化后的文本
+    """
+    if not text:
+        return ""
+    
+    # 预处理，处理可能的异常格式
+    # 处理行首的#号标记，确保它们被正确识别
+    # 替换掉可能存在的"## 2.1"这样的格式（确保空格正确）
+    text = re.sub(r'^(#+)\s*(\d+\.\d+)', r'\1 \2', text, flags=re.MULTILINE)
+    
+    # 分行处理，以便更精确地处理每一行
+    lines = text.split('\n')
+    processed_lines = []
+    in_table = False
+    table_data = []
+    in_section_2_2 = False  # 标记是否处于2.2节(术语检索与校验部分)
+    
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        
+        # 检测是否进入2.2节(术语检索与校验部分)
+        if re.match(r'^#+\s+2\.2', line) or re.search(r'术语检索与校验', line):
+            in_section_2_2 = True
+        # 检测是否离开2.2节
+        elif in_section_2_2 and re.match(r'^#+\s+\d+', line) and not re.match(r'^#+\s+2\.2', line):
+            in_section_2_2 = False
+            
+        # 1. 处理Markdown标题
+        if re.match(r'^#+\s+', line):
+            # 提取标题级别和内容
+            header_match = re.match(r'^(#+)\s+(.*?)$', line)
+            if header_match:
+                level = len(header_match.group(1))
+                content = header_match.group(2)
+                
+                # 根据标题级别应用不同的格式
+                if level == 1:  # # 一级标题
+                    processed_line = f"【{content}】："
+                elif level == 2:  # ## 二级标题
+                    # 检查是否是数字编号的标题（如 ## 1. 标题）
+                    if re.match(r'^\d+\.\s+', content):
+                        processed_line = f"【{content}】："
+                    else:
+                        processed_line = f"【{content}】："
+                elif level == 3:  # ### 三级标题
+                    # 检查是否是数字编号的标题（如 ### 2.1 标题）
+                    if re.match(r'^\d+\.\d+\s+', content):
+                        processed_line = f"【{content}】："
+                    else:
+                        processed_line = f"【{content}】："
+                else:  # 更深层次的标题
+                    processed_line = f"【{content}】："
+                
+                processed_lines.append(processed_line)
+                i += 1
+                continue
+        
+        # 2. 处理表格 - 对于2.2节特殊处理，转为列表而非表格
+        if line.strip().startswith('|') and line.strip().endswith('|'):
+            # 检测是否处于2.2节(术语检索与校验部分)
+            in_section_2_2 = False
+            for j in range(max(0, i-10), i):  # 向上查找10行以内是否有2.2节标题
+                if j < len(lines) and (re.match(r'^#+\s+2\.2', lines[j]) or re.search(r'术语检索与校验', lines[j])):
+                    in_section_2_2 = True
+                    break
+            
+            # 如果在2.2节且是表格开始，不使用表格格式而是转为列表
+            if in_section_2_2 and not in_table:
+                in_table = True
+                table_data = []
+                table_data.append(line)
+                i += 1
+                # 收集表格内容直到表格结束
+                while i < len(lines) and lines[i].strip().startswith('|') and lines[i].strip().endswith('|'):
+                    table_data.append(lines[i])
+                    i += 1
+                
+                # 转换表格为列表
+                headers = []
+                rows = []
+                
+                for idx, table_line in enumerate(table_data):
+                    cells = [cell.strip() for cell in table_line.split('|')[1:-1]]
+                    if idx == 0:  # 表头
+                        headers = cells
+                    elif not re.match(r'\s*[-:]+\s*', ''.join(cells)):  # 不是分隔行
+                        rows.append(cells)
+                
+                # 输出为列表格式
+                for row_idx, row in enumerate(rows):
+                    item_number = row_idx + 1
+                    item_text = f"• {item_number}. "
+                    
+                    for col_idx, cell in enumerate(row):
+                        if col_idx < len(headers) and headers[col_idx].strip() and cell.strip():
+                            item_text += f"{headers[col_idx]}: {cell}  "
+                    
+                    processed_lines.append(item_text)
+                
+                in_table = False
+                continue
+            # 非2.2节的表格正常处理
+            elif not in_section_2_2:
+                if not in_table:
+                    in_table = True
+                    table_data = []
+                
+                # 收集表格行数据
+                table_data.append(line)
+                i += 1
+                continue
+        elif in_table and not in_section_2_2:
+            # 表格结束，处理收集的表格数据（针对非2.2节的表格）
+            if table_data:
+                # 解析表格数据
+                parsed_table = []
+                max_cols = 0
+                
+                for table_line in table_data:
+                    if re.match(r'\|\s*[-:]+\s*\|', table_line):
+                        continue  # 跳过分隔行
+                    
+                    # 分割并清理单元格
+                    cells = [cell.strip() for cell in table_line.split('|')[1:-1]]
+                    parsed_table.append(cells)
+                    max_cols = max(max_cols, len(cells))
+                
+                # 确保所有行都有相同数量的列
+                for row_idx, row in enumerate(parsed_table):
+                    if len(row) < max_cols:
+                        parsed_table[row_idx] = row + [''] * (max_cols - len(row))
+                
+                # 计算每列的最大宽度
+                col_widths = [0] * max_cols
+                for row in parsed_table:
+                    for j, cell in enumerate(row):
+                        col_widths[j] = max(col_widths[j], len(cell))
+                
+                # 重建表格，使用固定宽度格式
+                formatted_table = []
+                for row in parsed_table:
+                    formatted_row = []
+                    for j, cell in enumerate(row):
+                        formatted_row.append(cell.ljust(col_widths[j]))
+                    
+                    formatted_table.append("| " + " | ".join(formatted_row) + " |")
+                
+                # 在第一行和第二行之间添加分隔行
+                if len(formatted_table) > 1:
+                    separator_line = "|-" + "-|-".join(["-" * w for w in col_widths]) + "-|"
+                    formatted_table.insert(1, separator_line)
+                
+                processed_lines.extend(formatted_table)
+            
+            in_table = False
+            # 注意：不再添加当前行，因为我们会在下一次循环中处理它
+            # 我们不增加索引i，这样当前行会在下次循环中被处理
+            continue
+        
+        # 3. 处理列表项
+        list_match = re.match(r'^(\s*)[-*]\s+(.*?)$', line)
+        if list_match:
+            indent = list_match.group(1)
+            content = list_match.group(2)
+            processed_lines.append(f"{indent}• {content}")
+            i += 1
+            continue
+        
+        # 4. 处理数字列表
+        num_list_match = re.match(r'^(\s*)(\d+)\.(\s+)(.*?)$', line)
+        if num_list_match:
+            indent = num_list_match.group(1)
+            number = num_list_match.group(2)
+            spaces = num_list_match.group(3)
+            content = num_list_match.group(4)
+            processed_lines.append(f"{indent}{number}.{spaces}{content}")
+            i += 1
+            continue
+        
+        # 5. 处理引用
+        quote_match = re.match(r'^>\s+(.*?)$', line)
+        if quote_match:
+            content = quote_match.group(1)
+            processed_lines.append(f"『{content}』")
+            i += 1
+            continue
+        
+        # 6. 处理代码块
+        if line.strip().startswith('```') or line.strip() == '```':
+            # 跳过代码块标记
+            i += 1
+            continue
+        
+        # 7. 处理水平线
+        if re.match(r'^-{3,}$|^_{3,}$|^\*{3,}$', line.strip()):
+            processed_lines.append("—" * 30)  # 使用长破折号作为分隔线
+            i += 1
+            continue
+        
+        # 处理内联格式（在行内部的标记）
+        # 处理加粗
+        line = re.sub(r'\*\*(.*?)\*\*', r'\1', line)
+        line = re.sub(r'__(.*?)__', r'\1', line)
+        
+        # 处理斜体
+        line = re.sub(r'\*(.*?)\*', r'\1', line)
+        line = re.sub(r'_(.*?)_', r'\1', line)
+        
+        # 处理链接
+        line = re.sub(r'\[(.*?)\]\((.*?)\)', r'\1', line)
+        
+        # 处理图片
+        line = re.sub(r'!\[(.*?)\]\((.*?)\)', r'[图片:\1]', line)
+        
+        # 8. 正常文本行
+        processed_lines.append(line)
+        i += 1
+    
+    # 将处理后的行重新组合
+    processed_text = '\n'.join(processed_lines)
+    
+    # 最终清理
+    # 1. 删除连续的空行
+    processed_text = re.sub(r'\n\s*\n\s*\n+', '\n\n', processed_text)
+    
+    # 2. 处理可能遗留的标记
+    # 确保没有遗漏的Markdown标题标记
+    processed_text = re.sub(r'^#+\s+', '', processed_text, flags=re.MULTILINE)
+    
+    # 3. 处理特殊格式的标题行（##2.1 这种格式）
+    processed_text = re.sub(r'##(\d+\.\d+)(.*?)$', r'【\1\2】：', processed_text, flags=re.MULTILINE)
+    processed_text = re.sub(r'##\s+(\d+\.\d+)(.*?)$', r'【\1\2】：', processed_text, flags=re.MULTILINE)
+    
+    # 4. 处理连续的冒号
+    processed_text = re.sub(r'：\s*：', '：', processed_text)
+    
+    # 5. 清理可能的双重标记
+    processed_text = re.sub(r'【【([^】]+)】】', r'【\1】', processed_text)
+    
+    # 6. 清理行首和行尾的空白
+    processed_text = re.sub(r'^\s+', '', processed_text, flags=re.MULTILINE)
+    processed_text = re.sub(r'\s+$', '', processed_text, flags=re.MULTILINE)
+    
+    # 7. 移除特殊的"##"标记
+    processed_text = re.sub(r'##\s*(\d+\.\d+)', r'【\1】：', processed_text)
+    
+    # 8. 检测和删除连续重复的内容块
+    lines = processed_text.split('\n')
+    if len(lines) > 10:  # 只有当内容足够长时才检查重复
+        half_length = len(lines) // 2
+        first_half = lines[:half_length]
+        second_half = lines[half_length:2*half_length]
+        
+        # 检查两半是否基本相同
+        similarity = sum(1 for a, b in zip(first_half, second_half) if a == b) / len(first_half) if first_half else 0
+        
+        if similarity > 0.7:  # 如果相似度超过70%，认为存在重复
+            processed_text = '\n'.join(lines[:half_length + (len(lines) - 2*half_length)])
+    
+    return processed_text
+
+
+def build_input(size_kb: int) -> str:
+    """以黄金样例中的大段工作流输出为基础，截取或拼接出指定大小（按UTF-8字节计）的输入"""
+    with open(CORPUS_FILE, "r", encoding="utf-8") as f:
+        base = f.read()
+    lines = []
+    size = 0
+    target = size_kb * 1024
+    while size < target:
+        for line in base.split("\n"):
+            lines.append(line)
+            size += len(line.encode("utf-8")) + 1
+            if size >= target:
+                break
+    return "\n".join(lines) + "\n"
+
+
+def measure(func, text: str, repeat: int) -> float:
+    """返回单次调用的最短耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='翻译输出格式化微基准')
+    parser.add_argument('--size-kb', type=int, nargs='+', default=[2, 20, 100], help='输入大小（KB）')
+    parser.add_argument('--repeat', type=int, default=100, help='每种输入重复次数（取最短耗时）')
+    args = parser.parse_args()
+
+    print(f"{'输入大小':>8} {'原实现(ms)':>12} {'状态机(ms)':>12} {'加速比':>8}")
+    for size_kb in args.size_kb:
+        text = build_input(size_kb)
+        if format_translation_output(text) != legacy_format_translation_output(text):
+            print(f"❌ {size_kb}KB 输入的格式化结果与原实现不一致")
+            return 1
+        legacy_ms = measure(legacy_format_translation_output, text, args.repeat)
+        current_ms = measure(format_translation_output, text, args.repeat)
+        print(f"{size_kb:>6}KB {legacy_ms:>12.3f} {current_ms:>12.3f} {legacy_ms / current_ms:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
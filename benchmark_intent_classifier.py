@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+用户意图识别微基准
+对比组合正则一次匹配与逐条规则 re.search（每次都重新小写消息）的耗时
+
+用法:
+    python benchmark_intent_classifier.py
+    python benchmark_intent_classifier.py --repeat 2000
+"""
+
+import argparse
+import sys
+import time
+
+from src.services.intent_classifier import intent_classifier
+from test_intent_classifier import legacy_intents
+
+MESSAGES = {
+    "来源请求": "显示上一回答的来源",
+    "直接翻译": "直接翻译：海关当局应当对进入联盟关境的货物实施监管。",
+    "对话前缀": "translate: The customs territory of the Union",
+    "中文长文本": "海关当局应当对进入联盟关境的货物实施监管。" * 100,
+    "英文长文本": "Customs authorities shall supervise goods entering the customs territory of the Union. " * 40,
+}
+
+
+def measure(func, text: str, repeat: int) -> float:
+    """返回单次调用的最短耗时（微秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000000
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='用户意图识别微基准')
+    parser.add_argument('--repeat', type=int, default=500, help='每条消息重复次数（取最短耗时）')
+    args = parser.parse_args()
+
+    print(f"{'消息':>10} {'长度':>6} {'逐条(us)':>10} {'组合(us)':>10} {'加速比':>8}")
+    for name, message in MESSAGES.items():
+        if set(intent_classifier.classify(message)) != legacy_intents(message):
+            print(f"❌ {name} 的识别结果与逐条匹配不一致")
+            return 1
+        legacy_us = measure(legacy_intents, message, args.repeat)
+        current_us = measure(intent_classifier.classify, message, args.repeat)
+        print(f"{name:>10} {len(message):>6} {legacy_us:>10.1f} {current_us:>10.1f} {legacy_us / current_us:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+DashScope 本地模拟服务
+模拟应用completion接口与记忆体接口，用于在无外网或压测场景下联调翻译服务
+
+用法:
+    python dashscope_stub_server.py --port 8089 --latency 0.5
+    python dashscope_stub_server.py --error-rate 0.2 --error-status 503 --hang-rate 0.05
+    DASHSCOPE_BASE_URL=http://127.0.0.1:8089/api/v1 python vivogpt.py
+
+故障注入也可以在运行时调整：
+    curl -X POST localhost:8089/stub/faults -d '{"fail_next": 3, "error_status": 500}'
+    curl localhost:8089/stub/faults
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="DashScope模拟服务")
+
+# 运行配置，可通过命令行参数或 POST /stub/faults 修改
+STUB_CONFIG = {
+    "latency": 0.0,        # 每次调用的模拟延迟（秒）
+    "error_rate": 0.0,     # 返回错误状态码的概率
+    "error_status": 503,   # 注入错误时返回的状态码
+    "hang_rate": 0.0,      # 挂起（长时间不响应，模拟超时）的概率
+    "hang_seconds": 300.0, # 挂起时长（秒）
+    "fail_next": 0,        # 接下来固定返回错误的请求数（优先于 error_rate，便于确定性测试）
+}
+
+# 故障注入统计
+STUB_STATS = {
+    "requests": 0,
+    "errors_injected": 0,
+    "hangs_injected": 0,
+}
+
+
+async def _inject_fault():
+    """按配置注入故障：返回错误响应，或挂起后继续；不注入时返回 None"""
+    STUB_STATS["requests"] += 1
+    if STUB_CONFIG["fail_next"] > 0 or random.random() < STUB_CONFIG["error_rate"]:
+        STUB_CONFIG["fail_next"] = max(0, STUB_CONFIG["fail_next"] - 1)
+        STUB_STATS["errors_injected"] += 1
+        status = int(STUB_CONFIG["error_status"])
+        return JSONResponse(status_code=status, content={
+            "code": "InternalError" if status >= 500 else "Throttling",
+            "message": f"Injected fault ({status}).",
+            "request_id": str(uuid.uuid4())
+        })
+    if random.random() < STUB_CONFIG["hang_rate"]:
+        STUB_STATS["hangs_injected"] += 1
+        await asyncio.sleep(STUB_CONFIG["hang_seconds"])
+    return None
+
+WORKFLOW_TEMPLATE = """# 翻译工作流执行过程：
+## 1. 原文拆解与专业术语提取
+- customs territory：关境
+- economic operators：经济运营商
+
+## 2. 术语检索与翻译
+### 2.1. 术语拆解与提取
+"customs territory"指海关法规适用的地理区域。
+
+### 2.2. 术语检索与校验
+| 术语 | 译文 | 来源 |
+|------|------|------|
+| customs territory | 关境 | [1] 词典测试集 |
+| economic operators | 经济运营商 | [2] 欧盟海关法典 |
+
+## 3. 初步译文生成
+【模拟译文】{text}
+
+## 4. 译文检查
+未发现术语错误。
+
+## 5. 错误纠正
+无需纠正。
+
+## 6. 译文润色
+【模拟译文】{text}
+
+## 7. 最终译文
+【模拟译文】{text}
+"""
+
+
+def _extract_source_text(prompt: str) -> str:
+    """从翻译提示词中取出待翻译原文"""
+    match = re.search(r'翻译成[^：:]*[：:]\s*\n(.*?)\n\n', prompt, re.S)
+    return match.group(1).strip() if match else prompt[:200]
+
+
+def build_stub_text(prompt: str) -> str:
+    """根据提示词类型生成模拟回答"""
+    if "翻译工作流执行过程" in prompt:
+        return WORKFLOW_TEMPLATE.format(text=_extract_source_text(prompt))
+    if prompt.startswith("请将以下从"):
+        return f"【模拟译文】{_extract_source_text(prompt)}"
+    return f"【模拟回答】{prompt[:100]}"
+
+
+@app.post("/api/v1/apps/{app_id}/completion")
+async def completion(app_id: str, request: Request):
+    """模拟应用completion接口"""
+    if not request.headers.get("Authorization"):
+        return JSONResponse(status_code=401, content={
+            "code": "InvalidApiKey",
+            "message": "No API-key provided.",
+            "request_id": str(uuid.uuid4())
+        })
+
+    fault = await _inject_fault()
+    if fault is not None:
+        return fault
+
+    body = await request.json()
+    prompt = body.get("input", {}).get("prompt", "")
+    session_id = body.get("input", {}).get("session_id") or uuid.uuid4().hex
+
+    if request.headers.get("X-DashScope-SSE") == "enable":
+        return StreamingResponse(_stream_text(build_stub_text(prompt), session_id),
+                                 media_type="text/event-stream")
+
+    if STUB_CONFIG["latency"]:
+        await asyncio.sleep(STUB_CONFIG["latency"])
+
+    return {
+        "output": {
+            "text": build_stub_text(prompt),
+            "finish_reason": "stop",
+            "session_id": session_id
+        },
+        "usage": {"models": [{"model_id": "stub", "input_tokens": len(prompt), "output_tokens": 0}]},
+        "request_id": str(uuid.uuid4())
+    }
+
+
+async def _stream_text(text: str, session_id: str):
+    """按行切分模拟文本，以SSE事件逐段返回，总延迟与非流式调用一致"""
+    pieces = text.splitlines(keepends=True) or [text]
+    request_id = str(uuid.uuid4())
+    for index, piece in enumerate(pieces):
+        if STUB_CONFIG["latency"]:
+            await asyncio.sleep(STUB_CONFIG["latency"] / len(pieces))
+        data = {
+            "output": {
+                "text": piece,
+                "finish_reason": "stop" if index == len(pieces) - 1 else "null",
+                "session_id": session_id
+            },
+            "request_id": request_id
+        }
+        yield f"id:{index + 1}\nevent:result\n:HTTP_STATUS/200\ndata:{json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/v1/{workspace_id}/memories")
+async def create_memory(workspace_id: str):
+    """模拟创建记忆体接口"""
+    fault = await _inject_fault()
+    if fault is not None:
+        return fault
+    return {
+        "memoryId": uuid.uuid4().hex,
+        "requestId": str(uuid.uuid4())
+    }
+
+
+@app.get("/stub/faults")
+async def get_faults():
+    """查看故障注入配置与统计"""
+    return {"config": STUB_CONFIG, "stats": STUB_STATS}
+
+
+@app.post("/stub/faults")
+async def set_faults(request: Request):
+    """修改故障注入配置（只修改请求体中给出的项），reset 为 true 时同时清零统计"""
+    body = await request.json()
+    for key, value in body.items():
+        if key in STUB_CONFIG:
+            STUB_CONFIG[key] = type(STUB_CONFIG[key])(value)
+    if body.get("reset"):
+        for key in STUB_STATS:
+            STUB_STATS[key] = 0
+    logger.info(f"故障注入配置: {STUB_CONFIG}")
+    return {"config": STUB_CONFIG, "stats": STUB_STATS}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='DashScope本地模拟服务')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8089, help='监听端口 (默认: 8089)')
+    parser.add_argument('--latency', type=float, default=0.0, help='每次调用的模拟延迟秒数 (默认: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回错误状态码的概率 (默认: 0)')
+    parser.add_argument('--error-status', type=int, default=503, help='注入错误时返回的状态码 (默认: 503)')
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='挂起不响应的概率 (默认: 0)')
+    args = parser.parse_args()
+
+    STUB_CONFIG["latency"] = args.latency
+    STUB_CONFIG["error_rate"] = args.error_rate
+    STUB_CONFIG["error_status"] = args.error_status
+    STUB_CONFIG["hang_rate"] = args.hang_rate
+
+    import uvicorn
+    logger.info(f"启动DashScope模拟服务: http://{args.host}:{args.port}/api/v1")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+术语表导入工具
+将 XLSX / CSV 双语术语表导入术语库（默认导入仓库自带的欧盟授权条例对照表）
+
+用法:
+    python import_terminology.py
+    python import_terminology.py my_terms.xlsx other_terms.csv --source-lang en --target-lang zh
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+from src.services.terminology_store import BUNDLED_WORKBOOK, terminology_store
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='导入双语术语表到术语库')
+    parser.add_argument('files', nargs='*', default=[BUNDLED_WORKBOOK],
+                        help='术语文件路径（.xlsx / .csv），默认为仓库自带的欧盟授权条例对照表')
+    parser.add_argument('--source-lang', type=str, default='en', help='源语言 (默认: en)')
+    parser.add_argument('--target-lang', type=str, default='zh', help='目标语言 (默认: zh)')
+    args = parser.parse_args()
+
+    if not terminology_store.is_available:
+        logger.error(f"术语库不可用: {terminology_store.db_path}")
+        sys.exit(1)
+
+    failed = False
+    for path in args.files:
+        start_time = time.time()
+        try:
+            imported = terminology_store.import_file(path, args.source_lang, args.target_lang)
+            logger.info(f"✅ {path}: 导入 {imported} 个术语对，耗时 {time.time() - start_time:.2f} 秒")
+        except Exception as e:
+            failed = True
+            logger.error(f"❌ {path}: 导入失败: {e}")
+
+    logger.info(f"术语库当前共 {terminology_store.count()} 个术语对 ({terminology_store.db_path})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
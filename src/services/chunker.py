@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+长文本分块
+按估算的token预算把长文本切成若干块，分块边界优先取段落/句子边界，其次取分句标点和空白，
+不会切断税则号列（8471.30.00）、条款编号（Article 5(2)、第五条）等编号
+"""
+
+import re
+from typing import List
+
+from src.services.language_detector import count_scripts
+from src.services.segmenter import Segment, split_segments
+
+# 分句边界：中文逗号/顿号/分号/冒号之后，英文逗号/分号/冒号之后须跟空白（"1,000"、"8471:30" 不切）
+_CLAUSE_BOUNDARY_RE = re.compile(r'[，、；：]\s*|[,;:]\s+')
+# 空白边界：其后紧跟数字或括号时不切，避免把 "Article 5"、"heading 8471" 拆开
+_SPACE_BOUNDARY_RE = re.compile(r'\s+(?![\d(（])')
+# 强制切分时不能落在其中间的字符（字母、数字以及编号中的点、连字符）
+_CODE_CHAR_RE = re.compile(r'[0-9A-Za-z.\-/]')
+# 强制切分点最多向前回退的字符数
+_MAX_BACKOFF = 32
+
+# 文字类别下标（见 language_detector.count_scripts）：汉字、假名、谚文按每字约1个token估算
+_DENSE_SCRIPTS = (1, 2, 3)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的token数：汉字、假名、谚文每字约1个token，其余字符约每4个1个token
+
+    Args:
+        text (str): 文本
+
+    Returns:
+        int: 估算的token数
+    """
+    counts = count_scripts(text)
+    dense = sum(counts[script] for script in _DENSE_SCRIPTS)
+    return dense + (len(text) - dense + 3) // 4
+
+
+def _split_at(text: str, boundary_re) -> List[str]:
+    """在边界（含其后的空白）之后切开，各部分首尾相接即为原文"""
+    pieces = []
+    start = 0
+    for match in boundary_re.finditer(text):
+        if match.end() > start and match.end() < len(text):
+            pieces.append(text[start:match.end()])
+            start = match.end()
+    pieces.append(text[start:])
+    return pieces
+
+
+def _hard_split(text: str, max_tokens: int) -> List[str]:
+    """没有可用边界时按长度切分，切分点向前回退到不在编号/单词中间的位置"""
+    pieces = []
+    start = 0
+    while estimate_tokens(text[start:]) > max_tokens:
+        # 按每字1个token取切分点，对拉丁文本偏保守
+        cut = start + max_tokens
+        position = cut
+        while (position > start + 1 and cut - position < _MAX_BACKOFF
+               and _CODE_CHAR_RE.match(text[position - 1]) and _CODE_CHAR_RE.match(text[position])):
+            position -= 1
+        if position > start + 1 and cut - position < _MAX_BACKOFF:
+            cut = position
+        pieces.append(text[start:cut])
+        start = cut
+    pieces.append(text[start:])
+    return pieces
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """依次按分句标点、空白、长度切分超过预算的句子"""
+    pieces = []
+    for clause in _split_at(text, _CLAUSE_BOUNDARY_RE):
+        if estimate_tokens(clause) <= max_tokens:
+            pieces.append(clause)
+            continue
+        for phrase in _split_at(clause, _SPACE_BOUNDARY_RE):
+            if estimate_tokens(phrase) <= max_tokens:
+                pieces.append(phrase)
+            else:
+                pieces.extend(_hard_split(phrase, max_tokens))
+    return pieces
+
+
+def split_chunks(text: str, source_lang: str = "zh", max_tokens: int = 1000) -> List[Segment]:
+    """
+    将长文本切分为不超过token预算的块
+
+    先按 split_segments 切成句段，超出预算的句段再按分句标点、空白切开，最后按顺序把相邻句段装入块中
+
+    Args:
+        text (str): 待切分文本
+        source_lang (str): 源语言
+        max_tokens (int): 每块的估算token上限
+
+    Returns:
+        List[Segment]: 块列表，结构与 split_segments 相同，可直接用 join_segments 拼接各块译文
+    """
+    units: List[Segment] = []
+    for segment in split_segments(text, source_lang):
+        if estimate_tokens(segment.text) <= max_tokens:
+            units.append(segment)
+            continue
+        pieces = _split_oversized(segment.text, max_tokens)
+        for index, piece in enumerate(pieces):
+            body = piece.rstrip()
+            separator = segment.separator if index == len(pieces) - 1 else piece[len(body):]
+            if body:
+                units.append(Segment(body, separator))
+
+    chunks: List[Segment] = []
+    current: List[Segment] = []
+    current_tokens = 0
+
+    def flush():
+        body = "".join(unit.text + unit.separator for unit in current[:-1]) + current[-1].text
+        chunks.append(Segment(body, current[-1].separator))
+
+    for unit in units:
+        tokens = estimate_tokens(unit.text + unit.separator)
+        if current and current_tokens + tokens > max_tokens:
+            flush()
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        flush()
+    return chunks
@@ -0,0 +1,336 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+上游调用自适应并发限制
+并发上限按 AIMD 调整：上游限流（429/503）、超时或延迟明显升高时按比例收缩，调用正常且上限被用满时逐步放大；
+超过上限的调用在有界队列中等待，排队已满或等待超时时直接拒绝，由接口返回 503 和 Retry-After；
+排队按优先级类别和租户调度（见 upstream_scheduler），等待不超过所属请求剩余的截止时间
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from src.services.hedging import latency_summary
+from src.services.request_context import current_priority, current_tenant, remaining
+from src.services.upstream_scheduler import BACKGROUND, BULK, INTERACTIVE, PRIORITY_CLASSES, FairQueue
+
+logger = logging.getLogger(__name__)
+
+# 视为上游过载的响应状态码
+THROTTLE_STATUSES = (429, 503)
+# 视为上游过载的异常：超时
+THROTTLE_EXCEPTIONS: Tuple[type, ...] = (asyncio.TimeoutError,)
+
+# 调用结果对并发上限的影响
+SUCCESS = "success"
+THROTTLED = "throttled"
+IGNORED = "ignored"
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """上游并发已达上限且排队已满或等待超时，调用被拒绝"""
+
+    def __init__(self, retry_after: float, reason: str = "排队已满"):
+        super().__init__(f"上游服务繁忙（{reason}），请 {math.ceil(retry_after)} 秒后重试")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+# 各优先级类别最多占用并发上限的比例
+DEFAULT_CLASS_SHARES = {INTERACTIVE: 1.0, BACKGROUND: 0.75, BULK: 0.5}
+
+
+class Permit:
+    """一次调用占用的并发名额，调用方通过 record_status 报告响应状态码"""
+
+    def __init__(self, started_at: float, priority: str, throttle_statuses: Tuple[int, ...]):
+        self.started_at = started_at
+        self.priority = priority
+        self.outcome = SUCCESS
+        self._throttle_statuses = throttle_statuses
+
+    def record_status(self, status_code: Optional[int]):
+        """上游返回限流状态码时把本次调用记为过载"""
+        if status_code in self._throttle_statuses:
+            self.outcome = THROTTLED
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    自适应并发限制器
+
+    - 加性增：调用成功且执行中的调用数达到上限的一半以上时，上限每轮（约 limit 次成功）加 1；
+    - 乘性减：上游限流、超时，或上限被用满时短期平均延迟超过长期平均延迟的 latency_tolerance 倍，上限乘以 backoff_ratio。
+      同一时刻并发的调用往往一起失败，只有在上一次收缩之后才开始的调用会再次触发收缩，避免上限一次跌到底；
+    - 排队：超过上限的调用每个优先级类别最多 max_queue 个排队，最长等待 max_wait 秒，否则抛出 ConcurrencyLimitExceeded；
+    - 调度：名额空出时按交互、后台、批量的顺序分配，后台与批量调用最多占用上限的 class_shares 比例，
+      同一类别中按租户加权公平排队
+
+    只在事件循环线程中使用，不需要加锁
+    """
+
+    def __init__(self,
+                 initial_limit: int = 16,
+                 min_limit: int = 2,
+                 max_limit: int = 64,
+                 max_queue: int = 64,
+                 max_wait: float = 5.0,
+                 backoff_ratio: float = 0.7,
+                 latency_tolerance: float = 2.0,
+                 throttle_statuses: Tuple[int, ...] = THROTTLE_STATUSES,
+                 throttle_exceptions: Tuple[type, ...] = THROTTLE_EXCEPTIONS,
+                 class_shares: Optional[Dict[str, float]] = None,
+                 class_max_wait: Optional[Dict[str, float]] = None,
+                 tenant_weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            initial_limit (int): 初始并发上限
+            min_limit (int): 并发上限的下限
+            max_limit (int): 并发上限的上限
+            max_queue (int): 每个优先级类别允许排队等待的调用数，0 表示不排队、超过上限直接拒绝
+            max_wait (float): 排队等待的最长时间（秒）
+            backoff_ratio (float): 过载时上限的收缩比例
+            latency_tolerance (float): 短期平均延迟超过长期平均延迟的多少倍视为过载
+            throttle_statuses (Tuple[int, ...]): 视为过载的响应状态码
+            throttle_exceptions (Tuple[type, ...]): 视为过载的异常类型
+            class_shares (Dict[str, float], optional): 优先级类别 -> 最多占用并发上限的比例，默认见 DEFAULT_CLASS_SHARES
+            class_max_wait (Dict[str, float], optional): 优先级类别 -> 最长排队时间（秒），未列出的类别使用 max_wait
+            tenant_weights (Dict[str, float], optional): 租户 -> 公平排队的权重，未列出的租户权重为 1
+        """
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = max(0.0, float(max_wait))
+        self.backoff_ratio = min(max(float(backoff_ratio), 0.1), 0.95)
+        self.latency_tolerance = max(1.0, float(latency_tolerance))
+        self.throttle_statuses = tuple(throttle_statuses)
+        self.throttle_exceptions = tuple(throttle_exceptions)
+        shares = dict(DEFAULT_CLASS_SHARES, **(class_shares or {}))
+        self.class_shares = {priority: min(max(float(shares[priority]), 0.0), 1.0) for priority in PRIORITY_CLASSES}
+        self.class_max_wait = {priority: max(0.0, float((class_max_wait or {}).get(priority, self.max_wait)))
+                               for priority in PRIORITY_CLASSES}
+
+        self._limit = float(min(max(int(initial_limit), self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._queues: Dict[str, FairQueue] = {priority: FairQueue(tenant_weights) for priority in PRIORITY_CLASSES}
+        self._last_decrease_at = 0.0
+        # 延迟的短期与长期指数平均（秒），用于判断延迟是否明显升高
+        self._short_latency: Optional[float] = None
+        self._long_latency: Optional[float] = None
+
+        # 运行指标
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+        self._throttled = 0
+        self._cancelled = 0
+        self._decreases = 0
+        self._peak_in_flight = 0
+        self._total_wait_seconds = 0.0
+        self._class_in_flight = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._class_admitted = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._class_rejected = {priority: 0 for priority in PRIORITY_CLASSES}
+        # 各类别最近调用的排队时间（秒，直接放行的调用计为 0）
+        self._class_waits: Dict[str, Deque[float]] = {priority: deque(maxlen=1000) for priority in PRIORITY_CLASSES}
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def queued(self) -> int:
+        """各类别排队中的调用总数"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def retry_after(self) -> float:
+        """按平均延迟和排队长度估算客户端应等待的时间（秒），至少 1 秒"""
+        latency = self._short_latency or 1.0
+        return max(1.0, latency * (self.queued() / max(1, self.limit) + 1))
+
+    def _class_limit(self, priority: str) -> int:
+        return max(1, int(self._limit * self.class_shares[priority]))
+
+    def _can_admit(self, priority: str) -> bool:
+        return self._in_flight < self.limit and self._class_in_flight[priority] < self._class_limit(priority)
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None, tenant: Optional[str] = None) -> AsyncIterator[Permit]:
+        """
+        占用一个并发名额执行上游调用，退出时按调用结果调整并发上限
+
+        Args:
+            priority (str, optional): 优先级类别，默认取当前请求上下文（未设置时为交互）
+            tenant (str, optional): 租户，默认取当前请求上下文
+
+        Yields:
+            Permit: 调用方拿到响应后通过 permit.record_status 报告状态码
+
+        Raises:
+            ConcurrencyLimitExceeded: 排队已满、等待超时，或请求的截止时间已到
+        """
+        permit = await self._acquire(priority or current_priority(), tenant or current_tenant())
+        try:
+            yield permit
+        except self.throttle_exceptions:
+            permit.outcome = THROTTLED
+            raise
+        except asyncio.CancelledError:
+            # 请求超时或客户端断开时取消进行中的调用，与上游负载无关
+            self._cancelled += 1
+            if permit.outcome == SUCCESS:
+                permit.outcome = IGNORED
+            raise
+        except BaseException:
+            # 参数错误等与上游负载无关的失败不参与调整；已报告限流状态码的调用仍按过载处理
+            if permit.outcome == SUCCESS:
+                permit.outcome = IGNORED
+            raise
+        finally:
+            self._release(permit)
+
+    async def _acquire(self, priority: str, tenant: Optional[str]) -> Permit:
+        queue = self._queues[priority]
+        # 同类别已有调用在排队时不插队；更高优先级的调用在排队时说明名额已满或其占用比例已满，不影响本类别
+        if self._can_admit(priority) and not queue:
+            return self._admit(priority, 0.0)
+
+        if len(queue) >= self.max_queue:
+            self._reject(priority)
+            raise ConcurrencyLimitExceeded(self.retry_after())
+
+        max_wait = self.class_max_wait[priority]
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                self._reject(priority)
+                raise ConcurrencyLimitExceeded(self.retry_after(), "请求已超时")
+            max_wait = min(max_wait, left)
+
+        waiter = queue.push(tenant)
+        self._queued += 1
+        enqueued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max_wait)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                queue.discard(waiter)
+                self._reject(priority)
+                raise ConcurrencyLimitExceeded(self.retry_after(), "排队超时")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已经转交给本调用，归还后唤醒下一个
+                self._in_flight -= 1
+                self._class_in_flight[priority] -= 1
+                self._wake_waiters()
+            else:
+                queue.discard(waiter)
+            raise
+        # 名额由 _wake_waiters 转交，执行中的调用数已经计入
+        return self._admit(priority, time.monotonic() - enqueued_at, counted=True)
+
+    def _admit(self, priority: str, waited: float, counted: bool = False) -> Permit:
+        if not counted:
+            self._in_flight += 1
+            self._class_in_flight[priority] += 1
+        self._admitted += 1
+        self._class_admitted[priority] += 1
+        self._total_wait_seconds += waited
+        self._class_waits[priority].append(waited)
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        return Permit(time.monotonic(), priority, self.throttle_statuses)
+
+    def _reject(self, priority: str):
+        self._rejected += 1
+        self._class_rejected[priority] += 1
+
+    def _release(self, permit: Permit):
+        now = time.monotonic()
+        # 执行中的调用数在扣减本次调用前判断上限是否被用满
+        utilized = self._in_flight >= self._limit / 2
+        self._in_flight -= 1
+        self._class_in_flight[permit.priority] -= 1
+        if permit.outcome == THROTTLED:
+            self._throttled += 1
+            self._decrease(permit.started_at, now, "上游限流或超时")
+        elif permit.outcome == SUCCESS:
+            latency = now - permit.started_at
+            self._observe_latency(latency)
+            # 译文长短不一，单次延迟波动很大；只在上限被用满时把延迟升高视为上游排队
+            if utilized and self._short_latency > self._long_latency * self.latency_tolerance:
+                self._decrease(permit.started_at, now, "延迟升高")
+            elif utilized and self._limit < self.max_limit:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+        self._wake_waiters()
+
+    def _observe_latency(self, latency: float):
+        if self._short_latency is None:
+            self._short_latency = self._long_latency = latency
+            return
+        self._short_latency += (latency - self._short_latency) * 0.2
+        self._long_latency += (latency - self._long_latency) * 0.02
+
+    def _decrease(self, started_at: float, now: float, reason: str):
+        if started_at < self._last_decrease_at:
+            return
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+        self._last_decrease_at = now
+        # 收缩后以当前延迟作为新的基准，下一轮重新判断
+        self._long_latency = self._short_latency
+        if self.limit < previous:
+            self._decreases += 1
+            logger.warning(f"上游并发上限收缩（{reason}）: {previous} -> {self.limit}，"
+                           f"执行中 {self._in_flight}，排队 {self.queued()}")
+
+    def _wake_waiters(self):
+        # 按优先级从高到低分配空出的名额；某类别占用比例已满时继续分给低优先级的类别
+        for priority in PRIORITY_CLASSES:
+            queue = self._queues[priority]
+            while queue and self._can_admit(priority):
+                waiter = queue.pop()
+                self._in_flight += 1
+                self._class_in_flight[priority] += 1
+                waiter.set_result(None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回并发限制的运行指标"""
+        admitted = self._admitted
+        return {
+            "limit": self.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "queued": self.queued(),
+            "peak_in_flight": self._peak_in_flight,
+            "admitted": admitted,
+            "waited": self._queued,
+            "rejected": self._rejected,
+            "throttled": self._throttled,
+            "cancelled": self._cancelled,
+            "decreases": self._decreases,
+            "avg_queue_wait_ms": round(self._total_wait_seconds * 1000 / admitted, 2) if admitted else 0.0,
+            "short_latency_ms": round(self._short_latency * 1000, 1) if self._short_latency is not None else None,
+            "long_latency_ms": round(self._long_latency * 1000, 1) if self._long_latency is not None else None,
+            "classes": {
+                priority: {
+                    "in_flight": self._class_in_flight[priority],
+                    "max_in_flight": self._class_limit(priority),
+                    "queued": len(self._queues[priority]),
+                    "queued_tenants": self._queues[priority].tenants(),
+                    "admitted": self._class_admitted[priority],
+                    "rejected": self._class_rejected[priority],
+                    "queue_wait_ms": latency_summary(self._class_waits[priority]),
+                }
+                for priority in PRIORITY_CLASSES
+            },
+        }
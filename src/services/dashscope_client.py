@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+DashScope 原生异步HTTP客户端
+基于 aiohttp 连接池复用 TLS 长连接，直接调用应用completion接口与记忆体接口
+"""
+
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://dashscope.aliyuncs.com/api/v1"
+
+
+class ApplicationResponse:
+    """
+    应用调用响应
+    字段与 dashscope.Application.call 的返回对象保持一致（status_code、request_id、code、message、output、usage），
+    因此业务代码可以不加区分地处理两种调用方式的结果
+    """
+
+    def __init__(self, status_code: int, payload: Dict[str, Any]):
+        self.status_code = status_code
+        self.request_id = payload.get("request_id", "")
+        self.code = payload.get("code", "")
+        self.message = payload.get("message", "")
+        self.usage = payload.get("usage")
+        output = payload.get("output")
+        self.output = SimpleNamespace(
+            text=output.get("text"),
+            session_id=output.get("session_id"),
+            finish_reason=output.get("finish_reason"),
+        ) if isinstance(output, dict) else None
+
+
+class JsonResponse:
+    """普通JSON接口的响应，接口与 requests.Response 的常用部分一致"""
+
+    def __init__(self, status_code: int, text: str):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class AsyncDashScopeClient:
+    """
+    DashScope 异步客户端
+    同一事件循环内共享一个 ClientSession，连接池中的长连接在请求之间复用，避免每次翻译都重新握手
+    """
+
+    def __init__(self,
+                 api_key: str,
+                 base_url: Optional[str] = None,
+                 pool_size: int = 100,
+                 keepalive_timeout: float = 60.0,
+                 timeout: float = 120.0,
+                 connect_timeout: float = 10.0):
+        """
+        Args:
+            api_key (str): DashScope API Key
+            base_url (str, optional): 接口根地址，默认为公网终端节点，可指向私网节点或本地模拟服务
+            pool_size (int): 连接池最大连接数
+            keepalive_timeout (float): 空闲长连接保留时间（秒）
+            timeout (float): 单次请求总超时（秒）
+            connect_timeout (float): 建立连接超时（秒）
+        """
+        self.api_key = api_key
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # 运行指标
+        self._requests = 0
+        self._errors = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._connections_created = 0
+        self._connections_reused = 0
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环对应的会话，不存在或已关闭时重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_create)
+            trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                trace_configs=[trace_config]
+            )
+            self._session_loop = loop
+            logger.info(f"创建DashScope异步连接池: {self.base_url} (最大连接数: {self.pool_size})")
+        return self._session
+
+    async def _on_connection_create(self, session, context, params):
+        self._connections_created += 1
+
+    async def _on_connection_reuse(self, session, context, params):
+        self._connections_reused += 1
+
+    async def _post(self, path: str, payload: Dict[str, Any]):
+        """发送POST请求，返回 (状态码, 响应文本)"""
+        session = self._get_session()
+        self._requests += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            async with session.post(f"{self.base_url}/{path.lstrip('/')}", json=payload) as response:
+                text = await response.text()
+                if response.status >= 400:
+                    self._errors += 1
+                return response.status, text
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    @staticmethod
+    def _build_application_payload(prompt: str,
+                                   session_id: Optional[str] = None,
+                                   memory_id: Optional[str] = None,
+                                   **parameters) -> Dict[str, Any]:
+        """按 Application.call 的参数规则组装请求体"""
+        input_param: Dict[str, Any] = {"prompt": prompt}
+        if session_id:
+            input_param["session_id"] = session_id
+        if memory_id is not None:
+            input_param["memory_id"] = memory_id
+
+        return {
+            "input": input_param,
+            "parameters": {key: value for key, value in parameters.items() if value is not None},
+            "debug": {}
+        }
+
+    async def call_application(self,
+                               app_id: str,
+                               prompt: str,
+                               session_id: Optional[str] = None,
+                               memory_id: Optional[str] = None,
+                               **parameters) -> ApplicationResponse:
+        """
+        调用应用 completion 接口
+
+        Args:
+            app_id (str): 应用ID
+            prompt (str): 提示词
+            session_id (str, optional): 多轮对话会话ID
+            memory_id (str, optional): 长期记忆体ID
+            **parameters: 其他调用参数（如 rag_options）
+
+        Returns:
+            ApplicationResponse: 与 Application.call 返回结构一致的响应
+        """
+        payload = self._build_application_payload(prompt, session_id, memory_id, **parameters)
+        status, text = await self._post(f"apps/{app_id}/completion", payload)
+        try:
+            data = json.loads(text) if text else {}
+        except json.JSONDecodeError:
+            data = {"message": text}
+        return ApplicationResponse(status, data if isinstance(data, dict) else {})
+
+    async def stream_application(self,
+                                 app_id: str,
+                                 prompt: str,
+                                 session_id: Optional[str] = None,
+                                 memory_id: Optional[str] = None,
+                                 **parameters) -> AsyncIterator[ApplicationResponse]:
+        """
+        以SSE方式调用应用 completion 接口，逐段返回增量输出
+
+        Args:
+            app_id (str): 应用ID
+            prompt (str): 提示词
+            session_id (str, optional): 多轮对话会话ID
+            memory_id (str, optional): 长期记忆体ID
+            **parameters: 其他调用参数（如 rag_options）
+
+        Yields:
+            ApplicationResponse: 每个SSE事件对应的响应，output.text 为本次新增的文本
+        """
+        parameters["incremental_output"] = True
+        payload = self._build_application_payload(prompt, session_id, memory_id, **parameters)
+        session = self._get_session()
+        self._requests += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            async with session.post(f"{self.base_url}/apps/{app_id}/completion",
+                                    json=payload,
+                                    headers={"X-DashScope-SSE": "enable"}) as response:
+                if response.status >= 400 or not response.content_type.startswith("text/event-stream"):
+                    # 出错时服务端直接返回普通JSON
+                    text = await response.text()
+                    if response.status >= 400:
+                        self._errors += 1
+                    try:
+                        data = json.loads(text) if text else {}
+                    except json.JSONDecodeError:
+                        data = {"message": text}
+                    yield ApplicationResponse(response.status, data if isinstance(data, dict) else {})
+                    return
+
+                status = response.status
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").rstrip("\r\n")
+                    if line.startswith(":HTTP_STATUS/"):
+                        status = int(line[len(":HTTP_STATUS/"):] or status)
+                    elif line.startswith("data:"):
+                        try:
+                            data = json.loads(line[len("data:"):])
+                        except json.JSONDecodeError:
+                            logger.warning(f"无法解析SSE数据行: {line[:100]}")
+                            continue
+                        yield ApplicationResponse(status, data if isinstance(data, dict) else {})
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    async def post_json(self, path: str, payload: Dict[str, Any]) -> JsonResponse:
+        """
+        调用其他JSON接口（如创建记忆体）
+
+        Args:
+            path (str): 相对于 base_url 的路径
+            payload (dict): 请求体
+
+        Returns:
+            JsonResponse: 响应
+        """
+        status, text = await self._post(path, payload)
+        return JsonResponse(status, text)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回客户端运行指标"""
+        return {
+            "base_url": self.base_url,
+            "pool_size": self.pool_size,
+            "requests": self._requests,
+            "errors": self._errors,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "connections_created": self._connections_created,
+            "connections_reused": self._connections_reused,
+        }
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("DashScope异步连接池已关闭")
+        self._session = None
+        self._session_loop = None
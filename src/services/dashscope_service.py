@@ -9,8 +9,28 @@ DashScope翻译服务模块
 
 import os
 import json
+import time
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from contextlib import aclosing
+from typing import Optional, Dict, Any, AsyncIterator, Awaitable, Callable
+
+from src.services.upstream_executor import UpstreamExecutor
+from src.services.singleflight import SingleFlight
+from src.services.resilience import ResilientCaller, CircuitOpenError, RETRYABLE_EXCEPTIONS
+from src.services.concurrency_limiter import AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded
+from src.services.hedging import Hedger
+from src.services.upstream_scheduler import BACKGROUND, BULK, parse_tenant_weights
+from src.services.translation_cache import TranslationCache
+from src.services.translation_memory import TranslationMemory
+from src.services.segmenter import split_segments, join_segments
+from src.services.chunker import estimate_tokens, split_chunks
+from src.services.workflow_document import WorkflowDocument
+from src.services.terminology_store import terminology_store
+from src.services.prompt_registry import prompt_registry
+
+# 代码内置翻译提示词的版本号，修改 _build_translation_prompt 中的提示词时需同步递增，使旧的缓存结果失效
+TRANSLATION_PROMPT_VERSION = "1"
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +58,94 @@ class DashScopeTranslationService:
         # 从 WVC/aliyun 文件获取的知识库ID列表
         self.knowledge_base_ids = ["didtamgrxs", "ebnq5okz57", "fc2ov71ytv", "ihu3fyuhwk", "s9gacm0ko0"]
         
+        # 上游调用线程池：SDK调用是阻塞的，统一放到独立线程池中执行，避免阻塞事件循环
+        self.upstream_executor = UpstreamExecutor(
+            max_workers=int(os.getenv("DASHSCOPE_MAX_WORKERS", "16")),
+            max_queue_size=int(os.getenv("DASHSCOPE_MAX_QUEUE", "64"))
+        )
+        # 相同翻译请求的进行中合并：并发的相同请求只调用一次上游
+        self.translation_flight = SingleFlight("translate_text")
+        # 翻译结果缓存（内存LRU + SQLite），TRANSLATION_CACHE=0 时关闭
+        self.result_cache = None
+        if os.getenv("TRANSLATION_CACHE", "1") != "0":
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            self.result_cache = TranslationCache(
+                db_path=os.getenv("TRANSLATION_CACHE_PATH", os.path.join(project_root, "cache", "translation_cache.db")),
+                memory_size=int(os.getenv("MAX_CACHE_SIZE", "1000")),
+                memory_ttl=float(os.getenv("TRANSLATION_CACHE_MEMORY_TTL", "600")),
+                ttl=float(os.getenv("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))
+            )
+        # 是否把原文中出现的术语库术语作为术语对照注入翻译提示词（默认关闭，术语库经过整理后再开启）
+        self.glossary_injection = os.getenv("TERMINOLOGY_INJECTION", "0") == "1"
+        # 句段级翻译记忆：直接翻译模式下的多句文本逐句查询，只翻译未命中的句子，TRANSLATION_MEMORY=0 时关闭
+        self.translation_memory = None
+        if os.getenv("TRANSLATION_MEMORY", "1") != "0":
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            memory = TranslationMemory(
+                os.getenv("TRANSLATION_MEMORY_PATH", os.path.join(project_root, "cache", "translation_memory.db")),
+                fuzzy_threshold=float(os.getenv("TRANSLATION_MEMORY_FUZZY_THRESHOLD", "0.9"))
+            )
+            self.translation_memory = memory if memory.is_available else None
+        # 批量翻译的默认并发数
+        self.batch_concurrency = int(os.getenv("DASHSCOPE_BATCH_CONCURRENCY", "8"))
+        # 长文本分块翻译的每块估算token上限，超过该长度的原文分块并发翻译，0 表示不分块
+        self.chunk_max_tokens = int(os.getenv("TRANSLATION_CHUNK_TOKENS", "1000"))
+        
+        # 上游调用容错：可重试的错误按指数退避加抖动重试，每类操作一个熔断器
+        retryable_exceptions = RETRYABLE_EXCEPTIONS
+        try:
+            import aiohttp
+            retryable_exceptions += (aiohttp.ClientError,)
+        except ImportError:
+            pass
+        self.resilience = ResilientCaller(
+            max_attempts=int(os.getenv("DASHSCOPE_RETRY_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("DASHSCOPE_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("DASHSCOPE_RETRY_MAX_DELAY", "8")),
+            failure_threshold=int(os.getenv("DASHSCOPE_BREAKER_THRESHOLD", "5")),
+            recovery_timeout=float(os.getenv("DASHSCOPE_BREAKER_RECOVERY", "30")),
+            half_open_max_calls=int(os.getenv("DASHSCOPE_BREAKER_HALF_OPEN_CALLS", "1")),
+            retryable_exceptions=retryable_exceptions
+        )
+        
+        # 上游并发上限：随限流响应和延迟自适应调整，超出的调用有界排队，排不上时直接拒绝；
+        # 排队按交互、后台（批量翻译接口）、批量（异步任务）的优先级和租户公平调度
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=int(os.getenv("DASHSCOPE_CONCURRENCY_INITIAL", "16")),
+            min_limit=int(os.getenv("DASHSCOPE_CONCURRENCY_MIN", "2")),
+            max_limit=int(os.getenv("DASHSCOPE_CONCURRENCY_MAX", "64")),
+            max_queue=int(os.getenv("DASHSCOPE_CONCURRENCY_QUEUE", "64")),
+            max_wait=float(os.getenv("DASHSCOPE_CONCURRENCY_MAX_WAIT", "5")),
+            latency_tolerance=float(os.getenv("DASHSCOPE_CONCURRENCY_LATENCY_TOLERANCE", "2")),
+            class_shares={
+                BACKGROUND: float(os.getenv("DASHSCOPE_SCHEDULER_BACKGROUND_SHARE", "0.75")),
+                BULK: float(os.getenv("DASHSCOPE_SCHEDULER_BULK_SHARE", "0.5"))
+            },
+            class_max_wait={BULK: float(os.getenv("DASHSCOPE_SCHEDULER_BULK_MAX_WAIT", "60"))},
+            tenant_weights=parse_tenant_weights(os.getenv("DASHSCOPE_SCHEDULER_TENANT_WEIGHTS"))
+        )
+        
+        # 对冲请求（DASHSCOPE_HEDGING=1 时启用）：短文本直接翻译与专业名词解释的调用超过近期延迟分位数仍未返回时，
+        # 再发起一次相同的调用，取先返回的结果
+        self.hedgers: Dict[str, Hedger] = {}
+        if os.getenv("DASHSCOPE_HEDGING", "0") == "1":
+            for operation in ("translate", "explain"):
+                self.hedgers[operation] = Hedger(
+                    operation,
+                    percentile=float(os.getenv("DASHSCOPE_HEDGE_PERCENTILE", "95")) / 100,
+                    initial_delay=float(os.getenv("DASHSCOPE_HEDGE_INITIAL_DELAY", "2")),
+                    min_delay=float(os.getenv("DASHSCOPE_HEDGE_MIN_DELAY", "0.2")),
+                    budget_ratio=float(os.getenv("DASHSCOPE_HEDGE_BUDGET", "0.1")),
+                    control_ratio=float(os.getenv("DASHSCOPE_HEDGE_CONTROL_RATIO", "0.05"))
+                )
+        # 参与对冲的翻译原文估算token上限，工作流模式和更长的原文不对冲
+        self.hedge_max_tokens = int(os.getenv("DASHSCOPE_HEDGE_MAX_TOKENS", "200"))
+        
+        # 接口根地址，可指向私网终端节点或本地模拟服务
+        self.base_url = os.getenv("DASHSCOPE_BASE_URL", "https://dashscope.aliyuncs.com/api/v1").rstrip("/")
+        # 原生异步客户端（热路径），不可用时回退到线程池中的SDK调用
+        self.async_client = None
+        
         # 尝试导入并配置DashScope
         try:
             import dashscope
@@ -51,6 +159,20 @@ class DashScopeTranslationService:
             # 设置API Key
             os.environ['DASHSCOPE_API_KEY'] = self.api_key
             self.dashscope.api_key = self.api_key
+            self.dashscope.base_http_api_url = self.base_url
+            
+            # 创建异步客户端，复用连接池中的长连接
+            if os.getenv("DASHSCOPE_ASYNC_CLIENT", "1") != "0":
+                try:
+                    from src.services.dashscope_client import AsyncDashScopeClient
+                    self.async_client = AsyncDashScopeClient(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        pool_size=int(os.getenv("DASHSCOPE_POOL_SIZE", "100")),
+                        timeout=float(os.getenv("DASHSCOPE_TIMEOUT", "120"))
+                    )
+                except ImportError as e:
+                    logger.warning(f"aiohttp未安装，将在线程池中执行SDK调用: {e}")
             
             # 测试连接
             if self._test_connection():
@@ -75,32 +197,14 @@ class DashScopeTranslationService:
     
     def _check_prompt_template_file(self):
         """
-        检查提示词模板文件是否存在，并记录路径信息，帮助诊断文件路径问题。
+        检查提示词模板文件是否已加载，并记录路径信息，帮助诊断文件路径问题。
         """
-        try:
-            # 获取可能的提示词模板文件路径
-            current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            possible_paths = [
-                os.path.join(current_dir, "prompt"),                  # WVC/prompt
-                os.path.join(os.path.dirname(current_dir), "prompt"), # prompt
-                "WVC/prompt",                                         # 相对路径
-                "prompt"                                              # 当前目录
-            ]
-            
-            # 检查哪些路径存在
-            found_paths = []
-            for path in possible_paths:
-                if os.path.exists(path):
-                    found_paths.append(path)
-            
-            if found_paths:
-                logger.info(f"找到提示词模板文件，可用路径: {', '.join(found_paths)}")
-            else:
-                logger.warning(f"未找到提示词模板文件，已尝试以下路径: {', '.join(possible_paths)}")
-                logger.warning(f"当前工作目录: {os.getcwd()}")
-                
-        except Exception as e:
-            logger.error(f"检查提示词模板文件时发生错误: {str(e)}")
+        template = prompt_registry.get()
+        if template.path:
+            logger.info(f"使用提示词模板文件: {template.path} (版本 {template.digest})")
+        else:
+            logger.warning(f"未找到提示词模板文件，已尝试以下路径: {', '.join(prompt_registry.candidate_paths)}")
+            logger.warning(f"当前工作目录: {os.getcwd()}")
     
     def _test_connection(self) -> bool:
         """
@@ -126,6 +230,210 @@ class DashScopeTranslationService:
             logger.debug(f"连接测试失败: {e}")
             return False
     
+    async def _call_application(self, operation: str = "translate", **kwargs):
+        """
+        调用DashScope应用，自动附带 api_key 和 app_id
+        优先使用异步客户端，否则在上游线程池中执行 Application.call；
+        限流、服务端错误、超时和连接错误按退避策略重试，熔断期间直接抛出 CircuitOpenError；
+        每次尝试占用一个上游并发名额，排不上队时抛出 ConcurrencyLimitExceeded
+        
+        Args:
+            operation (str): 操作类型（translate、chat、explain、knowledge、memory），每类操作使用独立的熔断器
+            **kwargs: 调用参数（prompt、rag_options、session_id、memory_id等）
+            
+        Returns:
+            与 Application.call 返回结构一致的响应对象
+        """
+        return await self.resilience.call(operation, lambda: self._call_application_once(**kwargs))
+    
+    async def _call_application_hedged(self, operation: str, **kwargs):
+        """
+        与 _call_application 相同；该类操作启用了对冲时，超过对冲阈值仍未返回则再发起一次调用，
+        取先返回的成功响应并取消另一个。上游并发已满时不对冲
+        """
+        hedger = self.hedgers.get(operation)
+        if hedger is None:
+            return await self._call_application(operation, **kwargs)
+        limiter = self.concurrency_limiter
+        return await hedger.run(
+            lambda: self._call_application(operation, **kwargs),
+            accept=lambda response: response.status_code == self.HTTPStatus.OK,
+            allow_hedge=lambda: limiter.in_flight < limiter.limit
+        )
+    
+    async def _call_application_once(self, **kwargs):
+        """发起一次应用调用，不重试"""
+        async with self.concurrency_limiter.slot() as permit:
+            if self.async_client is not None:
+                response = await self.async_client.call_application(self.app_id, **kwargs)
+            else:
+                response = await self.upstream_executor.run(
+                    self.Application.call,
+                    api_key=self.api_key,
+                    app_id=self.app_id,
+                    **kwargs
+                )
+            permit.record_status(response.status_code)
+            return response
+    
+    async def _stream_application(self, operation: str = "translate", **kwargs) -> AsyncIterator[Any]:
+        """
+        以增量输出方式调用DashScope应用，逐段返回响应
+        收到第一段响应之前的失败（可重试的状态码、超时、连接错误）按退避策略重试，来不及在请求截止时间前重试时不再重试；
+        已经返回过内容后不再重试，错误原样交给调用方
+        
+        Args:
+            operation (str): 操作类型，决定使用的熔断器
+            **kwargs: 调用参数（prompt、rag_options等）
+            
+        Yields:
+            与 Application.call 返回结构一致的响应对象，output.text 为本次新增的文本
+        """
+        resilience = self.resilience
+        breaker = resilience.breaker(operation)
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = breaker.acquire()
+            # 本次尝试是否已计入熔断器（收到第一段响应时即可判断上游是否正常）
+            settled = False
+            retry_error = None
+            try:
+                async with aclosing(self._stream_application_once(**kwargs)) as responses:
+                    async for response in responses:
+                        if not settled:
+                            settled = True
+                            if not resilience.is_retryable_status(response.status_code):
+                                breaker.record_success(probe)
+                            else:
+                                breaker.record_failure(probe)
+                                delay = resilience.next_delay(attempt)
+                                if delay is not None:
+                                    retry_error = f"HTTP {response.status_code}"
+                                    break
+                        yield response
+                if not settled:
+                    breaker.record_success(probe)
+            except resilience.retryable_exceptions as e:
+                if settled:
+                    raise
+                breaker.record_failure(probe)
+                delay = resilience.next_delay(attempt)
+                if delay is None:
+                    raise
+                retry_error = f"{type(e).__name__}: {e}"
+            except BaseException:
+                if not settled:
+                    breaker.release(probe)
+                raise
+            if retry_error is None:
+                return
+            logger.warning(f"上游流式调用失败（{operation}，第 {attempt}/{resilience.max_attempts} 次）: {retry_error}，"
+                           f"{delay:.2f} 秒后重试")
+            await asyncio.sleep(delay)
+    
+    async def _stream_application_once(self, **kwargs) -> AsyncIterator[Any]:
+        """发起一次流式应用调用，不重试；整个流式输出期间占用一个上游并发名额"""
+        async with self.concurrency_limiter.slot() as permit:
+            first = True
+            async for response in self._stream_application_raw(**kwargs):
+                if first:
+                    permit.record_status(response.status_code)
+                    first = False
+                yield response
+    
+    async def _stream_application_raw(self, **kwargs) -> AsyncIterator[Any]:
+        if self.async_client is not None:
+            async for response in self.async_client.stream_application(self.app_id, **kwargs):
+                yield response
+            return
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        end_of_stream = object()
+        
+        def pump():
+            try:
+                for response in self.Application.call(api_key=self.api_key,
+                                                      app_id=self.app_id,
+                                                      stream=True,
+                                                      incremental_output=True,
+                                                      **kwargs):
+                    loop.call_soon_threadsafe(queue.put_nowait, response)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, end_of_stream)
+        
+        pump_task = asyncio.ensure_future(self.upstream_executor.run(pump))
+        try:
+            while True:
+                item = await queue.get()
+                if item is end_of_stream:
+                    break
+                yield item
+            # 传递线程中的异常
+            await pump_task
+        finally:
+            if not pump_task.done():
+                pump_task.cancel()
+    
+    def _overloaded_result(self, error: ConcurrencyLimitExceeded, result_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        上游并发已满、调用被拒绝时的失败结果，附带 overloaded 标记和建议的重试等待时间
+        
+        Args:
+            error (ConcurrencyLimitExceeded): 并发限制器抛出的异常
+            result_key (str, optional): 结果字段名（translation、response等），值为 None
+            
+        Returns:
+            Dict[str, Any]: 失败结果
+        """
+        logger.warning(f"上游并发已满，拒绝调用: {error}")
+        result = {
+            "success": False,
+            "error": str(error),
+            "overloaded": True,
+            "retry_after": error.retry_after
+        }
+        if result_key:
+            result[result_key] = None
+        return result
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取上游调用相关的运行指标
+        
+        Returns:
+            Dict[str, Any]: 指标字典
+        """
+        metrics = {
+            "upstream_executor": self.upstream_executor.get_metrics(),
+            "translation_coalescing": self.translation_flight.get_metrics(),
+            "resilience": self.resilience.get_metrics(),
+            "concurrency_limiter": self.concurrency_limiter.get_metrics()
+        }
+        if self.hedgers:
+            metrics["hedging"] = {operation: hedger.get_metrics() for operation, hedger in self.hedgers.items()}
+        metrics["prompt_template"] = prompt_registry.get_metrics()
+        if self.result_cache is not None:
+            metrics["translation_cache"] = self.result_cache.get_metrics()
+        if self.translation_memory is not None:
+            metrics["translation_memory"] = self.translation_memory.get_metrics()
+        if self.async_client is not None:
+            metrics["async_client"] = self.async_client.get_metrics()
+        return metrics
+    
+    async def close(self):
+        """
+        释放上游调用资源（异步连接池与线程池）
+        """
+        if self.async_client is not None:
+            await self.async_client.close()
+        if self.result_cache is not None:
+            self.result_cache.close()
+        if self.translation_memory is not None:
+            self.translation_memory.close()
+        self.upstream_executor.shutdown(wait=False)
+    
     async def translate_text(self, 
                            text: str, 
                            source_lang: str = "zh", 
@@ -152,6 +460,357 @@ class DashScopeTranslationService:
                 "translation": None
             }
         
+        # 工作流输出无法按句拆分，翻译记忆只用于直接翻译模式；
+        # 记忆路径逐句翻译未命中的句段，超过分块预算的单个句段在其中分块
+        if self.translation_memory is not None and not show_workflow and not context:
+            segments = split_segments(text, source_lang)
+            if segments:
+                return await self._translate_with_memory(text, segments, source_lang, target_lang)
+        
+        # 超过分块预算的长文本分块并发翻译
+        if self.chunk_max_tokens > 0 and estimate_tokens(text) > self.chunk_max_tokens:
+            chunks = split_chunks(text, source_lang, self.chunk_max_tokens)
+            if len(chunks) > 1:
+                return await self._translate_chunked(text, chunks, source_lang, target_lang, context, show_workflow)
+        
+        return await self._translate_cached(text, source_lang, target_lang, context, show_workflow)
+    
+    async def _translate_cached(self, 
+                                text: str, 
+                                source_lang: str, 
+                                target_lang: str,
+                                context: Optional[str],
+                                show_workflow: bool,
+                                inject_glossary: bool = True) -> Dict[str, Any]:
+        """
+        先查结果缓存，未命中时通过进行中请求合并调用上游，参数与 translate_text 相同
+        
+        Args:
+            inject_glossary (bool): 是否在上下文中追加原文所含术语的对照表（调用方已追加时为False）
+        """
+        if inject_glossary:
+            context = self._with_glossary_context(text, source_lang, target_lang, context)
+        cache_key = self._get_cache_key(text, source_lang, target_lang, context, show_workflow)
+        if cache_key is not None:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                logger.info(f"翻译缓存命中: {text[:50]}...")
+                cached["cached"] = True
+                return cached
+        
+        async def translate_and_cache():
+            result = await self._translate_text_once(text, source_lang, target_lang, context, show_workflow)
+            await self._store_in_cache(cache_key, result, text, source_lang, target_lang, show_workflow)
+            return result
+        
+        # 相同参数的并发请求共享同一次上游调用
+        flight_key = cache_key or (text, source_lang, target_lang, context, show_workflow)
+        return await self.translation_flight.do(flight_key, translate_and_cache)
+    
+    async def _translate_with_memory(self, 
+                                     text: str, 
+                                     segments: list, 
+                                     source_lang: str, 
+                                     target_lang: str) -> Dict[str, Any]:
+        """
+        基于翻译记忆逐句翻译：
+        1. 完全相同的句段直接复用；
+        2. 与记忆库中句段仅数字不同时，替换数字后直接使用；
+        3. 相似度达到阈值的句段，把相似句段及其译文作为参考上下文交给模型；
+        4. 其余句段正常翻译，超过分块预算的单个句段再分块翻译。新译出的句段写回记忆库
+        记忆库的SQLite读写在线程池中执行，不阻塞事件循环
+        
+        Args:
+            text (str): 完整原文
+            segments (list): split_segments 切分出的句段
+            source_lang (str): 源语言代码
+            target_lang (str): 目标语言代码
+            
+        Returns:
+            Dict[str, Any]: 与 translate_text 结构一致的结果，附加句段命中统计
+        """
+        memory = self.translation_memory
+        loop = asyncio.get_running_loop()
+        segment_texts = [segment.text for segment in segments]
+        translations: Dict[int, str] = await loop.run_in_executor(
+            None, memory.lookup_many, segment_texts, source_lang, target_lang
+        )
+        memory_hits = len(translations)
+        
+        # 相同句段只处理一次
+        missing_texts = list(dict.fromkeys(segment_texts[index] for index in range(len(segments))
+                                           if index not in translations))
+        
+        new_pairs: Dict[str, str] = {}
+        fuzzy_contexts: Dict[str, str] = {}
+        fuzzy_matches = await loop.run_in_executor(
+            None, lambda: [memory.fuzzy_lookup(segment_text, source_lang, target_lang) for segment_text in missing_texts]
+        )
+        for segment_text, match in zip(missing_texts, fuzzy_matches):
+            if match is None:
+                continue
+            if match.translation is not None:
+                new_pairs[segment_text] = match.translation
+            else:
+                fuzzy_contexts[segment_text] = (
+                    f"翻译记忆中有相似句段（相似度 {match.similarity:.0%}），请参考其译法并保持术语一致：\n"
+                    f"原文：{match.source_text}\n"
+                    f"译文：{match.target_text}"
+                )
+        fuzzy_served = len(new_pairs)
+        to_translate = [segment_text for segment_text in missing_texts if segment_text not in new_pairs]
+        logger.info(f"翻译记忆: 共 {len(segments)} 句，完全命中 {memory_hits} 句，"
+                    f"模糊命中直接复用 {fuzzy_served} 句，模糊参考 {len(fuzzy_contexts)} 句，"
+                    f"需翻译 {len(to_translate)} 句")
+        
+        if to_translate:
+            semaphore = asyncio.Semaphore(self.batch_concurrency)
+            
+            async def translate_segment(segment_text: str) -> Dict[str, Any]:
+                context = fuzzy_contexts.get(segment_text)
+                # 没有句末标点等原因切不开的超长句段同样按分块预算分块，分块翻译自带并发限制
+                if self.chunk_max_tokens > 0 and estimate_tokens(segment_text) > self.chunk_max_tokens:
+                    chunks = split_chunks(segment_text, source_lang, self.chunk_max_tokens)
+                    if len(chunks) > 1:
+                        return await self._translate_chunked(segment_text, chunks, source_lang, target_lang,
+                                                             context, False)
+                async with semaphore:
+                    return await self._translate_cached(segment_text, source_lang, target_lang, context, False)
+            
+            results = await asyncio.gather(*(translate_segment(segment_text) for segment_text in to_translate))
+            for index, (segment_text, result) in enumerate(zip(to_translate, results)):
+                if not result.get("success"):
+                    return {
+                        "success": False,
+                        "error": f"第 {index + 1} 个待翻译句段失败: {result.get('error')}",
+                        "translation": None,
+                        "overloaded": bool(result.get("overloaded")),
+                        "retry_after": result.get("retry_after")
+                    }
+                new_pairs[segment_text] = result["translation"]
+        
+        if new_pairs:
+            await loop.run_in_executor(None, memory.record_many, list(new_pairs.items()), source_lang, target_lang)
+            for index, segment_text in enumerate(segment_texts):
+                if index not in translations:
+                    translations[index] = new_pairs[segment_text]
+        
+        translation_result = join_segments([translations[index] for index in range(len(segments))],
+                                           segments, target_lang)
+        return {
+            "success": True,
+            "translation": translation_result,
+            "source_text": text,
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "session_id": None,
+            "model_used": self.model_name,
+            "segments_total": len(segments),
+            "segments_from_memory": memory_hits,
+            "segments_fuzzy_served": fuzzy_served,
+            "segments_fuzzy_referenced": len(fuzzy_contexts)
+        }
+    
+    async def _translate_chunked(self, 
+                                 text: str, 
+                                 chunks: list, 
+                                 source_lang: str, 
+                                 target_lang: str,
+                                 context: Optional[str],
+                                 show_workflow: bool) -> Dict[str, Any]:
+        """
+        长文本分块并发翻译，按原顺序拼接
+        
+        Args:
+            text (str): 完整原文
+            chunks (list): split_chunks 切分出的块
+            source_lang (str): 源语言代码
+            target_lang (str): 目标语言代码
+            context (str, optional): 额外的上下文信息
+            show_workflow (bool): 是否展示翻译工作流过程
+            
+        Returns:
+            Dict[str, Any]: 与 translate_text 结构一致的结果，附加分块数
+        """
+        result = await self.translate_chunks(text, chunks, source_lang, target_lang, context, show_workflow)
+        if not result["success"]:
+            return result
+        return {
+            "success": True,
+            "translation": self.stitch_chunks(result["outputs"], chunks, target_lang, show_workflow),
+            "source_text": text,
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "session_id": None,
+            "model_used": self.model_name,
+            "chunks_total": len(chunks)
+        }
+    
+    async def translate_chunks(self, 
+                               text: str, 
+                               chunks: list, 
+                               source_lang: str, 
+                               target_lang: str,
+                               context: Optional[str] = None,
+                               show_workflow: bool = False,
+                               completed: Optional[Dict[int, str]] = None,
+                               on_chunk: Optional[Callable[[int, str], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """
+        并发翻译各块，返回按原顺序排列的各块输出（未拼接）
+        术语对照表按全文匹配一次，所有块使用同一份，保证同一术语在各块中的译法一致
+        
+        Args:
+            text (str): 完整原文（用于匹配术语）
+            chunks (list): split_chunks 切分出的块
+            source_lang (str): 源语言代码
+            target_lang (str): 目标语言代码
+            context (str, optional): 额外的上下文信息
+            show_workflow (bool): 是否展示翻译工作流过程
+            completed (Dict[int, str], optional): 已完成的块（块下标 -> 输出），这些块不再翻译，用于从检查点继续
+            on_chunk (Callable[[int, str], Awaitable[None]], optional): 每完成一块等待一次（块下标, 输出）；
+                                                             抛出异常时取消其余块并向上传递
+            
+        Returns:
+            Dict[str, Any]: {"success": True, "outputs": 各块输出列表}，或 {"success": False, "error": 错误信息}
+        """
+        outputs: Dict[int, str] = dict(completed or {})
+        pending = [index for index in range(len(chunks)) if index not in outputs]
+        logger.info(f"长文本分块翻译: 共 {len(chunks)} 块（已完成 {len(chunks) - len(pending)} 块），"
+                    f"估算 {estimate_tokens(text)} tokens")
+        if pending:
+            document_context = self._with_glossary_context(text, source_lang, target_lang, context)
+            semaphore = asyncio.Semaphore(self.batch_concurrency)
+            
+            async def translate_chunk(index: int) -> Dict[str, Any]:
+                async with semaphore:
+                    result = await self._translate_cached(chunks[index].text, source_lang, target_lang,
+                                                          document_context, show_workflow, inject_glossary=False)
+                if result.get("success") and on_chunk is not None:
+                    await on_chunk(index, result["translation"] or "")
+                return result
+            
+            tasks = [asyncio.ensure_future(translate_chunk(index)) for index in pending]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+            for index, result in zip(pending, results):
+                if not result.get("success"):
+                    return {
+                        "success": False,
+                        "error": f"第 {index + 1}/{len(chunks)} 块翻译失败: {result.get('error')}",
+                        "translation": None,
+                        "overloaded": bool(result.get("overloaded")),
+                        "retry_after": result.get("retry_after")
+                    }
+                outputs[index] = result["translation"] or ""
+        return {"success": True, "outputs": [outputs[index] for index in range(len(chunks))]}
+    
+    def stitch_chunks(self, outputs: list, chunks: list, target_lang: str, show_workflow: bool) -> str:
+        """
+        拼接各块输出：直接翻译模式按原文分隔拼接；工作流模式下依次给出各块的工作流，最后附上拼接后的完整最终译文
+        
+        Args:
+            outputs (list): translate_chunks 返回的各块输出
+            chunks (list): split_chunks 切分出的块
+            target_lang (str): 目标语言代码
+            show_workflow (bool): 各块输出是否为工作流
+            
+        Returns:
+            str: 完整译文
+        """
+        if not show_workflow:
+            return join_segments(outputs, chunks, target_lang)
+        if len(outputs) == 1:
+            return outputs[0]
+        final_translations = [WorkflowDocument(output).final_translation or output for output in outputs]
+        parts = [f"# 第{index}部分（共{len(chunks)}部分）\n\n{output.strip()}"
+                 for index, output in enumerate(outputs, 1)]
+        parts.append("# 最终译文\n\n" + join_segments(final_translations, chunks, target_lang))
+        return "\n\n".join(parts)
+    
+    def _with_glossary_context(self, 
+                               text: str, 
+                               source_lang: str, 
+                               target_lang: str,
+                               context: Optional[str]) -> Optional[str]:
+        """
+        在上下文中追加原文所含术语库术语的对照表
+        
+        Returns:
+            Optional[str]: 合并后的上下文
+        """
+        if not self.glossary_injection:
+            return context
+        try:
+            terms = terminology_store.find_terms(text, source_lang, target_lang)
+        except Exception as e:
+            logger.warning(f"术语库匹配失败，跳过术语注入: {e}")
+            return context
+        if not terms:
+            return context
+        
+        glossary_context = "请参考以下术语对照表进行翻译：\n" + "\n".join(
+            f"{source_term} -> {target_term}" for source_term, target_term in terms
+        )
+        logger.info(f"注入术语对照 {len(terms)} 条")
+        return f"{context}\n\n{glossary_context}" if context else glossary_context
+    
+    def get_prompt_template_version(self) -> str:
+        """
+        获取当前翻译提示词模板的版本
+        由内置提示词版本号与 prompt 模板文件内容的摘要组成，模板文件修改后版本随之变化
+        
+        Returns:
+            str: 模板版本字符串
+        """
+        return f"{TRANSLATION_PROMPT_VERSION}-{prompt_registry.get().digest}"
+    
+    def _get_cache_key(self, 
+                       text: str, 
+                       source_lang: str, 
+                       target_lang: str,
+                       context: Optional[str],
+                       show_workflow: bool) -> Optional[str]:
+        """生成翻译缓存键，未启用缓存时返回 None"""
+        if self.result_cache is None:
+            return None
+        return self.result_cache.make_key(text, source_lang, target_lang, show_workflow,
+                                          self.get_prompt_template_version(), context)
+    
+    async def _cache_get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """查询结果缓存：内存命中直接返回，否则在线程池中查询SQLite"""
+        cached = self.result_cache.get_from_memory(cache_key)
+        if cached is None:
+            cached = await asyncio.get_running_loop().run_in_executor(None, self.result_cache.get, cache_key)
+        return cached
+    
+    async def _store_in_cache(self, 
+                              cache_key: Optional[str], 
+                              result: Dict[str, Any], 
+                              text: str, 
+                              source_lang: str, 
+                              target_lang: str,
+                              show_workflow: bool):
+        """只缓存成功的翻译结果；写SQLite在线程池中执行"""
+        if cache_key is None or not result.get("success") or not result.get("translation"):
+            return
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.result_cache.set, cache_key, result, text, source_lang, target_lang, show_workflow,
+            self.get_prompt_template_version()
+        )
+    
+    async def _translate_text_once(self, 
+                                   text: str, 
+                                   source_lang: str, 
+                                   target_lang: str,
+                                   context: Optional[str],
+                                   show_workflow: bool) -> Dict[str, Any]:
+        """
+        实际调用上游执行一次翻译，参数与 translate_text 相同
+        """
         try:
             # 构建专业的海关翻译提示词
             prompt = self._build_translation_prompt(text, source_lang, target_lang, context, show_workflow)
@@ -162,10 +821,11 @@ class DashScopeTranslationService:
             logger.info(f"显示工作流: {show_workflow}")
             logger.info(f"实际调用API前 - 源语言: {source_lang}, 目标语言: {target_lang}, Prompt (部分): {prompt[:100]}...")
             
-            # 使用正确的DashScope API调用方式
-            response = self.Application.call(
-                api_key=self.api_key,
-                app_id=self.app_id,
+            # 使用正确的DashScope API调用方式；短文本直接翻译可对冲
+            hedged = not show_workflow and estimate_tokens(text) <= self.hedge_max_tokens
+            call_application = self._call_application_hedged if hedged else self._call_application
+            response = await call_application(
+                "translate",
                 prompt=prompt,
                 rag_options={
                     "pipeline_ids": self.knowledge_base_ids
@@ -206,6 +866,16 @@ class DashScopeTranslationService:
                 "model_used": self.model_name
             }
             
+        except ConcurrencyLimitExceeded as e:
+            return self._overloaded_result(e, "translation")
+        except CircuitOpenError as e:
+            logger.warning(f"DashScope翻译被熔断拒绝: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "translation": None,
+                "circuit_open": True
+            }
         except Exception as e:
             error_msg = f"DashScope翻译过程中发生错误: {str(e)}"
             logger.error(error_msg, exc_info=True) # 添加 exc_info=True 获取更详细的traceback
@@ -215,6 +885,111 @@ class DashScopeTranslationService:
                 "translation": None
             }
     
+    async def translate_text_stream(self, 
+                                  text: str, 
+                                  source_lang: str = "zh", 
+                                  target_lang: str = "en",
+                                  context: Optional[str] = None,
+                                  show_workflow: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式执行文本翻译，模型每生成一段文本即返回一次
+        
+        Args:
+            text (str): 待翻译的文本
+            source_lang (str): 源语言代码
+            target_lang (str): 目标语言代码
+            context (str, optional): 额外的上下文信息
+            show_workflow (bool): 是否展示翻译工作流过程，默认为True
+            
+        Yields:
+            Dict[str, Any]: {"type": "delta", "text": 新增文本}，
+                            结束时为 {"type": "done", "success": True, "translation": 完整译文, ...}，
+                            出错时为 {"type": "done", "success": False, "error": 错误信息, "translation": 已收到的部分}
+        """
+        if not self.is_available:
+            yield {
+                "type": "done",
+                "success": False,
+                "error": "DashScope服务不可用",
+                "translation": None
+            }
+            return
+        
+        context = self._with_glossary_context(text, source_lang, target_lang, context)
+        cache_key = self._get_cache_key(text, source_lang, target_lang, context, show_workflow)
+        if cache_key is not None:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                logger.info(f"翻译缓存命中（流式）: {text[:50]}...")
+                yield {"type": "delta", "text": cached["translation"]}
+                yield dict(cached, type="done", cached=True)
+                return
+        
+        chunks = []
+        request_id = None
+        try:
+            prompt = self._build_translation_prompt(text, source_lang, target_lang, context, show_workflow)
+            logger.info(f"开始DashScope流式翻译: {text[:50]}... (显示工作流: {show_workflow})")
+            
+            async for response in self._stream_application(
+                prompt=prompt,
+                rag_options={
+                    "pipeline_ids": self.knowledge_base_ids
+                }
+            ):
+                request_id = getattr(response, 'request_id', None) or request_id
+                if response.status_code != self.HTTPStatus.OK:
+                    error_msg = f"API调用失败: {response.status_code} - {getattr(response, 'message', '未知错误')}"
+                    logger.error(f"{error_msg} (Request ID: {request_id or 'N/A'})")
+                    yield {
+                        "type": "done",
+                        "success": False,
+                        "error": error_msg,
+                        "translation": "".join(chunks) or None
+                    }
+                    return
+                
+                delta = response.output.text if getattr(response, 'output', None) is not None else None
+                if delta:
+                    chunks.append(delta)
+                    yield {"type": "delta", "text": delta}
+            
+            translation_result = "".join(chunks).strip()
+            logger.info(f"DashScope流式翻译完成: {translation_result[:50]}...")
+            result = {
+                "success": True,
+                "translation": translation_result,
+                "source_text": text,
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "session_id": request_id,
+                "model_used": self.model_name
+            }
+            await self._store_in_cache(cache_key, result, text, source_lang, target_lang, show_workflow)
+            yield dict(result, type="done")
+            
+        except ConcurrencyLimitExceeded as e:
+            result = self._overloaded_result(e, "translation")
+            yield dict(result, type="done", translation="".join(chunks) or None)
+        except CircuitOpenError as e:
+            logger.warning(f"DashScope流式翻译被熔断拒绝: {e}")
+            yield {
+                "type": "done",
+                "success": False,
+                "error": str(e),
+                "translation": "".join(chunks) or None,
+                "circuit_open": True
+            }
+        except Exception as e:
+            error_msg = f"DashScope流式翻译过程中发生错误: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            yield {
+                "type": "done",
+                "success": False,
+                "error": error_msg,
+                "translation": "".join(chunks) or None
+            }
+    
     async def translate_with_terminology(self, 
                                        text: str, 
                                        terminology_dict: Optional[Dict[str, str]] = None,
@@ -242,26 +1017,132 @@ class DashScopeTranslationService:
         
         return await self.translate_text(text, source_lang, target_lang, context)
     
+    async def iter_batch_translate(self, 
+                                   text_list: list, 
+                                   source_lang: str = "zh", 
+                                   target_lang: str = "en",
+                                   show_workflow: bool = True,
+                                   max_concurrency: Optional[int] = None,
+                                   fail_fast: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发批量翻译，每完成一个文本立即返回其结果（返回顺序为完成顺序）
+        
+        Args:
+            text_list (list): 待翻译的文本列表；元素也可以是包含 text、source_lang、target_lang 的字典，
+                              用于为单个文本指定语言方向
+            source_lang (str): 默认源语言代码
+            target_lang (str): 默认目标语言代码
+            show_workflow (bool): 是否展示翻译工作流过程
+            max_concurrency (int, optional): 最大并发数，默认且最多为 DASHSCOPE_BATCH_CONCURRENCY
+            fail_fast (bool): 任一文本翻译失败时是否立即取消剩余文本
+            
+        Yields:
+            Dict[str, Any]: translate_text 的结果，附加 index（在输入中的位置）和 elapsed_ms（耗时）
+        """
+        total = len(text_list)
+        if total == 0:
+            return
+        
+        # 客户端指定的并发数不能超过服务端配置的上限
+        concurrency = max(1, min(max_concurrency or self.batch_concurrency, self.batch_concurrency, total))
+        logger.info(f"开始批量翻译: 共 {total} 个文本，并发数 {concurrency}")
+        
+        pending_indexes: asyncio.Queue = asyncio.Queue()
+        for index in range(total):
+            pending_indexes.put_nowait(index)
+        results: asyncio.Queue = asyncio.Queue()
+        
+        async def worker():
+            while True:
+                try:
+                    index = pending_indexes.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                
+                item = text_list[index]
+                if isinstance(item, dict):
+                    text = item.get("text") or ""
+                    item_source_lang = item.get("source_lang") or source_lang
+                    item_target_lang = item.get("target_lang") or target_lang
+                else:
+                    text = item or ""
+                    item_source_lang = source_lang
+                    item_target_lang = target_lang
+                
+                started_at = time.monotonic()
+                if not text.strip():
+                    result = {
+                        "success": False,
+                        "error": "翻译内容不能为空",
+                        "translation": None
+                    }
+                else:
+                    try:
+                        result = await self.translate_text(text, item_source_lang, item_target_lang,
+                                                           show_workflow=show_workflow)
+                    except Exception as e:
+                        result = {
+                            "success": False,
+                            "error": f"DashScope翻译过程中发生错误: {str(e)}",
+                            "translation": None
+                        }
+                result["index"] = index
+                result["source_lang"] = item_source_lang
+                result["target_lang"] = item_target_lang
+                result["elapsed_ms"] = round((time.monotonic() - started_at) * 1000, 1)
+                await results.put(result)
+        
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            for _ in range(total):
+                result = await results.get()
+                yield result
+                if fail_fast and not result.get("success"):
+                    logger.warning(f"第 {result['index'] + 1} 个文本翻译失败，取消剩余的批量翻译")
+                    break
+        finally:
+            # 提前结束（失败即停或调用方不再读取）时取消尚未完成的翻译
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
     async def batch_translate(self, 
                             text_list: list, 
                             source_lang: str = "zh", 
-                            target_lang: str = "en") -> list:
+                            target_lang: str = "en",
+                            show_workflow: bool = True,
+                            max_concurrency: Optional[int] = None,
+                            fail_fast: bool = False) -> list:
         """
-        批量翻译多个文本
+        并发批量翻译多个文本
         
         Args:
             text_list (list): 待翻译的文本列表
             source_lang (str): 源语言代码
             target_lang (str): 目标语言代码
+            show_workflow (bool): 是否展示翻译工作流过程
+            max_concurrency (int, optional): 最大并发数，不超过 DASHSCOPE_BATCH_CONCURRENCY
+            fail_fast (bool): 任一文本翻译失败时是否立即取消剩余文本
             
         Returns:
-            list: 翻译结果列表
+            list: 与输入顺序一致的翻译结果列表；被取消的文本对应 cancelled 为 True 的失败结果
         """
-        results = []
-        for i, text in enumerate(text_list):
-            logger.info(f"正在处理第 {i+1}/{len(text_list)} 个文本")
-            result = await self.translate_text(text, source_lang, target_lang)
-            results.append(result)
+        results = [None] * len(text_list)
+        async for result in self.iter_batch_translate(text_list, source_lang, target_lang,
+                                                      show_workflow=show_workflow,
+                                                      max_concurrency=max_concurrency,
+                                                      fail_fast=fail_fast):
+            results[result["index"]] = result
+        
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = {
+                    "success": False,
+                    "error": "批量翻译已取消",
+                    "translation": None,
+                    "index": index,
+                    "cancelled": True
+                }
         
         return results
     
@@ -289,9 +1170,8 @@ class DashScopeTranslationService:
             
             logger.info(f"开始DashScope单轮对话: {prompt[:50]}...")
             
-            response = self.Application.call(
-                api_key=self.api_key,
-                app_id=self.app_id,
+            response = await self._call_application(
+                operation="chat",
                 prompt=chat_prompt
             )
             
@@ -324,6 +1204,8 @@ class DashScopeTranslationService:
                 "model_used": self.model_name
             }
             
+        except ConcurrencyLimitExceeded as e:
+            return self._overloaded_result(e, "response")
         except Exception as e:
             error_msg = f"DashScope单轮对话过程中发生错误: {str(e)}"
             logger.error(error_msg)
@@ -358,9 +1240,8 @@ class DashScopeTranslationService:
             
             logger.info(f"开始DashScope多轮对话: {prompt[:50]}... (session: {session_id})")
             
-            response = self.Application.call(
-                api_key=self.api_key,
-                app_id=self.app_id,
+            response = await self._call_application(
+                operation="chat",
                 prompt=chat_prompt,
                 session_id=session_id
             )
@@ -394,6 +1275,8 @@ class DashScopeTranslationService:
                 "model_used": self.model_name
             }
             
+        except ConcurrencyLimitExceeded as e:
+            return self._overloaded_result(e, "response")
         except Exception as e:
             error_msg = f"DashScope多轮对话过程中发生错误: {str(e)}"
             logger.error(error_msg)
@@ -427,9 +1310,8 @@ class DashScopeTranslationService:
             
             logger.info(f"开始DashScope专业名词解释: {term}")
             
-            response = self.Application.call(
-                api_key=self.api_key,
-                app_id=self.app_id,
+            response = await self._call_application_hedged(
+                operation="explain",
                 prompt=explanation_prompt
             )
             
@@ -461,6 +1343,8 @@ class DashScopeTranslationService:
                 "model_used": self.model_name
             }
             
+        except ConcurrencyLimitExceeded as e:
+            return self._overloaded_result(e, "explanation")
         except Exception as e:
             error_msg = f"DashScope专业名词解释过程中发生错误: {str(e)}"
             logger.error(error_msg)
@@ -496,9 +1380,8 @@ class DashScopeTranslationService:
             if pipeline_ids:
                 rag_options["pipeline_ids"] = pipeline_ids
             
-            response = self.Application.call(
-                api_key=self.api_key,
-                app_id=self.app_id,
+            response = await self._call_application(
+                operation="knowledge",
                 prompt=query,
                 rag_options=rag_options if rag_options else None
             )
@@ -532,6 +1415,8 @@ class DashScopeTranslationService:
                 "model_used": self.model_name
             }
             
+        except ConcurrencyLimitExceeded as e:
+            return self._overloaded_result(e, "response")
         except Exception as e:
             error_msg = f"DashScope知识库检索过程中发生错误: {str(e)}"
             logger.error(error_msg)
@@ -628,71 +1513,11 @@ class DashScopeTranslationService:
 4. 遵循目标语言的行文习惯
 """
 
-        prompt_template = ""
-        try:
-            # 查找提示词模板文件的路径
-            current_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-            possible_paths = [
-                os.path.join(current_dir, "prompt"),                  # WVC/prompt
-                os.path.join(os.path.dirname(current_dir), "prompt"), # prompt
-                "WVC/prompt",                                         # 相对路径
-                "prompt"                                              # 当前目录
-            ]
-            
-            # 找到第一个存在的路径
-            prompt_file_path = None
-            for path in possible_paths:
-                if os.path.exists(path):
-                    prompt_file_path = path
-                    break
-            
-            if not prompt_file_path:
-                raise FileNotFoundError(f"无法找到提示词模板文件，已尝试路径: {', '.join(possible_paths)}")
-                
-            logger.info(f"使用提示词模板文件: {prompt_file_path}")
-            
-            # 加载提示词模板文件
-            with open(prompt_file_path, "r", encoding="utf-8") as f:
-                prompt_template = f.read()
-            
-            # 如果模板存在，使用模板中的知识库和限制条件等信息补充提示词
-            if prompt_template:
-                # 从模板中提取知识库数据解析注意事项、翻译原则、润色原则等关键部分
-                knowledge_section = ""
-                if "# 知识库数据解析注意事项" in prompt_template:
-                    knowledge_start = prompt_template.find("# 知识库数据解析注意事项")
-                    knowledge_end = prompt_template.find("#", knowledge_start + 1)
-                    if knowledge_end > knowledge_start:
-                        knowledge_section = prompt_template[knowledge_start:knowledge_end].strip()
-                
-                translation_principles = ""
-                if "# 翻译原则：" in prompt_template:
-                    principles_start = prompt_template.find("# 翻译原则：")
-                    principles_end = prompt_template.find("#", principles_start + 1)
-                    if principles_end > principles_start:
-                        translation_principles = prompt_template[principles_start:principles_end].strip()
-                
-                polish_principles = ""
-                if "# 润色原则：" in prompt_template:
-                    polish_start = prompt_template.find("# 润色原则：")
-                    polish_end = prompt_template.find("#", polish_start + 1)
-                    if polish_end > polish_start:
-                        polish_principles = prompt_template[polish_start:polish_end].strip()
-                
-                # 附加提取的部分到提示词中
-                if knowledge_section:
-                    prompt += f"\n\n{knowledge_section}"
-                if translation_principles:
-                    prompt += f"\n\n{translation_principles}"
-                if polish_principles:
-                    prompt += f"\n\n{polish_principles}"
-
-        except FileNotFoundError:
-            logger.error("提示词模板文件 WVC/prompt 未找到。将使用默认提示词。")
-            # 使用上面创建的基础提示词，已经定义了
-        except Exception as e:
-            logger.error(f"加载或格式化提示词模板 WVC/prompt 时发生错误: {e}")
-            # 使用上面创建的基础提示词，已经定义了
+        # 使用模板中的知识库数据解析注意事项、翻译原则、润色原则补充提示词（模板已在内存中解析好）
+        sections = prompt_registry.get().sections
+        for key in ("knowledge_section", "translation_principles", "polish_principles"):
+            if sections.get(key):
+                prompt += f"\n\n{sections[key]}"
         
         # 添加额外上下文 (如果提供)
         if context:
@@ -815,22 +1640,30 @@ class DashScopeTranslationService:
             }
         
         try:
-            import requests
-            
-            # 构建创建记忆体的API请求
-            url = f"https://dashscope.aliyuncs.com/api/v1/{self.workspace_id}/memories"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
             data = {}
             if description:
                 data["description"] = description
             
             logger.info("开始创建长期记忆体...")
             
-            response = requests.post(url, headers=headers, json=data)
+            async def post_memory():
+                async with self.concurrency_limiter.slot() as permit:
+                    if self.async_client is not None:
+                        response = await self.async_client.post_json(f"{self.workspace_id}/memories", data)
+                    else:
+                        import requests
+                        
+                        # 构建创建记忆体的API请求
+                        url = f"{self.base_url}/{self.workspace_id}/memories"
+                        headers = {
+                            "Authorization": f"Bearer {self.api_key}",
+                            "Content-Type": "application/json"
+                        }
+                        response = await self.upstream_executor.run(requests.post, url, headers=headers, json=data)
+                    permit.record_status(response.status_code)
+                    return response
+            
+            response = await self.resilience.call("memory", post_memory)
             
             if response.status_code == 200:
                 result = response.json()
@@ -852,6 +1685,8 @@ class DashScopeTranslationService:
                     "memory_id": None
                 }
                 
+        except ConcurrencyLimitExceeded as e:
+            return self._overloaded_result(e, "memory_id")
         except Exception as e:
             error_msg = f"创建记忆体过程中发生错误: {str(e)}"
             logger.error(error_msg)
@@ -889,9 +1724,8 @@ class DashScopeTranslationService:
             
             logger.info(f"开始DashScope长期记忆对话: {prompt[:50]}...")
             
-            response = self.Application.call(
-                api_key=self.api_key,
-                app_id=self.app_id,
+            response = await self._call_application(
+                operation="memory",
                 prompt=chat_prompt,
                 memory_id=used_memory_id
             )
@@ -925,6 +1759,8 @@ class DashScopeTranslationService:
                 "model_used": self.model_name
             }
             
+        except ConcurrencyLimitExceeded as e:
+            return self._overloaded_result(e, "response")
         except Exception as e:
             error_msg = f"DashScope长期记忆对话过程中发生错误: {str(e)}"
             logger.error(error_msg)
@@ -960,9 +1796,8 @@ class DashScopeTranslationService:
             
             logger.info(f"开始保存信息到记忆体: {info[:50]}...")
             
-            response = self.Application.call(
-                api_key=self.api_key,
-                app_id=self.app_id,
+            response = await self._call_application(
+                operation="memory",
                 prompt=save_prompt,
                 memory_id=used_memory_id
             )
@@ -984,6 +1819,8 @@ class DashScopeTranslationService:
                 "message": "信息已保存到长期记忆体"
             }
             
+        except ConcurrencyLimitExceeded as e:
+            return self._overloaded_result(e)
         except Exception as e:
             error_msg = f"保存信息到记忆体过程中发生错误: {str(e)}"
             logger.error(error_msg)
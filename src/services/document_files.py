@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+文档文件的逐段读取与译文回写
+XLSX 按单元格、TXT 按行流式读写，内存占用与文件大小无关；DOCX 按段落（含表格中的段落）读写。
+翻译分两遍进行：第一遍取出所有待翻译文本（调用方去重后并发翻译），第二遍重新读取原文件并写出同格式的译文文件
+"""
+
+import logging
+import os
+from typing import Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".xlsx", ".docx", ".txt")
+
+
+def is_translatable(value) -> bool:
+    """
+    判断单元格/段落是否需要翻译：只翻译含文字的字符串，数字、日期、公式和纯符号原样保留
+
+    Args:
+        value: 单元格值或段落文本
+
+    Returns:
+        bool: 是否需要翻译
+    """
+    if not isinstance(value, str):
+        return False
+    text = value.strip()
+    return bool(text) and not text.startswith("=") and any(ch.isalpha() for ch in text)
+
+
+def _detect_encoding(path: str) -> str:
+    """文本文件编码：UTF-8（含BOM）读取失败时按 GBK 读取"""
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            while f.read(1024 * 1024):
+                pass
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "gbk"
+
+
+# ---- XLSX ----
+
+def _iter_xlsx_texts(path: str) -> Iterator[str]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            for row in sheet.iter_rows(values_only=True):
+                for value in row:
+                    if is_translatable(value):
+                        yield value.strip()
+    finally:
+        workbook.close()
+
+
+def _write_xlsx(path: str, output_path: str, translate: Callable[[str], Optional[str]]):
+    """只读模式逐行读取、只写模式逐行写出；保留单元格值与工作表结构，不保留样式"""
+    from openpyxl import Workbook, load_workbook
+
+    source = load_workbook(path, read_only=True)
+    target = Workbook(write_only=True)
+    try:
+        for sheet in source.worksheets:
+            output_sheet = target.create_sheet(title=sheet.title)
+            for row in sheet.iter_rows(values_only=True):
+                output_sheet.append([
+                    (translate(value.strip()) or value) if is_translatable(value) else value
+                    for value in row
+                ])
+        target.save(output_path)
+    finally:
+        source.close()
+
+
+# ---- DOCX ----
+
+def _iter_docx_paragraphs(document):
+    """正文段落与表格（含嵌套表格）中的段落，按文档顺序"""
+    def from_tables(tables):
+        for table in tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    yield from cell.paragraphs
+                    yield from from_tables(cell.tables)
+
+    yield from document.paragraphs
+    yield from from_tables(document.tables)
+
+
+def _iter_docx_texts(path: str) -> Iterator[str]:
+    import docx
+
+    document = docx.Document(path)
+    for paragraph in _iter_docx_paragraphs(document):
+        if is_translatable(paragraph.text):
+            yield paragraph.text.strip()
+
+
+def _write_docx(path: str, output_path: str, translate: Callable[[str], Optional[str]]):
+    """译文写入段落的第一个文本块（保留其字体格式），其余文本块清空"""
+    import docx
+
+    document = docx.Document(path)
+    for paragraph in _iter_docx_paragraphs(document):
+        if not is_translatable(paragraph.text):
+            continue
+        translation = translate(paragraph.text.strip())
+        if translation is None:
+            continue
+        runs = paragraph.runs
+        if not runs:
+            paragraph.text = translation
+            continue
+        runs[0].text = translation
+        for run in runs[1:]:
+            run.text = ""
+    document.save(output_path)
+
+
+# ---- TXT ----
+
+def _iter_txt_texts(path: str) -> Iterator[str]:
+    with open(path, "r", encoding=_detect_encoding(path)) as f:
+        for line in f:
+            if is_translatable(line):
+                yield line.strip()
+
+
+def _write_txt(path: str, output_path: str, translate: Callable[[str], Optional[str]]):
+    """逐行写出，保留行首缩进与空行，输出统一为UTF-8"""
+    with open(path, "r", encoding=_detect_encoding(path)) as source, \
+            open(output_path, "w", encoding="utf-8", newline="") as target:
+        for line in source:
+            body = line.rstrip("\r\n")
+            if is_translatable(body):
+                translation = translate(body.strip())
+                if translation is not None:
+                    indent = body[:len(body) - len(body.lstrip())]
+                    body = indent + translation
+            target.write(body + line[len(line.rstrip("\r\n")):])
+
+
+_READERS = {".xlsx": _iter_xlsx_texts, ".docx": _iter_docx_texts, ".txt": _iter_txt_texts}
+_WRITERS = {".xlsx": _write_xlsx, ".docx": _write_docx, ".txt": _write_txt}
+
+
+def _extension(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"不支持的文件类型: {extension or path}")
+    return extension
+
+
+def iter_document_texts(path: str) -> Iterator[str]:
+    """
+    按文档顺序逐个取出需要翻译的文本（已去除首尾空白，未去重）
+
+    Args:
+        path (str): 文件路径，按扩展名识别格式
+
+    Yields:
+        str: 单元格或段落文本
+
+    Raises:
+        ValueError: 不支持的文件类型
+    """
+    return _READERS[_extension(path)](path)
+
+
+def write_translated_document(path: str, output_path: str, translations: Dict[str, str]) -> int:
+    """
+    重新读取原文件，把需要翻译的文本替换为译文后写出同格式的文件
+
+    Args:
+        path (str): 原文件路径
+        output_path (str): 译文文件路径
+        translations (Dict[str, str]): 原文（去除首尾空白）-> 译文；不在其中的文本原样保留
+
+    Returns:
+        int: 替换的单元格/段落数
+
+    Raises:
+        ValueError: 不支持的文件类型
+    """
+    replaced = 0
+
+    def translate(text: str) -> Optional[str]:
+        nonlocal replaced
+        translation = translations.get(text)
+        if translation is not None:
+            replaced += 1
+        return translation
+
+    _WRITERS[_extension(path)](path, output_path, translate)
+    logger.info(f"已写出译文文件: {output_path}，替换 {replaced} 处")
+    return replaced
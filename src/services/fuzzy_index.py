@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+模糊匹配工具
+基于字符n-gram的MinHash签名与LSH分桶，用于在大量已翻译句段中快速找出近似重复的候选，
+并提供相似度计算与“仅数字不同”时的数字替换
+"""
+
+import difflib
+import hashlib
+import re
+import struct
+from typing import List, Optional, Sequence, Set, Tuple
+
+from src.services.translation_cache import normalize_text
+
+_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)*')
+
+
+def mask_numbers(text: str) -> str:
+    """将数字统一替换为 #，使仅数字不同的句段得到相同的形态"""
+    return _NUMBER_RE.sub("#", text)
+
+
+def fuzzy_normalize(text: str) -> str:
+    """模糊匹配使用的规范化：通用规范化后再转小写"""
+    return normalize_text(text).lower()
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    计算两个句段的相似度（0~1），与翻译记忆工具常用的模糊匹配率含义一致
+
+    Args:
+        a (str): 句段一
+        b (str): 句段二
+
+    Returns:
+        float: 相似度
+    """
+    return difflib.SequenceMatcher(None, fuzzy_normalize(a), fuzzy_normalize(b), autojunk=False).ratio()
+
+
+def best_match(query: str,
+               candidates: Sequence[Tuple[str, str]],
+               threshold: float) -> Optional[Tuple[float, str, str]]:
+    """
+    在候选句段中找出与 query 最相似且不低于阈值的一条
+
+    Args:
+        query (str): 待匹配句段
+        candidates (Sequence[Tuple[str, str]]): (原文, 译文) 候选列表
+        threshold (float): 最低相似度
+
+    Returns:
+        Optional[Tuple[float, str, str]]: (相似度, 原文, 译文)，没有达到阈值的候选时返回 None
+    """
+    normalized_query = fuzzy_normalize(query)
+    # SequenceMatcher 会为第二个序列建立索引，固定为 query 后各候选之间可以复用
+    matcher = difflib.SequenceMatcher(None, autojunk=False)
+    matcher.set_seq2(normalized_query)
+    best = None
+    for source_text, target_text in candidates:
+        normalized_source = fuzzy_normalize(source_text)
+        total = len(normalized_source) + len(normalized_query)
+        floor = max(threshold, best[0] if best else 0.0)
+        # 长度差决定了相似度上限，先用它和 quick_ratio 排除不可能达标的候选
+        if not total or 2.0 * min(len(normalized_source), len(normalized_query)) / total < floor:
+            continue
+        matcher.set_seq1(normalized_source)
+        if matcher.quick_ratio() < floor:
+            continue
+        score = matcher.ratio()
+        if score >= floor and (best is None or score > best[0]):
+            best = (score, source_text, target_text)
+    return best
+
+
+def substitute_numbers(query: str, matched_source: str, matched_target: str) -> Optional[str]:
+    """
+    若 query 与 matched_source 仅有数字不同，则把 matched_target 中对应的数字替换为 query 中的数字
+
+    Args:
+        query (str): 待翻译句段
+        matched_source (str): 记忆库中的相似原文
+        matched_target (str): 记忆库中的相似原文对应的译文
+
+    Returns:
+        Optional[str]: 替换后的译文；句段不是仅数字不同，或译文中找不到对应数字时返回 None
+    """
+    if mask_numbers(fuzzy_normalize(query)) != mask_numbers(fuzzy_normalize(matched_source)):
+        return None
+    new_numbers = _NUMBER_RE.findall(query)
+    old_numbers = _NUMBER_RE.findall(matched_source)
+    if len(new_numbers) != len(old_numbers):
+        return None
+
+    mapping = {}
+    for old, new in zip(old_numbers, new_numbers):
+        if mapping.get(old, new) != new:
+            # 同一个旧数字对应多个新数字，无法确定替换关系
+            return None
+        mapping[old] = new
+    changes = {old: new for old, new in mapping.items() if old != new}
+    if not changes:
+        return matched_target
+
+    pattern = re.compile(r'(?<![\d.,])(' + "|".join(re.escape(old) for old in
+                                                   sorted(changes, key=len, reverse=True)) + r')(?![\d]|[.,]\d)')
+    found = set(pattern.findall(matched_target))
+    if found != set(changes):
+        # 译文中的数字写法与原文不同（如中文日期、千分位），放弃直接替换
+        return None
+    return pattern.sub(lambda match: changes[match.group(1)], matched_target)
+
+
+class MinHasher:
+    """
+    MinHash签名与LSH分桶
+    每个n-gram用一次 shake_128 产生 num_perm 个独立的32位哈希值，逐位取最小值即为签名；
+    num_perm 个哈希值分成 bands 组，任一组签名完全相同即成为候选，
+    候选相似度阈值约为 (1/bands) ** (1/rows)
+    """
+
+    def __init__(self, num_perm: int = 32, bands: int = 8, ngram: int = 3, seed: int = 20240524):
+        """
+        Args:
+            num_perm (int): 哈希函数个数（签名长度）
+            bands (int): LSH分组数，必须整除 num_perm
+            ngram (int): 字符n-gram长度
+            seed (int): 随机种子，同一个库中必须保持不变
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm 必须是 bands 的整数倍")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self._salt = f"{seed}:".encode("utf-8")
+        self._format = struct.Struct(f"<{num_perm}I")
+
+    def shingles(self, text: str) -> Set[str]:
+        """把文本切分为字符n-gram集合"""
+        text = fuzzy_normalize(text)
+        if len(text) <= self.ngram:
+            return {text}
+        return {text[i:i + self.ngram] for i in range(len(text) - self.ngram + 1)}
+
+    def signature(self, text: str) -> List[int]:
+        """计算文本的MinHash签名"""
+        unpack = self._format.unpack
+        size = self._format.size
+        hashed = [unpack(hashlib.shake_128(self._salt + gram.encode("utf-8")).digest(size))
+                  for gram in self.shingles(text)]
+        return list(map(min, zip(*hashed)))
+
+    def buckets(self, text: str, namespace: str = "") -> List[int]:
+        """
+        计算文本的LSH桶编号
+
+        Args:
+            text (str): 文本
+            namespace (str): 命名空间（如语言对），不同命名空间的桶互不相交
+
+        Returns:
+            List[int]: 每个分组一个64位有符号整数桶编号，可直接作为SQLite INTEGER存储
+        """
+        signature = self.signature(text)
+        result = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(
+                struct.pack(f"<I{self.rows}I", band, *rows) + namespace.encode("utf-8"),
+                digest_size=8
+            ).digest()
+            result.append(struct.unpack("<q", digest)[0])
+        return result
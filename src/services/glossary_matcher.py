@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+术语表多模式匹配
+基于 Aho-Corasick 自动机，一次扫描即可在文本中找出所有术语，并按“最左最长”原则做不重叠替换，
+耗时与输入长度（加上命中数）成线性关系，与术语表规模无关
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _is_word_char(ch: str) -> bool:
+    """拉丁字母与数字视为单词字符，中文等其他字符不参与整词判断"""
+    return ch.isascii() and (ch.isalnum() or ch == "_")
+
+
+class GlossaryMatcher:
+    """
+    术语表匹配器
+    构建一次后可被多个请求并发使用（匹配过程只读）
+    """
+
+    def __init__(self,
+                 glossary: Dict[str, str],
+                 case_insensitive: bool = False,
+                 whole_word: bool = False):
+        """
+        Args:
+            glossary (Dict[str, str]): 术语 -> 译文
+            case_insensitive (bool): 是否忽略大小写
+            whole_word (bool): 以拉丁字母/数字开头或结尾的术语是否要求整词匹配（避免 "hi" 命中 "shipping"）
+        """
+        self.case_insensitive = case_insensitive
+        self.whole_word = whole_word
+
+        # 状态转移、失败指针、状态对应的术语（术语长度, 译文）以及输出链指针
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[Optional[Tuple[int, str]]] = [None]
+        self._output_link: List[int] = [0]
+        self._terms: Dict[str, str] = {}
+
+        for term, translation in glossary.items():
+            self._add(term, translation)
+        self._build()
+        logger.debug(f"术语匹配器构建完成: {len(self._terms)} 个术语，{len(self._goto)} 个状态")
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def _fold(self, text: str) -> str:
+        """大小写折叠，保证折叠前后下标一一对应"""
+        if not self.case_insensitive:
+            return text
+        folded = text.lower()
+        if len(folded) == len(text):
+            return folded
+        # 少数字符（如 'İ'）小写后长度变化，逐字符处理以保持下标对齐
+        return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+    def _add(self, term: str, translation: str):
+        """向字典树中加入一个术语，重复的术语以后加入的为准"""
+        key = self._fold(term.strip())
+        if not key:
+            return
+        state = 0
+        for ch in key:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._output_link.append(0)
+            state = next_state
+        self._terminal[state] = (len(key), translation)
+        self._terms[key] = translation
+
+    def _build(self):
+        """按广度优先计算失败指针与输出链"""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                fail_state = self._goto[fallback].get(ch, 0)
+                if fail_state == next_state:
+                    fail_state = 0
+                self._fail[next_state] = fail_state
+                # 输出链指向失败链上最近的终止状态，匹配时只沿输出链遍历，不遍历整条失败链
+                self._output_link[next_state] = (fail_state if self._terminal[fail_state] is not None
+                                                 else self._output_link[fail_state])
+
+    def lookup(self, text: str) -> Optional[str]:
+        """
+        精确查询整个文本对应的译文
+
+        Args:
+            text (str): 文本（会去除首尾空白）
+
+        Returns:
+            Optional[str]: 译文，不存在时返回 None
+        """
+        return self._terms.get(self._fold(text.strip()))
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        按最左最长原则查找文本中不重叠的术语
+
+        Args:
+            text (str): 待匹配文本
+
+        Returns:
+            List[Tuple[int, int, str]]: (起始下标, 结束下标(不含), 译文) 列表，按起始下标升序
+        """
+        folded = self._fold(text)
+        goto = self._goto
+        fail = self._fail
+        terminal = self._terminal
+        output_link = self._output_link
+
+        # 每个起点上最长的命中：起点 -> (长度, 译文)
+        longest_at: Dict[int, Tuple[int, str]] = {}
+        state = 0
+        for index, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            match_state = state if terminal[state] is not None else output_link[state]
+            while match_state:
+                length, translation = terminal[match_state]
+                start = index - length + 1
+                if not self.whole_word or self._is_whole_word(folded, start, index + 1):
+                    best = longest_at.get(start)
+                    if best is None or length > best[0]:
+                        longest_at[start] = (length, translation)
+                match_state = output_link[match_state]
+
+        matches = []
+        position = 0
+        for start in sorted(longest_at):
+            if start < position:
+                continue
+            length, translation = longest_at[start]
+            matches.append((start, start + length, translation))
+            position = start + length
+        return matches
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        """以单词字符开头/结尾的术语，其前/后不能紧跟单词字符"""
+        if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+    def replace(self, text: str) -> Tuple[str, int]:
+        """
+        单次扫描，将文本中的术语替换为译文；替换结果不会被再次匹配
+
+        Args:
+            text (str): 待替换文本
+
+        Returns:
+            Tuple[str, int]: (替换后的文本, 替换次数)
+        """
+        matches = self.find_all(text)
+        if not matches:
+            return text, 0
+        parts = []
+        position = 0
+        for start, end, translation in matches:
+            parts.append(text[position:start])
+            parts.append(translation)
+            position = end
+        parts.append(text[position:])
+        return "".join(parts), len(matches)
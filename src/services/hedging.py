@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+对冲请求
+第一次调用超过近期调用延迟的指定分位数仍未返回时，再发起一次相同的调用，取先返回的结果并取消另一个；
+额外调用数受预算限制（不超过请求数的一定比例），避免上游变慢时对冲请求把负载成倍放大；
+随机抽出一小部分请求不做对冲作为对照组，用两组的延迟分位数对比对冲的效果
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """最近秩法取分位数，sorted_values 须已升序排列且非空"""
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(values) -> Dict[str, Optional[float]]:
+    """延迟样本（秒）的 p50/p95/p99（毫秒），没有样本时为 None"""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+    return {f"p{int(q * 100)}": round(_percentile(ordered, q) * 1000, 1) for q in (0.5, 0.95, 0.99)}
+
+
+class Hedger:
+    """
+    单类操作的对冲调用
+
+    对冲阈值取近期完成的调用延迟的 percentile 分位数（样本不足 min_samples 时使用 initial_delay），
+    并限制在 [min_delay, max_delay] 内。每个请求为预算增加 budget_ratio 次额外调用的额度（最多积累 max_burst 次），
+    每次对冲消耗一次额度。比例为 control_ratio 的请求作为对照组，不做对冲
+
+    只在事件循环线程中使用，不需要加锁
+    """
+
+    def __init__(self,
+                 name: str,
+                 percentile: float = 0.95,
+                 initial_delay: float = 2.0,
+                 min_delay: float = 0.1,
+                 max_delay: float = 10.0,
+                 min_samples: int = 20,
+                 budget_ratio: float = 0.1,
+                 max_burst: float = 10.0,
+                 control_ratio: float = 0.05,
+                 window: int = 1000):
+        """
+        Args:
+            name (str): 名称（操作类型），用于日志与指标
+            percentile (float): 对冲阈值取调用延迟的哪个分位数（0~1）
+            initial_delay (float): 延迟样本不足时的对冲阈值（秒）
+            min_delay (float): 对冲阈值下限（秒）
+            max_delay (float): 对冲阈值上限（秒）
+            min_samples (int): 按分位数计算阈值所需的最少样本数
+            budget_ratio (float): 额外调用数占请求数的比例上限
+            max_burst (float): 预算最多积累的额外调用次数
+            control_ratio (float): 不做对冲的对照组请求比例
+            window (int): 保留的最近延迟样本数
+        """
+        self.name = name
+        self.percentile = min(max(float(percentile), 0.5), 0.999)
+        self.initial_delay = float(initial_delay)
+        self.min_delay = max(0.0, float(min_delay))
+        self.max_delay = max(self.min_delay, float(max_delay))
+        self.min_samples = max(1, int(min_samples))
+        self.budget_ratio = max(0.0, float(budget_ratio))
+        self.max_burst = max(1.0, float(max_burst))
+        self.control_ratio = min(max(float(control_ratio), 0.0), 1.0)
+
+        self._budget = 1.0
+        # 单次调用的延迟（计算对冲阈值），以及对冲组、对照组请求得到结果的延迟
+        self._call_latencies: Deque[float] = deque(maxlen=window)
+        self._served_latencies: Deque[float] = deque(maxlen=window)
+        self._control_latencies: Deque[float] = deque(maxlen=window)
+        self._delay = self._clamp(self.initial_delay)
+        self._samples_since_update = 0
+
+        # 运行指标
+        self._requests = 0
+        self._control_requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._budget_exhausted = 0
+
+    def _clamp(self, delay: float) -> float:
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def hedge_delay(self) -> float:
+        """当前的对冲阈值（秒）"""
+        return self._delay
+
+    def _record_call(self, latency: float):
+        self._call_latencies.append(latency)
+        self._samples_since_update += 1
+        # 每积累一批新样本重新计算一次阈值，避免每次调用都排序
+        if len(self._call_latencies) >= self.min_samples and self._samples_since_update >= 10:
+            self._samples_since_update = 0
+            self._delay = self._clamp(_percentile(sorted(self._call_latencies), self.percentile))
+
+    async def _timed(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        started_at = time.monotonic()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            # 被取消的慢调用记为已等待的时间（实际延迟的下限），避免阈值只由较快的调用决定
+            self._record_call(time.monotonic() - started_at)
+            raise
+        self._record_call(time.monotonic() - started_at)
+        return result
+
+    async def run(self,
+                  func: Callable[[], Awaitable[Any]],
+                  accept: Optional[Callable[[Any], bool]] = None,
+                  allow_hedge: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        执行调用，超过对冲阈值仍未返回时发起对冲调用
+
+        Args:
+            func (Callable[[], Awaitable[Any]]): 发起一次调用的函数，对冲时会再调用一次
+            accept (Callable[[Any], bool], optional): 判断结果是否可用；先返回但不可用的结果会继续等待另一个调用
+            allow_hedge (Callable[[], bool], optional): 到达阈值时是否允许对冲（如上游并发已满时不对冲）
+
+        Returns:
+            Any: 先返回的可用结果；都不可用时为先返回的结果
+
+        Raises:
+            Exception: 所有调用都抛出异常时，抛出先发生的异常
+        """
+        started_at = time.monotonic()
+        if self.control_ratio and random.random() < self.control_ratio:
+            self._control_requests += 1
+            result = await self._timed(func)
+            self._control_latencies.append(time.monotonic() - started_at)
+            return result
+        
+        self._requests += 1
+        self._budget = min(self.max_burst, self._budget + self.budget_ratio)
+        primary = asyncio.ensure_future(self._timed(func))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._delay)
+            if not done:
+                if self._budget < 1:
+                    self._budget_exhausted += 1
+                elif allow_hedge is None or allow_hedge():
+                    self._budget -= 1
+                    self._hedged += 1
+                    logger.info(f"对冲调用（{self.name}）: 第一次调用 {self._delay:.2f} 秒未返回，发起第二次调用")
+                    tasks.append(asyncio.ensure_future(self._timed(func)))
+            winner, result = await self._first_result(tasks, accept)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            # 等待被取消的调用结束，避免遗留未取回的异常
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._served_latencies.append(time.monotonic() - started_at)
+        if winner is not primary:
+            self._hedge_wins += 1
+        return result
+
+    @staticmethod
+    async def _first_result(tasks: list, accept: Optional[Callable[[Any], bool]]):
+        pending = set(tasks)
+        fallback = None
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=tasks.index):
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                result = task.result()
+                if accept is None or accept(result):
+                    return task, result
+                fallback = fallback or (task, result)
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回对冲次数、对冲阈值，以及对冲组与对照组的延迟分位数"""
+        served = latency_summary(self._served_latencies)
+        control = latency_summary(self._control_latencies)
+        return {
+            "requests": self._requests,
+            "control_requests": self._control_requests,
+            "hedged": self._hedged,
+            "hedge_wins": self._hedge_wins,
+            "budget_exhausted": self._budget_exhausted,
+            "hedge_rate": round(self._hedged / self._requests, 4) if self._requests else 0.0,
+            "hedge_delay_ms": round(self._delay * 1000, 1),
+            "latency_ms": served,
+            "control_latency_ms": control,
+            "p99_saved_ms": (round(control["p99"] - served["p99"], 1)
+                             if served["p99"] is not None and control["p99"] is not None else None),
+        }
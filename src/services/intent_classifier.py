@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+用户意图识别
+查询与对话端点共用的意图规则，启动时编译成一个组合正则，一次匹配即可得到所有命中的意图及其位置
+"""
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+# 意图名称（同时用作组合正则中的分组名）
+DIRECT_TRANSLATION = "direct_translation"          # 直接翻译，不显示工作流
+SHOW_SOURCES = "show_sources"                      # 显示上一次翻译的来源
+SHOW_FINAL_TRANSLATION = "show_final_translation"  # 只展示上一次翻译的最终译文
+TRANSLATION_PREFIX = "translation_prefix"          # 对话中以"翻译："开头的翻译请求
+
+INTENT_RULES: Dict[str, List[str]] = {
+    DIRECT_TRANSLATION: [
+        r'直接翻译',
+        r'只要翻译',
+        r'只需翻译',
+        r'仅翻译',
+        r'仅需要翻译',
+        r'不需要工作流',
+        r'不要工作流',
+        r'无需工作流',
+        r'不用显示工作流',
+        r'不显示工作流',
+        r'隐藏工作流',
+        r'无工作流',
+        r'direct.*translate',
+        r'just.*translate',
+        r'only.*translate',
+        r'translate.*only',
+        r'without.*workflow',
+        r'no.*workflow'
+    ],
+    SHOW_SOURCES: [
+        r'显示.*上一.*回答.*来源',
+        r'显示.*上一.*翻译.*来源',
+        r'查看.*上一.*回答.*来源',
+        r'查看.*上一.*翻译.*来源',
+        r'上一.*回答.*来源.*是什么',
+        r'上一.*翻译.*来源.*是什么',
+        r'总结.*上一.*回答.*来源',
+        r'总结.*上一.*翻译.*来源',
+        r'上一.*回答.*引用',
+        r'上一.*翻译.*引用',
+        r'show.*previous.*translation.*source',
+        r'display.*previous.*translation.*source',
+        r'show.*last.*translation.*source',
+        r'display.*last.*translation.*source',
+        r'previous.*translation.*source',
+        r'last.*translation.*reference',
+    ],
+    SHOW_FINAL_TRANSLATION: [
+        r'直接展示最终译文',
+        r'仅展示最终译文',
+        r'只展示最终译文',
+        r'只显示最终译文',
+        r'只要最终译文',
+        r'给我最终译文',
+        r'只要译文',
+        r'仅要译文',
+        r'去掉工作流',
+        r'不要工作流',
+        r'不显示工作流',
+        r'only.*final.*translation',
+        r'just.*translation',
+        r'show.*only.*translation',
+        r'without.*workflow'
+    ],
+    TRANSLATION_PREFIX: [
+        r'翻译[：:]\s*',
+        r'translate[：:]\s*',
+        r'translation[：:]\s*'
+    ],
+}
+
+# 只在消息开头匹配的意图
+ANCHORED_INTENTS = (TRANSLATION_PREFIX,)
+
+# 从消息中去掉意图表述时，一并去掉其前后的标点
+_STRIP_PUNCTUATION = r'[，,：:。.；;]?'
+_GREEDY_GAP_RE = re.compile(r'\.\*(?![?*+])')
+_REGEX_METACHARS = set('.^$*+?{}[]\\|()')
+
+
+def _first_chars(patterns: Sequence[str]) -> Optional[str]:
+    """各规则的首字符集合（都以普通字符开头时），用于快速跳过不可能命中的位置"""
+    chars = set()
+    for pattern in patterns:
+        if not pattern or pattern[0] in _REGEX_METACHARS:
+            return None
+        chars.add(pattern[0])
+    return "".join(sorted(chars))
+
+
+class IntentMatch(NamedTuple):
+    """一个命中的意图"""
+    intent: str
+    start: int      # 命中片段在原消息中的位置
+    end: int
+    text: str       # 命中的片段
+
+
+class IntentClassifier:
+    """
+    意图分类器
+
+    每个意图的规则合并为一个分支，各意图再各自放进一个可选的前瞻断言，组成一个组合正则；
+    对消息做一次 match 即可得到所有意图在消息中的首个命中位置。
+    规则忽略大小写，命中位置直接对应原消息，不需要另外生成小写副本。
+    判断是否命中时规则中的 ".*" 按非贪婪匹配（是否命中不变，只是命中片段取最短），并先用首字符集合过滤起点
+    """
+
+    def __init__(self, rules: Dict[str, Sequence[str]], anchored: Iterable[str] = ()):
+        """
+        Args:
+            rules (Dict[str, Sequence[str]]): 意图名称 -> 规则列表（正则表达式）
+            anchored (Iterable[str]): 只在消息开头匹配的意图
+        """
+        anchored = set(anchored)
+        self.intents = list(rules)
+        lookaheads = []
+        self._strippers = {}
+        for intent, patterns in rules.items():
+            alternation = "|".join(f"(?:{pattern})" for pattern in patterns)
+            lazy_alternation = "|".join(f"(?:{_GREEDY_GAP_RE.sub('.*?', pattern)})" for pattern in patterns)
+            # 规则中的 "." 不跨行；跳过前面内容时可以跨行
+            prefix = ""
+            if intent not in anchored:
+                first_chars = _first_chars(patterns)
+                prefix = r"[\s\S]*?" + (f"(?=[{re.escape(first_chars)}])" if first_chars else "")
+            lookaheads.append(f"(?=(?:{prefix}(?P<{intent}>{lazy_alternation}))?)")
+            self._strippers[intent] = re.compile(
+                _STRIP_PUNCTUATION + r'\s*(?:' + alternation + r')\s*' + _STRIP_PUNCTUATION + r'\s*', re.IGNORECASE
+            )
+        self._pattern = re.compile("".join(lookaheads), re.IGNORECASE)
+
+    def classify(self, message: str) -> Dict[str, IntentMatch]:
+        """
+        识别消息中的所有意图
+
+        Args:
+            message (str): 用户消息
+
+        Returns:
+            Dict[str, IntentMatch]: 意图名称 -> 首个命中；未命中的意图不出现
+        """
+        matches = {}
+        if not message:
+            return matches
+        result = self._pattern.match(message)
+        for intent in self.intents:
+            start = result.start(intent)
+            if start >= 0:
+                end = result.end(intent)
+                matches[intent] = IntentMatch(intent, start, end, message[start:end])
+        return matches
+
+    def strip(self, message: str, intent: str) -> str:
+        """
+        从消息中去掉该意图的所有表述（连同前后的标点）
+
+        Args:
+            message (str): 用户消息
+            intent (str): 意图名称
+
+        Returns:
+            str: 去掉意图表述并去除首尾空白后的消息
+        """
+        return self._strippers[intent].sub(' ', message).strip()
+
+    def strip_prefix(self, message: str, match: Optional[IntentMatch]) -> str:
+        """
+        去掉消息开头命中的意图片段（用于"翻译："之类的前缀）
+
+        Args:
+            message (str): 用户消息
+            match (IntentMatch, optional): classify 返回的命中，为 None 或不在开头时原样返回
+
+        Returns:
+            str: 去掉前缀后的消息
+        """
+        if match is None or match.start != 0:
+            return message
+        return message[match.end:]
+
+
+intent_classifier = IntentClassifier(INTENT_RULES, anchored=ANCHORED_INTENTS)
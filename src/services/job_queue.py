@@ -0,0 +1,622 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+异步任务队列
+大文档翻译等耗时任务提交后立即返回任务ID，由后台工作协程执行，客户端轮询进度并取回结果；
+任务、进度和分块检查点保存在SQLite中，服务重启后未完成的任务从检查点继续执行；
+SQLite读写（忙等待最长5秒）都在线程池中执行，大任务逐块保存检查点时不阻塞事件循环上的其他请求
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+# 失败重试的退避时间（秒），按已尝试次数递增
+_RETRY_BACKOFF = 5.0
+
+
+class JobQueueFull(Exception):
+    """排队中的任务数已达上限"""
+
+
+class JobCancelled(Exception):
+    """任务已被取消，或已被其他工作进程接管"""
+
+
+class JobContext:
+    """
+    交给任务处理函数的执行上下文：读取参数、报告进度、保存和读取分块检查点
+    """
+
+    def __init__(self, queue: "JobQueue", job_id: str, kind: str, params: Dict[str, Any], attempt: int):
+        self.queue = queue
+        self.job_id = job_id
+        self.kind = kind
+        self.params = params
+        self.attempt = attempt
+
+    async def checkpoints(self) -> Dict[int, str]:
+        """
+        读取此前各次执行已保存的检查点
+
+        Returns:
+            Dict[int, str]: 分块下标 -> 该块的结果
+        """
+        return await asyncio.to_thread(self.queue._load_checkpoints, self.job_id)
+
+    async def set_total(self, total: int):
+        """
+        设置任务的总分块数（进度分母），已保存的检查点计入已完成数
+
+        Args:
+            total (int): 总分块数
+        """
+        await asyncio.to_thread(self.queue._set_total, self.job_id, total)
+
+    async def save_checkpoint(self, index: int, output: str):
+        """
+        保存一个分块的结果并推进进度；任务已被取消时抛出 JobCancelled
+
+        Args:
+            index (int): 分块下标
+            output (str): 该块的结果
+        """
+        write = asyncio.ensure_future(asyncio.to_thread(self.queue._save_checkpoint, self.job_id, index, output))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # 写入已在线程中进行：等它完成再响应取消，避免随后的重新排队抢在写入之前，使这一块白白重译
+            await asyncio.wait([write])
+            raise
+
+
+JobHandler = Callable[[JobContext], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """
+    基于SQLite的持久化任务队列与工作协程池
+
+    多个工作进程可共用同一个数据库：领取任务用一条带条件的 UPDATE ... RETURNING 原子完成，
+    执行中的任务定期刷新心跳，心跳超时（进程崩溃）的任务重新排队，由任意进程从检查点继续执行
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 workers: int = 2,
+                 lease_timeout: float = 60.0,
+                 max_attempts: int = 3,
+                 max_pending: int = 100,
+                 result_ttl: float = 7 * 24 * 3600.0,
+                 max_retained: int = 1000,
+                 poll_interval: float = 1.0):
+        """
+        Args:
+            db_path (str): SQLite数据库文件路径
+            workers (int): 本进程的工作协程数，为0时只接受提交和查询，不执行任务
+            lease_timeout (float): 执行中的任务心跳超时时间（秒），超时后重新排队
+            max_attempts (int): 每个任务最多执行次数（失败重试与崩溃恢复都计入）
+            max_pending (int): 最多排队中的任务数，超过时拒绝提交
+            result_ttl (float): 已结束任务的保留时间（秒）
+            max_retained (int): 最多保留的已结束任务数
+            poll_interval (float): 没有任务时工作协程的轮询间隔（秒）
+        """
+        self.db_path = db_path
+        self.workers = max(0, int(workers))
+        self.lease_timeout = float(lease_timeout)
+        self.max_attempts = max(1, int(max_attempts))
+        self.max_pending = max(1, int(max_pending))
+        self.result_ttl = float(result_ttl)
+        self.max_retained = max(1, int(max_retained))
+        self.poll_interval = float(poll_interval)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._cleanups: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._on_success: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._lock = threading.Lock()
+        self._conn = self._open(db_path)
+        self._tasks = []
+        self._maintenance_task: Optional[asyncio.Task] = None
+        # 本进程正在执行的任务：任务ID -> 执行任务
+        self._running: Dict[str, asyncio.Task] = {}
+        self._cancel_requested = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+        # 运行指标
+        self._submitted = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._retried = 0
+        self._cancelled = 0
+        self._resumed = 0
+        self._requeued = 0
+        self._purged = 0
+
+    @staticmethod
+    def _open(db_path: str) -> sqlite3.Connection:
+        """打开数据库并建表；WAL模式允许多个进程同时读写"""
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                progress_done INTEGER NOT NULL DEFAULT 0,
+                progress_total INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                worker_id TEXT,
+                created_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                started_at REAL,
+                heartbeat_at REAL,
+                finished_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_checkpoints (
+                job_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                output TEXT NOT NULL,
+                PRIMARY KEY (job_id, chunk_index)
+            )
+        """)
+        return conn
+
+    def register(self, kind: str, handler: JobHandler, cleanup: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_success: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        注册任务类型的处理函数
+
+        Args:
+            kind (str): 任务类型
+            handler (JobHandler): 异步处理函数，接收 JobContext，返回可JSON序列化的结果；
+                                  抛出异常表示本次执行失败
+            cleanup (Callable[[Dict[str, Any]], None], optional): 任务过保留期被清理时调用（参数为任务参数），
+                                                                  用于删除任务关联的文件
+            on_success (Callable[[Dict[str, Any]], None], optional): 成功结果保存后调用（参数为任务参数），
+                                                                     用于释放重试时才需要的资源（如上传的原文件）；
+                                                                     结果未能保存时不调用，任务仍可重新执行
+        """
+        self._handlers[kind] = handler
+        if cleanup is not None:
+            self._cleanups[kind] = cleanup
+        if on_success is not None:
+            self._on_success[kind] = on_success
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        提交任务
+
+        Args:
+            kind (str): 任务类型（须已注册）
+            params (Dict[str, Any]): 任务参数，可JSON序列化
+
+        Returns:
+            Dict[str, Any]: 任务状态（同 get）
+
+        Raises:
+            ValueError: 任务类型未注册
+            JobQueueFull: 排队中的任务数已达上限
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"未知的任务类型: {kind}")
+        job = await asyncio.to_thread(self._insert, kind, params)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def _insert(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            pending = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"排队中的任务已达上限 {self.max_pending}")
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, params, created_at, available_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params, ensure_ascii=False), now, now)
+            )
+            self._submitted += 1
+        logger.info(f"任务已提交: {job_id} ({kind})")
+        return self._read_job(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        查询任务状态与进度
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 任务状态；任务不存在（或已过保留期被清理）时返回 None
+        """
+        return await asyncio.to_thread(self._read_job, job_id)
+
+    def _read_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, kind, status, progress_done, progress_total, attempts, error, "
+                "created_at, started_at, finished_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        done, total = row[3], row[4]
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "progress": {
+                "done": done,
+                "total": total,
+                "percent": round(done * 100.0 / total, 1) if total else (100.0 if row[2] == SUCCEEDED else 0.0)
+            },
+            "attempts": row[5],
+            "error": row[6],
+            "created_at": row[7],
+            "started_at": row[8],
+            "finished_at": row[9]
+        }
+
+    async def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取已成功任务的结果
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 处理函数返回的结果；任务不存在或尚未成功时返回 None
+        """
+        return await asyncio.to_thread(self._read_result, job_id)
+
+    def _read_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM jobs WHERE job_id = ? AND status = ?", (job_id, SUCCEEDED)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return json.loads(row[0])
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        取消排队中或执行中的任务；执行中的任务在本进程时立即中止，在其他进程时于下一次保存检查点时中止
+
+        Args:
+            job_id (str): 任务ID
+
+        Returns:
+            Optional[Dict[str, Any]]: 取消后的任务状态；已结束的任务保持原状态；任务不存在时返回 None
+        """
+        if await asyncio.to_thread(self._mark_cancelled, job_id):
+            logger.info(f"任务已取消: {job_id}")
+            task = self._running.get(job_id)
+            if task is not None:
+                self._cancel_requested.add(job_id)
+                task.cancel()
+        return await self.get(job_id)
+
+    def _mark_cancelled(self, job_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, worker_id = NULL "
+                "WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+            )
+            if cursor.rowcount:
+                self._cancelled += 1
+                self._conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+        return bool(cursor.rowcount)
+
+    # ---- 处理函数通过 JobContext 调用 ----
+
+    def _load_checkpoints(self, job_id: str) -> Dict[int, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_index, output FROM job_checkpoints WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {index: output for index, output in rows}
+
+    def _set_total(self, job_id: str, total: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress_total = ?, "
+                "progress_done = (SELECT COUNT(*) FROM job_checkpoints WHERE job_id = ?) WHERE job_id = ?",
+                (int(total), job_id, job_id)
+            )
+
+    def _save_checkpoint(self, job_id: str, index: int, output: str):
+        with self._lock:
+            # 先确认任务仍由本进程执行（同时刷新心跳），再写入检查点
+            cursor = self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE job_id = ? AND status = ? AND worker_id = ?",
+                (time.time(), job_id, RUNNING, self.worker_id)
+            )
+            if not cursor.rowcount:
+                raise JobCancelled(job_id)
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO job_checkpoints (job_id, chunk_index, output) VALUES (?, ?, ?)",
+                (job_id, int(index), output)
+            )
+            if cursor.rowcount:
+                self._conn.execute("UPDATE jobs SET progress_done = progress_done + 1 WHERE job_id = ?", (job_id,))
+
+    # ---- 工作协程 ----
+
+    async def start(self):
+        """启动工作协程与维护协程（在事件循环中调用）"""
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self._maintain)
+        for index in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(index)))
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        logger.info(f"任务队列已启动: {self.db_path}，工作协程 {self.workers} 个")
+
+    async def stop(self):
+        """
+        停止工作协程；本进程中执行到一半的任务重新排队，下次启动时从检查点继续
+        """
+        self._stopping = True
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        for task in list(self._running.values()):
+            task.cancel()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _claim(self) -> Optional[JobContext]:
+        """原子地领取一个到期的排队任务"""
+        now = time.time()
+        kinds = list(self._handlers)
+        if not kinds:
+            return None
+        placeholders = ", ".join("?" for _ in kinds)
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, attempts = attempts + 1, "
+                "started_at = COALESCE(started_at, ?), heartbeat_at = ? "
+                "WHERE job_id = (SELECT job_id FROM jobs WHERE status = ? AND available_at <= ? "
+                f"AND kind IN ({placeholders}) ORDER BY created_at LIMIT 1) AND status = ? "
+                "RETURNING job_id, kind, params, attempts, progress_done",
+                (RUNNING, self.worker_id, now, now, QUEUED, now, *kinds, QUEUED)
+            ).fetchone()
+        if row is None:
+            return None
+        if row[4]:
+            self._resumed += 1
+            logger.info(f"任务从检查点继续: {row[0]}（已完成 {row[4]} 块）")
+        return JobContext(self, row[0], row[1], json.loads(row[2]), row[3])
+
+    async def _worker(self, worker_index: int):
+        while not self._stopping:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except sqlite3.Error as e:
+                logger.warning(f"领取任务失败: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                await self._execute(job)
+            except sqlite3.Error as e:
+                # 结果未能写入时任务仍处于执行中状态；本进程不再刷新其心跳，超时后由维护协程回收并从检查点重新执行
+                logger.warning(f"记录任务结果失败: {job.job_id}: {e}")
+
+    async def _execute(self, job: JobContext):
+        """执行一个任务并记录结果"""
+        logger.info(f"开始执行任务: {job.job_id} ({job.kind}，第 {job.attempt} 次)")
+        task = asyncio.create_task(self._handlers[job.kind](job))
+        self._running[job.job_id] = task
+        if self._stopping:
+            task.cancel()
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job.job_id in self._cancel_requested:
+                logger.info(f"任务已中止: {job.job_id}")
+            else:
+                await asyncio.to_thread(self._requeue, job.job_id)
+            return
+        except JobCancelled:
+            logger.info(f"任务已被取消或被其他进程接管: {job.job_id}")
+            return
+        except Exception as e:
+            logger.error(f"任务执行失败: {job.job_id}: {e}", exc_info=True)
+            await asyncio.to_thread(self._fail, job, str(e))
+            return
+        finally:
+            self._running.pop(job.job_id, None)
+            self._cancel_requested.discard(job.job_id)
+        if not await asyncio.to_thread(self._succeed, job.job_id, result):
+            return
+        on_success = self._on_success.get(job.kind)
+        if on_success is not None:
+            try:
+                await asyncio.to_thread(on_success, job.params)
+            except Exception as e:
+                logger.warning(f"任务完成后的清理失败: {job.job_id}: {e}")
+
+    def _succeed(self, job_id: str, result: Dict[str, Any]) -> bool:
+        """保存成功结果；任务已被取消或被其他进程接管时不保存，返回 False"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ?, "
+                "progress_done = MAX(progress_done, progress_total) WHERE job_id = ? AND status = ? AND worker_id = ?",
+                (SUCCEEDED, json.dumps(result, ensure_ascii=False), time.time(), job_id, RUNNING, self.worker_id)
+            )
+            if cursor.rowcount:
+                self._succeeded += 1
+                # 结果已保存，检查点不再需要
+                self._conn.execute("DELETE FROM job_checkpoints WHERE job_id = ?", (job_id,))
+        if cursor.rowcount:
+            logger.info(f"任务完成: {job_id}")
+        return bool(cursor.rowcount)
+
+    def _fail(self, job: JobContext, error: str):
+        """失败后未超过最多执行次数时延后重新排队（保留检查点），否则标记为失败"""
+        now = time.time()
+        with self._lock:
+            if job.attempt < self.max_attempts:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, available_at = ? "
+                    "WHERE job_id = ? AND status = ? AND worker_id = ?",
+                    (QUEUED, error, now + _RETRY_BACKOFF * job.attempt, job.job_id, RUNNING, self.worker_id)
+                )
+                self._retried += cursor.rowcount
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                    "WHERE job_id = ? AND status = ? AND worker_id = ?",
+                    (FAILED, error, now, job.job_id, RUNNING, self.worker_id)
+                )
+                self._failed += cursor.rowcount
+
+    def _requeue(self, job_id: str):
+        """服务停止时把本进程执行中的任务放回队列"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, attempts = MAX(attempts - 1, 0) "
+                "WHERE job_id = ? AND status = ? AND worker_id = ?",
+                (QUEUED, job_id, RUNNING, self.worker_id)
+            )
+            self._requeued += cursor.rowcount
+        logger.info(f"服务停止，任务重新排队: {job_id}")
+
+    async def _maintenance_loop(self):
+        interval = max(1.0, self.lease_timeout / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if await asyncio.to_thread(self._maintain, list(self._running)) and self._wakeup is not None:
+                self._wakeup.set()
+
+    def _maintain(self, running: Iterable[str] = ()) -> int:
+        """
+        刷新本进程任务的心跳，回收心跳超时的任务，清理超过保留期限的已结束任务（在线程池中执行）
+
+        Args:
+            running (Iterable[str]): 本进程正在执行的任务ID
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        now = time.time()
+        running = list(running)
+        finished = ", ".join("?" for _ in FINISHED_STATUSES)
+        try:
+            with self._lock:
+                if running:
+                    placeholders = ", ".join("?" for _ in running)
+                    self._conn.execute(
+                        f"UPDATE jobs SET heartbeat_at = ? WHERE worker_id = ? AND job_id IN ({placeholders})",
+                        (now, self.worker_id, *running)
+                    )
+                stale = now - self.lease_timeout
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = '执行次数已用完（工作进程多次中断）', finished_at = ? "
+                    "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                    (FAILED, now, RUNNING, stale, self.max_attempts)
+                )
+                recovered = self._conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = NULL, available_at = ? "
+                    "WHERE status = ? AND heartbeat_at < ?",
+                    (QUEUED, now, RUNNING, stale)
+                ).rowcount
+                purged_rows = self._conn.execute(
+                    f"DELETE FROM jobs WHERE status IN ({finished}) AND finished_at < ? RETURNING kind, params",
+                    (*FINISHED_STATUSES, now - self.result_ttl)
+                ).fetchall()
+                purged_rows += self._conn.execute(
+                    f"DELETE FROM jobs WHERE status IN ({finished}) AND job_id NOT IN ("
+                    f"SELECT job_id FROM jobs WHERE status IN ({finished}) ORDER BY finished_at DESC LIMIT ?) "
+                    "RETURNING kind, params",
+                    (*FINISHED_STATUSES, *FINISHED_STATUSES, self.max_retained)
+                ).fetchall()
+                if purged_rows:
+                    self._conn.execute(
+                        "DELETE FROM job_checkpoints WHERE job_id NOT IN (SELECT job_id FROM jobs)"
+                    )
+                self._purged += len(purged_rows)
+        except sqlite3.Error as e:
+            logger.warning(f"任务队列维护失败: {e}")
+            return 0
+        for kind, params in purged_rows:
+            cleanup = self._cleanups.get(kind)
+            if cleanup is None:
+                continue
+            try:
+                cleanup(json.loads(params))
+            except Exception as e:
+                logger.warning(f"清理任务关联资源失败: {e}")
+        if recovered:
+            logger.info(f"回收心跳超时的任务 {recovered} 个，重新排队")
+        return recovered
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回任务队列运行指标"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "db_path": self.db_path,
+            "workers": self.workers,
+            "running_local": len(self._running),
+            "queued": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "succeeded": counts.get(SUCCEEDED, 0),
+            "failed": counts.get(FAILED, 0),
+            "cancelled": counts.get(CANCELLED, 0),
+            "submitted_total": self._submitted,
+            "succeeded_total": self._succeeded,
+            "failed_total": self._failed,
+            "retried_total": self._retried,
+            "cancelled_total": self._cancelled,
+            "resumed_total": self._resumed,
+            "requeued_total": self._requeued,
+            "purged_total": self._purged,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
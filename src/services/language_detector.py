@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+语言检测
+按字符所属的文字（汉字、假名、谚文、西里尔字母、拉丁字母及各语言特有的变音字母）统计字符数，
+给出翻译提示词支持的所有语言的置信度；短文本逐字符扫描一遍，长文本用 str.translate 在C层面统计直方图
+"""
+
+from typing import Dict, List, NamedTuple, Tuple
+
+# 与翻译提示词中 lang_map 一致的语言
+SUPPORTED_LANGUAGES = ("zh", "en", "ja", "ko", "fr", "de", "es", "ru")
+
+# 文字类别
+_LATIN, _HAN, _KANA, _HANGUL, _CYRILLIC, _FR_MARK, _DE_MARK, _ES_MARK = range(8)
+_CLASS_COUNT = 8
+
+# 超过该长度的文本改用直方图统计（实测几十个字符以上 str.translate 即快于逐字符查表）
+LONG_TEXT_THRESHOLD = 64
+
+_RANGES = (
+    (_HAN, 0x3400, 0x4DBF),      # CJK扩展A
+    (_HAN, 0x4E00, 0x9FFF),      # CJK统一汉字
+    (_HAN, 0xF900, 0xFAFF),      # CJK兼容汉字
+    (_KANA, 0x3040, 0x309F),     # 平假名
+    (_KANA, 0x30A0, 0x30FF),     # 片假名
+    (_KANA, 0x31F0, 0x31FF),     # 片假名音标扩展
+    (_HANGUL, 0x1100, 0x11FF),   # 谚文字母
+    (_HANGUL, 0x3130, 0x318F),   # 谚文兼容字母
+    (_HANGUL, 0xAC00, 0xD7AF),   # 谚文音节
+    (_CYRILLIC, 0x0400, 0x04FF),
+    (_LATIN, 0x41, 0x5A),
+    (_LATIN, 0x61, 0x7A),
+)
+# 各语言特有的变音字母（同时计入拉丁字母）
+_MARKS = {
+    _FR_MARK: "àâçèéêëîïôùûÿœæ",
+    _DE_MARK: "äöüß",
+    _ES_MARK: "ñáíóú¿¡",
+}
+# 变音字母占拉丁字母的比例达到该值时，认为拉丁字母部分完全属于对应语言；
+# 第一个变音字母不计（英文中偶尔出现的 "café" 之类的外来词不足以改判语言）
+_MARK_DENSITY = 0.02
+# 假名占日文汉字与假名总数的典型比例，达到该值时汉字全部归入日文
+_KANA_DENSITY = 0.3
+
+
+def _build_tables() -> Tuple[Dict[int, int], Dict[int, str]]:
+    """码位 -> 文字类别；以及直方图统计用的码位 -> 类别标记字符（私用区字符）"""
+    classes: Dict[int, int] = {}
+    for script, first, last in _RANGES:
+        for code_point in range(first, last + 1):
+            classes[code_point] = script
+    for script, letters in _MARKS.items():
+        for letter in letters:
+            for variant in {letter, letter.upper()}:
+                # "ß".upper() 为 "SS"，只取大小写一一对应的字母
+                if len(variant) == 1:
+                    classes[ord(variant)] = script
+    markers = {code_point: chr(0xE000 + script) for code_point, script in classes.items()}
+    # 原文中本身出现的标记字符不能被计入
+    for script in range(_CLASS_COUNT):
+        markers[0xE000 + script] = " "
+    return classes, markers
+
+
+_SCRIPT_OF, _MARKER_TABLE = _build_tables()
+_MARKER_CHARS = [chr(0xE000 + script) for script in range(_CLASS_COUNT)]
+
+
+class LanguageDetection(NamedTuple):
+    """语言检测结果"""
+    language: str               # 置信度最高的语言；没有可识别的文字时为 "en"
+    confidence: float           # 该语言的置信度（0~1）
+    scores: Dict[str, float]    # 所有支持语言的置信度，总和为1（没有可识别的文字时全为0）
+
+
+def count_scripts(text: str) -> List[int]:
+    """
+    统计各文字类别的字符数
+
+    Args:
+        text (str): 待检测文本
+
+    Returns:
+        List[int]: 按类别下标排列的字符数
+    """
+    if len(text) > LONG_TEXT_THRESHOLD:
+        marked = text.translate(_MARKER_TABLE)
+        return [marked.count(marker) for marker in _MARKER_CHARS]
+    counts = [0] * _CLASS_COUNT
+    script_of = _SCRIPT_OF.get
+    for ch in text:
+        script = script_of(ord(ch))
+        if script is not None:
+            counts[script] += 1
+    return counts
+
+
+def detect_language(text: str) -> LanguageDetection:
+    """
+    检测文本语言
+
+    汉字在出现假名时按假名比例归入日文；拉丁字母按法、德、西语特有变音字母的密度分给对应语言，其余归入英文
+
+    Args:
+        text (str): 待检测文本
+
+    Returns:
+        LanguageDetection: 检测结果
+    """
+    counts = count_scripts(text or "")
+    marks = counts[_FR_MARK] + counts[_DE_MARK] + counts[_ES_MARK]
+    latin = counts[_LATIN] + marks
+    han, kana = counts[_HAN], counts[_KANA]
+
+    weights = dict.fromkeys(SUPPORTED_LANGUAGES, 0.0)
+    japanese_share = min(1.0, kana / ((han + kana) * _KANA_DENSITY)) if kana else 0.0
+    weights["ja"] = kana + han * japanese_share
+    weights["zh"] = han * (1.0 - japanese_share)
+    weights["ko"] = float(counts[_HANGUL])
+    weights["ru"] = float(counts[_CYRILLIC])
+    if latin:
+        marked_share = min(1.0, max(0, marks - 1) / (latin * _MARK_DENSITY))
+        weights["en"] = latin * (1.0 - marked_share)
+        if marks:
+            weights["fr"] = latin * marked_share * counts[_FR_MARK] / marks
+            weights["de"] = latin * marked_share * counts[_DE_MARK] / marks
+            weights["es"] = latin * marked_share * counts[_ES_MARK] / marks
+
+    total = sum(weights.values())
+    if not total:
+        return LanguageDetection("en", 0.0, weights)
+    scores = {language: round(weight / total, 4) for language, weight in weights.items()}
+    # 权重相同时优先判为英文（与原来中英文字符数相同时判为英文一致），其余按 SUPPORTED_LANGUAGES 的顺序
+    language = max(SUPPORTED_LANGUAGES, key=lambda lang: (weights[lang], lang == "en"))
+    return LanguageDetection(language, scores[language], scores)
+
+
+def target_language_for(source_lang: str) -> str:
+    """中文译为英文，其他语言译为中文"""
+    return "en" if source_lang == "zh" else "zh"
+
+
+def detect_language_direction(text: str) -> Tuple[str, str]:
+    """
+    根据文本内容确定翻译方向：中文译为英文，其他语言译为中文
+
+    Args:
+        text (str): 待翻译文本
+
+    Returns:
+        Tuple[str, str]: (源语言, 目标语言)
+    """
+    source_lang = detect_language(text).language
+    return source_lang, target_language_for(source_lang)
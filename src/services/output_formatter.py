@@ -0,0 +1,447 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+翻译工作流输出格式化
+将模型输出的Markdown转换为阅读格式：按行扫描一次，用状态机处理标题、表格（2.2节表格转为列表）、
+列表、引用等，随后对输出行做一次逐行清理；所有正则表达式在模块加载时预编译
+"""
+
+import operator
+import re
+from collections import deque
+from typing import List, Tuple
+
+# ---- 逐行扫描阶段 ----
+# "##2.1" / "##   2.1" -> "## 2.1"
+_HEADING_NUMBER_RE = re.compile(r'(#+)\s*(\d+\.\d+)')
+# 只有#号（可带尾随空白）的行，其后的空行和下一行开头的编号会被合并成 "## 2.1"
+_HASH_ONLY_RE = re.compile(r'#+\s*$')
+_LEADING_NUMBER_RE = re.compile(r'\s*\d+\.\d+')
+_SECTION_2_2_RE = re.compile(r'#+\s+2\.2')
+_NUMBERED_HEADING_RE = re.compile(r'#+\s+\d')
+_HEADING_RE = re.compile(r'#+\s+')
+_BULLET_RE = re.compile(r'(\s*)[-*]\s+')
+_NUMBERED_ITEM_RE = re.compile(r'\s*\d+\.\s+')
+_QUOTE_RE = re.compile(r'>\s+')
+_RULE_RE = re.compile(r'-{3,}|_{3,}|\*{3,}')
+_TABLE_SEPARATOR_RE = re.compile(r'\|\s*[-:]+\s*\|')
+_SEPARATOR_CELLS_RE = re.compile(r'\s*[-:]+\s*')
+_BOLD_STAR_RE = re.compile(r'\*\*(.*?)\*\*')
+_BOLD_UNDERSCORE_RE = re.compile(r'__(.*?)__')
+_ITALIC_STAR_RE = re.compile(r'\*(.*?)\*')
+_ITALIC_UNDERSCORE_RE = re.compile(r'_(.*?)_')
+_LINK_RE = re.compile(r'\[(.*?)\]\((.*?)\)')
+_IMAGE_RE = re.compile(r'!\[(.*?)\]\((.*?)\)')
+# 替换为第一个分组；比模板 r'\1' 少了每次命中时的模板展开
+_FIRST_GROUP = operator.methodcaller('group', 1)
+
+# ---- 输出行清理阶段 ----
+_LEADING_HASHES_RE = re.compile(r'#+\s+')
+_HASH_NUMBER_TITLE_RE = re.compile(r'##(\d+\.\d+)(.*?)$')
+_HASH_SPACE_NUMBER_TITLE_RE = re.compile(r'##\s+(\d+\.\d+)(.*?)$')
+_REPEATED_COLON_RE = re.compile(r'：\s*：')
+_DOUBLE_BRACKET_RE = re.compile(r'【【([^】]+)】】')
+_HASH_NUMBER_RE = re.compile(r'##\s*(\d+\.\d+)')
+
+# 整段文本上的清理规则，仅在输出行之间可能互相影响的少见情况下使用
+_BLANK_LINES_TEXT_RE = re.compile(r'\n\s*\n\s*\n+')
+_LEADING_HASHES_TEXT_RE = re.compile(r'^#+\s+', re.MULTILINE)
+_HASH_NUMBER_TITLE_TEXT_RE = re.compile(r'##(\d+\.\d+)(.*?)$', re.MULTILINE)
+_HASH_SPACE_NUMBER_TITLE_TEXT_RE = re.compile(r'##\s+(\d+\.\d+)(.*?)$', re.MULTILINE)
+_LEADING_SPACE_TEXT_RE = re.compile(r'^\s+', re.MULTILINE)
+_TRAILING_SPACE_TEXT_RE = re.compile(r'\s+$', re.MULTILINE)
+
+# 2.2节标题之后多少行内出现的表格按2.2节处理
+SECTION_2_2_LOOKBACK = 10
+
+
+def _is_table_line(line: str) -> bool:
+    stripped = line.strip()
+    return stripped[:1] == '|' and stripped[-1:] == '|'
+
+
+def is_section_2_2_line(line: str) -> bool:
+    """是否为2.2节（术语检索与校验）的标题行"""
+    return bool((line[:1] == '#' and _SECTION_2_2_RE.match(line)) or '术语检索与校验' in line)
+
+
+def split_output_lines(text: str) -> Tuple[List[str], List[bool]]:
+    """
+    分行并规范编号标题（"##2.1" -> "## 2.1"），同时标记2.2节标题行
+
+    Returns:
+        Tuple[List[str], List[bool]]: (行, 每行是否为2.2节标题)
+    """
+    raw = text.split('\n')
+    lines: List[str] = []
+    markers: List[bool] = []
+    count = len(raw)
+    i = 0
+    while i < count:
+        line = raw[i]
+        i += 1
+        if line[:1] == '#':
+            match = _HEADING_NUMBER_RE.match(line)
+            if match:
+                line = f"{match.group(1)} {line[match.start(2):]}"
+            elif _HASH_ONLY_RE.match(line):
+                # 编号落在后面的行上（中间只隔空白行）时与原格式化规则一致，合并为一行
+                j = i
+                while j < count and not raw[j].strip():
+                    j += 1
+                if j < count and _LEADING_NUMBER_RE.match(raw[j]):
+                    line = f"{line.rstrip()} {raw[j].lstrip()}"
+                    i = j + 1
+        lines.append(line)
+        markers.append(is_section_2_2_line(line))
+    return lines, markers
+
+
+def _table_to_list(table_lines: List[str]) -> List[str]:
+    """2.2节的表格转为编号列表：• 1. 表头: 单元格  表头: 单元格"""
+    headers: List[str] = []
+    rows: List[List[str]] = []
+    for index, table_line in enumerate(table_lines):
+        cells = [cell.strip() for cell in table_line.split('|')[1:-1]]
+        if index == 0:
+            headers = cells
+        elif not _SEPARATOR_CELLS_RE.match(''.join(cells)):
+            rows.append(cells)
+
+    items = []
+    for row_index, row in enumerate(rows):
+        item_text = f"• {row_index + 1}. "
+        for col_index, cell in enumerate(row):
+            if col_index < len(headers) and headers[col_index].strip() and cell.strip():
+                item_text += f"{headers[col_index]}: {cell}  "
+        items.append(item_text)
+    return items
+
+
+def _align_table(table_lines: List[str]) -> List[str]:
+    """普通表格按列宽对齐，并在第一行之后重建分隔行"""
+    parsed_table = []
+    max_cols = 0
+    for table_line in table_lines:
+        if _TABLE_SEPARATOR_RE.match(table_line):
+            continue
+        cells = [cell.strip() for cell in table_line.split('|')[1:-1]]
+        parsed_table.append(cells)
+        max_cols = max(max_cols, len(cells))
+
+    col_widths = [0] * max_cols
+    for row_index, row in enumerate(parsed_table):
+        if len(row) < max_cols:
+            row = parsed_table[row_index] = row + [''] * (max_cols - len(row))
+        for col_index, cell in enumerate(row):
+            col_widths[col_index] = max(col_widths[col_index], len(cell))
+
+    formatted_table = [
+        "| " + " | ".join(cell.ljust(col_widths[col_index]) for col_index, cell in enumerate(row)) + " |"
+        for row in parsed_table
+    ]
+    if len(formatted_table) > 1:
+        formatted_table.insert(1, "|-" + "-|-".join("-" * width for width in col_widths) + "-|")
+    return formatted_table
+
+
+def _strip_inline_markup(text: str) -> str:
+    """
+    去掉加粗、斜体、链接等行内标记；文本中没有对应字符时跳过该规则
+    这些规则都不会跨行匹配，因此可以把所有普通文本行拼在一起一次处理
+    """
+    if '*' in text:
+        text = _BOLD_STAR_RE.sub(_FIRST_GROUP, text)
+    if '_' in text:
+        text = _BOLD_UNDERSCORE_RE.sub(_FIRST_GROUP, text)
+    if '*' in text:
+        text = _ITALIC_STAR_RE.sub(_FIRST_GROUP, text)
+    if '_' in text:
+        text = _ITALIC_UNDERSCORE_RE.sub(_FIRST_GROUP, text)
+    if '](' in text:
+        text = _LINK_RE.sub(_FIRST_GROUP, text)
+        if '![' in text:
+            text = _IMAGE_RE.sub(r'[图片:\1]', text)
+    return text
+
+
+def _convert_lines(lines: List[str], markers: List[bool]) -> List[str]:
+    """
+    逐行转换Markdown结构
+
+    状态：普通文本 / 收集普通表格中。普通表格在遇到第一个非表格、非标题行时整体对齐输出；
+    前 SECTION_2_2_LOOKBACK 行内有2.2节标题的表格直接转为列表。
+    标题行不会结束正在收集的表格，文本末尾未结束的表格不输出，均与原格式化规则保持一致。
+    """
+    output: List[str] = []
+    plain_indices: List[int] = []  # 普通文本行在输出中的位置，行内标记最后统一处理
+    table: List[str] = []
+    in_table = False
+    in_section_2_2 = False
+    count = len(lines)
+
+    # 每行之前最近的2.2节标题行下标（没有时为 -1），表格是否位于2.2节只需比较一次
+    previous_marker: List[int] = []
+    last_marker = -1
+    for index in range(count):
+        previous_marker.append(last_marker)
+        if markers[index]:
+            last_marker = index
+
+    i = 0
+    while i < count:
+        line = lines[i]
+        is_heading_line = line[:1] == '#'
+
+        if markers[i]:
+            in_section_2_2 = True
+        elif in_section_2_2 and is_heading_line and _NUMBERED_HEADING_RE.match(line):
+            in_section_2_2 = False
+
+        # 1. 标题
+        if is_heading_line:
+            match = _HEADING_RE.match(line)
+            if match:
+                output.append(f"【{line[match.end():]}】：")
+                i += 1
+                continue
+
+        # 2. 表格
+        stripped = line.strip()
+        if stripped[:1] == '|' and stripped[-1:] == '|':
+            in_section_2_2 = previous_marker[i] >= max(0, i - SECTION_2_2_LOOKBACK)
+            if in_section_2_2 and not in_table:
+                end = i + 1
+                while end < count and _is_table_line(lines[end]):
+                    end += 1
+                output.extend(_table_to_list(lines[i:end]))
+                i = end
+                continue
+            if not in_section_2_2:
+                if not in_table:
+                    in_table = True
+                    table = []
+                table.append(line)
+                i += 1
+                continue
+            # 普通表格尚未结束时后面出现了2.2节标题：该行按普通文本处理
+        elif in_table and not in_section_2_2:
+            # 表格结束，输出后重新处理当前行
+            output.extend(_align_table(table))
+            in_table = False
+            continue
+
+        i += 1
+        first_char = stripped[:1]
+
+        # 3. 列表项
+        if first_char == '-' or first_char == '*':
+            match = _BULLET_RE.match(line)
+            if match:
+                output.append(f"{match.group(1)}• {line[match.end():]}")
+                continue
+
+        # 4. 数字列表（原样保留，不处理行内标记）
+        if first_char.isdigit() and _NUMBERED_ITEM_RE.match(line):
+            output.append(line)
+            continue
+
+        # 5. 引用
+        if first_char == '>':
+            match = _QUOTE_RE.match(line)
+            if match:
+                output.append(f"『{line[match.end():]}』")
+                continue
+
+        # 6. 代码块标记
+        if stripped.startswith('```'):
+            continue
+
+        # 7. 水平线
+        if first_char in ('-', '_', '*') and _RULE_RE.fullmatch(stripped):
+            output.append("—" * 30)
+            continue
+
+        # 8. 普通文本
+        plain_indices.append(len(output))
+        output.append(line)
+
+    if plain_indices:
+        plain_text = _strip_inline_markup('\n'.join([output[index] for index in plain_indices]))
+        for index, plain_line in zip(plain_indices, plain_text.split('\n')):
+            output[index] = plain_line
+    return output
+
+
+def _needs_text_cleanup(line: str) -> bool:
+    """该行的清理结果是否可能与相邻行相关（标记或冒号跨行），需要对整段文本做清理"""
+    if '##' in line and line.rstrip().endswith('##'):
+        return True
+    if '：' in line and line.lstrip()[:1] == '：':
+        return True
+    if '【【' in line:
+        last_close = line.rfind('】')
+        return '【【' in line[last_close + 1:]
+    return False
+
+
+def _clean_text(text: str) -> str:
+    """对整段文本依次应用清理规则（输出行之间互相影响时使用）"""
+    text = _BLANK_LINES_TEXT_RE.sub('\n\n', text)
+    text = _LEADING_HASHES_TEXT_RE.sub('', text)
+    text = _HASH_NUMBER_TITLE_TEXT_RE.sub(r'【\1\2】：', text)
+    text = _HASH_SPACE_NUMBER_TITLE_TEXT_RE.sub(r'【\1\2】：', text)
+    text = _REPEATED_COLON_RE.sub('：', text)
+    text = _DOUBLE_BRACKET_RE.sub(r'【\1】', text)
+    text = _LEADING_SPACE_TEXT_RE.sub('', text)
+    text = _TRAILING_SPACE_TEXT_RE.sub('', text)
+    text = _HASH_NUMBER_RE.sub(r'【\1】：', text)
+    return text
+
+
+def _clean_lines(lines: List[str]) -> List[str]:
+    """
+    逐行清理：去掉残留的#号标记、把 "##2.1 标题" 转为【】标题、合并连续冒号、去掉双重【】，
+    去掉首尾空白并删除空行
+    """
+    cleaned: List[str] = []
+    last = len(lines) - 1
+    for index, line in enumerate(lines):
+        if line[:1] == '#':
+            match = _LEADING_HASHES_RE.match(line)
+            if match:
+                line = line[match.end():]
+            elif index < last and not line.strip('#'):
+                # 只有#号的行连同其后的换行一起删除
+                continue
+        if _needs_text_cleanup(line):
+            return _clean_text('\n'.join(lines)).split('\n')
+        if '##' in line:
+            line = _HASH_NUMBER_TITLE_RE.sub(r'【\1\2】：', line)
+            line = _HASH_SPACE_NUMBER_TITLE_RE.sub(r'【\1\2】：', line)
+        if line.count('：') > 1:
+            line = _REPEATED_COLON_RE.sub('：', line)
+        if '【【' in line:
+            line = _DOUBLE_BRACKET_RE.sub(r'【\1】', line)
+        line = line.strip()
+        if not line:
+            continue
+        if '##' in line:
+            line = _HASH_NUMBER_RE.sub(r'【\1】：', line)
+        cleaned.append(line)
+    return cleaned
+
+
+def _drop_repeated_half(lines: List[str]) -> List[str]:
+    """前后两半内容基本相同（超过70%的行一致）时只保留前一半"""
+    if len(lines) <= 10:
+        return lines
+    half_length = len(lines) // 2
+    same = sum(1 for a, b in zip(lines[:half_length], lines[half_length:2 * half_length]) if a == b)
+    if same / half_length > 0.7:
+        return lines[:half_length + (len(lines) - 2 * half_length)]
+    return lines
+
+
+def format_translation_output(text: str) -> str:
+    """
+    将翻译工作流的Markdown格式转换为更易读的阅读格式，并删除不必要的空格
+
+    Args:
+        text (str): 原始翻译输出文本（包含Markdown格式）
+
+    Returns:
+        str: 格式化后的文本
+    """
+    if not text:
+        return ""
+    return format_output_lines(*split_output_lines(text))
+
+
+def format_output_lines(lines: List[str], markers: List[bool]) -> str:
+    """
+    格式化已分好行的输出（供已经调用过 split_output_lines 的解析方复用分行结果）
+
+    Args:
+        lines (List[str]): split_output_lines 返回的行
+        markers (List[bool]): split_output_lines 返回的2.2节标题标记
+
+    Returns:
+        str: 格式化后的文本
+    """
+    return '\n'.join(_drop_repeated_half(_clean_lines(_convert_lines(lines, markers))))
+
+
+class StreamingTranslationFormatter:
+    """
+    流式翻译输出的逐段格式化器
+
+    按行接收模型的增量输出，每凑满一行就套用 format_translation_output 的格式化规则输出；
+    表格行先缓存，表格结束后整体格式化（2.2节的表格同样转为列表）。
+    跨越全文的清理步骤（如重复内容检测）只在最终完整结果中执行。
+    """
+
+    def __init__(self):
+        self._pending = ""              # 尚未凑满一行的文本
+        self._table_lines = []          # 正在收集的表格行
+        self._recent_lines = deque(maxlen=SECTION_2_2_LOOKBACK)  # 最近的原始行，用于判断表格是否位于2.2节
+        self._table_context = []        # 表格开始前的最近10行
+
+    @staticmethod
+    def _emit(formatted: str) -> str:
+        """返回带换行符的输出片段；与完整格式化一致，空行不输出"""
+        return formatted + "\n" if formatted.strip() else ""
+
+    def _flush_table(self) -> str:
+        if not self._table_lines:
+            return ""
+        table_text = "\n".join(self._table_lines)
+        heading_lines = [line for line in self._table_context if is_section_2_2_line(line)]
+        if heading_lines:
+            # 带上2.2节标题一起格式化以复用列表化规则，再去掉格式化后的标题行
+            formatted = format_translation_output(heading_lines[-1] + "\n" + table_text + "\n")
+            formatted = formatted.split("\n", 1)[1] if "\n" in formatted else ""
+        else:
+            formatted = format_translation_output(table_text + "\n")
+        self._table_lines = []
+        return self._emit(formatted)
+
+    def _process_line(self, line: str) -> str:
+        if line[:1] == '#':
+            line = _HEADING_NUMBER_RE.sub(r'\1 \2', line, count=1)
+        output = ""
+        if _is_table_line(line):
+            if not self._table_lines:
+                self._table_context = list(self._recent_lines)
+            self._table_lines.append(line)
+        else:
+            output += self._flush_table()
+            output += self._emit(format_translation_output(line))
+        self._recent_lines.append(line)
+        return output
+
+    def feed(self, delta: str) -> str:
+        """
+        接收一段增量文本，返回其中已完整的行格式化后的结果
+
+        Args:
+            delta (str): 模型新输出的文本
+
+        Returns:
+            str: 可以立即推送给客户端的格式化文本（可能为空）
+        """
+        self._pending += delta
+        if "\n" not in self._pending:
+            return ""
+        *complete_lines, self._pending = self._pending.split("\n")
+        return "".join(self._process_line(line) for line in complete_lines)
+
+    def flush(self) -> str:
+        """输出剩余的缓存内容"""
+        output = ""
+        if self._pending:
+            output += self._process_line(self._pending)
+            self._pending = ""
+        output += self._flush_table()
+        return output
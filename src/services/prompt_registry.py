@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+提示词模板注册表
+启动时读取并解析一次 prompt 模板文件，之后从内存提供各部分内容；
+文件修改时间变化时重新解析并整体替换，同时给出模板版本号供结果缓存使用
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 查找提示词模板文件的候选路径，按顺序取第一个存在的
+DEFAULT_TEMPLATE_PATHS = [
+    os.path.join(PROJECT_ROOT, "prompt"),                   # WVC/prompt
+    os.path.join(os.path.dirname(PROJECT_ROOT), "prompt"),  # prompt
+    "WVC/prompt",                                           # 相对路径
+    "prompt"                                                # 当前目录
+]
+
+# 需要从模板中提取并附加到翻译提示词的部分（标题 -> 键名）
+TEMPLATE_SECTIONS = {
+    "# 知识库数据解析注意事项": "knowledge_section",
+    "# 翻译原则：": "translation_principles",
+    "# 润色原则：": "polish_principles",
+}
+
+
+class PromptTemplate(NamedTuple):
+    """解析后的模板快照，一经创建不再修改"""
+    path: Optional[str]        # 模板文件路径，未找到时为 None
+    mtime: Optional[float]     # 文件修改时间
+    digest: str                # 文件内容摘要，未找到时为 "none"
+    sections: Dict[str, str]   # 键名 -> 部分内容（不存在的部分为空字符串）
+
+
+def parse_sections(content: str) -> Dict[str, str]:
+    """
+    从模板内容中截取各部分：从标题开始，到下一个 "#" 之前为止
+
+    Args:
+        content (str): 模板文件内容
+
+    Returns:
+        Dict[str, str]: 键名 -> 部分内容
+    """
+    sections = {}
+    for heading, key in TEMPLATE_SECTIONS.items():
+        section = ""
+        if heading in content:
+            start = content.find(heading)
+            end = content.find("#", start + 1)
+            if end > start:
+                section = content[start:end].strip()
+        sections[key] = section
+    return sections
+
+
+class PromptTemplateRegistry:
+    """
+    提示词模板注册表
+    读取方直接拿到当前快照的引用；重新加载时先完整解析新文件，再一次性替换引用，读取方不会看到半更新的状态
+    """
+
+    def __init__(self, candidate_paths: Optional[List[str]] = None, check_interval: float = 1.0):
+        """
+        Args:
+            candidate_paths (List[str], optional): 模板文件候选路径
+            check_interval (float): 两次检查文件修改时间的最小间隔（秒）
+        """
+        self.candidate_paths = candidate_paths or DEFAULT_TEMPLATE_PATHS
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._reloads = 0
+        self._template = self._load()
+
+    def _find_path(self) -> Optional[str]:
+        for path in self.candidate_paths:
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def _load(self) -> PromptTemplate:
+        """读取并解析模板文件"""
+        path = self._find_path()
+        if path is None:
+            logger.error(f"无法找到提示词模板文件，已尝试路径: {', '.join(self.candidate_paths)}，将使用默认提示词")
+            return PromptTemplate(None, None, "none", parse_sections(""))
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path, "rb") as f:
+                raw = f.read()
+            template = PromptTemplate(path, mtime, hashlib.sha1(raw).hexdigest()[:12],
+                                      parse_sections(raw.decode("utf-8").replace("\r\n", "\n")))
+            logger.info(f"已加载提示词模板文件: {path} (版本 {template.digest})")
+            return template
+        except Exception as e:
+            logger.error(f"加载提示词模板文件 {path} 时发生错误: {e}，将使用默认提示词")
+            return PromptTemplate(path, None, "none", parse_sections(""))
+
+    def get(self) -> PromptTemplate:
+        """
+        获取当前模板；距上次检查超过 check_interval 时检查文件修改时间，有变化则重新加载
+
+        Returns:
+            PromptTemplate: 模板快照
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._template
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return self._template
+            self._checked_at = now
+            current = self._template
+            path = self._find_path()
+            try:
+                mtime = os.path.getmtime(path) if path else None
+            except OSError:
+                mtime = None
+            if path != current.path or mtime != current.mtime:
+                self._template = self._load()
+                self._reloads += 1
+                logger.info(f"提示词模板已重新加载 (版本 {current.digest} -> {self._template.digest})")
+            return self._template
+
+    def get_metrics(self) -> Dict[str, object]:
+        """返回模板信息"""
+        template = self._template
+        return {
+            "path": template.path,
+            "version": template.digest,
+            "reloads": self._reloads,
+        }
+
+
+prompt_registry = PromptTemplateRegistry()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+请求截止时间与客户端断开处理
+截止时间保存在 contextvars 中，随请求创建的协程与任务自动传递到各层上游调用：
+重试、排队等待等环节据此放弃来不及完成的工作；到达截止时间或客户端断开时，由中间件取消整个请求，
+取消沿调用链传递到进行中的上游请求。
+上游调用排队时使用的优先级类别与租户同样保存在 contextvars 中
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.services.upstream_scheduler import INTERACTIVE, PRIORITY_CLASSES
+
+logger = logging.getLogger(__name__)
+
+# 当前请求的截止时间（time.monotonic() 时刻），None 表示不限
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+# 当前请求的上游调用优先级类别与租户
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+_tenant: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("upstream_tenant", default=None)
+
+# 客户端指定本次请求超时秒数的请求头
+TIMEOUT_HEADER = b"x-request-timeout"
+# 标识调用方租户的请求头
+TENANT_HEADER = b"x-tenant-id"
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    在作用域内设置截止时间；外层已有更早的截止时间时保持不变
+
+    Args:
+        timeout (float, optional): 从现在起的秒数，None 表示不设置
+
+    Yields:
+        Optional[float]: 生效的截止时间
+    """
+    current = _deadline.get()
+    deadline = current
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
+        if current is not None:
+            deadline = min(current, deadline)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """距截止时间的秒数（可能为负），未设置截止时间时为 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def has_time_for(seconds: float) -> bool:
+    """截止时间之前是否还来得及等待 seconds 秒"""
+    left = remaining()
+    return left is None or left > seconds
+
+
+@contextmanager
+def upstream_scope(priority: Optional[str] = None, tenant: Optional[str] = None) -> Iterator[None]:
+    """
+    在作用域内设置上游调用的优先级类别与租户，未指定的保持外层的值
+
+    Args:
+        priority (str, optional): 优先级类别（interactive / background / bulk）
+        tenant (str, optional): 租户
+    """
+    if priority is not None and priority not in PRIORITY_CLASSES:
+        raise ValueError(f"未知的优先级类别: {priority}")
+    priority_token = _priority.set(priority) if priority is not None else None
+    tenant_token = _tenant.set(tenant) if tenant is not None else None
+    try:
+        yield
+    finally:
+        if tenant_token is not None:
+            _tenant.reset(tenant_token)
+        if priority_token is not None:
+            _priority.reset(priority_token)
+
+
+def current_priority() -> str:
+    """当前上游调用的优先级类别，默认为交互"""
+    return _priority.get()
+
+
+def current_tenant() -> Optional[str]:
+    """当前请求的租户，不在请求中时为 None"""
+    return _tenant.get()
+
+
+def tenant_for(scope) -> str:
+    """请求所属的租户：请求头 X-Tenant-ID，没有时按客户端IP区分"""
+    for name, value in scope.get("headers", []):
+        if name == TENANT_HEADER:
+            tenant = value.decode("latin-1").strip()
+            if tenant:
+                return tenant[:128]
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RequestDeadlinePolicy:
+    """
+    各接口的截止时间配置与请求取消统计
+
+    截止时间取请求头 X-Request-Timeout（秒，不超过 max_timeout），未指定时取接口的默认值；
+    同时按路径确定请求发起的上游调用的优先级类别
+    """
+
+    def __init__(self,
+                 timeouts: Dict[str, Optional[float]],
+                 max_timeout: float = 600.0,
+                 priorities: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            timeouts (Dict[str, Optional[float]]): 路径前缀 -> 默认超时秒数（None 或 0 表示不限，只处理客户端断开）；
+                                                   按最长前缀匹配，未匹配的路径不做处理
+            max_timeout (float): 客户端可指定的最长超时秒数
+            priorities (Dict[str, str], optional): 路径前缀 -> 上游调用的优先级类别，按最长前缀匹配，未匹配的路径为交互
+        """
+        self.max_timeout = float(max_timeout)
+        self._routes: List[Tuple[str, Optional[float]]] = sorted(
+            ((prefix.rstrip("/"), timeout or None) for prefix, timeout in timeouts.items()),
+            key=lambda item: len(item[0]), reverse=True
+        )
+        for priority in (priorities or {}).values():
+            if priority not in PRIORITY_CLASSES:
+                raise ValueError(f"未知的优先级类别: {priority}")
+        self._priority_routes: List[Tuple[str, str]] = sorted(
+            ((prefix.rstrip("/"), priority) for prefix, priority in (priorities or {}).items()),
+            key=lambda item: len(item[0]), reverse=True
+        )
+
+        # 运行指标
+        self._requests = 0
+        self._in_flight = 0
+        self._deadline_exceeded = 0
+        self._client_disconnected = 0
+
+    @staticmethod
+    def _match_prefix(routes: list, path: str):
+        for prefix, value in routes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return True, value
+        return False, None
+
+    def priority_for(self, scope) -> str:
+        """请求发起的上游调用的优先级类别"""
+        matched, priority = self._match_prefix(self._priority_routes, scope.get("path", ""))
+        return priority if matched else INTERACTIVE
+
+    def timeout_for(self, scope) -> Tuple[bool, Optional[float]]:
+        """
+        Returns:
+            Tuple[bool, Optional[float]]: 路径是否需要处理，以及超时秒数（None 表示不限）
+        """
+        matched, timeout = self._match_prefix(self._routes, scope.get("path", ""))
+        if not matched:
+            return False, None
+        for name, value in scope.get("headers", []):
+            if name == TIMEOUT_HEADER:
+                try:
+                    requested = float(value.decode("latin-1"))
+                except ValueError:
+                    break
+                if requested > 0:
+                    timeout = min(requested, self.max_timeout)
+                break
+        return True, timeout
+
+    def get_metrics(self) -> Dict[str, int]:
+        """返回请求数、进行中请求数，以及超时与客户端断开分别取消的请求数"""
+        return {
+            "requests": self._requests,
+            "in_flight": self._in_flight,
+            "deadline_exceeded": self._deadline_exceeded,
+            "client_disconnected": self._client_disconnected,
+        }
+
+
+class RequestDeadlineMiddleware:
+    """
+    ASGI 中间件：按 RequestDeadlinePolicy 为请求设置截止时间，并在客户端断开时取消请求；
+    同时为所有 HTTP 请求标记上游调用的优先级类别与租户
+
+    到达截止时间时取消请求，尚未开始响应则返回 504；客户端断开时直接取消请求。
+    取消会传递到进行中的上游调用（异步客户端的 HTTP 请求随之关闭）
+    """
+
+    def __init__(self, app, policy: RequestDeadlinePolicy):
+        """
+        Args:
+            app: 下游 ASGI 应用
+            policy (RequestDeadlinePolicy): 截止时间配置，同时记录取消统计
+        """
+        self.app = app
+        self.policy = policy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        policy = self.policy
+        matched, timeout = policy.timeout_for(scope)
+        tenant = tenant_for(scope)
+        priority = policy.priority_for(scope)
+        if not matched:
+            with upstream_scope(priority, tenant):
+                return await self.app(scope, receive, send)
+
+        body_received = asyncio.Event()
+        disconnected = asyncio.Event()
+        response = {"started": False, "complete": False}
+
+        async def app_receive():
+            # 请求体读完后由 watch_disconnect 独占底层 receive，应用再读取时等到断开为止
+            if body_received.is_set():
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_received.set()
+            return message
+
+        async def app_send(message):
+            if message["type"] == "http.response.start":
+                response["started"] = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response["complete"] = True
+            await send(message)
+
+        async def watch_disconnect():
+            await body_received.wait()
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        policy._requests += 1
+        policy._in_flight += 1
+        with deadline_scope(timeout), upstream_scope(priority, tenant):
+            # 任务创建时复制当前上下文，截止时间、优先级与租户随之传入应用
+            app_task = asyncio.ensure_future(self.app(scope, app_receive, app_send))
+        watcher = asyncio.ensure_future(watch_disconnect())
+        disconnect_waiter = asyncio.ensure_future(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait({app_task, disconnect_waiter}, timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if app_task not in done:
+                app_task.cancel()
+                await asyncio.gather(app_task, return_exceptions=True)
+            path = scope.get("path")
+            if disconnected.is_set():
+                # 流式响应中途断开时应用可能已自行结束，同样计为客户端断开
+                if not response["complete"]:
+                    policy._client_disconnected += 1
+                    logger.info(f"客户端已断开，取消请求: {path}")
+                return
+            if app_task in done:
+                return app_task.result()
+            policy._deadline_exceeded += 1
+            logger.warning(f"请求超过截止时间（{timeout:g} 秒），已取消: {path}")
+            await self._send_timeout(send, response, timeout)
+        finally:
+            policy._in_flight -= 1
+            watcher.cancel()
+            disconnect_waiter.cancel()
+            if not app_task.done():
+                app_task.cancel()
+
+    @staticmethod
+    async def _send_timeout(send, response: dict, timeout: float):
+        """尚未开始响应时返回 504；已经开始（如流式输出）时结束响应体"""
+        if response["complete"]:
+            return
+        if not response["started"]:
+            body = json.dumps({"code": -1, "message": f"请求处理超时（{timeout:g} 秒）"},
+                              ensure_ascii=False).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode("latin-1"))]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+上游调用容错
+按响应状态码和异常类型判断是否重试，重试间隔按指数退避并加入随机抖动；
+每类操作一个熔断器，连续失败达到阈值后熔断，熔断期间直接失败，冷却后放行少量探测请求，成功即恢复
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.services.request_context import has_time_for
+
+logger = logging.getLogger(__name__)
+
+# 熔断器状态
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# 默认重试的响应状态码：限流与服务端临时错误
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# 默认重试的异常：超时与连接错误（requests、aiohttp 的连接错误均为 OSError 的子类）
+RETRYABLE_EXCEPTIONS: Tuple[type, ...] = (asyncio.TimeoutError, ConnectionError, OSError)
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+    def __init__(self, operation: str, retry_after: float):
+        super().__init__(f"上游调用已熔断（{operation}），{retry_after:.1f} 秒后重试")
+        self.operation = operation
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    关闭状态下记录连续失败次数，达到阈值后打开；打开状态下拒绝所有调用，
+    经过冷却时间后进入半开状态，最多放行 half_open_max_calls 个探测调用：
+    探测成功则关闭，失败则重新打开并重新计算冷却时间
+    """
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = 5,
+                 recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """
+        Args:
+            name (str): 名称（操作类型），用于日志与指标
+            failure_threshold (int): 连续失败多少次后熔断
+            recovery_timeout (float): 熔断后多久（秒）进入半开状态
+            half_open_max_calls (int): 半开状态下同时放行的探测调用数
+        """
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.recovery_timeout = float(recovery_timeout)
+        self.half_open_max_calls = max(1, int(half_open_max_calls))
+
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+        # 运行指标
+        self._opened = 0
+        self._rejected = 0
+        self._successes = 0
+        self._failures = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info(f"熔断器 {self.name} 进入半开状态，放行探测请求")
+        return self._state
+
+    def acquire(self) -> bool:
+        """
+        调用前申请放行
+
+        Returns:
+            bool: 本次调用是否为半开状态下的探测调用（调用结束后须调用 record_success / record_failure / release）
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下的探测名额已用完
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+                self._probes_in_flight += 1
+                return True
+            self._rejected += 1
+            retry_after = max(0.0, self._opened_at + self.recovery_timeout - now) if state == OPEN else 0.0
+            raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self, probe: bool = False):
+        with self._lock:
+            self._successes += 1
+            self._consecutive_failures = 0
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if self._state != CLOSED and (probe or self._state == HALF_OPEN):
+                self._state = CLOSED
+                logger.info(f"熔断器 {self.name} 探测成功，恢复正常")
+
+    def record_failure(self, probe: bool = False):
+        with self._lock:
+            self._failures += 1
+            self._consecutive_failures += 1
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            reopen = probe or self._state == HALF_OPEN
+            if self._state != OPEN and (reopen or self._consecutive_failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._opened += 1
+                logger.warning(f"熔断器 {self.name} 已打开：连续失败 {self._consecutive_failures} 次，"
+                               f"{self.recovery_timeout} 秒内直接拒绝调用")
+
+    def release(self, probe: bool = False):
+        """调用被取消、结果不计入成功或失败时归还探测名额"""
+        if probe:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(time.monotonic()),
+                "consecutive_failures": self._consecutive_failures,
+                "opened": self._opened,
+                "rejected": self._rejected,
+                "successes": self._successes,
+                "failures": self._failures,
+            }
+
+
+class ResilientCaller:
+    """
+    带重试与熔断的上游调用
+
+    被调用函数返回带 status_code 属性的响应对象（Application.call 或异步客户端的响应）；
+    可重试的状态码和异常按指数退避加随机抖动（full jitter）重试，其余错误响应原样返回、不计入熔断
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay: float = 0.5,
+                 max_delay: float = 8.0,
+                 failure_threshold: int = 5,
+                 recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1,
+                 retryable_statuses: Tuple[int, ...] = RETRYABLE_STATUSES,
+                 retryable_exceptions: Tuple[type, ...] = RETRYABLE_EXCEPTIONS):
+        """
+        Args:
+            max_attempts (int): 每次调用最多尝试次数（含第一次）
+            base_delay (float): 第一次重试的退避上限（秒），之后每次翻倍
+            max_delay (float): 单次退避时间上限（秒）
+            failure_threshold (int): 熔断器连续失败阈值
+            recovery_timeout (float): 熔断器冷却时间（秒）
+            half_open_max_calls (int): 半开状态下同时放行的探测调用数
+            retryable_statuses (Tuple[int, ...]): 需要重试的响应状态码
+            retryable_exceptions (Tuple[type, ...]): 需要重试的异常类型
+        """
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.retryable_statuses = tuple(retryable_statuses)
+        self.retryable_exceptions = tuple(retryable_exceptions)
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+        # 运行指标
+        self._calls = 0
+        self._retries = 0
+        self._exhausted = 0
+        self._deadline_skipped = 0
+
+    def breaker(self, operation: str) -> CircuitBreaker:
+        """获取操作对应的熔断器，不存在时创建"""
+        with self._lock:
+            breaker = self._breakers.get(operation)
+            if breaker is None:
+                breaker = CircuitBreaker(operation, self.failure_threshold, self.recovery_timeout,
+                                         self.half_open_max_calls)
+                self._breakers[operation] = breaker
+            return breaker
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间：在 [0, min(max_delay, base_delay * 2^(attempt-1))] 内均匀随机"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def is_retryable_status(self, status_code: Optional[int]) -> bool:
+        return status_code in self.retryable_statuses
+
+    def next_delay(self, attempt: int) -> Optional[float]:
+        """
+        第 attempt 次失败后的重试等待时间
+
+        Returns:
+            Optional[float]: 等待秒数；尝试次数已用完，或等待后已超过请求截止时间时为 None
+        """
+        if attempt >= self.max_attempts:
+            self._exhausted += 1
+            return None
+        delay = self.backoff(attempt)
+        if not has_time_for(delay):
+            self._deadline_skipped += 1
+            return None
+        return delay
+
+    async def call(self, operation: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行一次上游调用，按需重试
+
+        Args:
+            operation (str): 操作类型（translate、chat 等），每类操作使用独立的熔断器
+            func (Callable[[], Awaitable[Any]]): 发起一次调用的函数，每次尝试都会重新调用
+
+        Returns:
+            Any: 最后一次调用的响应（重试用尽或来不及在请求截止时间前重试时为最后一次的错误响应）
+
+        Raises:
+            CircuitOpenError: 熔断器打开，调用被直接拒绝
+            Exception: 不可重试的异常，或重试用尽后最后一次的异常
+        """
+        breaker = self.breaker(operation)
+        self._calls += 1
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = breaker.acquire()
+            try:
+                response = await func()
+            except asyncio.CancelledError:
+                breaker.release(probe)
+                raise
+            except self.retryable_exceptions as e:
+                breaker.record_failure(probe)
+                delay = self.next_delay(attempt)
+                if delay is None:
+                    raise
+                error = f"{type(e).__name__}: {e}"
+            except Exception:
+                breaker.release(probe)
+                raise
+            else:
+                status_code = getattr(response, "status_code", None)
+                if not self.is_retryable_status(status_code):
+                    breaker.record_success(probe)
+                    return response
+                breaker.record_failure(probe)
+                delay = self.next_delay(attempt)
+                if delay is None:
+                    return response
+                error = f"HTTP {status_code}"
+
+            self._retries += 1
+            logger.warning(f"上游调用失败（{operation}，第 {attempt}/{self.max_attempts} 次）: {error}，"
+                           f"{delay:.2f} 秒后重试")
+            await asyncio.sleep(delay)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回重试与各熔断器的运行指标"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            "calls": self._calls,
+            "retries": self._retries,
+            "exhausted": self._exhausted,
+            "deadline_skipped": self._deadline_skipped,
+            "breakers": {name: breaker.get_metrics() for name, breaker in breakers.items()},
+        }
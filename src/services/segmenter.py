@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+文本分句
+将待翻译文本按句子/分句切分，并保留分隔空白，便于逐句查询翻译记忆后重新拼接
+"""
+
+import re
+from typing import List, NamedTuple
+
+# 中文句末标点（含全角分号，法规条文中常以分号分隔分句）
+_ZH_BOUNDARY_RE = re.compile(r'[。！？；!?;]+[”’」』）)]*')
+# 英文句末标点，后面必须跟空白
+_EN_BOUNDARY_RE = re.compile(r'[.!?;]+["\')\]]*(?=\s)')
+
+# 句点结尾但不代表句子结束的常见缩写（小写比较）
+_EN_ABBREVIATIONS = {
+    "no", "nos", "art", "arts", "para", "paras", "reg", "regs", "e.g", "i.e", "etc", "vs",
+    "mr", "mrs", "ms", "dr", "prof", "inc", "ltd", "co", "corp", "jan", "feb", "mar", "apr",
+    "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec", "approx", "fig", "vol", "p", "pp",
+    "cf", "ch", "sec", "subpara", "ref", "hs", "u.s", "u.k", "e.u", "a.m", "p.m",
+}
+
+
+class Segment(NamedTuple):
+    """切分出的一个句段"""
+    text: str        # 句段正文（不含首尾空白）
+    separator: str   # 句段之后、下一句段之前的原始空白
+
+
+def _is_abbreviation(text: str, end: int) -> bool:
+    """判断 text[:end] 末尾的句点是否属于缩写或编号（如 No. 5、1.、3.5）"""
+    if text[end - 1] != ".":
+        return False
+    word_match = re.search(r'([A-Za-z.]+|\d+)\.$', text[:end])
+    if not word_match:
+        return False
+    word = word_match.group(1)
+    if word.isdigit():
+        # 行首的 "1." 等条目编号
+        line_start = text.rfind("\n", 0, word_match.start()) + 1
+        return not text[line_start:word_match.start()].strip()
+    word = word.lower().rstrip(".")
+    return word in _EN_ABBREVIATIONS or len(word) == 1
+
+
+def _split_line(line: str, source_lang: str) -> List[str]:
+    """切分单行文本"""
+    pieces = []
+    start = 0
+    if source_lang == "zh":
+        for match in _ZH_BOUNDARY_RE.finditer(line):
+            pieces.append(line[start:match.end()])
+            start = match.end()
+    else:
+        for match in _EN_BOUNDARY_RE.finditer(line):
+            if _is_abbreviation(line, match.end()):
+                continue
+            pieces.append(line[start:match.end()])
+            start = match.end()
+    pieces.append(line[start:])
+    return pieces
+
+
+def split_segments(text: str, source_lang: str = "zh") -> List[Segment]:
+    """
+    将文本切分为句段，换行始终作为句段边界
+
+    Args:
+        text (str): 待切分文本
+        source_lang (str): 源语言，zh 按中文标点切分，其余按英文规则切分
+
+    Returns:
+        List[Segment]: 句段列表；"".join(s.text + s.separator) 与原文去除首部空白后一致
+    """
+    segments: List[Segment] = []
+    leading = re.match(r'\s*', text).end()
+    pieces: List[str] = []
+    for line in re.split(r'(\n)', text[leading:]):
+        if line == "\n":
+            if pieces:
+                pieces[-1] += "\n"
+            continue
+        pieces.extend(_split_line(line, source_lang))
+
+    for piece in pieces:
+        body = piece.strip()
+        if not body:
+            # 纯空白部分并入上一句段的分隔符
+            if segments:
+                last = segments[-1]
+                segments[-1] = Segment(last.text, last.separator + piece)
+            continue
+        lead = piece[:len(piece) - len(piece.lstrip())]
+        if lead and segments:
+            last = segments[-1]
+            segments[-1] = Segment(last.text, last.separator + lead)
+        segments.append(Segment(body, piece[len(lead) + len(body):]))
+    return segments
+
+
+def join_segments(translations: List[str], segments: List[Segment], target_lang: str = "en") -> str:
+    """
+    按原句段的分隔符拼接译文
+
+    Args:
+        translations (List[str]): 与 segments 一一对应的译文
+        segments (List[Segment]): split_segments 的结果
+        target_lang (str): 目标语言；译为中文时去掉句间空格，译为其他语言时在紧邻的句子间补空格
+
+    Returns:
+        str: 拼接后的译文
+    """
+    parts = []
+    for index, (translation, segment) in enumerate(zip(translations, segments)):
+        parts.append(translation.strip())
+        if index == len(segments) - 1:
+            break
+        separator = segment.separator
+        if "\n" not in separator:
+            separator = "" if target_lang == "zh" else " "
+        parts.append(separator)
+    return "".join(parts).strip()
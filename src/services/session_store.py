@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+会话存储
+按会话保存上一次翻译的工作流文档，"显示来源""只要最终译文"等后续请求只读取本会话的结果；
+内存LRU按条目数、总字节数和过期时间淘汰，可选SQLite共享存储供多个工作进程共用
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.services.workflow_document import WorkflowDocument
+
+logger = logging.getLogger(__name__)
+
+# 两次清理SQLite过期会话的最小间隔（秒）
+_PRUNE_INTERVAL = 60.0
+
+
+class SessionStore:
+    """
+    会话 -> 上一次翻译的工作流文档
+
+    内存中保存解析好的文档对象；启用共享存储时同时写入SQLite，读取时先比对SQLite中的更新时间，
+    其他进程写入过更新的结果时重新加载，因此同一会话的请求落到不同工作进程也能读到最新结果
+    """
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 max_sessions: int = 1000,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 3600.0):
+        """
+        Args:
+            db_path (str, optional): SQLite共享存储路径，为空时只使用内存
+            max_sessions (int): 内存中最多保存的会话数
+            max_bytes (int): 内存中保存的模型输出总字节数上限
+            ttl (float): 会话过期时间（秒），从最后一次写入开始计算
+        """
+        self.db_path = db_path
+        self.max_sessions = max(1, int(max_sessions))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = float(ttl)
+
+        # 会话ID -> (过期时间, 更新时间, 字节数, 文档)
+        self._memory: "OrderedDict[str, Tuple[float, float, int, WorkflowDocument]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pruned_at = 0.0
+
+        # 运行指标
+        self._hits = 0
+        self._misses = 0
+        self._reloads = 0
+        self._sets = 0
+        self._evictions = 0
+        self._expired = 0
+        self._errors = 0
+
+        if db_path:
+            try:
+                self._conn = self._open(db_path)
+                logger.info(f"会话共享存储已启用: {db_path}")
+            except Exception as e:
+                logger.error(f"打开会话存储数据库失败，仅使用内存存储: {e}")
+                self._conn = None
+
+    @staticmethod
+    def _open(db_path: str) -> sqlite3.Connection:
+        """打开数据库并建表；WAL模式允许多个进程同时读写"""
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_documents (
+                session_id TEXT PRIMARY KEY,
+                output TEXT NOT NULL,
+                is_direct INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_session_documents_expires ON session_documents (expires_at)")
+        return conn
+
+    @staticmethod
+    def _size(document: WorkflowDocument) -> int:
+        return len(document.text.encode("utf-8"))
+
+    def _remember(self, session_id: str, document: WorkflowDocument, updated_at: float, expires_at: float):
+        """写入内存，超过条目数或字节数上限时淘汰最久未使用的会话"""
+        self._forget(session_id)
+        size = self._size(document)
+        if size > self.max_bytes:
+            return
+        self._memory[session_id] = (expires_at, updated_at, size, document)
+        self._bytes += size
+        while len(self._memory) > self.max_sessions or self._bytes > self.max_bytes:
+            _, (_, _, evicted_size, _) = self._memory.popitem(last=False)
+            self._bytes -= evicted_size
+            self._evictions += 1
+
+    def _forget(self, session_id: str):
+        entry = self._memory.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def get(self, session_id: str) -> Optional[WorkflowDocument]:
+        """
+        获取会话上一次翻译的工作流文档
+
+        Args:
+            session_id (str): 会话ID
+
+        Returns:
+            Optional[WorkflowDocument]: 未保存或已过期时返回 None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(session_id)
+            if entry is not None and entry[0] <= now:
+                self._forget(session_id)
+                self._expired += 1
+                entry = None
+
+            if self._conn is None:
+                if entry is None:
+                    self._misses += 1
+                    return None
+                self._memory.move_to_end(session_id)
+                self._hits += 1
+                return entry[3]
+
+            try:
+                row = self._conn.execute(
+                    "SELECT updated_at, expires_at FROM session_documents WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if row is None or row[1] <= now:
+                    # 其他进程已清除该会话，或已过期
+                    self._forget(session_id)
+                    self._misses += 1
+                    return None
+                if entry is not None and entry[1] == row[0]:
+                    self._memory.move_to_end(session_id)
+                    self._hits += 1
+                    return entry[3]
+                output_row = self._conn.execute(
+                    "SELECT output, is_direct, updated_at, expires_at FROM session_documents WHERE session_id = ?",
+                    (session_id,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                self._errors += 1
+                logger.warning(f"读取会话存储失败: {e}")
+                if entry is None:
+                    self._misses += 1
+                    return None
+                self._hits += 1
+                return entry[3]
+
+            if output_row is None:
+                self._misses += 1
+                return None
+            document = WorkflowDocument(output_row[0], is_direct=bool(output_row[1]))
+            self._remember(session_id, document, output_row[2], output_row[3])
+            self._reloads += 1
+            self._hits += 1
+            return document
+
+    def set(self, session_id: str, document: WorkflowDocument):
+        """
+        保存会话本次翻译的工作流文档，覆盖之前的结果
+
+        Args:
+            session_id (str): 会话ID
+            document (WorkflowDocument): 解析好的工作流文档
+        """
+        now = time.time()
+        with self._lock:
+            self._sets += 1
+            self._remember(session_id, document, now, now + self.ttl)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO session_documents (session_id, output, is_direct, updated_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (session_id, document.text, int(document.is_direct), now, now + self.ttl)
+                )
+                if now - self._pruned_at >= _PRUNE_INTERVAL:
+                    self._pruned_at = now
+                    self._conn.execute("DELETE FROM session_documents WHERE expires_at <= ?", (now,))
+            except sqlite3.Error as e:
+                self._errors += 1
+                logger.warning(f"写入会话存储失败: {e}")
+
+    def clear(self, session_id: str):
+        """
+        清除会话保存的结果（翻译失败时调用，避免后续请求读到更早的结果）
+
+        Args:
+            session_id (str): 会话ID
+        """
+        with self._lock:
+            self._forget(session_id)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute("DELETE FROM session_documents WHERE session_id = ?", (session_id,))
+            except sqlite3.Error as e:
+                self._errors += 1
+                logger.warning(f"清除会话存储失败: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回会话存储运行指标"""
+        with self._lock:
+            shared_sessions = None
+            if self._conn is not None:
+                try:
+                    shared_sessions = self._conn.execute(
+                        "SELECT COUNT(*) FROM session_documents WHERE expires_at > ?", (time.time(),)
+                    ).fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                "db_path": self.db_path or None,
+                "sessions": len(self._memory),
+                "max_sessions": self.max_sessions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "shared_sessions": shared_sessions,
+                "hits": self._hits,
+                "misses": self._misses,
+                "reloads": self._reloads,
+                "sets": self._sets,
+                "evictions": self._evictions,
+                "expired": self._expired,
+                "errors": self._errors,
+            }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+进行中请求合并（single-flight）
+同一时刻对相同参数的多次调用只向上游发起一次，其余调用等待并共享同一个结果
+"""
+
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """一次进行中的上游调用及其等待方数量"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    进行中请求合并器
+    第一个调用方创建上游任务，之后到达的相同键调用直接等待该任务；
+    任务完成后立即移除，不缓存结果（结果缓存由上层负责）
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        """
+        Args:
+            name (str): 名称，用于日志
+        """
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+
+        # 运行指标
+        self._calls = 0
+        self._executions = 0
+        self._coalesced = 0
+        self._peak_waiters = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行调用，相同键的并发调用共享一次执行结果
+
+        Args:
+            key (Hashable): 合并键
+            func (Callable): 无参协程函数，仅在没有相同键的进行中调用时执行
+
+        Returns:
+            Any: 调用结果；每个调用方拿到的是独立的浅拷贝，互相修改不受影响
+        """
+        self._calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            self._executions += 1
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._forget(key, flight))
+        else:
+            self._coalesced += 1
+            logger.info(f"[{self.name}] 合并相同的进行中请求（当前等待方 {flight.waiters + 1}）")
+
+        flight.waiters += 1
+        self._peak_waiters = max(self._peak_waiters, flight.waiters)
+        try:
+            # shield: 单个等待方被取消（如客户端断开）不影响其他等待方
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 所有等待方都已离开，上游调用没有必要继续
+                flight.task.cancel()
+            raise
+        flight.waiters -= 1
+        return copy.copy(result)
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        """任务结束后移除记录，之后的相同请求重新发起调用"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回合并相关的运行指标"""
+        return {
+            "calls": self._calls,
+            "executions": self._executions,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._flights),
+            "peak_waiters": self._peak_waiters,
+        }
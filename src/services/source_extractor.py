@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+知识库来源提取
+从解析好的工作流文档中本地提取"术语 → 译文 + 来源编号/来源名称"，生成来源明细，
+不需要再把工作流发回模型整理
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.services.workflow_document import WorkflowDocument
+
+SOURCES_HEADER = "以下是上一回答中使用的知识库来源明细："
+
+# 来源名称中不会出现的字符
+_NAME_STOP = r'\s\[\]，。、；：,;:|"“”「」『』()（）'
+# "[1] 词典测试集" / "[1]词典测试集"：编号在前
+_CITATION_BEFORE_NAME_RE = re.compile(r'\[(\d+)\]\s*([^' + _NAME_STOP + r']*)')
+# "词典测试集[2]"：名称在前（名称与编号之间没有空白）
+_NAME_BEFORE_CITATION_RE = re.compile(r'[^' + _NAME_STOP + r']+$')
+_NAME_STOP_CHAR_RE = re.compile(r'[' + _NAME_STOP + r']')
+_CITATION_RE = re.compile(r'\[(\d+)\]')
+# 名称前常见的引导词，如 "根据词典测试集[2]"
+_NAME_PREFIXES = ("来源于", "根据", "依据", "来自", "出自", "参见", "参考", "源自", "见")
+# 引号括起的术语与译文："非欧盟货物" ... "non-Union goods"
+_QUOTED_RE = re.compile(r'["“「『]([^"”」』]+)["”」』]')
+# 行首的列表标记
+_BULLET_RE = re.compile(r'\s*(?:[-*•]|\d+[\.、)])\s*')
+# 术语与译文之间的分隔
+_PAIR_SEPARATOR_RE = re.compile(r'\s*(?:→|->|=>|：|:|对应为|对应|译为|翻译为)\s*')
+# 译文后面附带的来源说明，如 "（[1] 词典测试集）"、"，来源：..."
+_TRAILING_SOURCE_RE = re.compile(r'\s*[(（]?\s*(?:来源|出处|source)?\s*[:：]?\s*\[\d+\].*$', re.IGNORECASE)
+
+# 只在这些章节中查找来源：术语提取与检索（编号1、2开头），以及标题含下列关键词的章节
+_SOURCE_SECTION_KEYWORDS = ("参考", "来源", "知识")
+
+
+class Citation(NamedTuple):
+    """一次来源引用"""
+    index: str   # 来源编号，如 "1"；没有编号时为空字符串
+    name: str    # 来源名称；未给出名称时为空字符串
+
+
+class SourceEntry(NamedTuple):
+    """来源明细中的一个术语"""
+    term: str
+    translation: str
+    citations: List[Citation]
+
+
+def _clean_name(name: str) -> str:
+    name = name.strip()
+    for prefix in _NAME_PREFIXES:
+        if name.startswith(prefix) and len(name) > len(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def parse_citations(text: str) -> List[Citation]:
+    """
+    找出文本中的来源引用
+
+    "词典测试集[2]" 这样紧贴在名称后面的编号取前面的名称，其余编号取后面的名称（"[1] 词典测试集"）
+
+    Args:
+        text (str): 一行文本或表格单元格
+
+    Returns:
+        List[Citation]: 按出现顺序的引用；只有名称没有编号的单元格返回一个编号为空的引用
+    """
+    citations = []
+    for match in _CITATION_RE.finditer(text):
+        start = match.start()
+        if start > 0 and not _NAME_STOP_CHAR_RE.match(text[start - 1]):
+            name = _NAME_BEFORE_CITATION_RE.search(text, 0, start).group(0)
+        else:
+            after = _CITATION_BEFORE_NAME_RE.match(text, start)
+            name = after.group(2)
+        citations.append(Citation(match.group(1), _clean_name(name)))
+    if not citations and text.strip() and '[' not in text:
+        citations.append(Citation("", text.strip()))
+    return citations
+
+
+def _split_pair(text: str) -> Optional[Tuple[str, str]]:
+    """从一行描述中取出 (术语, 译文)"""
+    quoted = _QUOTED_RE.findall(text)
+    if len(quoted) >= 2:
+        return quoted[0].strip(), quoted[1].strip()
+    text = _BULLET_RE.sub('', text, count=1)
+    parts = _PAIR_SEPARATOR_RE.split(text, maxsplit=1)
+    if len(parts) != 2:
+        return None
+    term = _CITATION_RE.sub('', parts[0]).strip(' "“”')
+    translation = _TRAILING_SOURCE_RE.sub('', parts[1]).strip(' "“”，,。；;')
+    if not term or not translation:
+        return None
+    return term, translation
+
+
+def _source_sections(document: WorkflowDocument):
+    for section in document.sections:
+        if section.number[:1] in ("1", "2") and not section.number[1:2].isdigit():
+            yield section
+        elif any(keyword in section.title for keyword in _SOURCE_SECTION_KEYWORDS):
+            yield section
+
+
+def extract_source_entries(document: WorkflowDocument) -> List[SourceEntry]:
+    """
+    从工作流文档中提取带来源的术语
+
+    依次使用2.2节术语表的来源列，以及术语提取/检索章节中带 [n] 引用的描述行；
+    只有编号没有名称的引用用文档中其他位置出现过的同编号名称补全
+
+    Args:
+        document (WorkflowDocument): 解析好的工作流文档
+
+    Returns:
+        List[SourceEntry]: 按首次出现顺序、按 (术语, 译文) 去重合并后的条目
+    """
+    entries: Dict[Tuple[str, str], List[Citation]] = {}
+
+    def add(term: str, translation: str, citations: List[Citation]):
+        merged = entries.setdefault((term, translation), [])
+        for citation in citations:
+            if citation not in merged:
+                merged.append(citation)
+
+    for term in document.terms:
+        citations = parse_citations(term.source)
+        if citations:
+            add(term.term, term.translation, citations)
+
+    for section in _source_sections(document):
+        for line in section.lines:
+            stripped = line.strip()
+            if '[' not in stripped or stripped[:1] == '|':
+                continue
+            citations = parse_citations(stripped)
+            if not citations:
+                continue
+            pair = _split_pair(_CITATION_BEFORE_NAME_RE.sub('', stripped) if stripped[:1] == '[' else stripped)
+            if pair:
+                add(pair[0], pair[1], citations)
+
+    # 补全缺少名称的引用
+    names = {}
+    for citations in entries.values():
+        for citation in citations:
+            if citation.index and citation.name:
+                names.setdefault(citation.index, citation.name)
+    return [
+        SourceEntry(term, translation,
+                    [Citation(c.index, c.name or names.get(c.index, "")) for c in citations])
+        for (term, translation), citations in entries.items()
+    ]
+
+
+def render_source_entries(entries: List[SourceEntry]) -> Optional[str]:
+    """
+    渲染来源明细文本（每个术语一行"术语 → 译文"，其后每个来源一行缩进的"编号 (来源名称: 内容)"）
+
+    Args:
+        entries (List[SourceEntry]): extract_source_entries 的结果
+
+    Returns:
+        Optional[str]: 来源明细；没有条目时返回 None
+    """
+    if not entries:
+        return None
+    lines = [SOURCES_HEADER, ""]
+    for number, entry in enumerate(entries, 1):
+        lines.append(f"{number}.  {entry.term} → {entry.translation}")
+        for citation in entry.citations:
+            index = f"{citation.index} " if citation.index else ""
+            name = citation.name or "知识库"
+            lines.append(f"    {index}({name}: {entry.term}对应\"{entry.translation}\")")
+    return "\n".join(lines)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+术语表导入
+逐行流式读取 XLSX / CSV 文件中的双语术语对，内存占用与文件大小无关；
+双语对照表中常混有条款标题、编号和整句，is_term_pair 用于挑出可以做术语替换与注入的条目
+"""
+
+import csv
+import logging
+import os
+import re
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CJK_RE = re.compile(r'[一-鿿]')
+# 句子标点、括号和数字：含有这些字符的条目一般是整句、条款编号或引用，不是术语
+_NON_TERM_RE = re.compile(r'[。；;：:，,、！!？?（）()\[\]【】“”"\d]')
+# 术语不会以冠词、介词等虚词开头（如签名栏的 "For the Commission"）
+_LEADING_FUNCTION_WORDS = {"a", "an", "the", "for", "of", "to", "in", "on", "at", "by", "with", "and", "or", "done"}
+
+# 术语的最大长度：中文字符数、拉丁文字单词数
+MAX_TERM_CJK_CHARS = 16
+MAX_TERM_WORDS = 6
+
+
+def _clean_cell(value) -> Optional[str]:
+    """只接受非空字符串单元格；数字、日期等单元格（如表中的Excel日期序列号）忽略"""
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return value or None
+
+
+def _orient(first: str, second: str, source_lang: str, target_lang: str) -> Optional[Tuple[str, str]]:
+    """
+    按内容判断中英文所在列，返回 (源语言文本, 目标语言文本)
+    两列都含中文或都不含中文时无法判断，返回 None
+    """
+    first_zh = bool(_CJK_RE.search(first))
+    second_zh = bool(_CJK_RE.search(second))
+    if first_zh == second_zh:
+        return None
+    zh_text, other_text = (first, second) if first_zh else (second, first)
+    if source_lang == "zh":
+        return zh_text, other_text
+    if target_lang == "zh":
+        return other_text, zh_text
+    return first, second
+
+
+def _is_term(text: str) -> bool:
+    if _NON_TERM_RE.search(text) or text.endswith("."):
+        return False
+    if _CJK_RE.search(text):
+        return len(text) <= MAX_TERM_CJK_CHARS and not re.search(r'\s', text)
+    words = text.split()
+    if len(words) > MAX_TERM_WORDS or words[0].lower() in _LEADING_FUNCTION_WORDS:
+        return False
+    # 多个单词全部大写的是章节标题（如 "FINAL PROVISIONS"），单个大写词可能是缩写（如 EORI）
+    return not (len(words) > 1 and text.isupper())
+
+
+def is_term_pair(term: str, translation: str) -> bool:
+    """
+    判断术语对是否像术语：两边都较短，不含句子标点、括号和编号，不是全大写的标题
+
+    Args:
+        term (str): 源语言文本
+        translation (str): 目标语言文本
+
+    Returns:
+        bool: 是否可以用于术语替换与提示词注入
+    """
+    return _is_term(term.strip()) and _is_term(translation.strip())
+
+
+def iter_xlsx_pairs(path: str,
+                    source_lang: str = "en",
+                    target_lang: str = "zh",
+                    columns: Tuple[int, int] = (0, 1)) -> Iterator[Tuple[str, str]]:
+    """
+    逐行读取XLSX文件中的术语对（只读模式，不把整个工作簿载入内存）
+
+    Args:
+        path (str): 文件路径
+        source_lang (str): 源语言
+        target_lang (str): 目标语言
+        columns (Tuple[int, int]): 两种语言所在的列下标，列的先后顺序会按内容自动识别
+
+    Yields:
+        Tuple[str, str]: (源语言文本, 目标语言文本)
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            for row in sheet.iter_rows(values_only=True):
+                if len(row) <= max(columns):
+                    continue
+                first, second = _clean_cell(row[columns[0]]), _clean_cell(row[columns[1]])
+                if not first or not second:
+                    continue
+                pair = _orient(first, second, source_lang, target_lang)
+                if pair:
+                    yield pair
+    finally:
+        workbook.close()
+
+
+def iter_csv_pairs(path: str,
+                   source_lang: str = "en",
+                   target_lang: str = "zh",
+                   columns: Tuple[int, int] = (0, 1)) -> Iterator[Tuple[str, str]]:
+    """
+    逐行读取CSV文件中的术语对，自动识别 UTF-8（含BOM）与 GBK 编码
+
+    Args:
+        path (str): 文件路径
+        source_lang (str): 源语言
+        target_lang (str): 目标语言
+        columns (Tuple[int, int]): 两种语言所在的列下标，列的先后顺序会按内容自动识别
+
+    Yields:
+        Tuple[str, str]: (源语言文本, 目标语言文本)
+    """
+    encoding = "utf-8-sig"
+    try:
+        with open(path, "r", encoding=encoding) as f:
+            f.read(64 * 1024)
+    except UnicodeDecodeError:
+        encoding = "gbk"
+
+    with open(path, "r", encoding=encoding, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) <= max(columns):
+                continue
+            first, second = _clean_cell(row[columns[0]]), _clean_cell(row[columns[1]])
+            if not first or not second:
+                continue
+            pair = _orient(first, second, source_lang, target_lang)
+            if pair:
+                yield pair
+
+
+def iter_file_pairs(path: str,
+                    source_lang: str = "en",
+                    target_lang: str = "zh") -> Iterator[Tuple[str, str]]:
+    """
+    按扩展名选择读取方式
+
+    Raises:
+        ValueError: 不支持的文件类型
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        return iter_xlsx_pairs(path, source_lang, target_lang)
+    if extension in (".csv", ".txt"):
+        return iter_csv_pairs(path, source_lang, target_lang)
+    raise ValueError(f"不支持的术语文件类型: {extension}（仅支持 .xlsx / .csv）")
@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+术语库
+以SQLite保存双语术语对，支持精确、前缀与忽略大小写查询，
+并为术语替换和提示词术语注入提供基于术语库构建的多模式匹配器。
+术语库不会自动导入任何文件，需通过 import_terminology.py 或管理接口导入
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.services.glossary_matcher import GlossaryMatcher
+from src.services.terminology_importer import is_term_pair, iter_file_pairs
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 仓库自带的欧盟授权条例中英对照表（按句对齐的语料，由 import_terminology.py 导入）
+BUNDLED_WORKBOOK = os.path.join(PROJECT_ROOT, "欧盟授权条例.xlsx")
+
+# 前缀查询的上界字符
+_MAX_CHAR = "\U0010ffff"
+
+
+class TerminologyStore:
+    """
+    术语库
+    每个术语对按两个方向各存一行（en->zh 与 zh->en），主键为 (源语言, 目标语言, 术语)，
+    表使用 WITHOUT ROWID 按主键聚簇存储，精确与前缀查询都是一次索引范围扫描
+    """
+
+    # 用于术语替换/注入的最长术语（更长的条目一般是整句对照，只参与精确查询）
+    MAX_MATCHER_TERM_LENGTH = 64
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path (str): SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # (源语言, 目标语言, 额外词典名称) -> (术语库版本, 匹配器)；名称为空字符串表示只用术语库
+        self._matchers: Dict[Tuple[str, str, str], Tuple[int, GlossaryMatcher]] = {}
+        # (源语言, 目标语言, 额外词典名称) -> 额外词典
+        self._glossaries: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+        self._version = 0
+        self._version_checked_at = 0.0
+        # 后台重建匹配器的线程，同一时刻最多一个
+        self._rebuild_thread: Optional[threading.Thread] = None
+
+        try:
+            self._conn = self._open(db_path)
+            self._version = self._read_version()
+        except Exception as e:
+            logger.error(f"打开术语库失败: {e}")
+            self._conn = None
+
+    @property
+    def is_available(self) -> bool:
+        return self._conn is not None
+
+    @staticmethod
+    def _open(db_path: str) -> sqlite3.Connection:
+        """打开数据库并建表"""
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS terms (
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                term TEXT NOT NULL,
+                term_folded TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                origin TEXT NOT NULL DEFAULT '',
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (source_lang, target_lang, term)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_terms_folded ON terms (source_lang, target_lang, term_folded)")
+        conn.execute("CREATE TABLE IF NOT EXISTS terminology_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO terminology_meta (name, value) VALUES ('version', '0')")
+        return conn
+
+    def _read_version(self) -> int:
+        row = self._conn.execute("SELECT value FROM terminology_meta WHERE name = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def import_pairs(self,
+                     pairs: Iterable[Tuple[str, str]],
+                     source_lang: str = "en",
+                     target_lang: str = "zh",
+                     origin: str = "",
+                     batch_size: int = 1000) -> int:
+        """
+        导入术语对，同一术语重复导入时以最后一次为准
+
+        Args:
+            pairs (Iterable[Tuple[str, str]]): (源语言术语, 目标语言译文)，可以是生成器
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            origin (str): 来源（文件名等），便于追溯
+            batch_size (int): 每批提交的条数
+
+        Returns:
+            int: 导入的术语对数量
+        """
+        if self._conn is None:
+            raise RuntimeError("术语库不可用")
+
+        sql = ("INSERT INTO terms (source_lang, target_lang, term, term_folded, translation, origin, updated_at) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?) "
+               "ON CONFLICT (source_lang, target_lang, term) DO UPDATE SET "
+               "translation = excluded.translation, origin = excluded.origin, updated_at = excluded.updated_at")
+        imported = 0
+        batch: List[tuple] = []
+
+        def flush():
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(sql, batch)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            batch.clear()
+
+        now = time.time()
+        for term, translation in pairs:
+            term, translation = term.strip(), translation.strip()
+            if not term or not translation:
+                continue
+            batch.append((source_lang, target_lang, term, term.lower(), translation, origin, now))
+            batch.append((target_lang, source_lang, translation, translation.lower(), term, origin, now))
+            imported += 1
+            if len(batch) >= batch_size * 2:
+                flush()
+        if batch:
+            flush()
+
+        with self._lock:
+            self._conn.execute("UPDATE terminology_meta SET value = CAST(value AS INTEGER) + 1 WHERE name = 'version'")
+            self._version = self._read_version()
+        logger.info(f"术语库导入完成: {imported} 个术语对（来源: {origin or '未知'}）")
+        # 导入本身不在请求路径上（命令行工具或管理接口的线程池），顺带重建已有的匹配器
+        self.build_matchers()
+        return imported
+
+    def import_file(self, path: str, source_lang: str = "en", target_lang: str = "zh",
+                    origin: Optional[str] = None) -> int:
+        """
+        从 XLSX / CSV 文件流式导入术语
+
+        Args:
+            path (str): 文件路径
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            origin (str, optional): 来源名称，默认为文件名
+
+        Returns:
+            int: 导入的术语对数量
+        """
+        return self.import_pairs(iter_file_pairs(path, source_lang, target_lang),
+                                 source_lang, target_lang, origin or os.path.basename(path))
+
+    def lookup(self, term: str, source_lang: str, target_lang: str,
+               case_insensitive: bool = True) -> Optional[str]:
+        """
+        精确查询术语译文，区分大小写的结果优先
+
+        Args:
+            term (str): 术语
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            case_insensitive (bool): 精确匹配失败时是否忽略大小写再查一次
+
+        Returns:
+            Optional[str]: 译文，不存在时返回 None
+        """
+        if self._conn is None:
+            return None
+        term = term.strip()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation FROM terms WHERE source_lang = ? AND target_lang = ? AND term = ?",
+                (source_lang, target_lang, term)
+            ).fetchone()
+            if row is None and case_insensitive:
+                row = self._conn.execute(
+                    "SELECT translation FROM terms WHERE source_lang = ? AND target_lang = ? AND term_folded = ? "
+                    "LIMIT 1",
+                    (source_lang, target_lang, term.lower())
+                ).fetchone()
+        return row[0] if row else None
+
+    def search_prefix(self, prefix: str, source_lang: str, target_lang: str,
+                      limit: int = 20, case_insensitive: bool = True) -> List[Dict[str, str]]:
+        """
+        前缀查询
+
+        Args:
+            prefix (str): 术语前缀
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            limit (int): 最多返回条数
+            case_insensitive (bool): 是否忽略大小写
+
+        Returns:
+            List[Dict[str, str]]: [{"term", "translation", "origin"}]，按术语排序
+        """
+        if self._conn is None or not prefix.strip():
+            return []
+        prefix = prefix.strip()
+        column = "term_folded" if case_insensitive else "term"
+        if case_insensitive:
+            prefix = prefix.lower()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT term, translation, origin FROM terms "
+                f"WHERE source_lang = ? AND target_lang = ? AND {column} >= ? AND {column} < ? "
+                f"ORDER BY {column} LIMIT ?",
+                (source_lang, target_lang, prefix, prefix + _MAX_CHAR, limit)
+            ).fetchall()
+        return [{"term": term, "translation": translation, "origin": origin}
+                for term, translation, origin in rows]
+
+    def count(self) -> int:
+        """术语对数量（每个术语对按两个方向存储，计一次）"""
+        if self._conn is None:
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0] // 2
+
+    def _current_version(self) -> int:
+        """每5秒至多读取一次版本号，其他工作进程导入术语后本进程据此重建匹配器"""
+        now = time.time()
+        if self._conn is not None and now - self._version_checked_at >= 5.0:
+            self._version_checked_at = now
+            with self._lock:
+                self._version = self._read_version()
+        return self._version
+
+    def register_glossary(self, name: str, source_lang: str, target_lang: str, glossary: Dict[str, str]):
+        """
+        登记与术语库合并使用的额外词典（如内置词典），之后通过 get_matcher(..., glossary=name) 获取合并后的匹配器
+
+        Args:
+            name (str): 词典名称
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            glossary (Dict[str, str]): 术语 -> 译文
+        """
+        key = (source_lang, target_lang, name)
+        self._glossaries[key] = dict(glossary)
+        self._matchers.pop(key, None)
+
+    def build_matchers(self):
+        """
+        构建（或按当前版本重建）所有语言方向的匹配器：术语库中已有的语言方向与已登记的额外词典。
+        扫描整个术语库，应在启动时或线程池中调用，不要在事件循环中调用
+        """
+        keys = set(self._glossaries) | set(self._matchers)
+        if self._conn is not None:
+            with self._lock:
+                directions = self._conn.execute("SELECT DISTINCT source_lang, target_lang FROM terms").fetchall()
+            keys.update((source_lang, target_lang, "") for source_lang, target_lang in directions)
+        for key in keys:
+            self._build_matcher(*key)
+
+    def get_matcher(self, source_lang: str, target_lang: str, glossary: str = "") -> GlossaryMatcher:
+        """
+        获取该语言方向的术语匹配器；术语库中只有像术语的条目（见 is_term_pair）参与匹配。
+        匹配器应已由 build_matchers 预先构建；术语库被其他进程更新后先返回旧的匹配器，并在后台线程中重建
+
+        Args:
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            glossary (str): 与术语库合并的额外词典名称（见 register_glossary），为空时只用术语库
+
+        Returns:
+            GlossaryMatcher: 匹配器（英文源语言时忽略大小写并整词匹配）
+        """
+        key = (source_lang, target_lang, glossary)
+        cached = self._matchers.get(key)
+        if cached is None:
+            # 未预先构建的语言方向只能当场构建
+            return self._build_matcher(*key)
+        if cached[0] != self._current_version():
+            self._schedule_rebuild()
+        return cached[1]
+
+    def _schedule_rebuild(self):
+        with self._lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(target=self.build_matchers, name="terminology-matcher-rebuild",
+                                                    daemon=True)
+            self._rebuild_thread.start()
+
+    def _build_matcher(self, source_lang: str, target_lang: str, name: str) -> GlossaryMatcher:
+        """按当前术语库版本构建匹配器并缓存"""
+        key = (source_lang, target_lang, name)
+        version = self._current_version()
+        glossary: Dict[str, str] = dict(self._glossaries.get(key, {}))
+        if self._conn is not None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT term, translation FROM terms WHERE source_lang = ? AND target_lang = ? "
+                    "AND length(term) BETWEEN 2 AND ?",
+                    (source_lang, target_lang, self.MAX_MATCHER_TERM_LENGTH)
+                ).fetchall()
+            # 整句、条款标题等对照只参与精确查询，不参与替换和注入
+            glossary.update((term, translation) for term, translation in rows if is_term_pair(term, translation))
+        matcher = GlossaryMatcher(glossary,
+                                  case_insensitive=source_lang != "zh",
+                                  whole_word=source_lang != "zh")
+        self._matchers[key] = (version, matcher)
+        logger.info(f"术语匹配器已构建: {source_lang}->{target_lang}{f'（{name}）' if name else ''}，"
+                    f"{len(matcher)} 个术语")
+        return matcher
+
+    def find_terms(self, text: str, source_lang: str, target_lang: str,
+                   limit: int = 30) -> List[Tuple[str, str]]:
+        """
+        找出文本中出现的术语库术语，用于向翻译提示词注入术语对照
+
+        Args:
+            text (str): 待翻译文本
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            limit (int): 最多返回的术语数
+
+        Returns:
+            List[Tuple[str, str]]: 去重后的 (原文术语, 译文)，按首次出现顺序
+        """
+        if self._conn is None:
+            return []
+        found: Dict[str, str] = {}
+        for start, end, translation in self.get_matcher(source_lang, target_lang).find_all(text):
+            found.setdefault(text[start:end], translation)
+            if len(found) >= limit:
+                break
+        return list(found.items())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回术语库信息"""
+        return {
+            "db_path": self.db_path,
+            "terms": self.count(),
+            "version": self._version,
+        }
+
+
+terminology_store = TerminologyStore(
+    os.getenv("TERMINOLOGY_DB_PATH", os.path.join(PROJECT_ROOT, "cache", "terminology.db"))
+)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+翻译结果缓存
+内存LRU（带过期时间）+ SQLite持久化两级缓存，重启后保留，并可在多个uvicorn工作进程之间共享
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HORIZONTAL_SPACE_RE = re.compile(r"[ \t　 ]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def normalize_text(text: str) -> str:
+    """
+    规范化待翻译文本，使仅有空白差异的相同内容命中同一缓存项
+
+    Args:
+        text (str): 原始文本
+
+    Returns:
+        str: 统一换行符、合并行内空白、去除首尾空白后的文本
+    """
+    text = unicodedata.normalize("NFC", text or "")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [_HORIZONTAL_SPACE_RE.sub(" ", line).strip() for line in text.split("\n")]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _sha1(value: str) -> str:
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    两级翻译结果缓存
+    读取顺序为内存 -> SQLite，SQLite命中后回填内存；写入同时写两级。
+    内存与SQLite各用一把锁，在线程池中进行的SQLite读写不会挡住事件循环上的 get_from_memory
+    """
+
+    def __init__(self,
+                 db_path: str,
+                 memory_size: int = 1000,
+                 memory_ttl: float = 600.0,
+                 ttl: float = 30 * 24 * 3600.0):
+        """
+        Args:
+            db_path (str): SQLite数据库文件路径，为空时只使用内存缓存
+            memory_size (int): 内存缓存最大条目数
+            memory_ttl (float): 内存缓存过期时间（秒），也是其他工作进程清理缓存后本进程的最长感知延迟
+            ttl (float): 持久化缓存过期时间（秒）
+        """
+        self.db_path = db_path
+        self.memory_size = max(0, int(memory_size))
+        self.memory_ttl = float(memory_ttl)
+        self.ttl = float(ttl)
+
+        self._memory: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # _lock 保护内存缓存与运行指标，_db_lock 保护数据库连接
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # 清理代数：任一进程清理缓存后递增，其余进程据此丢弃内存中的旧条目
+        self._generation = 0
+        self._generation_checked_at = 0.0
+
+        # 运行指标
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._sets = 0
+        self._evictions = 0
+        self._expired = 0
+        self._errors = 0
+
+        if db_path:
+            try:
+                self._conn = self._open(db_path)
+                self._generation = self._read_generation()
+                logger.info(f"翻译缓存已启用: {db_path}")
+            except Exception as e:
+                logger.error(f"打开翻译缓存数据库失败，仅使用内存缓存: {e}")
+                self._conn = None
+
+    @staticmethod
+    def _open(db_path: str) -> sqlite3.Connection:
+        """打开数据库并建表；WAL模式允许多个进程同时读写"""
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS translation_cache (
+                cache_key TEXT PRIMARY KEY,
+                text_hash TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                show_workflow INTEGER NOT NULL,
+                template_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_translation_cache_text ON translation_cache (text_hash)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_translation_cache_expires ON translation_cache (expires_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('generation', 0)")
+        return conn
+
+    def _read_generation(self) -> int:
+        row = self._conn.execute("SELECT value FROM cache_meta WHERE name = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def make_key(text: str,
+                 source_lang: str,
+                 target_lang: str,
+                 show_workflow: bool,
+                 template_version: str,
+                 context: Optional[str] = None) -> str:
+        """
+        生成缓存键
+
+        Args:
+            text (str): 待翻译文本（会先规范化）
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            show_workflow (bool): 是否展示工作流
+            template_version (str): 提示词模板版本，模板变更后旧缓存自然失效
+            context (str, optional): 额外上下文
+
+        Returns:
+            str: 缓存键
+        """
+        parts = [
+            normalize_text(text),
+            source_lang,
+            target_lang,
+            "1" if show_workflow else "0",
+            template_version,
+            _sha1(context) if context else "",
+        ]
+        return _sha1("\x1f".join(parts))
+
+    def _generation_check_due(self, now: float) -> bool:
+        return self._conn is not None and now - self._generation_checked_at >= 1.0
+
+    def _sync_generation(self, now: float):
+        """每秒至多检查一次清理代数，发现其他进程清理过缓存时清空本进程内存缓存"""
+        if not self._generation_check_due(now):
+            return
+        self._generation_checked_at = now
+        with self._db_lock:
+            generation = self._read_generation()
+        with self._lock:
+            if generation != self._generation:
+                self._generation = generation
+                self._memory.clear()
+
+    def get_from_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        只查询内存缓存，不访问SQLite，可以直接在事件循环中调用；
+        距上次检查清理代数超过1秒时返回 None，由 get 在线程池中检查清理代数并查询SQLite
+
+        Args:
+            key (str): make_key 生成的缓存键
+
+        Returns:
+            Optional[Dict[str, Any]]: 命中时返回缓存的结果字典（副本），否则返回 None（未命中不计入指标）
+        """
+        now = time.time()
+        with self._lock:
+            if self._generation_check_due(now):
+                return None
+            entry = self._memory.get(key)
+            if entry is None or entry[0] <= now:
+                return None
+            self._memory.move_to_end(key)
+            self._memory_hits += 1
+            return dict(entry[1])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存（可能读取SQLite，在事件循环中应放到线程池执行）
+
+        Args:
+            key (str): make_key 生成的缓存键
+
+        Returns:
+            Optional[Dict[str, Any]]: 命中时返回缓存的结果字典（副本），否则返回 None
+        """
+        now = time.time()
+        try:
+            self._sync_generation(now)
+        except sqlite3.Error as e:
+            with self._lock:
+                self._errors += 1
+            logger.warning(f"读取翻译缓存清理代数失败: {e}")
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._memory_hits += 1
+                    return dict(entry[1])
+                del self._memory[key]
+
+        row = None
+        if self._conn is not None:
+            try:
+                with self._db_lock:
+                    row = self._conn.execute(
+                        "SELECT result, expires_at FROM translation_cache WHERE cache_key = ?", (key,)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                with self._lock:
+                    self._errors += 1
+                logger.warning(f"读取翻译缓存失败: {e}")
+
+        with self._lock:
+            if row is not None:
+                if row[1] > now:
+                    result = json.loads(row[0])
+                    self._remember(key, result, min(row[1], now + self.memory_ttl))
+                    self._disk_hits += 1
+                    return dict(result)
+                self._expired += 1
+            self._misses += 1
+            return None
+
+    def set(self,
+            key: str,
+            result: Dict[str, Any],
+            text: str,
+            source_lang: str,
+            target_lang: str,
+            show_workflow: bool,
+            template_version: str):
+        """
+        写入缓存（写SQLite，在事件循环中应放到线程池执行）
+
+        Args:
+            key (str): make_key 生成的缓存键
+            result (dict): 翻译结果字典（需可JSON序列化）
+            text (str): 待翻译文本，用于按原文清理缓存
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+            show_workflow (bool): 是否展示工作流
+            template_version (str): 提示词模板版本
+        """
+        now = time.time()
+        with self._lock:
+            self._sets += 1
+            self._remember(key, dict(result), now + min(self.memory_ttl, self.ttl))
+        if self._conn is None:
+            return
+        try:
+            with self._db_lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO translation_cache "
+                    "(cache_key, text_hash, source_lang, target_lang, show_workflow, template_version, "
+                    "result, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, _sha1(normalize_text(text)), source_lang, target_lang, int(bool(show_workflow)),
+                     template_version, json.dumps(result, ensure_ascii=False), now, now + self.ttl)
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            with self._lock:
+                self._errors += 1
+            logger.warning(f"写入翻译缓存失败: {e}")
+
+    def _remember(self, key: str, result: Dict[str, Any], expires_at: float):
+        """写入内存缓存，超过容量时淘汰最久未使用的条目"""
+        if self.memory_size <= 0:
+            return
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self._evictions += 1
+
+    def purge(self,
+              text: Optional[str] = None,
+              source_lang: Optional[str] = None,
+              target_lang: Optional[str] = None,
+              expired_only: bool = False) -> int:
+        """
+        清理缓存
+
+        Args:
+            text (str, optional): 只清理该原文的缓存
+            source_lang (str, optional): 只清理该源语言的缓存
+            target_lang (str, optional): 只清理该目标语言的缓存
+            expired_only (bool): 只清理已过期的条目
+
+        Returns:
+            int: 清理的持久化条目数（仅内存缓存时为清理的内存条目数，数据库出错时为 0）
+        """
+        conditions = []
+        params: list = []
+        if text is not None:
+            conditions.append("text_hash = ?")
+            params.append(_sha1(normalize_text(text)))
+        if source_lang:
+            conditions.append("source_lang = ?")
+            params.append(source_lang)
+        if target_lang:
+            conditions.append("target_lang = ?")
+            params.append(target_lang)
+        if expired_only:
+            conditions.append("expires_at <= ?")
+            params.append(time.time())
+
+        with self._lock:
+            removed = len(self._memory)
+            # 内存条目不记录原文，按条件清理时直接整体清空，未命中的条目会从SQLite回填
+            self._memory.clear()
+        if self._conn is None:
+            return removed
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        try:
+            with self._db_lock:
+                cursor = self._conn.execute(f"DELETE FROM translation_cache{where}", params)
+                self._conn.execute("UPDATE cache_meta SET value = value + 1 WHERE name = 'generation'")
+                generation = self._read_generation()
+        except sqlite3.Error as e:
+            with self._lock:
+                self._errors += 1
+            logger.warning(f"清理翻译缓存失败: {e}")
+            return 0
+        with self._lock:
+            self._generation = generation
+            # 清理期间从SQLite回填的条目可能已被删除，再清空一次
+            self._memory.clear()
+        logger.info(f"已清理翻译缓存 {cursor.rowcount} 条")
+        return cursor.rowcount
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回缓存运行指标"""
+        disk_entries = None
+        if self._conn is not None:
+            try:
+                with self._db_lock:
+                    disk_entries = self._conn.execute("SELECT COUNT(*) FROM translation_cache").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            hits = self._memory_hits + self._disk_hits
+            lookups = hits + self._misses
+            return {
+                "db_path": self.db_path or None,
+                "memory_entries": len(self._memory),
+                "memory_size": self.memory_size,
+                "disk_entries": disk_entries,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "sets": self._sets,
+                "evictions": self._evictions,
+                "expired": self._expired,
+                "errors": self._errors,
+            }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
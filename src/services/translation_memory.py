@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+句段级翻译记忆
+以SQLite持久化保存 原文句段 -> 译文句段，长文档修订后只需翻译新增或改动的句子
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from src.services.fuzzy_index import MinHasher, best_match, substitute_numbers
+from src.services.translation_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def _segment_hash(text: str) -> str:
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class FuzzyMatch(NamedTuple):
+    """模糊匹配结果"""
+    source_text: str            # 记忆库中的相似原文
+    target_text: str            # 相似原文的译文
+    similarity: float           # 相似度（0~1）
+    translation: Optional[str]  # 仅数字不同时，替换数字后可直接使用的译文，否则为 None
+
+
+class TranslationMemory:
+    """
+    句段翻译记忆库
+    同一句段在同一语言对下只保留最新的一条译文；
+    每条句段同时写入MinHash LSH分桶表，模糊查询只需按桶编号走索引取少量候选，不随库容量线性增长
+    """
+
+    # 模糊查询最多校验的候选数
+    MAX_FUZZY_CANDIDATES = 10
+    # 模糊查询时每个LSH桶最多读取的条目数
+    MAX_BUCKET_SCAN = 64
+
+    def __init__(self, db_path: str, fuzzy_threshold: float = 0.9):
+        """
+        Args:
+            db_path (str): SQLite数据库文件路径
+            fuzzy_threshold (float): 模糊匹配的最低相似度
+        """
+        self.db_path = db_path
+        self.fuzzy_threshold = fuzzy_threshold
+        self.hasher = MinHasher()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        # 运行指标
+        self._documents = 0
+        self._segments = 0
+        self._hits = 0
+        self._misses = 0
+        self._recorded = 0
+        self._errors = 0
+        self._fuzzy_lookups = 0
+        self._fuzzy_matches = 0
+        self._fuzzy_number_substitutions = 0
+
+        try:
+            self._conn = self._open(db_path)
+            self._backfill_fuzzy_index()
+            logger.info(f"翻译记忆库已启用: {db_path}")
+        except Exception as e:
+            logger.error(f"打开翻译记忆库失败: {e}")
+            self._conn = None
+
+    @property
+    def is_available(self) -> bool:
+        return self._conn is not None
+
+    @staticmethod
+    def _open(db_path: str) -> sqlite3.Connection:
+        """打开数据库并建表"""
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS segments (
+                source_hash TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                target_text TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                use_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source_hash, source_lang, target_lang)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS segment_lsh (
+                bucket INTEGER NOT NULL,
+                segment_id INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_segment_lsh_bucket ON segment_lsh (bucket)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_segment_lsh_segment ON segment_lsh (segment_id)")
+        conn.execute("CREATE TABLE IF NOT EXISTS memory_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        return conn
+
+    def _backfill_fuzzy_index(self):
+        """为模糊索引上线前写入的句段补建LSH分桶（只执行一次）"""
+        row = self._conn.execute("SELECT value FROM memory_meta WHERE name = 'lsh_indexed'").fetchone()
+        if row is not None:
+            return
+        rows = self._conn.execute(
+            "SELECT rowid, source_text, source_lang, target_lang FROM segments"
+        ).fetchall()
+        if rows:
+            logger.info(f"为 {len(rows)} 条已有句段建立模糊索引...")
+        self._conn.execute("BEGIN")
+        try:
+            for segment_id, source_text, source_lang, target_lang in rows:
+                self._index_segment(segment_id, source_text, source_lang, target_lang)
+            self._conn.execute("INSERT OR REPLACE INTO memory_meta (name, value) VALUES ('lsh_indexed', '1')")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _index_segment(self, segment_id: int, source_text: str, source_lang: str, target_lang: str):
+        """写入一条句段的LSH分桶（调用方负责加锁与事务）"""
+        self._conn.execute("DELETE FROM segment_lsh WHERE segment_id = ?", (segment_id,))
+        self._conn.executemany(
+            "INSERT INTO segment_lsh (bucket, segment_id) VALUES (?, ?)",
+            [(bucket, segment_id) for bucket in self.hasher.buckets(source_text, f"{source_lang}:{target_lang}")]
+        )
+
+    def lookup_many(self, texts: List[str], source_lang: str, target_lang: str) -> Dict[int, str]:
+        """
+        批量查询句段译文
+
+        Args:
+            texts (List[str]): 原文句段列表
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+
+        Returns:
+            Dict[int, str]: 命中句段的 {下标: 译文}
+        """
+        found: Dict[int, str] = {}
+        if self._conn is None or not texts:
+            return found
+
+        hashes = [_segment_hash(text) for text in texts]
+        with self._lock:
+            self._documents += 1
+            self._segments += len(texts)
+            try:
+                rows = {}
+                unique_hashes = list(dict.fromkeys(hashes))
+                # SQLite单条语句的参数数量有限，分批查询
+                for start in range(0, len(unique_hashes), 500):
+                    chunk = unique_hashes[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    for source_hash, target_text in self._conn.execute(
+                        f"SELECT source_hash, target_text FROM segments "
+                        f"WHERE source_lang = ? AND target_lang = ? AND source_hash IN ({placeholders})",
+                        [source_lang, target_lang, *chunk]
+                    ):
+                        rows[source_hash] = target_text
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE segments SET last_used_at = ?, use_count = use_count + 1 "
+                        "WHERE source_hash = ? AND source_lang = ? AND target_lang = ?",
+                        [(time.time(), source_hash, source_lang, target_lang) for source_hash in rows]
+                    )
+            except sqlite3.Error as e:
+                self._errors += 1
+                logger.warning(f"查询翻译记忆失败: {e}")
+                rows = {}
+
+            for index, source_hash in enumerate(hashes):
+                if source_hash in rows:
+                    found[index] = rows[source_hash]
+            self._hits += len(found)
+            self._misses += len(texts) - len(found)
+        return found
+
+    def record_many(self, pairs: Iterable[Tuple[str, str]], source_lang: str, target_lang: str):
+        """
+        记录新的句段译文
+
+        Args:
+            pairs (Iterable[Tuple[str, str]]): (原文句段, 译文句段) 列表
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+        """
+        if self._conn is None:
+            return
+        now = time.time()
+        rows = [(_segment_hash(source), source_lang, target_lang, source, target.strip(), now, now)
+                for source, target in pairs if source.strip() and target and target.strip()]
+        if not rows:
+            return
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                for row in rows:
+                    # 使用UPSERT保持原有rowid，LSH分桶表按rowid关联
+                    self._conn.execute(
+                        "INSERT INTO segments "
+                        "(source_hash, source_lang, target_lang, source_text, target_text, created_at, last_used_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (source_hash, source_lang, target_lang) DO UPDATE SET "
+                        "source_text = excluded.source_text, target_text = excluded.target_text, "
+                        "last_used_at = excluded.last_used_at",
+                        row
+                    )
+                    segment_id = self._conn.execute(
+                        "SELECT rowid FROM segments WHERE source_hash = ? AND source_lang = ? AND target_lang = ?",
+                        row[:3]
+                    ).fetchone()[0]
+                    self._index_segment(segment_id, row[3], source_lang, target_lang)
+                self._conn.execute("COMMIT")
+                self._recorded += len(rows)
+            except sqlite3.Error as e:
+                self._conn.execute("ROLLBACK")
+                self._errors += 1
+                logger.warning(f"写入翻译记忆失败: {e}")
+
+    def fuzzy_lookup(self, text: str, source_lang: str, target_lang: str) -> Optional[FuzzyMatch]:
+        """
+        查找与句段最相似的已翻译句段
+
+        Args:
+            text (str): 原文句段
+            source_lang (str): 源语言
+            target_lang (str): 目标语言
+
+        Returns:
+            Optional[FuzzyMatch]: 相似度不低于 fuzzy_threshold 的最佳匹配，没有时返回 None
+        """
+        if self._conn is None:
+            return None
+        buckets = self.hasher.buckets(text, f"{source_lang}:{target_lang}")
+        # 每个桶最多取固定条数，模板化文本集中在少数热门桶时查询开销依然有上限
+        per_bucket = " UNION ALL ".join(
+            "SELECT * FROM (SELECT segment_id FROM segment_lsh WHERE bucket = ? LIMIT ?)" for _ in buckets
+        )
+        params: list = []
+        for bucket in buckets:
+            params.extend((bucket, self.MAX_BUCKET_SCAN))
+        with self._lock:
+            self._fuzzy_lookups += 1
+            try:
+                candidates = self._conn.execute(
+                    f"SELECT s.source_text, s.target_text FROM segments s "
+                    f"JOIN (SELECT segment_id, COUNT(*) AS shared FROM ({per_bucket}) "
+                    f"      GROUP BY segment_id ORDER BY shared DESC LIMIT ?) c ON s.rowid = c.segment_id",
+                    [*params, self.MAX_FUZZY_CANDIDATES]
+                ).fetchall()
+            except sqlite3.Error as e:
+                self._errors += 1
+                logger.warning(f"模糊查询翻译记忆失败: {e}")
+                return None
+
+        best = best_match(text, candidates, self.fuzzy_threshold)
+        if best is None:
+            return None
+
+        score, source_text, target_text = best
+        translation = substitute_numbers(text, source_text, target_text)
+        with self._lock:
+            self._fuzzy_matches += 1
+            if translation is not None:
+                self._fuzzy_number_substitutions += 1
+        return FuzzyMatch(source_text, target_text, round(score, 4), translation)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回翻译记忆运行指标"""
+        with self._lock:
+            entries = None
+            if self._conn is not None:
+                try:
+                    entries = self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+                except sqlite3.Error:
+                    pass
+            return {
+                "db_path": self.db_path,
+                "entries": entries,
+                "documents": self._documents,
+                "segments": self._segments,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / self._segments, 4) if self._segments else 0.0,
+                "recorded": self._recorded,
+                "fuzzy_lookups": self._fuzzy_lookups,
+                "fuzzy_matches": self._fuzzy_matches,
+                "fuzzy_number_substitutions": self._fuzzy_number_substitutions,
+                "errors": self._errors,
+            }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
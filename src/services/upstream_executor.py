@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+上游调用执行层
+为阻塞式的DashScope SDK调用提供独立的、有界的线程池，避免阻塞事件循环
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamQueueFullError(Exception):
+    """上游调用排队数超过上限时抛出"""
+
+
+class UpstreamExecutor:
+    """
+    有界线程池执行器
+    限制同时执行的上游调用数量（线程数）以及排队等待的调用数量，并记录运行指标
+    """
+
+    def __init__(self, max_workers: int = 16, max_queue_size: int = 64,
+                 thread_name_prefix: str = "dashscope-upstream"):
+        """
+        Args:
+            max_workers (int): 线程池大小，即同时进行的上游调用上限
+            max_queue_size (int): 允许排队等待的调用数上限，超过后直接拒绝
+            thread_name_prefix (str): 线程名前缀，便于排查
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue_size = max(0, int(max_queue_size))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+
+        # 运行指标
+        self._queued = 0
+        self._active = 0
+        self._peak_queued = 0
+        self._peak_active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait_seconds = 0.0
+        self._total_run_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行阻塞函数并等待结果
+
+        Raises:
+            UpstreamQueueFullError: 排队数已达上限
+        """
+        with self._lock:
+            if self._queued + self._active >= self.max_workers + self.max_queue_size:
+                self._rejected += 1
+                raise UpstreamQueueFullError(
+                    f"上游调用排队已满（执行中 {self._active}，排队 {self._queued}）"
+                )
+            self._queued += 1
+            self._submitted += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        call = functools.partial(self._run_in_worker, time.monotonic(), func, *args, **kwargs)
+        future = self._executor.submit(call)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # 等待方被取消时，尚未开始执行的调用直接撤销，不再占用线程
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            raise
+
+    def _run_in_worker(self, enqueued_at: float, func: Callable[..., Any], *args, **kwargs) -> Any:
+        started_at = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._peak_active = max(self._peak_active, self._active)
+            self._total_wait_seconds += started_at - enqueued_at
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._total_run_seconds += time.monotonic() - started_at
+        return result
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """返回线程池的运行指标"""
+        with self._lock:
+            completed = self._completed
+            started = completed + self._active
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+                "active": self._active,
+                "queued": self._queued,
+                "peak_active": self._peak_active,
+                "peak_queued": self._peak_queued,
+                "submitted": self._submitted,
+                "completed": completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_queue_wait_ms": round(self._total_wait_seconds * 1000 / started, 2) if started else 0.0,
+                "avg_run_ms": round(self._total_run_seconds * 1000 / completed, 2) if completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = False):
+        """关闭线程池"""
+        logger.info("关闭上游调用线程池")
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+上游调用的优先级与租户公平排队
+上游并发名额不足时，排队的调用按优先级分为交互、后台、批量三类：名额空出时先分给高优先级的调用，
+后台与批量调用各自最多占用并发上限的一定比例，为交互请求留出余量；
+同一类中按租户（X-Tenant-ID 或客户端IP）做加权公平排队，单个租户的大量调用不会挤占其他租户
+"""
+
+import asyncio
+import heapq
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+# 优先级类别，按优先级从高到低排列
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, BACKGROUND, BULK)
+
+# 未标识租户的调用归入的租户
+DEFAULT_TENANT = "default"
+
+
+def parse_tenant_weights(spec: Optional[str]) -> Dict[str, float]:
+    """
+    解析租户权重配置
+
+    Args:
+        spec (str, optional): 形如 "tenant-a:3,tenant-b:0.5" 的配置，未列出的租户权重为 1
+
+    Returns:
+        Dict[str, float]: 租户 -> 权重
+    """
+    weights = {}
+    for item in (spec or "").split(","):
+        tenant, _, weight = item.strip().rpartition(":")
+        if not tenant:
+            continue
+        try:
+            value = float(weight)
+        except ValueError:
+            continue
+        if value > 0:
+            weights[tenant.strip()] = value
+    return weights
+
+
+class FairQueue:
+    """
+    单个优先级类别的等待队列：按租户加权公平排队（start-time fair queuing）
+
+    每个排队的调用按所属租户打上虚拟完成时间：max(队列虚拟时间, 该租户上一个调用的完成时间) + 1 / 权重，
+    出队时取完成时间最小的调用。空闲的租户不积累额度，重新排队时从当前虚拟时间开始
+
+    只在事件循环线程中使用，不需要加锁
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            weights (Dict[str, float], optional): 租户 -> 权重，未列出的租户权重为 1
+        """
+        self.weights = dict(weights or {})
+        self._heap: List[Tuple[float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        # 排队中的调用 -> 租户，已取消的调用留在堆中，出队时跳过
+        self._tenant_of: Dict[asyncio.Future, str] = {}
+        self._tenant_queued: Dict[str, int] = {}
+        self._tenant_finish: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._tenant_of)
+
+    def push(self, tenant: Optional[str]) -> asyncio.Future:
+        """
+        为租户的一次调用排队
+
+        Returns:
+            asyncio.Future: 轮到该调用时被设置结果
+        """
+        tenant = tenant or DEFAULT_TENANT
+        start = max(self._virtual_time, self._tenant_finish.get(tenant, 0.0))
+        finish = start + 1.0 / self.weights.get(tenant, 1.0)
+        self._tenant_finish[tenant] = finish
+        self._tenant_queued[tenant] = self._tenant_queued.get(tenant, 0) + 1
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._tenant_of[waiter] = tenant
+        heapq.heappush(self._heap, (finish, next(self._sequence), waiter))
+        return waiter
+
+    def pop(self) -> Optional[asyncio.Future]:
+        """取出下一个轮到的调用，队列为空时返回 None"""
+        while self._heap:
+            finish, _, waiter = heapq.heappop(self._heap)
+            if waiter not in self._tenant_of:
+                continue
+            self._virtual_time = max(self._virtual_time, finish)
+            self._forget(waiter)
+            return waiter
+        return None
+
+    def discard(self, waiter: asyncio.Future):
+        """排队的调用超时或被取消时移出队列"""
+        if waiter in self._tenant_of:
+            self._forget(waiter)
+        waiter.cancel()
+
+    def _forget(self, waiter: asyncio.Future):
+        tenant = self._tenant_of.pop(waiter)
+        self._tenant_queued[tenant] -= 1
+        if not self._tenant_queued[tenant]:
+            del self._tenant_queued[tenant]
+            del self._tenant_finish[tenant]
+        if not self._tenant_of:
+            # 队列排空时丢弃已取消调用留下的堆条目
+            self._heap.clear()
+
+    def tenants(self) -> int:
+        """有调用在排队的租户数"""
+        return len(self._tenant_queued)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+翻译工作流文档
+将模型返回的7步工作流输出一次性解析为结构化对象（步骤章节、术语表行、最终译文），
+格式化输出、最终译文等视图都从该对象按需计算并缓存
+"""
+
+import re
+from functools import cached_property
+from typing import List, NamedTuple, Optional
+
+from src.services.output_formatter import format_output_lines, is_section_2_2_line, split_output_lines
+
+# 标题行："## 2.2. 术语检索与校验" -> 级别 2，编号 "2.2"，标题 "术语检索与校验"
+_HEADING_RE = re.compile(r'\s*(#+)\s*(.*?)\s*$')
+_STEP_NUMBER_RE = re.compile(r'(\d+(?:\.\d+)*)[\.、]?\s*(.*)$')
+# 正文中的最终译文标签，如 "最终译文：..."、"Final Translation: ..."
+_FINAL_LABEL_RE = re.compile(r'(?:7[\.、]\s*最终译文[:：]?|最终译文[:：]|最终翻译[:：]|Final Translation[:：])',
+                             re.IGNORECASE)
+_FINAL_TITLE_RE = re.compile(r'最终译文|最终翻译|Final Translation', re.IGNORECASE)
+
+# 术语表各列的表头关键词
+_TERM_HEADERS = ("术语", "原文", "term", "source term")
+_TRANSLATION_HEADERS = ("译文", "翻译", "translation", "target")
+_SOURCE_HEADERS = ("来源", "出处", "source", "reference")
+
+# 最终译文的最短长度，过短时视为提取错误
+MIN_FINAL_TRANSLATION_LENGTH = 5
+
+
+class WorkflowSection(NamedTuple):
+    """工作流中的一个标题及其正文"""
+    number: str         # 步骤编号，如 "7"、"2.2"；无编号时为空字符串
+    title: str          # 去掉编号后的标题
+    level: int          # Markdown标题级别
+    lines: List[str]    # 正文行（到下一个标题为止）
+
+    @property
+    def body(self) -> str:
+        return "\n".join(self.lines).strip()
+
+
+class TermEntry(NamedTuple):
+    """2.2节术语表中的一行"""
+    term: str
+    translation: str
+    source: str         # 来源单元格原文，如 "[1] 词典测试集"
+
+
+def _find_column(headers: List[str], keywords, default: int, taken=()) -> int:
+    """按表头关键词查找列，找不到时使用默认位置；已被其他字段占用的列不再选择"""
+    for index, header in enumerate(headers):
+        header = header.lower()
+        if index not in taken and any(keyword in header for keyword in keywords):
+            return index
+    return default if default < len(headers) and default not in taken else -1
+
+
+class WorkflowDocument:
+    """
+    一次翻译的模型输出
+
+    构造时只扫描一遍文本，切分出各步骤章节并收集2.2节术语表；
+    formatted、final_translation、terms 等视图在首次访问时计算并缓存。
+    直接翻译模式（不含工作流）的输出不解析，各视图都直接返回原文。
+    """
+
+    def __init__(self, text: str, is_direct: bool = False):
+        """
+        Args:
+            text (str): 模型返回的完整输出
+            is_direct (bool): 是否为直接翻译模式的输出
+        """
+        self.text = text or ""
+        self.is_direct = is_direct
+        self.sections: List[WorkflowSection] = []
+        # 正文中的最终译文标签：(章节下标, 行下标, 标签之后的文本)
+        self._final_labels: List[tuple] = []
+        self._table_rows: List[List[str]] = []
+
+        if is_direct or not self.text:
+            self._lines, self._markers = [], []
+            return
+        self._lines, self._markers = split_output_lines(self.text)
+        self._parse()
+
+    def _parse(self):
+        """按行扫描：标题开启新章节，其他行归入当前章节；2.2节中的表格行收集为术语表"""
+        preamble = WorkflowSection("", "", 0, [])
+        current = preamble
+        in_term_section = False
+        for line in self._lines:
+            stripped = line.strip()
+            if stripped[:1] == '#':
+                match = _HEADING_RE.match(line)
+                level = len(match.group(1))
+                number_match = _STEP_NUMBER_RE.match(match.group(2))
+                if number_match:
+                    number, title = number_match.group(1), number_match.group(2)
+                else:
+                    number, title = "", match.group(2)
+                current = WorkflowSection(number, title, level, [])
+                self.sections.append(current)
+                in_term_section = is_section_2_2_line(line)
+                continue
+
+            current.lines.append(line)
+            if in_term_section and stripped[:1] == '|' and stripped[-1:] == '|':
+                self._table_rows.append([cell.strip() for cell in stripped.split('|')[1:-1]])
+            else:
+                label = _FINAL_LABEL_RE.search(line)
+                if label:
+                    self._final_labels.append((len(self.sections) - 1, len(current.lines) - 1,
+                                               line[label.end():]))
+        if preamble.lines:
+            self.sections.insert(0, preamble)
+            self._final_labels = [(section + 1, line, rest) for section, line, rest in self._final_labels]
+
+    def get_section(self, number: str) -> Optional[WorkflowSection]:
+        """按步骤编号查找章节（"2.2" 也匹配 "2.2." 之类的写法）"""
+        number = number.rstrip(".")
+        for section in self.sections:
+            if section.number == number:
+                return section
+        return None
+
+    @cached_property
+    def formatted(self) -> str:
+        """格式化后的阅读格式输出"""
+        if self.is_direct:
+            return self.text
+        return format_output_lines(self._lines, self._markers) if self._lines else ""
+
+    @cached_property
+    def final_translation(self) -> Optional[str]:
+        """
+        最终译文：优先取标题为"最终译文"的（最后一个）章节正文（其次是第7步章节），再次取正文中"最终译文："等标签之后的内容，
+        都没有时取最后一个较长的段落；均未找到时为 None
+        """
+        if self.is_direct:
+            return self.text or None
+
+        # 分块翻译的输出中各块都有最终译文章节，末尾是拼接后的完整最终译文，因此按标题匹配时取最后一个
+        candidates = [section for section in reversed(self.sections)
+                      if section.level and _FINAL_TITLE_RE.search(section.title)]
+        candidates += [section for section in self.sections if section.level and section.number == "7"]
+        for section in candidates:
+            body = section.body
+            if len(body) >= MIN_FINAL_TRANSLATION_LENGTH:
+                return body
+
+        for section_index, line_index, rest in self._final_labels:
+            lines = self.sections[section_index].lines
+            body = "\n".join([rest] + lines[line_index + 1:]).strip()
+            if len(body) >= MIN_FINAL_TRANSLATION_LENGTH:
+                return body
+
+        paragraphs = [paragraph.strip() for paragraph in self.text.split('\n\n') if paragraph.strip()]
+        if paragraphs and len(paragraphs[-1]) > 10:
+            return paragraphs[-1]
+        return None
+
+    @cached_property
+    def terms(self) -> List[TermEntry]:
+        """2.2节术语表（跳过分隔行，按表头识别术语、译文、来源列）"""
+        if not self._table_rows:
+            return []
+        headers = self._table_rows[0]
+        term_col = _find_column(headers, _TERM_HEADERS, 0)
+        translation_col = _find_column(headers, _TRANSLATION_HEADERS, 1, (term_col,))
+        source_col = _find_column(headers, _SOURCE_HEADERS, 2, (term_col, translation_col))
+
+        def cell(row: List[str], col: int) -> str:
+            return row[col] if 0 <= col < len(row) else ""
+
+        entries = []
+        for row in self._table_rows[1:]:
+            if not "".join(row).strip("-: "):
+                continue
+            if row == headers:
+                continue
+            term, translation = cell(row, term_col), cell(row, translation_col)
+            if term or translation:
+                entries.append(TermEntry(term, translation, cell(row, source_col)))
+        return entries
@@ -109,6 +109,186 @@ does not apply."""
         logger.error(f"测试过程中发生错误: {e}", exc_info=True)
         return False, f"测试过程中发生错误: {str(e)}"
 
+def test_stream_api(server_url):
+    """测试流式翻译API（Server-Sent Events）"""
+    logger.info("\n=== 测试流式翻译API ===")
+    
+    test_data = {
+        "message": "Rules should be defined for situations where the presumption of the customs status of Union goods does not apply."
+    }
+    
+    try:
+        start_time = time.time()
+        first_delta_time = None
+        final_result = None
+        current_event = None
+        
+        with requests.post(
+            f"{server_url}/api/query/stream",
+            headers={"Content-Type": "application/json"},
+            json=test_data,
+            stream=True,
+            timeout=30
+        ) as response:
+            logger.info(f"响应状态码: {response.status_code}")
+            if response.status_code != 200:
+                return False, f"流式翻译API响应异常: {response.status_code}"
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    current_event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    if current_event == "delta" and first_delta_time is None:
+                        first_delta_time = time.time() - start_time
+                        logger.info(f"首个增量输出耗时: {first_delta_time:.2f}秒")
+                    elif current_event == "done":
+                        final_result = json.loads(line[len("data:"):])
+                    elif current_event == "error":
+                        return False, f"流式翻译失败: {line[len('data:'):].strip()}"
+        
+        if not final_result or final_result.get('code') != 0:
+            return False, "流式翻译未返回最终结果"
+        
+        logger.info(f"流式翻译完成，总耗时: {time.time() - start_time:.2f}秒")
+        logger.info(f"译文 (部分): {final_result.get('data', {}).get('content', '')[:200]}...")
+        return True, "流式翻译API测试成功"
+        
+    except requests.exceptions.ConnectionError:
+        logger.error(f"无法连接到服务器 {server_url}，请确保服务器正在运行")
+        return False, f"无法连接到服务器 {server_url}"
+    except Exception as e:
+        logger.error(f"测试过程中发生错误: {e}", exc_info=True)
+        return False, f"测试过程中发生错误: {str(e)}"
+
+def test_batch_api(server_url):
+    """测试批量翻译API（NDJSON流）"""
+    logger.info("\n=== 测试批量翻译API ===")
+    
+    test_data = {
+        "texts": ["原产地证书", "海关申报", "关税配额", "Customs Clearance"],
+        "max_concurrency": 4
+    }
+    
+    try:
+        results = {}
+        summary = None
+        with requests.post(
+            f"{server_url}/api/query/batch",
+            headers={"Content-Type": "application/json"},
+            json=test_data,
+            stream=True,
+            timeout=60
+        ) as response:
+            logger.info(f"响应状态码: {response.status_code}")
+            if response.status_code != 200:
+                return False, f"批量翻译API响应异常: {response.status_code}"
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                item = json.loads(line)
+                if item.get("type") == "summary":
+                    summary = item
+                else:
+                    results[item["index"]] = item
+                    logger.info(f"第 {item['index'] + 1} 条完成 ({item['elapsed_ms']}ms): {item.get('content') or item.get('error')}")
+        
+        if not summary or len(results) != len(test_data["texts"]):
+            return False, "批量翻译结果不完整"
+        
+        logger.info(f"批量翻译汇总: {summary}")
+        if summary["failed"]:
+            return False, f"批量翻译中有 {summary['failed']} 条失败"
+        return True, "批量翻译API测试成功"
+        
+    except requests.exceptions.ConnectionError:
+        logger.error(f"无法连接到服务器 {server_url}，请确保服务器正在运行")
+        return False, f"无法连接到服务器 {server_url}"
+    except Exception as e:
+        logger.error(f"测试过程中发生错误: {e}", exc_info=True)
+        return False, f"测试过程中发生错误: {str(e)}"
+
+def test_session_api(server_url):
+    """测试会话隔离：一个会话的翻译结果不会出现在另一个会话的来源查询中"""
+    logger.info("\n=== 测试会话隔离 ===")
+    
+    owner = {"X-Session-ID": f"test-owner-{int(time.time() * 1000)}"}
+    other = {"X-Session-ID": f"test-other-{int(time.time() * 1000)}"}
+    
+    try:
+        response = requests.post(
+            f"{server_url}/api/query",
+            headers={"Content-Type": "application/json", **owner},
+            json={"message": "The customs territory of the Union.", "sourceLang": "en", "targetLang": "zh"},
+            timeout=30
+        )
+        if response.status_code != 200 or response.json().get("code") != 0:
+            return False, f"翻译请求失败: {response.status_code}"
+        if response.json()["data"].get("model_used") == "Enhanced-Dictionary":
+            return True, "DashScope不可用，跳过会话隔离测试"
+        
+        other_response = requests.post(f"{server_url}/api/show_last_answer_sources", headers=other, timeout=30)
+        logger.info(f"其他会话查询来源: {other_response.status_code}")
+        if other_response.status_code != 404:
+            return False, "其他会话读取到了本会话的翻译结果"
+        
+        owner_response = requests.post(f"{server_url}/api/show_last_answer_sources", headers=owner, timeout=30)
+        logger.info(f"本会话查询来源: {owner_response.status_code}")
+        if owner_response.status_code != 200 or owner_response.json().get("code") != 0:
+            return False, f"本会话未能读取自己的翻译结果: {owner_response.status_code}"
+        return True, "会话隔离测试成功"
+        
+    except requests.exceptions.ConnectionError:
+        logger.error(f"无法连接到服务器 {server_url}，请确保服务器正在运行")
+        return False, f"无法连接到服务器 {server_url}"
+    except Exception as e:
+        logger.error(f"测试过程中发生错误: {e}", exc_info=True)
+        return False, f"测试过程中发生错误: {str(e)}"
+
+def test_job_api(server_url):
+    """测试异步翻译任务：提交、轮询进度、取回结果"""
+    logger.info("\n=== 测试异步翻译任务API ===")
+    
+    text = " ".join(f"The customs authorities shall verify declaration {i}." for i in range(20))
+    try:
+        response = requests.post(
+            f"{server_url}/api/jobs",
+            json={"message": text, "sourceLang": "en", "targetLang": "zh"},
+            timeout=30
+        )
+        if response.status_code == 503:
+            return True, "DashScope不可用，跳过异步任务测试"
+        if response.status_code != 202 or response.json().get("code") != 0:
+            return False, f"提交任务失败: {response.status_code}"
+        job_id = response.json()["data"]["job_id"]
+        logger.info(f"任务ID: {job_id}")
+        
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            job = requests.get(f"{server_url}/api/jobs/{job_id}", timeout=30).json()["data"]
+            logger.info(f"任务状态: {job['status']}，进度 {job['progress']['done']}/{job['progress']['total']}")
+            if job["status"] in ("succeeded", "failed", "cancelled"):
+                break
+            time.sleep(0.5)
+        if job["status"] != "succeeded":
+            return False, f"任务未成功完成: {job['status']} {job.get('error')}"
+        
+        result = requests.get(f"{server_url}/api/jobs/{job_id}/result", timeout=30)
+        if result.status_code != 200 or not result.json()["data"].get("content"):
+            return False, f"取回结果失败: {result.status_code}"
+        
+        missing = requests.get(f"{server_url}/api/jobs/not-a-job", timeout=30)
+        if missing.status_code != 404:
+            return False, f"不存在的任务应返回404，实际为 {missing.status_code}"
+        return True, "异步任务测试成功"
+        
+    except requests.exceptions.ConnectionError:
+        logger.error(f"无法连接到服务器 {server_url}，请确保服务器正在运行")
+        return False, f"无法连接到服务器 {server_url}"
+    except Exception as e:
+        logger.error(f"测试过程中发生错误: {e}", exc_info=True)
+        return False, f"测试过程中发生错误: {str(e)}"
+
 def test_chat_api(server_url):
     """测试对话API"""
     logger.info("\n=== 测试对话API ===")
@@ -188,7 +368,7 @@ def main():
                         help=f'服务器URL (默认: {DEFAULT_SERVER_URL})')
     parser.add_argument('--wait', type=int, default=2,
                         help='等待服务器启动的秒数 (默认: 2)')
-    parser.add_argument('--test', type=str, choices=['all', 'health', 'translation', 'chat'],
+    parser.add_argument('--test', type=str, choices=['all', 'health', 'translation', 'stream', 'batch', 'session', 'job', 'chat'],
                         default='all', help='指定要运行的测试 (默认: all)')
     
     args = parser.parse_args()
@@ -215,6 +395,26 @@ def main():
         translation_ok, translation_msg = test_translation_api(args.url)
         test_results['translation'] = (translation_ok, translation_msg)
     
+    # 测试流式翻译功能
+    if args.test in ['all', 'stream'] and (args.test != 'all' or test_results.get('health', (True, ''))[0]):
+        stream_ok, stream_msg = test_stream_api(args.url)
+        test_results['stream'] = (stream_ok, stream_msg)
+    
+    # 测试批量翻译功能
+    if args.test in ['all', 'batch'] and (args.test != 'all' or test_results.get('health', (True, ''))[0]):
+        batch_ok, batch_msg = test_batch_api(args.url)
+        test_results['batch'] = (batch_ok, batch_msg)
+    
+    # 测试会话隔离
+    if args.test in ['all', 'session'] and (args.test != 'all' or test_results.get('health', (True, ''))[0]):
+        session_ok, session_msg = test_session_api(args.url)
+        test_results['session'] = (session_ok, session_msg)
+    
+    # 测试异步翻译任务
+    if args.test in ['all', 'job'] and (args.test != 'all' or test_results.get('health', (True, ''))[0]):
+        job_ok, job_msg = test_job_api(args.url)
+        test_results['job'] = (job_ok, job_msg)
+    
     # 测试对话功能
     if args.test in ['all', 'chat'] and (args.test != 'all' or test_results.get('health', (True, ''))[0]):
         chat_ok, chat_msg = test_chat_api(args.url)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+长文本分块的测试
+
+用法:
+    python test_chunker.py
+    python -m pytest test_chunker.py
+"""
+
+import logging
+import sys
+
+from src.services.chunker import estimate_tokens, split_chunks
+from src.services.segmenter import join_segments
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ZH_ARTICLE = "第五条 海关当局应当对进入联盟关境的货物实施监管，税则号列8471.30.00项下的货物适用第2(3)款规定；经济运营商应当提交报关单。\n"
+EN_ARTICLE = ("Article 5(2) of Regulation (EU) No. 952/2013 provides that goods classified under heading 8471.30.00, "
+              "including portable machines, shall be declared. ")
+
+
+def _rejoin(chunks):
+    return "".join(chunk.text + chunk.separator for chunk in chunks)
+
+
+def test_budget_and_roundtrip():
+    """每块不超过预算，各块首尾相接即为原文"""
+    for text, source_lang in ((ZH_ARTICLE * 40, "zh"), (EN_ARTICLE * 60, "en")):
+        chunks = split_chunks(text, source_lang, 200)
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk.text) <= 200 for chunk in chunks)
+        assert _rejoin(chunks) == text
+        # 整句装块，不在句中切开
+        assert all(chunk.text.endswith(("。", ".")) for chunk in chunks)
+
+
+def test_codes_not_broken():
+    """超长句子按分句标点/空白切开时，不拆开税则号列和条款编号"""
+    sentence = "，".join(f"税则号列8471.30.{i:02d}项下的货物适用第{i}(3)款" for i in range(60)) + "。"
+    chunks = split_chunks(sentence, "zh", 50)
+    assert len(chunks) > 1 and _rejoin(chunks) == sentence
+    for chunk in chunks:
+        assert chunk.text.startswith("税则号列")
+
+    sentence = " ".join(f"heading 8471.30.{i:02d} under Article {i}(2)" for i in range(80)) + "."
+    chunks = split_chunks(sentence, "en", 40)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert not chunk.text[0].isdigit() and not chunk.text.endswith(("heading", "Article"))
+
+
+def test_join_translations():
+    chunks = split_chunks(ZH_ARTICLE * 10, "zh", 100)
+    assert join_segments([chunk.text for chunk in chunks], chunks, "zh") == (ZH_ARTICLE * 10).strip()
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_budget_and_roundtrip, test_codes_not_broken, test_join_translations]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+上游调用自适应并发限制的测试
+
+用法:
+    python test_concurrency_limiter.py
+    python -m pytest test_concurrency_limiter.py
+"""
+
+import asyncio
+import logging
+import sys
+
+from src.services.concurrency_limiter import AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded
+from src.services.request_context import upstream_scope
+from src.services.upstream_scheduler import BULK, INTERACTIVE
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def _call(limiter, delay=0.0, status=200, error=None):
+    async with limiter.slot() as permit:
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        permit.record_status(status)
+        return status
+
+
+def test_queue_then_reject():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=2, max_queue=1, max_wait=1.0)
+        release = asyncio.Event()
+
+        async def held():
+            async with limiter.slot():
+                await release.wait()
+
+        running = [asyncio.create_task(held()) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 2
+
+        # 第三个调用排队，第四个排不上直接拒绝
+        queued = asyncio.create_task(_call(limiter))
+        await asyncio.sleep(0)
+        try:
+            await _call(limiter)
+            raise AssertionError("排队已满时应直接拒绝")
+        except ConcurrencyLimitExceeded as e:
+            assert e.retry_after >= 1
+
+        release.set()
+        assert await queued == 200
+        await asyncio.gather(*running)
+        metrics = limiter.get_metrics()
+        assert metrics["in_flight"] == 0 and metrics["queued"] == 0
+        assert metrics["admitted"] == 3 and metrics["waited"] == 1 and metrics["rejected"] == 1
+
+    asyncio.run(run())
+
+
+def test_wait_timeout_and_cancel():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1, max_queue=4, max_wait=0.05)
+        release = asyncio.Event()
+
+        async def held():
+            async with limiter.slot():
+                await release.wait()
+
+        running = asyncio.create_task(held())
+        await asyncio.sleep(0)
+        try:
+            await _call(limiter)
+            raise AssertionError("等待超时应被拒绝")
+        except ConcurrencyLimitExceeded:
+            pass
+
+        # 排队中被取消的调用不占用名额
+        cancelled = asyncio.create_task(_call(limiter))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert limiter.get_metrics()["queued"] == 0
+
+        release.set()
+        await running
+        assert await _call(limiter) == 200
+        assert limiter.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_throttling_shrinks_once_per_window_and_recovers():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=2, max_limit=12, backoff_ratio=0.5)
+
+        # 同一批并发调用一起被限流，只收缩一次
+        await asyncio.gather(*(_call(limiter, 0.01, status=429) for _ in range(8)))
+        assert limiter.limit == 5
+
+        # 之后开始的调用再次被限流时继续收缩，不低于下限
+        await asyncio.gather(*(_call(limiter, 0.01, status=429) for _ in range(5)))
+        await asyncio.gather(*(_call(limiter, 0.01, error=asyncio.TimeoutError()) for _ in range(2)),
+                             return_exceptions=True)
+        assert limiter.limit == 2
+
+        # 与负载无关的错误不影响上限
+        await asyncio.gather(_call(limiter, error=ValueError("bad request")), return_exceptions=True)
+        assert limiter.limit == 2
+
+        # 上限被用满且调用正常时逐步放大
+        for _ in range(40):
+            await asyncio.gather(*(_call(limiter, 0.001) for _ in range(limiter.limit)))
+        assert limiter.limit > 5
+        assert limiter.get_metrics()["throttled"] == 15
+
+    asyncio.run(run())
+
+
+def test_latency_rise_shrinks_limit():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=4, latency_tolerance=2.0)
+        for _ in range(5):
+            await asyncio.gather(*(_call(limiter, 0.01) for _ in range(4)))
+        assert limiter.limit == 4
+        for _ in range(3):
+            await asyncio.gather(*(_call(limiter, 0.1) for _ in range(limiter.limit)))
+        assert limiter.limit < 4
+        assert limiter.get_metrics()["decreases"] >= 1
+
+    asyncio.run(run())
+
+
+async def _record_order(limiter, order, label, priority=None, tenant=None):
+    async with limiter.slot(priority, tenant):
+        order.append(label)
+        await asyncio.sleep(0)
+
+
+def test_interactive_before_bulk_and_bulk_share():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=4, max_limit=4, max_queue=10,
+                                             class_shares={BULK: 0.5})
+        release = asyncio.Event()
+
+        async def held(priority):
+            async with limiter.slot(priority):
+                await release.wait()
+
+        # 批量调用最多占用一半名额，剩下的名额留给交互调用
+        bulk = [asyncio.create_task(held(BULK)) for _ in range(3)]
+        await asyncio.sleep(0)
+        metrics = limiter.get_metrics()["classes"]
+        assert metrics[BULK]["in_flight"] == 2 and metrics[BULK]["queued"] == 1
+        interactive = [asyncio.create_task(held(INTERACTIVE)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 4 and limiter.get_metrics()["classes"][INTERACTIVE]["queued"] == 0
+
+        # 名额空出时先分给排队的交互调用；优先级默认取请求上下文
+        order = []
+        waiting = [asyncio.create_task(_record_order(limiter, order, "bulk", BULK))]
+        with upstream_scope(priority=BULK):
+            waiting.append(asyncio.create_task(_record_order(limiter, order, "bulk-context")))
+        waiting.append(asyncio.create_task(_record_order(limiter, order, "interactive")))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*bulk, *interactive, *waiting)
+        assert order[0] == "interactive" and sorted(order[1:]) == ["bulk", "bulk-context"]
+        metrics = limiter.get_metrics()["classes"]
+        assert metrics[BULK]["admitted"] == 5 and metrics[INTERACTIVE]["admitted"] == 3
+        assert metrics[BULK]["queue_wait_ms"]["p99"] > 0
+
+    asyncio.run(run())
+
+
+def test_tenants_share_queue_fairly():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_limit=1, max_queue=20,
+                                             tenant_weights={"heavy": 2})
+        release = asyncio.Event()
+
+        async def held():
+            async with limiter.slot():
+                await release.wait()
+
+        running = asyncio.create_task(held())
+        await asyncio.sleep(0)
+        # 先到的租户排了很多调用，后到的租户不必等它们全部完成
+        order = []
+        tasks = [asyncio.create_task(_record_order(limiter, order, "a", tenant="a")) for _ in range(4)]
+        await asyncio.sleep(0)
+        tasks += [asyncio.create_task(_record_order(limiter, order, "b", tenant="b")) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert limiter.get_metrics()["classes"][INTERACTIVE]["queued_tenants"] == 2
+        release.set()
+        await asyncio.gather(running, *tasks)
+        assert order == ["a", "b", "a", "b", "a", "a"]
+
+        # 权重为 2 的租户每轮得到两次机会
+        order = []
+        running = asyncio.create_task(held())
+        release.clear()
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(_record_order(limiter, order, "heavy", tenant="heavy")) for _ in range(4)]
+        tasks += [asyncio.create_task(_record_order(limiter, order, "light", tenant="light")) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(running, *tasks)
+        assert order == ["heavy", "heavy", "light", "heavy", "heavy", "light"]
+
+    asyncio.run(run())
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_queue_then_reject, test_wait_timeout_and_cancel,
+             test_throttling_shrinks_once_per_window_and_recovers, test_latency_rise_shrinks_limit,
+             test_interactive_before_bulk_and_bulk_share, test_tenants_share_queue_fairly]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+DashScope 异步HTTP客户端的测试（使用进程内的 aiohttp 测试服务）
+
+用法:
+    python test_dashscope_client.py
+    python -m pytest test_dashscope_client.py
+"""
+
+import asyncio
+import json
+import logging
+import sys
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.services.dashscope_client import AsyncDashScopeClient
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _app(received):
+    """模拟应用 completion 接口：记录请求，按 X-DashScope-SSE 返回JSON或SSE"""
+    async def completion(request):
+        payload = await request.json()
+        received.append((request.match_info["app_id"], request.headers.get("Authorization"), payload))
+        prompt = payload["input"]["prompt"]
+        if prompt == "fail":
+            return web.json_response({"code": "Throttling", "message": "请求过多", "request_id": "r-1"}, status=429)
+        if request.headers.get("X-DashScope-SSE") != "enable":
+            return web.json_response({"request_id": "r-2", "output": {"text": f"译文:{prompt}", "session_id": "s-1",
+                                                                      "finish_reason": "stop"},
+                                      "usage": {"models": []}})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for index, piece in enumerate(["译", "文"]):
+            event = {"request_id": "r-3", "output": {"text": piece, "finish_reason": "stop" if index else "null"}}
+            await response.write(f"id:{index}\nevent:result\n:HTTP_STATUS/200\n"
+                                 f"data:{json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/api/v1/apps/{app_id}/completion", completion)
+    return app
+
+
+async def _with_client(check):
+    received = []
+    server = TestServer(_app(received))
+    await server.start_server()
+    client = AsyncDashScopeClient("sk-test", base_url=str(server.make_url("/api/v1/")))
+    try:
+        await check(client, received)
+    finally:
+        await client.close()
+        await server.close()
+
+
+def test_call_application_and_payload():
+    async def check(client, received):
+        response = await client.call_application("app-1", "海关", session_id="s-0", memory_id=None,
+                                                 rag_options={"pipeline_ids": ["kb"]}, seed=None)
+        assert response.status_code == 200 and response.request_id == "r-2"
+        assert response.output.text == "译文:海关" and response.output.session_id == "s-1"
+
+        app_id, authorization, payload = received[0]
+        assert app_id == "app-1" and authorization == "Bearer sk-test"
+        # 值为 None 的参数不发送，未指定记忆体时不带 memory_id
+        assert payload["input"] == {"prompt": "海关", "session_id": "s-0"}
+        assert payload["parameters"] == {"rag_options": {"pipeline_ids": ["kb"]}}
+
+        # 错误状态码以响应返回（与 Application.call 一致），并计入错误数
+        response = await client.call_application("app-1", "fail")
+        assert response.status_code == 429 and response.code == "Throttling" and response.output is None
+        assert client.get_metrics()["errors"] == 1
+
+    asyncio.run(_with_client(check))
+
+
+def test_stream_application_parses_sse():
+    async def check(client, received):
+        responses = [response async for response in client.stream_application("app-1", "海关")]
+        assert [response.output.text for response in responses] == ["译", "文"]
+        assert responses[-1].status_code == 200 and responses[-1].output.finish_reason == "stop"
+        assert received[0][2]["parameters"] == {"incremental_output": True}
+
+        # 出错时服务端返回普通JSON，只产出一个错误响应
+        responses = [response async for response in client.stream_application("app-1", "fail")]
+        assert len(responses) == 1 and responses[0].status_code == 429
+        assert client.get_metrics()["in_flight"] == 0
+
+    asyncio.run(_with_client(check))
+
+
+def test_connections_are_reused():
+    async def check(client, received):
+        for _ in range(3):
+            await client.call_application("app-1", "海关")
+        metrics = client.get_metrics()
+        # 顺序请求复用同一条长连接
+        assert metrics["requests"] == 3 and metrics["connections_created"] == 1
+        assert metrics["connections_reused"] == 2
+
+    asyncio.run(_with_client(check))
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_call_application_and_payload, test_stream_application_parses_sse, test_connections_are_reused]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
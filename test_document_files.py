@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+文档文件逐段读取与译文回写的测试
+
+用法:
+    python test_document_files.py
+    python -m pytest test_document_files.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+
+from src.services.document_files import is_translatable, iter_document_texts, write_translated_document
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TRANSLATIONS = {
+    "Customs value of goods.": "货物的海关估价。",
+    "Goods shall be released.": "货物应予放行。",
+    "Article 5": "第五条",
+}
+
+
+def test_is_translatable():
+    assert is_translatable("Article 5") and is_translatable("  海关  ")
+    assert not any(is_translatable(value) for value in ("", "   ", "12.5", "8471.30.00", "=SUM(A1:A3)", 42, None))
+
+
+def test_txt_roundtrip():
+    with tempfile.TemporaryDirectory() as directory:
+        path, output_path = os.path.join(directory, "a.txt"), os.path.join(directory, "b.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Customs value of goods.\n\n  Goods shall be released.\n12345\nCustoms value of goods.\nOther line\n")
+        assert list(iter_document_texts(path)) == [
+            "Customs value of goods.", "Goods shall be released.", "Customs value of goods.", "Other line"
+        ]
+        assert write_translated_document(path, output_path, TRANSLATIONS) == 3
+        with open(output_path, encoding="utf-8") as f:
+            assert f.read() == "货物的海关估价。\n\n  货物应予放行。\n12345\n货物的海关估价。\nOther line\n"
+
+
+def test_xlsx_roundtrip():
+    from openpyxl import Workbook, load_workbook
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, output_path = os.path.join(directory, "a.xlsx"), os.path.join(directory, "b.xlsx")
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "条例"
+        sheet.append(["Article 5", "第五条", 42])
+        sheet.append(["Customs value of goods.", "=1+1", None])
+        workbook.create_sheet("Second").append(["Article 5"])
+        workbook.save(path)
+
+        assert list(iter_document_texts(path)) == ["Article 5", "第五条", "Customs value of goods.", "Article 5"]
+        assert write_translated_document(path, output_path, TRANSLATIONS) == 3
+        translated = load_workbook(output_path)
+        assert translated.sheetnames == ["条例", "Second"]
+        assert [list(row) for row in translated["条例"].iter_rows(values_only=True)] == [
+            ["第五条", "第五条", 42], ["货物的海关估价。", "=1+1", None]
+        ]
+        assert translated["Second"]["A1"].value == "第五条"
+
+
+def test_docx_roundtrip():
+    import docx
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, output_path = os.path.join(directory, "a.docx"), os.path.join(directory, "b.docx")
+        document = docx.Document()
+        paragraph = document.add_paragraph()
+        paragraph.add_run("Goods shall ").bold = True
+        paragraph.add_run("be released.")
+        document.add_paragraph("12.5")
+        table = document.add_table(rows=1, cols=2)
+        table.cell(0, 0).text = "Article 5"
+        table.cell(0, 1).text = "Customs value of goods."
+        document.save(path)
+
+        assert list(iter_document_texts(path)) == ["Goods shall be released.", "Article 5", "Customs value of goods."]
+        assert write_translated_document(path, output_path, TRANSLATIONS) == 3
+        translated = docx.Document(output_path)
+        assert [p.text for p in translated.paragraphs] == ["货物应予放行。", "12.5"]
+        # 译文沿用段落第一个文本块的格式
+        assert translated.paragraphs[0].runs[0].bold
+        assert [cell.text for cell in translated.tables[0].rows[0].cells] == ["第五条", "货物的海关估价。"]
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_is_translatable, test_txt_roundtrip, test_xlsx_roundtrip, test_docx_roundtrip]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+翻译输出格式化与工作流文档解析的测试
+test_data/format_output 下每个 *.md 为模型原始输出，同名 *.expected.txt 为期望的格式化结果
+
+用法:
+    python test_format_output.py
+    python -m pytest test_format_output.py
+"""
+
+import glob
+import logging
+import os
+import sys
+
+from src.services.output_formatter import format_translation_output
+from src.services.source_extractor import Citation, extract_source_entries, parse_citations, render_source_entries
+from src.services.workflow_document import WorkflowDocument
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_data", "format_output")
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def load_corpus():
+    """读取黄金样例，返回 [(名称, 原始输出, 期望结果)]"""
+    cases = []
+    for source_path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.md"))):
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        expected_path = os.path.join(CORPUS_DIR, name + ".expected.txt")
+        cases.append((name, _read(source_path), _read(expected_path)))
+    return cases
+
+
+def test_golden_corpus():
+    """格式化结果与黄金样例逐字一致"""
+    cases = load_corpus()
+    assert cases, f"未找到黄金样例: {CORPUS_DIR}"
+    failed = [name for name, source, expected in cases if format_translation_output(source) != expected]
+    assert not failed, f"格式化结果与黄金样例不一致: {', '.join(failed)}"
+
+
+def test_empty_input():
+    assert format_translation_output("") == ""
+    assert format_translation_output(None) == ""
+
+
+def test_workflow_document():
+    """工作流文档的格式化视图与 format_translation_output 一致，并能取出术语表与最终译文"""
+    for name, source, expected in load_corpus():
+        assert WorkflowDocument(source).formatted == expected, name
+
+    document = WorkflowDocument(_read(os.path.join(CORPUS_DIR, "01_stub_workflow.md")))
+    assert [section.number for section in document.sections if section.level == 2] == [str(i) for i in range(1, 8)]
+    assert document.final_translation == "【模拟译文】海关当局应当对进入联盟关境的货物实施监管。"
+    assert [(term.term, term.translation) for term in document.terms] == [
+        ("customs territory", "关境"), ("economic operators", "经济运营商")
+    ]
+
+    direct = WorkflowDocument("【模拟译文】关境", is_direct=True)
+    assert direct.formatted == direct.final_translation == "【模拟译文】关境"
+
+
+def test_source_extraction():
+    """本地提取来源：术语表来源列与正文中的 [n] 引用"""
+    assert parse_citations("[1] 词典测试集") == [Citation("1", "词典测试集")]
+    assert parse_citations("根据词典测试集[2]对应") == [Citation("2", "词典测试集")]
+    assert parse_citations("欧盟海关法典") == [Citation("", "欧盟海关法典")]
+
+    document = WorkflowDocument(_read(os.path.join(CORPUS_DIR, "01_stub_workflow.md")))
+    entries = extract_source_entries(document)
+    assert [(entry.term, entry.translation, entry.citations) for entry in entries] == [
+        ("customs territory", "关境", [Citation("1", "词典测试集")]),
+        ("economic operators", "经济运营商", [Citation("2", "欧盟海关法典")]),
+    ]
+    rendered = render_source_entries(entries)
+    assert rendered.startswith("以下是上一回答中使用的知识库来源明细：")
+    assert '    1 (词典测试集: customs territory对应"关境")' in rendered
+
+    document = WorkflowDocument(
+        "## 2.1. 术语拆解与提取\n"
+        "\"非欧盟货物\"根据词典测试集[2]对应\"non-Union goods\"。\n"
+        "- customs territory：关境 [2]\n"
+        "## 7. 最终译文\nnon-Union goods\n"
+    )
+    assert [(entry.term, entry.translation, entry.citations) for entry in extract_source_entries(document)] == [
+        ("非欧盟货物", "non-Union goods", [Citation("2", "词典测试集")]),
+        ("customs territory", "关境", [Citation("2", "词典测试集")]),
+    ]
+    assert render_source_entries(extract_source_entries(WorkflowDocument("## 7. 最终译文\n关境\n"))) is None
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_golden_corpus, test_empty_input, test_workflow_document, test_source_extraction]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
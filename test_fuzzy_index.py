@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+模糊匹配（MinHash/LSH、相似度、数字替换）与翻译记忆模糊查询的测试
+
+用法:
+    python test_fuzzy_index.py
+    python -m pytest test_fuzzy_index.py
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+
+from src.services.fuzzy_index import MinHasher, best_match, similarity, substitute_numbers
+from src.services.translation_memory import TranslationMemory
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+GOODS = ["冻牛肉", "鲜苹果", "棉纱线", "不锈钢管", "锂离子电池", "医用口罩", "塑料玩具", "咖啡豆", "大豆油", "机床零件"]
+PORTS = ["天津港", "上海港", "宁波港", "青岛港", "深圳港", "厦门港", "大连港", "广州港"]
+
+
+def _sentences(count, seed=7):
+    """生成互不相同、长度接近法规条文的句段"""
+    rng = random.Random(seed)
+    sentences = set()
+    while len(sentences) < count:
+        sentences.add(f"进口{rng.choice(GOODS)}的收货人应当在货物运抵{rng.choice(PORTS)}之日起"
+                      f"{rng.randint(2, 30)}日内向海关申报，并提交第{rng.randint(1, 99)}号检验证书")
+    return sorted(sentences)
+
+
+def _edit(text, rng):
+    """改动一个字符，得到近似重复的句段"""
+    index = rng.randrange(len(text))
+    return text[:index] + "某" + text[index + 1:]
+
+
+def test_lsh_recall_for_near_duplicates():
+    hasher = MinHasher()
+    rng = random.Random(11)
+    sentences = _sentences(200)
+    found = 0
+    for sentence in sentences:
+        near = _edit(sentence, rng)
+        assert similarity(sentence, near) > 0.95
+        if set(hasher.buckets(sentence, "zh:en")) & set(hasher.buckets(near, "zh:en")):
+            found += 1
+    # 仅改动一个字的句段几乎总能成为候选
+    assert found / len(sentences) >= 0.95, found
+
+    # 签名稳定；不同语言对（命名空间）的桶互不相交
+    assert hasher.buckets(sentences[0], "zh:en") == MinHasher().buckets(sentences[0], "zh:en")
+    assert not set(hasher.buckets(sentences[0], "zh:en")) & set(hasher.buckets(sentences[0], "zh:ja"))
+    unrelated = "本规定自发布之日起施行，由海关总署负责解释"
+    assert not set(hasher.buckets(sentences[0], "zh:en")) & set(hasher.buckets(unrelated, "zh:en"))
+
+
+def test_best_match_respects_threshold():
+    candidates = [("进口冻牛肉应当申报", "Imported frozen beef shall be declared"),
+                  ("进口冻羊肉应当申报", "Imported frozen mutton shall be declared"),
+                  ("出口货物应当查验", "Export goods shall be inspected")]
+    score, source_text, target_text = best_match("进口冻牛肉应当申报。", candidates, 0.9)
+    assert source_text == "进口冻牛肉应当申报" and score > 0.9
+    # 没有达到阈值的候选时返回 None
+    assert best_match("进口冻猪肉应当查验", candidates, 0.9) is None
+    assert best_match("进口冻猪肉应当查验", candidates, 0.6)[1] in ("进口冻牛肉应当申报", "进口冻羊肉应当申报")
+
+
+def test_substitute_numbers():
+    assert substitute_numbers("第12条 税率为5%", "第3条 税率为8%", "Article 3: the rate is 8%") == \
+        "Article 12: the rate is 5%"
+    assert substitute_numbers("期限为3日", "期限为3日", "within 3 days") == "within 3 days"
+    # 不是仅数字不同，或译文中的数字写法不同时不替换
+    assert substitute_numbers("期限为3个月", "期限为2日", "within 2 days") is None
+    assert substitute_numbers("2024年5月1日起施行", "2023年5月1日起施行", "effective from 1 May, twenty-three") is None
+
+
+def test_translation_memory_fuzzy_lookup():
+    with tempfile.TemporaryDirectory() as directory:
+        memory = TranslationMemory(os.path.join(directory, "memory.db"), fuzzy_threshold=0.9)
+        sentences = _sentences(300)
+        memory.record_many([(sentence, f"EN:{index}") for index, sentence in enumerate(sentences)], "zh", "en")
+
+        rng = random.Random(3)
+        hits = 0
+        for index, sentence in enumerate(sentences[:50]):
+            match = memory.fuzzy_lookup(_edit(sentence, rng), "zh", "en")
+            if match is not None and match.target_text == f"EN:{index}":
+                assert match.similarity >= 0.9
+                hits += 1
+        assert hits >= 47, hits
+
+        # 低于阈值或语言对不同时没有结果
+        assert memory.fuzzy_lookup("本规定自发布之日起施行", "zh", "en") is None
+        assert memory.fuzzy_lookup(sentences[0], "zh", "ja") is None
+        memory.close()
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_lsh_recall_for_near_duplicates, test_best_match_respects_threshold, test_substitute_numbers,
+             test_translation_memory_fuzzy_lookup]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+术语表多模式匹配的测试
+
+用法:
+    python test_glossary_matcher.py
+    python -m pytest test_glossary_matcher.py
+"""
+
+import logging
+import sys
+
+from src.services.glossary_matcher import GlossaryMatcher
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def test_leftmost_longest_without_overlap():
+    matcher = GlossaryMatcher({"customs": "海关", "customs declaration": "报关单", "declaration form": "申报表",
+                               "form": "表格"})
+    # 同一起点取最长的术语，已被覆盖的位置不再匹配
+    text = "customs declaration form"
+    assert [text[start:end] for start, end, _ in matcher.find_all(text)] == ["customs declaration", "form"]
+    assert matcher.replace(text) == ("报关单 表格", 2)
+
+    # 最左优先：较早开始的短术语胜过与之重叠、较晚开始的长术语
+    matcher = GlossaryMatcher({"ab": "1", "bcd": "2"})
+    assert matcher.find_all("abcd") == [(0, 2, "1")]
+
+
+def test_whole_word_and_case_insensitive():
+    matcher = GlossaryMatcher({"hi": "嗨", "tariff": "关税", "HS code": "HS编码"},
+                              case_insensitive=True, whole_word=True)
+    assert matcher.find_all("shipping") == []
+    assert matcher.replace("Tariff for HS CODE, hi!") == ("关税 for HS编码, 嗨!", 3)
+    assert matcher.replace("tariffs") == ("tariffs", 0)
+    assert matcher.lookup("  TARIFF ") == "关税"
+
+    # 不要求整词时按子串匹配，且区分大小写
+    matcher = GlossaryMatcher({"hi": "嗨"})
+    assert matcher.replace("shipping Hi") == ("s嗨pping Hi", 1)
+
+
+def test_chinese_matching():
+    matcher = GlossaryMatcher({"海关": "customs", "海关总署": "General Administration of Customs",
+                               "报关单": "customs declaration"}, whole_word=True)
+    # 中文没有词边界，整词限制只作用于拉丁字母和数字
+    assert matcher.replace("海关总署发布报关单填制规范") == \
+        ("General Administration of Customs发布customs declaration填制规范", 2)
+    # 替换结果不会被再次匹配
+    matcher = GlossaryMatcher({"关税": "tariff", "tariff": "关税"})
+    assert matcher.replace("关税") == ("tariff", 1)
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_leftmost_longest_without_overlap, test_whole_word_and_case_insensitive, test_chinese_matching]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
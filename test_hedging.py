@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+对冲请求的测试
+
+用法:
+    python test_hedging.py
+    python -m pytest test_hedging.py
+"""
+
+import asyncio
+import logging
+import sys
+import time
+
+from src.services.hedging import Hedger
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _upstream(delays, results=None):
+    """第 n 次调用等待 delays[n] 秒后返回 results[n]（默认为调用序号），记录被取消的调用"""
+    state = {"calls": 0, "cancelled": []}
+
+    async def call():
+        index = state["calls"]
+        state["calls"] += 1
+        try:
+            await asyncio.sleep(delays[min(index, len(delays) - 1)])
+        except asyncio.CancelledError:
+            state["cancelled"].append(index)
+            raise
+        result = results[min(index, len(results) - 1)] if results else index
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return call, state
+
+
+def _hedger(**kwargs):
+    kwargs.setdefault("initial_delay", 0.05)
+    kwargs.setdefault("min_delay", 0.0)
+    kwargs.setdefault("control_ratio", 0.0)
+    kwargs.setdefault("budget_ratio", 1.0)
+    return Hedger("translate", **kwargs)
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    async def run():
+        hedger = _hedger()
+        call, state = _upstream([1.0, 0.01])
+        started_at = time.monotonic()
+        assert await hedger.run(call) == 1
+        assert time.monotonic() - started_at < 0.5
+        assert state["calls"] == 2 and state["cancelled"] == [0]
+
+        # 阈值内返回的调用不对冲
+        call, state = _upstream([0.001])
+        assert await hedger.run(call) == 0
+        assert state["calls"] == 1
+
+        # 上游并发已满等情况下不对冲
+        call, state = _upstream([0.1, 0.001])
+        assert await hedger.run(call, allow_hedge=lambda: False) == 0
+        assert state["calls"] == 1
+
+        metrics = hedger.get_metrics()
+        assert metrics["requests"] == 3 and metrics["hedged"] == 1 and metrics["hedge_wins"] == 1
+
+    asyncio.run(run())
+
+
+def test_budget_caps_extra_calls():
+    async def run():
+        hedger = _hedger(initial_delay=0.005, budget_ratio=0.1, max_burst=1, min_samples=1000)
+        total_calls = 0
+        for _ in range(20):
+            call, state = _upstream([0.03, 0.001])
+            await hedger.run(call)
+            total_calls += state["calls"]
+        metrics = hedger.get_metrics()
+        # 初始额度 1 次，之后每 10 个请求积累 1 次
+        assert metrics["hedged"] <= 3 and total_calls == 20 + metrics["hedged"]
+        assert metrics["budget_exhausted"] >= 17
+
+    asyncio.run(run())
+
+
+def test_unaccepted_and_failed_results():
+    async def run():
+        hedger = _hedger()
+        # 对冲调用先返回但不可用时，继续等待第一次调用
+        call, _ = _upstream([0.1, 0.001], results=[200, 503])
+        assert await hedger.run(call, accept=lambda status: status == 200) == 200
+
+        # 一个调用失败时取另一个的结果；都失败时抛出先发生的异常
+        call, _ = _upstream([0.1, 0.001], results=[200, ConnectionError("reset")])
+        assert await hedger.run(call) == 200
+        call, _ = _upstream([0.1, 0.001], results=[TimeoutError("slow"), ConnectionError("reset")])
+        try:
+            await hedger.run(call)
+            raise AssertionError("都失败时应抛出异常")
+        except ConnectionError:
+            pass
+
+    asyncio.run(run())
+
+
+def test_delay_tracks_percentile_and_control_group():
+    async def run():
+        hedger = _hedger(initial_delay=1.0, percentile=0.9, min_samples=20)
+        for index in range(20):
+            call, _ = _upstream([0.001 if index < 18 else 0.05])
+            await hedger.run(call)
+        assert 0.001 <= hedger.hedge_delay() < 0.05
+
+        control = _hedger(control_ratio=1.0)
+        call, state = _upstream([0.1, 0.001])
+        assert await control.run(call) == 0 and state["calls"] == 1
+        metrics = control.get_metrics()
+        assert metrics["control_requests"] == 1 and metrics["control_latency_ms"]["p99"] >= 100
+        assert metrics["p99_saved_ms"] is None
+
+    asyncio.run(run())
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_slow_call_is_hedged_and_loser_cancelled, test_budget_caps_extra_calls,
+             test_unaccepted_and_failed_results, test_delay_tracks_percentile_and_control_group]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+用户意图识别的测试
+
+用法:
+    python test_intent_classifier.py
+    python -m pytest test_intent_classifier.py
+"""
+
+import logging
+import random
+import re
+import sys
+
+from src.services.intent_classifier import (
+    intent_classifier, INTENT_RULES, ANCHORED_INTENTS,
+    DIRECT_TRANSLATION, SHOW_SOURCES, SHOW_FINAL_TRANSLATION, TRANSLATION_PREFIX
+)
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def legacy_intents(message: str) -> set:
+    """重写前的做法：逐条规则对小写后的消息做一次 re.search"""
+    intents = set()
+    for intent, patterns in INTENT_RULES.items():
+        prefix = "^" if intent in ANCHORED_INTENTS else ""
+        for pattern in patterns:
+            if re.search(prefix + pattern, message.lower(), re.IGNORECASE):
+                intents.add(intent)
+                break
+    return intents
+
+
+def test_classify():
+    """一次匹配得到所有意图及其位置"""
+    intents = intent_classifier.classify("翻译：直接翻译 customs territory")
+    assert set(intents) == {DIRECT_TRANSLATION, TRANSLATION_PREFIX}
+    assert intents[DIRECT_TRANSLATION].text == "直接翻译"
+    assert (intents[DIRECT_TRANSLATION].start, intents[DIRECT_TRANSLATION].end) == (3, 7)
+    assert intents[TRANSLATION_PREFIX].text == "翻译："
+
+    assert set(intent_classifier.classify("请显示上一回答的来源")) == {SHOW_SOURCES}
+    assert set(intent_classifier.classify("Show the LAST translation SOURCE")) == {SHOW_SOURCES}
+    assert set(intent_classifier.classify("只要最终译文")) == {SHOW_FINAL_TRANSLATION}
+    # 前缀只在开头匹配；"." 不跨行
+    assert intent_classifier.classify("请翻译：关境") == {}
+    assert intent_classifier.classify("no\nworkflow") == {}
+    assert intent_classifier.classify("") == {}
+
+
+def test_strip():
+    assert intent_classifier.strip("直接翻译：海关当局应当对货物实施监管", DIRECT_TRANSLATION) == "海关当局应当对货物实施监管"
+    match = intent_classifier.classify("Translate: customs territory")[TRANSLATION_PREFIX]
+    assert intent_classifier.strip_prefix("Translate: customs territory", match) == "customs territory"
+
+
+def test_matches_legacy():
+    """随机组合的消息上与逐条 re.search 的结果一致"""
+    words = ["直接", "翻译", "显示", "上一", "回答", "来源", "只要", "最终译文", "工作流", "不要", "show", "Last",
+             "translation", "source", "just", "only", "no", "workflow", "translate", ":", "：", "\n", " ", "x"]
+    rng = random.Random(0)
+    for _ in range(5000):
+        message = "".join(rng.choice(words) for _ in range(rng.randint(0, 12)))
+        assert set(intent_classifier.classify(message)) == legacy_intents(message), message
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_classify, test_strip, test_matches_legacy]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+异步任务队列的测试
+
+用法:
+    python test_job_queue.py
+    python -m pytest test_job_queue.py
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from src.services.job_queue import JobQueue
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _make_queue(directory, **kwargs):
+    kwargs.setdefault("poll_interval", 0.05)
+    return JobQueue(os.path.join(directory, "jobs.db"), **kwargs)
+
+
+async def _wait_for(queue, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"任务 {job_id} 未进入状态 {statuses}: {await queue.get(job_id)}")
+
+
+def _chunk_handler(calls, delay=0.0):
+    """每块结果为块内容的大写，记录实际处理过的块"""
+    async def handler(job):
+        chunks = job.params["chunks"]
+        await job.set_total(len(chunks))
+        outputs = await job.checkpoints()
+        for index, chunk in enumerate(chunks):
+            if index in outputs:
+                continue
+            await asyncio.sleep(delay)
+            calls.append(index)
+            outputs[index] = chunk.upper()
+            await job.save_checkpoint(index, outputs[index])
+        return {"text": "".join(outputs[index] for index in range(len(chunks)))}
+    return handler
+
+
+def test_submit_and_result():
+    async def run(directory):
+        calls = []
+        queue = _make_queue(directory)
+        queue.register("upper", _chunk_handler(calls))
+        await queue.start()
+        job = await queue.submit("upper", {"chunks": ["a", "b", "c"]})
+        assert job["status"] == "queued"
+        assert await queue.get_result(job["job_id"]) is None
+        done = await _wait_for(queue, job["job_id"], ("succeeded",))
+        assert done["progress"] == {"done": 3, "total": 3, "percent": 100.0}
+        assert await queue.get_result(job["job_id"]) == {"text": "ABC"}
+        assert calls == [0, 1, 2]
+        await queue.stop()
+        queue.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+
+
+def test_resume_from_checkpoints_after_restart():
+    """停止时执行到一半的任务重新排队，重启后只处理未完成的块"""
+    async def run(directory):
+        calls = []
+        queue = _make_queue(directory)
+        queue.register("upper", _chunk_handler(calls, delay=0.05))
+        await queue.start()
+        job_id = (await queue.submit("upper", {"chunks": list("abcdefghij")}))["job_id"]
+        while len(calls) < 3:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        queue.close()
+        interrupted = len(calls)
+        reopened = _make_queue(directory)
+        assert (await reopened.get(job_id))["status"] == "queued"
+        reopened.close()
+
+        restarted = _make_queue(directory)
+        restarted.register("upper", _chunk_handler(calls))
+        await restarted.start()
+        await _wait_for(restarted, job_id, ("succeeded",))
+        assert await restarted.get_result(job_id) == {"text": "ABCDEFGHIJ"}
+        assert sorted(calls) == list(range(10)) and len(calls) == 10
+        assert calls[interrupted:] == list(range(interrupted, 10))
+        await restarted.stop()
+        restarted.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+
+
+def test_cancel_and_failure():
+    async def run(directory):
+        calls = []
+
+        async def failing(job):
+            raise RuntimeError("上游不可用")
+
+        queue = _make_queue(directory, max_attempts=1)
+        queue.register("upper", _chunk_handler(calls, delay=0.05))
+        queue.register("failing", failing)
+        await queue.start()
+
+        job_id = (await queue.submit("upper", {"chunks": list("abcdefghij")}))["job_id"]
+        while not calls:
+            await asyncio.sleep(0.01)
+        assert (await queue.cancel(job_id))["status"] == "cancelled"
+        processed = len(calls)
+        await asyncio.sleep(0.2)
+        assert len(calls) == processed
+        assert (await queue.get(job_id))["status"] == "cancelled"
+
+        failed = await _wait_for(queue, (await queue.submit("failing", {}))["job_id"], ("failed",))
+        assert failed["error"] == "上游不可用"
+        assert (await queue.cancel(failed["job_id"]))["status"] == "failed"
+        assert await queue.cancel("missing") is None
+        await queue.stop()
+        queue.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+
+
+def test_retention():
+    """超过保留数量的已结束任务按结束时间从旧到新清理"""
+    async def run(directory):
+        queue = _make_queue(directory, max_retained=2)
+        queue.register("upper", _chunk_handler([]))
+        await queue.start()
+        job_ids = []
+        for text in "abc":
+            job_ids.append((await queue.submit("upper", {"chunks": [text]}))["job_id"])
+            await _wait_for(queue, job_ids[-1], ("succeeded",))
+        queue._maintain()
+        assert await queue.get(job_ids[0]) is None
+        assert [await queue.get_result(job_id) for job_id in job_ids[1:]] == [{"text": "B"}, {"text": "C"}]
+        await queue.stop()
+        queue.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+
+
+def test_on_success_runs_after_result_is_saved():
+    """成功结果保存后才调用 on_success；任务已被其他进程接管时结果不保存，也不调用"""
+    async def run(directory):
+        queue = _make_queue(directory)
+        finished = []
+
+        def on_success(params):
+            # 在线程池中调用，直接读取数据库
+            finished.append((params["name"], queue._read_job(job_ids[params["name"]])["status"]))
+
+        async def handler(job):
+            if job.params["name"] == "taken_over":
+                with queue._lock:
+                    queue._conn.execute("UPDATE jobs SET worker_id = 'other' WHERE job_id = ?", (job.job_id,))
+            return {"name": job.params["name"]}
+
+        queue.register("named", handler, on_success=on_success)
+        await queue.start()
+        job_ids = {}
+        for name in ("ok", "taken_over"):
+            job_ids[name] = (await queue.submit("named", {"name": name}))["job_id"]
+        await _wait_for(queue, job_ids["ok"], ("succeeded",))
+        await asyncio.sleep(0.1)
+        assert finished == [("ok", "succeeded")]
+        assert (await queue.get(job_ids["taken_over"]))["status"] == "running"
+        await queue.stop()
+        queue.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+
+
+def test_worker_survives_database_errors():
+    """记录结果时数据库出错不会让工作协程退出，后续任务照常执行"""
+    async def run(directory):
+        queue = _make_queue(directory, workers=1)
+        queue.register("upper", _chunk_handler([]))
+        succeed = queue._succeed
+        errors = []
+
+        def locked_once(job_id, result):
+            if not errors:
+                errors.append(job_id)
+                raise sqlite3.OperationalError("database is locked")
+            return succeed(job_id, result)
+
+        queue._succeed = locked_once
+        await queue.start()
+        first = (await queue.submit("upper", {"chunks": ["a"]}))["job_id"]
+        second = (await queue.submit("upper", {"chunks": ["b"]}))["job_id"]
+        await _wait_for(queue, second, ("succeeded",))
+        assert errors == [first] and (await queue.get(first))["status"] == "running"
+        await queue.stop()
+        queue.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+
+
+def test_sqlite_io_does_not_block_event_loop():
+    """数据库被占用（如其他进程长时间写入）时，排队查询在线程池中等待，事件循环照常运行"""
+    async def run(directory):
+        queue = _make_queue(directory, workers=0)
+        queue.register("upper", _chunk_handler([]))
+        job_id = (await queue.submit("upper", {"chunks": ["a"]}))["job_id"]
+        ticks = []
+
+        async def ticker():
+            for _ in range(10):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        holder = threading.Thread(target=lambda: (queue._lock.acquire(), time.sleep(0.3), queue._lock.release()))
+        holder.start()
+        await asyncio.sleep(0.01)
+        started_at = time.monotonic()
+        job, _ = await asyncio.gather(queue.get(job_id), ticker())
+        holder.join()
+        assert job["status"] == "queued" and time.monotonic() - started_at >= 0.2
+        assert len(ticks) == 10 and ticks[-1] - ticks[0] < 0.2
+        queue.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(directory))
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_submit_and_result, test_resume_from_checkpoints_after_restart,
+             test_cancel_and_failure, test_retention, test_on_success_runs_after_result_is_saved,
+             test_worker_survives_database_errors, test_sqlite_io_does_not_block_event_loop]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+语言检测的测试
+
+用法:
+    python test_language_detector.py
+    python -m pytest test_language_detector.py
+"""
+
+import logging
+import random
+import sys
+
+from src.services import language_detector
+from src.services.language_detector import SUPPORTED_LANGUAGES, count_scripts, detect_language, detect_language_direction
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SAMPLES = {
+    "zh": "海关当局应当对进入联盟关境的货物实施监管。",
+    "en": "Customs authorities shall supervise goods entering the customs territory.",
+    "ja": "税関当局は連合の関税領域に入る貨物を監督しなければならない。",
+    "ko": "세관 당국은 연합 관세 영역에 반입되는 물품을 감독해야 한다.",
+    "fr": "Les autorités douanières contrôlent les marchandises à l'entrée du territoire douanier.",
+    "de": "Die Zollbehörden überwachen die Waren, die in das Zollgebiet der Union verbracht werden.",
+    "es": "Las autoridades aduaneras supervisarán las mercancías que se introduzcan en el territorio aduanero.",
+    "ru": "Таможенные органы осуществляют надзор за товарами, ввозимыми на таможенную территорию.",
+}
+
+
+def legacy_direction(message: str):
+    """重写前 query/chat 端点中的中英文判断"""
+    chinese_count = sum(1 for char in message if '一' <= char <= '鿿')
+    english_count = sum(1 for char in message if 'a' <= char.lower() <= 'z')
+    return ('zh', 'en') if chinese_count > english_count else ('en', 'zh')
+
+
+def test_supported_languages():
+    """每种支持的语言都能识别，且给出所有语言的置信度"""
+    for language, text in SAMPLES.items():
+        detection = detect_language(text)
+        assert detection.language == language, (language, detection)
+        assert set(detection.scores) == set(SUPPORTED_LANGUAGES)
+        assert abs(sum(detection.scores.values()) - 1.0) < 1e-3
+    assert detect_language("8471.30").confidence == 0.0
+    assert detect_language_direction("8471.30") == ("en", "zh")
+    assert detect_language_direction(SAMPLES["zh"]) == ("zh", "en")
+    assert detect_language_direction(SAMPLES["ja"]) == ("ja", "zh")
+    # 英文中偶尔出现的变音字母不改判语言
+    assert detect_language("The café stays open during customs clearance").language == "en"
+
+
+def test_matches_legacy_for_zh_en():
+    """只含中英文时与原来的判断一致"""
+    rng = random.Random(0)
+    alphabet = "海关货物监管abcXYZ 0123，。,.-"
+    for _ in range(3000):
+        message = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        assert detect_language_direction(message) == legacy_direction(message), message
+
+
+def test_histogram_matches_scan():
+    """长文本的直方图统计与逐字符扫描结果一致"""
+    text = "".join(SAMPLES.values()) * 3 + "ßÄ"
+    threshold = language_detector.LONG_TEXT_THRESHOLD
+    try:
+        language_detector.LONG_TEXT_THRESHOLD = len(text) + 1
+        scanned = count_scripts(text)
+        language_detector.LONG_TEXT_THRESHOLD = 0
+        assert count_scripts(text) == scanned
+    finally:
+        language_detector.LONG_TEXT_THRESHOLD = threshold
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_supported_languages, test_matches_legacy_for_zh_en, test_histogram_matches_scan]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+提示词模板注册表的测试
+
+用法:
+    python test_prompt_registry.py
+    python -m pytest test_prompt_registry.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+
+from src.services.prompt_registry import PromptTemplateRegistry, parse_sections
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TEMPLATE = """# 角色
+海关法规翻译专家
+
+# 翻译原则：
+1. 术语统一
+
+# 润色原则：
+1. 句式简洁
+
+# 输出格式
+"""
+
+
+def _write(path, content, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.utime(path, (mtime, mtime))
+
+
+def test_parse_sections():
+    sections = parse_sections(TEMPLATE)
+    assert sections["translation_principles"] == "# 翻译原则：\n1. 术语统一"
+    assert sections["polish_principles"] == "# 润色原则：\n1. 句式简洁"
+    # 模板中没有的部分，以及后面没有下一个标题的部分为空字符串
+    assert sections["knowledge_section"] == ""
+    assert parse_sections("# 翻译原则：\n1. 术语统一")["translation_principles"] == ""
+
+
+def test_reload_after_mtime_change():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prompt")
+        _write(path, TEMPLATE, 1_700_000_000)
+        registry = PromptTemplateRegistry([path], check_interval=0)
+        first = registry.get()
+        assert first.path == path and first.digest != "none"
+        # 文件未变化时返回同一个快照
+        assert registry.get() is first
+
+        _write(path, TEMPLATE.replace("术语统一", "术语与海关总署公告一致"), 1_700_000_100)
+        second = registry.get()
+        assert second is not first and second.digest != first.digest
+        assert "海关总署公告" in second.sections["translation_principles"]
+        # 旧快照不受影响
+        assert "海关总署公告" not in first.sections["translation_principles"]
+        assert registry.get_metrics() == {"path": path, "version": second.digest, "reloads": 1}
+
+
+def test_check_interval_limits_stat_calls():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prompt")
+        _write(path, TEMPLATE, 1_700_000_000)
+        registry = PromptTemplateRegistry([path], check_interval=3600)
+        registry.get()
+        _write(path, "# 翻译原则：\n新原则\n#", 1_700_000_100)
+        # 检查间隔内不查看文件，继续使用当前快照
+        assert "术语统一" in registry.get().sections["translation_principles"]
+        registry._checked_at = 0
+        assert registry.get().sections["translation_principles"] == "# 翻译原则：\n新原则"
+
+
+def test_missing_file_and_candidate_order():
+    with tempfile.TemporaryDirectory() as directory:
+        preferred = os.path.join(directory, "preferred")
+        fallback = os.path.join(directory, "fallback")
+        registry = PromptTemplateRegistry([preferred, fallback], check_interval=0)
+        assert registry.get().path is None and registry.get().digest == "none"
+
+        _write(fallback, TEMPLATE, 1_700_000_000)
+        assert registry.get().path == fallback
+        # 优先级更高的候选文件出现后切换过去
+        _write(preferred, TEMPLATE, 1_700_000_000)
+        assert registry.get().path == preferred
+        os.remove(preferred)
+        assert registry.get().path == fallback
+        assert registry.get_metrics()["reloads"] == 3
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_parse_sections, test_reload_after_mtime_change, test_check_interval_limits_stat_calls,
+             test_missing_file_and_candidate_order]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
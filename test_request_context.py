@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+请求截止时间与客户端断开处理的测试
+
+用法:
+    python test_request_context.py
+    python -m pytest test_request_context.py
+"""
+
+import asyncio
+import json
+import logging
+import sys
+import time
+
+from src.services.request_context import (
+    RequestDeadlinePolicy, RequestDeadlineMiddleware, current_priority, current_tenant, deadline_scope,
+    has_time_for, remaining
+)
+from src.services.resilience import ResilientCaller
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _scope(path, timeout=None, tenant=None):
+    headers = [(b"content-type", b"application/json")]
+    if timeout is not None:
+        headers.append((b"x-request-timeout", str(timeout).encode("latin-1")))
+    if tenant is not None:
+        headers.append((b"x-tenant-id", tenant.encode("latin-1")))
+    return {"type": "http", "method": "POST", "path": path, "headers": headers, "client": ("10.0.0.8", 5000)}
+
+
+def _slow_app(delay, state):
+    """读完请求体后等待 delay 秒再返回 200，记录截止时间和是否被取消"""
+    async def app(scope, receive, send):
+        await receive()
+        state["remaining"] = remaining()
+        state["priority"] = current_priority()
+        state["tenant"] = current_tenant()
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+async def _serve(middleware, scope, disconnect_after=None):
+    """调用中间件，返回发出的消息；disconnect_after 秒后模拟客户端断开"""
+    messages = []
+    requests = [{"type": "http.request", "body": b"{}", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    return messages
+
+
+def test_deadline_scope_nesting():
+    assert remaining() is None and has_time_for(1000)
+    with deadline_scope(1.0):
+        assert 0.9 < remaining() <= 1.0
+        # 内层不能延长外层的截止时间
+        with deadline_scope(10.0):
+            assert remaining() <= 1.0
+        with deadline_scope(0.1):
+            assert remaining() <= 0.1
+            assert not has_time_for(0.5)
+        assert has_time_for(0.5)
+    assert remaining() is None
+
+
+def test_deadline_returns_504_and_cancels_app():
+    async def run():
+        policy = RequestDeadlinePolicy({"/api/query": 0.05, "/api/query/batch": None},
+                                       priorities={"/api/query/batch": "background"})
+        state = {}
+        middleware = RequestDeadlineMiddleware(_slow_app(1.0, state), policy)
+
+        started_at = time.monotonic()
+        messages = await _serve(middleware, _scope("/api/query"))
+        assert time.monotonic() - started_at < 0.5
+        assert messages[0]["status"] == 504
+        assert json.loads(messages[1]["body"])["code"] == -1
+        assert state["cancelled"] and 0 < state["remaining"] <= 0.05
+
+        # 未设超时的接口与未匹配的路径正常完成
+        state = {}
+        middleware = RequestDeadlineMiddleware(_slow_app(0.1, state), policy)
+        messages = await _serve(middleware, _scope("/api/query/batch"))
+        assert messages[0]["status"] == 200 and state["remaining"] is None and state["priority"] == "background"
+        messages = await _serve(middleware, _scope("/api/metrics"))
+        assert messages[0]["status"] == 200
+        assert current_tenant() is None
+
+        metrics = policy.get_metrics()
+        assert metrics["requests"] == 2 and metrics["deadline_exceeded"] == 1 and metrics["in_flight"] == 0
+
+    asyncio.run(run())
+
+
+def test_timeout_header_is_clamped():
+    policy = RequestDeadlinePolicy({"/api/query": 120, "/api/chat": 0}, max_timeout=300)
+    assert policy.timeout_for(_scope("/api/query")) == (True, 120)
+    assert policy.timeout_for(_scope("/api/query", 5)) == (True, 5)
+    assert policy.timeout_for(_scope("/api/query", 3600)) == (True, 300)
+    assert policy.timeout_for(_scope("/api/query", "abc")) == (True, 120)
+    assert policy.timeout_for(_scope("/api/chat")) == (True, None)
+    assert policy.timeout_for(_scope("/api/chatroom")) == (False, None)
+
+
+def test_priority_and_tenant_tagging():
+    async def run():
+        policy = RequestDeadlinePolicy({"/api/query": 10}, priorities={"/api/query/batch": "bulk"})
+        state = {}
+        middleware = RequestDeadlineMiddleware(_slow_app(0, state), policy)
+        await _serve(middleware, _scope("/api/query", tenant="customs-a"))
+        assert state["priority"] == "interactive" and state["tenant"] == "customs-a"
+        await _serve(middleware, _scope("/api/query/batch"))
+        assert state["priority"] == "bulk" and state["tenant"] == "ip:10.0.0.8"
+
+    asyncio.run(run())
+
+
+def test_client_disconnect_cancels_request():
+    async def run():
+        policy = RequestDeadlinePolicy({"/api/chat": 10})
+        state = {}
+        middleware = RequestDeadlineMiddleware(_slow_app(1.0, state), policy)
+        started_at = time.monotonic()
+        messages = await _serve(middleware, _scope("/api/chat"), disconnect_after=0.05)
+        assert time.monotonic() - started_at < 0.5
+        assert messages == [] and state["cancelled"]
+        metrics = policy.get_metrics()
+        assert metrics["client_disconnected"] == 1 and metrics["deadline_exceeded"] == 0
+
+    asyncio.run(run())
+
+
+def test_no_retry_past_deadline():
+    async def run():
+        caller = ResilientCaller(max_attempts=3)
+        caller.backoff = lambda attempt: 0.2
+        calls = []
+
+        async def failing():
+            calls.append(time.monotonic())
+            raise ConnectionError("reset")
+
+        with deadline_scope(0.1):
+            try:
+                await caller.call("translate", failing)
+                raise AssertionError("应抛出最后一次的异常")
+            except ConnectionError:
+                pass
+        assert len(calls) == 1
+        assert caller.get_metrics()["deadline_skipped"] == 1
+
+    asyncio.run(run())
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_deadline_scope_nesting, test_deadline_returns_504_and_cancels_app,
+             test_timeout_header_is_clamped, test_priority_and_tenant_tagging, test_client_disconnect_cancels_request,
+             test_no_retry_past_deadline]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
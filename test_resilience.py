@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+上游调用重试与熔断的测试
+
+用法:
+    python test_resilience.py
+    python -m pytest test_resilience.py
+"""
+
+import asyncio
+import logging
+import sys
+import time
+from types import SimpleNamespace
+
+from src.services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, ResilientCaller
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _upstream(outcomes):
+    """按顺序返回给定状态码的响应或抛出给定异常，记录调用次数"""
+    calls = []
+
+    async def call():
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(status_code=outcome)
+
+    return call, calls
+
+
+def _caller(**kwargs):
+    kwargs.setdefault("base_delay", 0.001)
+    kwargs.setdefault("max_delay", 0.01)
+    return ResilientCaller(**kwargs)
+
+
+def test_retries_transient_failures():
+    caller = _caller(max_attempts=3, failure_threshold=100)
+    call, calls = _upstream([503, asyncio.TimeoutError(), 200])
+    assert asyncio.run(caller.call("translate", call)).status_code == 200
+    assert len(calls) == 3
+
+    # 不可重试的状态码直接返回，不计入熔断
+    call, calls = _upstream([400])
+    assert asyncio.run(caller.call("translate", call)).status_code == 400
+    assert len(calls) == 1
+    assert caller.breaker("translate").get_metrics()["consecutive_failures"] == 0
+
+    # 重试用尽时返回最后一次的错误响应；异常则向上抛出
+    call, calls = _upstream([502])
+    assert asyncio.run(caller.call("translate", call)).status_code == 502
+    assert len(calls) == 3
+    call, calls = _upstream([ConnectionResetError("reset")])
+    try:
+        asyncio.run(caller.call("translate", call))
+        raise AssertionError("应抛出最后一次的异常")
+    except ConnectionResetError:
+        pass
+
+    # 其他异常不重试
+    call, calls = _upstream([ValueError("bad request")])
+    try:
+        asyncio.run(caller.call("translate", call))
+        raise AssertionError("应直接抛出不可重试的异常")
+    except ValueError:
+        assert len(calls) == 1
+
+
+def test_backoff_is_bounded_and_jittered():
+    caller = ResilientCaller(base_delay=0.5, max_delay=4.0)
+    delays = [caller.backoff(attempt) for attempt in range(1, 8) for _ in range(50)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert all(caller.backoff(1) <= 0.5 for _ in range(50))
+    assert len(set(delays)) > 100
+
+
+def test_circuit_breaker_opens_and_probes():
+    caller = _caller(max_attempts=1, failure_threshold=3, recovery_timeout=0.2)
+    breaker = caller.breaker("translate")
+    failing, failing_calls = _upstream([503])
+    for _ in range(3):
+        asyncio.run(caller.call("translate", failing))
+    assert breaker.state == OPEN
+
+    # 熔断期间直接失败，不调用上游；其他操作的熔断器不受影响
+    try:
+        asyncio.run(caller.call("translate", failing))
+        raise AssertionError("熔断期间应直接拒绝")
+    except CircuitOpenError as e:
+        assert e.retry_after > 0
+    assert len(failing_calls) == 3
+    healthy, _ = _upstream([200])
+    assert asyncio.run(caller.call("chat", healthy)).status_code == 200
+
+    # 冷却后半开：探测失败重新打开
+    time.sleep(0.25)
+    assert breaker.state == HALF_OPEN
+    asyncio.run(caller.call("translate", failing))
+    assert breaker.state == OPEN and len(failing_calls) == 4
+
+    # 再次冷却后探测成功即恢复
+    time.sleep(0.25)
+    assert asyncio.run(caller.call("translate", healthy)).status_code == 200
+    assert breaker.state == CLOSED
+
+
+def test_half_open_limits_probes():
+    caller = _caller(max_attempts=1, failure_threshold=1, recovery_timeout=0.05, half_open_max_calls=1)
+
+    async def run():
+        failing, _ = _upstream([503])
+        await caller.call("translate", failing)
+        await asyncio.sleep(0.06)
+        release = asyncio.Event()
+
+        async def slow_probe():
+            await release.wait()
+            return SimpleNamespace(status_code=200)
+
+        probe = asyncio.create_task(caller.call("translate", slow_probe))
+        await asyncio.sleep(0)
+        try:
+            await caller.call("translate", failing)
+            raise AssertionError("探测进行中时其他调用应被拒绝")
+        except CircuitOpenError:
+            pass
+        release.set()
+        assert (await probe).status_code == 200
+        assert caller.breaker("translate").state == CLOSED
+
+    asyncio.run(run())
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_retries_transient_failures, test_backoff_is_bounded_and_jittered,
+             test_circuit_breaker_opens_and_probes, test_half_open_limits_probes]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
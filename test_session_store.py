@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+会话存储的测试
+
+用法:
+    python test_session_store.py
+    python -m pytest test_session_store.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from src.services.session_store import SessionStore
+from src.services.workflow_document import WorkflowDocument
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _document(text):
+    return WorkflowDocument(text, is_direct=True)
+
+
+def test_lru_and_byte_eviction():
+    store = SessionStore(max_sessions=2, max_bytes=1000)
+    store.set("a", _document("译文A"))
+    store.set("b", _document("译文B"))
+    # 读取 a 之后，b 成为最久未使用的会话
+    assert store.get("a").text == "译文A"
+    store.set("c", _document("译文C"))
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+    # 总字节数超过上限时同样淘汰最久未使用的会话；单个超过上限的文档不保存
+    store = SessionStore(max_sessions=10, max_bytes=30)
+    store.set("a", _document("x" * 20))
+    store.set("b", _document("y" * 20))
+    assert store.get("a") is None and store.get("b") is not None
+    store.set("huge", _document("z" * 31))
+    assert store.get("huge") is None
+    metrics = store.get_metrics()
+    assert metrics["bytes"] == 20 and metrics["evictions"] == 1
+
+
+def test_ttl_expiry_and_clear():
+    store = SessionStore(ttl=0.05)
+    store.set("a", _document("译文"))
+    assert store.get("a") is not None
+    time.sleep(0.06)
+    assert store.get("a") is None
+    assert store.get_metrics()["expired"] == 1
+
+    store = SessionStore()
+    store.set("a", _document("译文"))
+    store.set("b", _document("译文"))
+    store.clear("a")
+    assert store.get("a") is None and store.get("b") is not None
+    assert store.get_metrics()["bytes"] == len("译文".encode("utf-8"))
+
+
+def _shared_store_roundtrip(db_path):
+    # 两个实例共用同一个SQLite文件，模拟两个工作进程
+    first = SessionStore(db_path=db_path)
+    second = SessionStore(db_path=db_path)
+    try:
+        first.set("s", _document("第一次译文"))
+        assert second.get("s").text == "第一次译文"
+
+        # 另一个进程写入更新的结果后，按更新时间重新加载，而不是返回内存中的旧文档
+        time.sleep(0.01)
+        first.set("s", _document("第二次译文"))
+        assert second.get("s").text == "第二次译文"
+        assert second.get_metrics()["reloads"] == 2
+        assert second.get("s").text == "第二次译文"
+        assert second.get_metrics()["reloads"] == 2
+
+        # 一个进程清除后，另一个进程也读不到
+        second.clear("s")
+        assert first.get("s") is None
+        assert first.get_metrics()["shared_sessions"] == 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_store_reloads_across_processes():
+    with tempfile.TemporaryDirectory() as directory:
+        _shared_store_roundtrip(os.path.join(directory, "sessions.db"))
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_lru_and_byte_eviction, test_ttl_expiry_and_clear, test_shared_store_reloads_across_processes]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
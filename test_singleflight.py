@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+进行中请求合并的测试
+
+用法:
+    python test_singleflight.py
+    python -m pytest test_singleflight.py
+"""
+
+import asyncio
+import logging
+import sys
+
+from src.services.singleflight import SingleFlight
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def test_concurrent_calls_are_coalesced():
+    async def run():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def translate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"translation": "customs"}
+
+        results = await asyncio.gather(*(flight.do("海关", translate) for _ in range(5)),
+                                       flight.do("关税", translate))
+        assert len(calls) == 2
+        assert all(result == {"translation": "customs"} for result in results)
+        # 每个调用方拿到独立的浅拷贝
+        results[0]["cached"] = True
+        assert "cached" not in results[1]
+        metrics = flight.get_metrics()
+        assert metrics["calls"] == 6 and metrics["executions"] == 2 and metrics["coalesced"] == 4
+        assert metrics["in_flight"] == 0 and metrics["peak_waiters"] == 5
+
+        # 完成后不缓存结果，之后的调用重新执行
+        await flight.do("海关", translate)
+        assert len(calls) == 3
+
+    asyncio.run(run())
+
+
+def test_errors_reach_every_waiter():
+    async def run():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            raise ConnectionError("上游断开")
+
+        results = await asyncio.gather(*(flight.do("海关", failing) for _ in range(3)), return_exceptions=True)
+        assert len(calls) == 1
+        assert all(isinstance(result, ConnectionError) for result in results)
+        # 失败的调用不会留下记录，下一次调用重新执行
+        assert flight.get_metrics()["in_flight"] == 0
+        try:
+            await flight.do("海关", failing)
+            raise AssertionError("应抛出 ConnectionError")
+        except ConnectionError:
+            pass
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+def test_cancellation_only_stops_upstream_when_all_waiters_leave():
+    async def run():
+        flight = SingleFlight("test")
+        state = {"cancelled": False}
+
+        async def slow():
+            try:
+                await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+            return "译文"
+
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        # 一个等待方离开，其他等待方照常拿到结果
+        first.cancel()
+        assert await second == "译文" and not state["cancelled"]
+
+        waiters = [asyncio.ensure_future(flight.do("k", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        # 所有等待方都离开后取消上游调用
+        assert state["cancelled"] and flight.get_metrics()["in_flight"] == 0
+
+    asyncio.run(run())
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_concurrent_calls_are_coalesced, test_errors_reach_every_waiter,
+             test_cancellation_only_stops_upstream_when_all_waiters_leave]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+术语库与术语表导入的测试
+
+用法:
+    python test_terminology_store.py
+    python -m pytest test_terminology_store.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+
+from src.services.terminology_importer import is_term_pair, iter_csv_pairs
+from src.services.terminology_store import TerminologyStore
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PAIRS = [
+    ("Customs declaration", "报关单"),
+    ("customs debt", "海关债"),
+    ("customs territory", "关境"),
+    ("Authorised economic operator", "经认证经营者"),
+]
+
+
+def _store(directory):
+    store = TerminologyStore(os.path.join(directory, "terminology.db"))
+    store.import_pairs(PAIRS, "en", "zh", origin="test")
+    return store
+
+
+def test_exact_and_prefix_lookup():
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        assert store.count() == len(PAIRS)
+        # 区分大小写的结果优先，失败时忽略大小写再查
+        assert store.lookup("Customs declaration", "en", "zh") == "报关单"
+        assert store.lookup("CUSTOMS DEBT", "en", "zh") == "海关债"
+        assert store.lookup("CUSTOMS DEBT", "en", "zh", case_insensitive=False) is None
+        # 两个方向都可以查询
+        assert store.lookup("关境", "zh", "en") == "customs territory"
+
+        results = store.search_prefix("customs ", "en", "zh")
+        # 按忽略大小写后的术语排序
+        assert [item["term"] for item in results] == ["customs debt", "Customs declaration", "customs territory"]
+        assert [item["term"] for item in store.search_prefix("customs dec", "en", "zh", limit=1)] == \
+            ["Customs declaration"]
+        assert store.search_prefix("customs ", "en", "zh", case_insensitive=False)[0]["term"] == "customs debt"
+        assert results[1]["origin"] == "test"
+
+
+def test_reimport_upserts_and_rebuilds_matcher():
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        matcher = store.get_matcher("en", "zh")
+        assert matcher.lookup("customs debt") == "海关债"
+        assert store.get_matcher("en", "zh") is matcher
+        version = store.get_metrics()["version"]
+
+        # 同一术语重新导入时覆盖译文，不新增条目；版本号变化后匹配器重建
+        store.import_pairs([("customs debt", "海关债务")], "en", "zh", origin="revised")
+        assert store.count() == len(PAIRS)
+        assert store.lookup("customs debt", "en", "zh") == "海关债务"
+        assert store.get_metrics()["version"] == version + 1
+        rebuilt = store.get_matcher("en", "zh")
+        assert rebuilt is not matcher and rebuilt.lookup("customs debt") == "海关债务"
+
+        # 其他进程导入后，请求先拿到旧的匹配器，匹配器在后台线程中按新版本重建
+        other = TerminologyStore(os.path.join(directory, "terminology.db"))
+        other.import_pairs([("bonded zone", "保税区")], "en", "zh")
+        store._version_checked_at = 0
+        assert store.get_matcher("en", "zh").lookup("bonded zone") is None
+        store._rebuild_thread.join(timeout=5)
+        assert store.get_matcher("en", "zh").lookup("bonded zone") == "保税区"
+
+
+def test_registered_glossary_is_merged():
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        store.register_glossary("builtin", "en", "zh", {"customs debt": "关税债务", "tariff": "关税"})
+        store.build_matchers()
+        merged = store.get_matcher("en", "zh", glossary="builtin")
+        # 术语库中的条目优先于额外词典
+        assert merged.lookup("customs debt") == "海关债" and merged.lookup("tariff") == "关税"
+        # 只用术语库的匹配器（提示词注入）不包含额外词典
+        assert store.get_matcher("en", "zh").lookup("tariff") is None
+
+
+def test_only_term_like_pairs_are_matched():
+    assert is_term_pair("customs declaration", "报关单")
+    assert is_term_pair("EORI", "经济经营者注册与识别号")
+    for term, translation in [("For the Commission", "委员会"), ("The President", "主席："),
+                              ("FINAL PROVISIONS", "附则"), ("Article 5", "第5条"),
+                              ("(a) the holder of the decision;", "（a）决定相对人；"),
+                              ("The goods shall be declared.", "货物应当申报。")]:
+        assert not is_term_pair(term, translation), term
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = _store(directory)
+        store.import_pairs([("For the Commission", "委员会")], "en", "zh")
+        # 整句对照仍可精确查询，但不参与替换和注入
+        assert store.lookup("For the Commission", "en", "zh") == "委员会"
+        assert store.get_matcher("en", "zh").lookup("For the Commission") is None
+        assert store.find_terms("委员会审核报关单", "zh", "en") == [("报关单", "Customs declaration")]
+
+
+def test_csv_import_detects_column_order():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "terms.csv")
+        with open(path, "w", encoding="gbk", newline="") as f:
+            f.write("保税区,bonded zone\ncustoms duty,关税\n12,34\n,空\n")
+        assert list(iter_csv_pairs(path, "en", "zh")) == [("bonded zone", "保税区"), ("customs duty", "关税")]
+        assert list(iter_csv_pairs(path, "zh", "en")) == [("保税区", "bonded zone"), ("关税", "customs duty")]
+
+        store = TerminologyStore(os.path.join(directory, "terminology.db"))
+        assert store.import_file(path) == 2
+        assert store.lookup("bonded zone", "en", "zh") == "保税区"
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_exact_and_prefix_lookup, test_reimport_upserts_and_rebuilds_matcher,
+             test_registered_glossary_is_merged, test_only_term_like_pairs_are_matched, test_csv_import_detects_column_order]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
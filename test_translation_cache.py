@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+翻译结果缓存的测试
+
+用法:
+    python test_translation_cache.py
+    python -m pytest test_translation_cache.py
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from src.services.translation_cache import TranslationCache, normalize_text
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+VERSION = "v1"
+
+
+def _set(cache, text, source_lang="zh", target_lang="en", translation=None):
+    key = TranslationCache.make_key(text, source_lang, target_lang, False, VERSION)
+    cache.set(key, {"success": True, "translation": translation or f"译:{text}"},
+              text, source_lang, target_lang, False, VERSION)
+    return key
+
+
+def test_key_normalizes_whitespace():
+    assert normalize_text("  海关\r\n\r\n\r\n报关  单\t ") == "海关\n\n报关 单"
+    assert TranslationCache.make_key("海关  报关单", "zh", "en", False, VERSION) == \
+        TranslationCache.make_key(" 海关 报关单\n", "zh", "en", False, VERSION)
+    # 语言方向、模板版本、上下文都参与缓存键
+    base = TranslationCache.make_key("海关", "zh", "en", False, VERSION)
+    assert base != TranslationCache.make_key("海关", "zh", "ja", False, VERSION)
+    assert base != TranslationCache.make_key("海关", "zh", "en", False, "v2")
+    assert base != TranslationCache.make_key("海关", "zh", "en", False, VERSION, context="术语表")
+
+
+def test_copy_on_read_and_lru_eviction():
+    cache = TranslationCache("", memory_size=2)
+    key_a = _set(cache, "a")
+    key_b = _set(cache, "b")
+    # 读出的是副本，修改不影响缓存内容
+    cached = cache.get(key_a)
+    cached["cached"] = True
+    assert "cached" not in cache.get(key_a)
+
+    # 读取 a 之后，b 成为最久未使用的条目
+    key_c = _set(cache, "c")
+    assert cache.get(key_b) is None
+    assert cache.get(key_a) is not None and cache.get(key_c) is not None
+    metrics = cache.get_metrics()
+    assert metrics["evictions"] == 1 and metrics["memory_entries"] == 2 and metrics["disk_entries"] is None
+
+
+def test_memory_and_disk_ttl():
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "cache.db")
+        cache = TranslationCache(db_path, memory_ttl=0.05, ttl=0.2)
+        key = _set(cache, "海关")
+        assert cache.get(key)["translation"] == "译:海关"
+
+        # 内存条目过期后从SQLite回填
+        time.sleep(0.06)
+        assert cache.get(key)["translation"] == "译:海关"
+        metrics = cache.get_metrics()
+        assert metrics["memory_hits"] == 1 and metrics["disk_hits"] == 1
+
+        # 持久化条目过期后不再命中
+        time.sleep(0.2)
+        assert cache.get(key) is None
+        assert cache.get_metrics()["expired"] == 1
+
+        # 重启（新实例）后仍可从SQLite读到未过期的条目
+        cache = TranslationCache(db_path)
+        key = _set(cache, "关税")
+        assert TranslationCache(db_path).get(key)["translation"] == "译:关税"
+
+
+def test_purge_filters():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TranslationCache(os.path.join(directory, "cache.db"))
+        key_customs = _set(cache, "海关")
+        key_customs_ja = _set(cache, "海关", target_lang="ja")
+        key_tariff = _set(cache, "关税")
+        key_en = _set(cache, "tariff", "en", "zh")
+
+        # 按原文清理时忽略空白差异
+        assert cache.purge(text=" 海关 ", target_lang="ja") == 1
+        assert cache.get(key_customs_ja) is None and cache.get(key_customs) is not None
+        assert cache.purge(source_lang="en") == 1
+        assert cache.get(key_en) is None and cache.get(key_tariff) is not None
+        assert cache.purge(expired_only=True) == 0
+        assert cache.purge() == 2
+        assert cache.get_metrics()["disk_entries"] == 0
+
+
+def test_purge_is_seen_by_other_processes():
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "cache.db")
+        first = TranslationCache(db_path)
+        second = TranslationCache(db_path)
+        key = _set(second, "海关")
+        assert second.get(key) is not None
+
+        # 其他进程清理后，本进程按清理代数丢弃内存中的条目
+        first.purge()
+        second._generation_checked_at = 0
+        assert second.get(key) is None
+
+
+def test_purge_database_error_is_counted():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TranslationCache(os.path.join(directory, "cache.db"))
+        key = _set(cache, "海关")
+        cache._conn.execute("DROP TABLE translation_cache")
+        # 数据库出错时不抛出异常，记入错误数
+        assert cache.purge() == 0
+        assert cache.get_metrics()["errors"] == 1
+        assert cache.get(key) is None
+        cache.close()
+
+
+def test_memory_lookup_does_not_wait_for_sqlite():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TranslationCache(os.path.join(directory, "cache.db"))
+        key = _set(cache, "海关")
+        cache.get(key)
+        # 其他线程正在读写SQLite时，内存命中不需要等待数据库锁
+        with cache._db_lock:
+            started_at = time.monotonic()
+            assert cache.get_from_memory(key)["translation"] == "译:海关"
+            assert time.monotonic() - started_at < 0.1
+        assert cache.get_from_memory("missing") is None
+        assert cache.get_metrics()["misses"] == 0
+
+        # 需要检查清理代数时不走内存快速路径，交给 get 处理
+        cache._generation_checked_at = 0
+        assert cache.get_from_memory(key) is None
+        assert cache.get(key) is not None and cache.get_from_memory(key) is not None
+        cache.close()
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_key_normalizes_whitespace, test_copy_on_read_and_lru_eviction, test_memory_and_disk_ttl,
+             test_purge_filters, test_purge_is_seen_by_other_processes, test_purge_database_error_is_counted,
+             test_memory_lookup_does_not_wait_for_sqlite]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
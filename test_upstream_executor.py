@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+"""
+上游调用线程池的测试
+
+用法:
+    python test_upstream_executor.py
+    python -m pytest test_upstream_executor.py
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+
+from src.services.upstream_executor import UpstreamExecutor, UpstreamQueueFullError
+
+# 设置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def test_runs_off_the_event_loop():
+    async def run():
+        executor = UpstreamExecutor(max_workers=2, max_queue_size=0)
+        loop_thread = threading.current_thread()
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        def blocking(value):
+            time.sleep(0.1)
+            return threading.current_thread(), value
+
+        try:
+            (worker, value), _ = await asyncio.gather(executor.run(blocking, 7), ticker())
+            # 阻塞调用在线程池中执行，事件循环上的其他协程照常运行
+            assert worker is not loop_thread and worker.name.startswith("dashscope-upstream")
+            assert value == 7 and len(ticks) == 5 and ticks[-1] - ticks[0] < 0.09
+        finally:
+            executor.shutdown()
+
+    asyncio.run(run())
+
+
+def test_rejects_when_queue_is_full():
+    async def run():
+        executor = UpstreamExecutor(max_workers=1, max_queue_size=1)
+        release = threading.Event()
+        try:
+            first = asyncio.ensure_future(executor.run(release.wait))
+            second = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            # 一个执行中、一个排队，第三个调用直接拒绝
+            try:
+                await executor.run(release.wait)
+                raise AssertionError("应抛出 UpstreamQueueFullError")
+            except UpstreamQueueFullError:
+                pass
+            metrics = executor.get_metrics()
+            assert metrics["active"] == 1 and metrics["queued"] == 1 and metrics["rejected"] == 1
+
+            release.set()
+            assert await first and await second
+            metrics = executor.get_metrics()
+            assert metrics["completed"] == 2 and metrics["active"] == 0 and metrics["queued"] == 0
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(run())
+
+
+def test_cancelled_queued_call_is_withdrawn():
+    async def run():
+        executor = UpstreamExecutor(max_workers=1, max_queue_size=4)
+        release = threading.Event()
+        calls = []
+        try:
+            running = asyncio.ensure_future(executor.run(release.wait))
+            queued = asyncio.ensure_future(executor.run(calls.append, "queued"))
+            await asyncio.sleep(0.05)
+            queued.cancel()
+            await asyncio.sleep(0)
+            # 尚未开始执行的调用被撤销，不再占用排队名额，也不会执行
+            assert executor.get_metrics()["queued"] == 0
+            release.set()
+            await running
+            await asyncio.sleep(0.05)
+            assert calls == []
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(run())
+
+
+def test_failures_propagate_and_are_counted():
+    async def run():
+        executor = UpstreamExecutor(max_workers=1)
+
+        def failing():
+            raise ValueError("上游错误")
+
+        try:
+            try:
+                await executor.run(failing)
+                raise AssertionError("应抛出 ValueError")
+            except ValueError:
+                pass
+            assert await executor.run(sum, [1, 2, 3]) == 6
+            metrics = executor.get_metrics()
+            assert metrics["failed"] == 1 and metrics["completed"] == 2 and metrics["submitted"] == 2
+        finally:
+            executor.shutdown()
+
+    asyncio.run(run())
+
+
+def main():
+    """依次运行所有测试"""
+    tests = [test_runs_off_the_event_loop, test_rejects_when_queue_is_full, test_cancelled_queued_call_is_withdrawn,
+             test_failures_propagate_and_are_counted]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            logger.info(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"❌ {test.__name__}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
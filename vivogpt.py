@@ -7,13 +7,35 @@ WVC海关行业大模型翻译服务 - 工作版本
 """
 
 import logging
-from typing import Optional, Dict
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, FileResponse, Response
+from typing import Optional, Dict, List
+from fastapi import FastAPI, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import re
+import os
+import hmac
 import json
+import math
+import time
+import asyncio
+import tempfile
+import uuid
+from contextlib import aclosing
+
+from src.services.terminology_store import terminology_store
+from src.services.output_formatter import StreamingTranslationFormatter
+from src.services.workflow_document import WorkflowDocument
+from src.services.session_store import SessionStore
+from src.services.intent_classifier import (
+    intent_classifier, DIRECT_TRANSLATION, SHOW_SOURCES, SHOW_FINAL_TRANSLATION, TRANSLATION_PREFIX
+)
+from src.services.language_detector import detect_language, detect_language_direction, target_language_for
+from src.services.source_extractor import extract_source_entries, render_source_entries
+from src.services.chunker import split_chunks
+from src.services.job_queue import JobQueue, JobQueueFull, JobContext, SUCCEEDED, FINISHED_STATUSES
+from src.services.document_files import SUPPORTED_EXTENSIONS, iter_document_texts, write_translated_document
+from src.services.request_context import RequestDeadlinePolicy, RequestDeadlineMiddleware, current_tenant, upstream_scope
+from src.services.upstream_scheduler import BACKGROUND, BULK
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -25,17 +47,78 @@ try:
     DASHSCOPE_AVAILABLE = translation_service and translation_service.is_available
     logger.info(f"DashScope翻译服务: {'可用' if DASHSCOPE_AVAILABLE else '不可用'}")
 except Exception as e:
+    translation_service = None
     DASHSCOPE_AVAILABLE = False
     logger.warning(f"DashScope翻译服务加载失败: {e}")
 
-# 全局变量用于缓存上一次翻译的完整输出 (包含工作流)
-last_translation_full_output_cache: Optional[str] = None
-# 新增全局变量，用于缓存最终翻译结果（不含工作流）
-last_translation_result_only_cache: Optional[str] = None
+# 按会话保存上一次翻译的模型输出（解析后的工作流文档），最终译文与来源明细都从中获取
+# SESSION_STORE_SHARED=1 时同时写入SQLite，供多个工作进程共享
+session_store = SessionStore(
+    db_path=os.getenv("SESSION_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "sessions.db"))
+    if os.getenv("SESSION_STORE_SHARED", "0") == "1" else None,
+    max_sessions=int(os.getenv("SESSION_STORE_MAX_SESSIONS", "1000")),
+    max_bytes=int(os.getenv("SESSION_STORE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("SESSION_STORE_TTL", "3600"))
+)
+
+# 大文档异步翻译任务队列（SQLite持久化），任务进度和分块检查点在服务重启后保留
+job_queue = JobQueue(
+    db_path=os.getenv("JOB_QUEUE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "jobs.db")),
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    lease_timeout=float(os.getenv("JOB_LEASE_TIMEOUT", "60")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    max_pending=int(os.getenv("JOB_MAX_PENDING", "100")),
+    result_ttl=float(os.getenv("JOB_RESULT_TTL", str(7 * 24 * 3600))),
+    max_retained=int(os.getenv("JOB_MAX_RETAINED", "1000"))
+)
+
+# 各接口的请求截止时间（秒，0 表示不限），客户端可通过请求头 X-Request-Timeout 缩短或延长（不超过 REQUEST_TIMEOUT_MAX）；
+# 到达截止时间或客户端断开时取消请求及进行中的上游调用；请求头 X-Tenant-ID（没有时为客户端IP）标识租户，
+# 上游名额不足时同一优先级的调用按租户公平排队
+request_deadlines = RequestDeadlinePolicy(
+    {
+        "/api/query": float(os.getenv("REQUEST_TIMEOUT_QUERY", "120")),
+        "/api/query/stream": float(os.getenv("REQUEST_TIMEOUT_STREAM", "300")),
+        "/api/query/batch": float(os.getenv("REQUEST_TIMEOUT_BATCH", "600")),
+        "/api/show_last_answer_sources": float(os.getenv("REQUEST_TIMEOUT_QUERY", "120")),
+        "/api/chat": float(os.getenv("REQUEST_TIMEOUT_CHAT", "120")),
+        "/api/explain": float(os.getenv("REQUEST_TIMEOUT_EXPLAIN", "60")),
+        "/api/knowledge": float(os.getenv("REQUEST_TIMEOUT_EXPLAIN", "60")),
+        "/api/memory": float(os.getenv("REQUEST_TIMEOUT_MEMORY", "60")),
+    },
+    max_timeout=float(os.getenv("REQUEST_TIMEOUT_MAX", "600")),
+    # 批量翻译接口的上游调用排在交互请求之后；异步任务在任务处理函数中按批量优先级排队
+    priorities={"/api/query/batch": BACKGROUND}
+)
+
+# 会话标识的请求头与Cookie名称
+SESSION_HEADER = "X-Session-ID"
+SESSION_COOKIE = "wvc_session"
+
+def resolve_session_id(request: Request, body_session_id: Optional[str] = None) -> str:
+    """
+    确定请求所属的翻译会话：依次取请求头 X-Session-ID、Cookie wvc_session、请求体中的 translation_session_id，
+    都没有时按客户端IP区分。请求体中的 session_id 是DashScope多轮对话的会话ID，不用于区分翻译会话
+    
+    Args:
+        request (Request): 原始请求
+        body_session_id (str, optional): 请求体中的 translation_session_id
+        
+    Returns:
+        str: 会话ID
+    """
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE) or body_session_id
+    if session_id:
+        return str(session_id)
+    client_host = request.client.host if request.client else "unknown"
+    return f"ip:{client_host}"
 
 # 创建FastAPI应用
 app = FastAPI(title="WVC海关翻译服务", version="1.0.0")
 
+# 请求截止时间与客户端断开处理（位于CORS中间件内层，超时响应同样带有CORS响应头）
+app.add_middleware(RequestDeadlineMiddleware, policy=request_deadlines)
+
 # 添加CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -45,286 +128,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def format_translation_output(text: str) -> str:
-    """
-    将翻译工作流的Markdown格式转换为更易读的阅读格式，并删除不必要的空格
-    
-    Args:
-        text (str): 原始翻译输出文本（包含Markdown格式）
-        
-    Returns:
-        str: 格式化后的文本
-    """
-    if not text:
-        return ""
-    
-    # 预处理，处理可能的异常格式
-    # 处理行首的#号标记，确保它们被正确识别
-    # 替换掉可能存在的"## 2.1"这样的格式（确保空格正确）
-    text = re.sub(r'^(#+)\s*(\d+\.\d+)', r'\1 \2', text, flags=re.MULTILINE)
-    
-    # 分行处理，以便更精确地处理每一行
-    lines = text.split('\n')
-    processed_lines = []
-    in_table = False
-    table_data = []
-    in_section_2_2 = False  # 标记是否处于2.2节(术语检索与校验部分)
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        
-        # 检测是否进入2.2节(术语检索与校验部分)
-        if re.match(r'^#+\s+2\.2', line) or re.search(r'术语检索与校验', line):
-            in_section_2_2 = True
-        # 检测是否离开2.2节
-        elif in_section_2_2 and re.match(r'^#+\s+\d+', line) and not re.match(r'^#+\s+2\.2', line):
-            in_section_2_2 = False
-            
-        # 1. 处理Markdown标题
-        if re.match(r'^#+\s+', line):
-            # 提取标题级别和内容
-            header_match = re.match(r'^(#+)\s+(.*?)$', line)
-            if header_match:
-                level = len(header_match.group(1))
-                content = header_match.group(2)
-                
-                # 根据标题级别应用不同的格式
-                if level == 1:  # # 一级标题
-                    processed_line = f"【{content}】："
-                elif level == 2:  # ## 二级标题
-                    # 检查是否是数字编号的标题（如 ## 1. 标题）
-                    if re.match(r'^\d+\.\s+', content):
-                        processed_line = f"【{content}】："
-                    else:
-                        processed_line = f"【{content}】："
-                elif level == 3:  # ### 三级标题
-                    # 检查是否是数字编号的标题（如 ### 2.1 标题）
-                    if re.match(r'^\d+\.\d+\s+', content):
-                        processed_line = f"【{content}】："
-                    else:
-                        processed_line = f"【{content}】："
-                else:  # 更深层次的标题
-                    processed_line = f"【{content}】："
-                
-                processed_lines.append(processed_line)
-                i += 1
-                continue
-        
-        # 2. 处理表格 - 对于2.2节特殊处理，转为列表而非表格
-        if line.strip().startswith('|') and line.strip().endswith('|'):
-            # 检测是否处于2.2节(术语检索与校验部分)
-            in_section_2_2 = False
-            for j in range(max(0, i-10), i):  # 向上查找10行以内是否有2.2节标题
-                if j < len(lines) and (re.match(r'^#+\s+2\.2', lines[j]) or re.search(r'术语检索与校验', lines[j])):
-                    in_section_2_2 = True
-                    break
-            
-            # 如果在2.2节且是表格开始，不使用表格格式而是转为列表
-            if in_section_2_2 and not in_table:
-                in_table = True
-                table_data = []
-                table_data.append(line)
-                i += 1
-                # 收集表格内容直到表格结束
-                while i < len(lines) and lines[i].strip().startswith('|') and lines[i].strip().endswith('|'):
-                    table_data.append(lines[i])
-                    i += 1
-                
-                # 转换表格为列表
-                headers = []
-                rows = []
-                
-                for idx, table_line in enumerate(table_data):
-                    cells = [cell.strip() for cell in table_line.split('|')[1:-1]]
-                    if idx == 0:  # 表头
-                        headers = cells
-                    elif not re.match(r'\s*[-:]+\s*', ''.join(cells)):  # 不是分隔行
-                        rows.append(cells)
-                
-                # 输出为列表格式
-                for row_idx, row in enumerate(rows):
-                    item_number = row_idx + 1
-                    item_text = f"• {item_number}. "
-                    
-                    for col_idx, cell in enumerate(row):
-                        if col_idx < len(headers) and headers[col_idx].strip() and cell.strip():
-                            item_text += f"{headers[col_idx]}: {cell}  "
-                    
-                    processed_lines.append(item_text)
-                
-                in_table = False
-                continue
-            # 非2.2节的表格正常处理
-            elif not in_section_2_2:
-                if not in_table:
-                    in_table = True
-                    table_data = []
-                
-                # 收集表格行数据
-                table_data.append(line)
-                i += 1
-                continue
-        elif in_table and not in_section_2_2:
-            # 表格结束，处理收集的表格数据（针对非2.2节的表格）
-            if table_data:
-                # 解析表格数据
-                parsed_table = []
-                max_cols = 0
-                
-                for table_line in table_data:
-                    if re.match(r'\|\s*[-:]+\s*\|', table_line):
-                        continue  # 跳过分隔行
-                    
-                    # 分割并清理单元格
-                    cells = [cell.strip() for cell in table_line.split('|')[1:-1]]
-                    parsed_table.append(cells)
-                    max_cols = max(max_cols, len(cells))
-                
-                # 确保所有行都有相同数量的列
-                for row_idx, row in enumerate(parsed_table):
-                    if len(row) < max_cols:
-                        parsed_table[row_idx] = row + [''] * (max_cols - len(row))
-                
-                # 计算每列的最大宽度
-                col_widths = [0] * max_cols
-                for row in parsed_table:
-                    for j, cell in enumerate(row):
-                        col_widths[j] = max(col_widths[j], len(cell))
-                
-                # 重建表格，使用固定宽度格式
-                formatted_table = []
-                for row in parsed_table:
-                    formatted_row = []
-                    for j, cell in enumerate(row):
-                        formatted_row.append(cell.ljust(col_widths[j]))
-                    
-                    formatted_table.append("| " + " | ".join(formatted_row) + " |")
-                
-                # 在第一行和第二行之间添加分隔行
-                if len(formatted_table) > 1:
-                    separator_line = "|-" + "-|-".join(["-" * w for w in col_widths]) + "-|"
-                    formatted_table.insert(1, separator_line)
-                
-                processed_lines.extend(formatted_table)
-            
-            in_table = False
-            # 注意：不再添加当前行，因为我们会在下一次循环中处理它
-            # 我们不增加索引i，这样当前行会在下次循环中被处理
-            continue
-        
-        # 3. 处理列表项
-        list_match = re.match(r'^(\s*)[-*]\s+(.*?)$', line)
-        if list_match:
-            indent = list_match.group(1)
-            content = list_match.group(2)
-            processed_lines.append(f"{indent}• {content}")
-            i += 1
-            continue
-        
-        # 4. 处理数字列表
-        num_list_match = re.match(r'^(\s*)(\d+)\.(\s+)(.*?)$', line)
-        if num_list_match:
-            indent = num_list_match.group(1)
-            number = num_list_match.group(2)
-            spaces = num_list_match.group(3)
-            content = num_list_match.group(4)
-            processed_lines.append(f"{indent}{number}.{spaces}{content}")
-            i += 1
-            continue
-        
-        # 5. 处理引用
-        quote_match = re.match(r'^>\s+(.*?)$', line)
-        if quote_match:
-            content = quote_match.group(1)
-            processed_lines.append(f"『{content}』")
-            i += 1
-            continue
-        
-        # 6. 处理代码块
-        if line.strip().startswith('```') or line.strip() == '```':
-            # 跳过代码块标记
-            i += 1
-            continue
-        
-        # 7. 处理水平线
-        if re.match(r'^-{3,}$|^_{3,}$|^\*{3,}$', line.strip()):
-            processed_lines.append("—" * 30)  # 使用长破折号作为分隔线
-            i += 1
-            continue
-        
-        # 处理内联格式（在行内部的标记）
-        # 处理加粗
-        line = re.sub(r'\*\*(.*?)\*\*', r'\1', line)
-        line = re.sub(r'__(.*?)__', r'\1', line)
-        
-        # 处理斜体
-        line = re.sub(r'\*(.*?)\*', r'\1', line)
-        line = re.sub(r'_(.*?)_', r'\1', line)
-        
-        # 处理链接
-        line = re.sub(r'\[(.*?)\]\((.*?)\)', r'\1', line)
-        
-        # 处理图片
-        line = re.sub(r'!\[(.*?)\]\((.*?)\)', r'[图片:\1]', line)
-        
-        # 8. 正常文本行
-        processed_lines.append(line)
-        i += 1
-    
-    # 将处理后的行重新组合
-    processed_text = '\n'.join(processed_lines)
-    
-    # 最终清理
-    # 1. 删除连续的空行
-    processed_text = re.sub(r'\n\s*\n\s*\n+', '\n\n', processed_text)
-    
-    # 2. 处理可能遗留的标记
-    # 确保没有遗漏的Markdown标题标记
-    processed_text = re.sub(r'^#+\s+', '', processed_text, flags=re.MULTILINE)
-    
-    # 3. 处理特殊格式的标题行（##2.1 这种格式）
-    processed_text = re.sub(r'##(\d+\.\d+)(.*?)$', r'【\1\2】：', processed_text, flags=re.MULTILINE)
-    processed_text = re.sub(r'##\s+(\d+\.\d+)(.*?)$', r'【\1\2】：', processed_text, flags=re.MULTILINE)
-    
-    # 4. 处理连续的冒号
-    processed_text = re.sub(r'：\s*：', '：', processed_text)
-    
-    # 5. 清理可能的双重标记
-    processed_text = re.sub(r'【【([^】]+)】】', r'【\1】', processed_text)
-    
-    # 6. 清理行首和行尾的空白
-    processed_text = re.sub(r'^\s+', '', processed_text, flags=re.MULTILINE)
-    processed_text = re.sub(r'\s+$', '', processed_text, flags=re.MULTILINE)
-    
-    # 7. 移除特殊的"##"标记
-    processed_text = re.sub(r'##\s*(\d+\.\d+)', r'【\1】：', processed_text)
-    
-    # 8. 检测和删除连续重复的内容块
-    lines = processed_text.split('\n')
-    if len(lines) > 10:  # 只有当内容足够长时才检查重复
-        half_length = len(lines) // 2
-        first_half = lines[:half_length]
-        second_half = lines[half_length:2*half_length]
-        
-        # 检查两半是否基本相同
-        similarity = sum(1 for a, b in zip(first_half, second_half) if a == b) / len(first_half) if first_half else 0
-        
-        if similarity > 0.7:  # 如果相似度超过70%，认为存在重复
-            processed_text = '\n'.join(lines[:half_length + (len(lines) - 2*half_length)])
-    
-    return processed_text
-
 class QueryRequest(BaseModel):
     type: str = "terminology"
     message: str
     sourceLang: Optional[str] = "eh"
     targetLang: Optional[str] = "zn"
 
+class BatchQueryRequest(BaseModel):
+    texts: List[str]
+    sourceLang: Optional[str] = None
+    targetLang: Optional[str] = None
+    show_workflow: bool = False
+    max_concurrency: Optional[int] = None
+    fail_fast: bool = False
+
+class JobRequest(BaseModel):
+    message: str
+    sourceLang: Optional[str] = None
+    targetLang: Optional[str] = None
+    show_workflow: bool = False
+
 class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     context: Optional[str] = None
+    translation_session_id: Optional[str] = None
 
 class ExplainRequest(BaseModel):
     term: str
@@ -346,8 +174,31 @@ class SaveMemoryRequest(BaseModel):
     info: str
     memory_id: Optional[str] = None
 
+class PurgeCacheRequest(BaseModel):
+    text: Optional[str] = None
+    sourceLang: Optional[str] = None
+    targetLang: Optional[str] = None
+    expired_only: bool = False
+
+def overloaded_response(result: dict) -> JSONResponse:
+    """
+    上游并发已满、调用被拒绝时返回 503，Retry-After 为建议的重试等待秒数
+    
+    Args:
+        result (dict): 服务层返回的 overloaded 失败结果
+    """
+    retry_after = math.ceil(result.get("retry_after") or 1)
+    return JSONResponse(
+        status_code=503,
+        content={
+            "code": -1,
+            "message": result.get("error") or "上游服务繁忙，请稍后重试"
+        },
+        headers={"Retry-After": str(retry_after)}
+    )
+
 async def dashscope_translate(text: str, source_lang: str, target_lang: str, show_workflow: bool = True) -> dict:
-    """使用DashScope进行专业翻译"""
+    """使用DashScope进行专业翻译；上游繁忙被拒绝时原样返回 overloaded 失败结果，由调用方返回 503"""
     try:
         if not DASHSCOPE_AVAILABLE:
             raise Exception("DashScope服务不可用")
@@ -371,6 +222,8 @@ async def dashscope_translate(text: str, source_lang: str, target_lang: str, sho
                 "model_used": "DashScope-Customs",
                 "full_workflow": full_translation_output  # 额外保存完整工作流
             }
+        elif result.get('overloaded'):
+            return result
         else:
             raise Exception(result.get('error', 'DashScope翻译失败'))
             
@@ -378,102 +231,94 @@ async def dashscope_translate(text: str, source_lang: str, target_lang: str, sho
         logger.error(f"DashScope翻译错误: {e}")
         raise Exception(f"DashScope翻译失败: {str(e)}")
 
+# 海关术语对照表（中文到英文）
+ZH_TO_EN_GLOSSARY = {
+    "原产地证书": "Certificate of Origin",
+    "海关申报": "Customs Declaration", 
+    "进出口": "Import and Export",
+    "关税": "Tariff",
+    "商品归类": "Goods Classification",
+    "HS编码": "HS Code",
+    "检验检疫": "Inspection and Quarantine",
+    "保税区": "Bonded Zone",
+    "报关单": "Customs Declaration Form",
+    "完税证明": "Tax Payment Certificate",
+    "运费": "Freight",
+    "价目": "Price List",
+    "运费价目": "Freight Price List",
+    "报关": "Customs Declaration",
+    "清关": "Customs Clearance",
+    "关税配额": "Tariff Quota",
+    "免税": "Duty Free",
+    "征税": "Taxation",
+    "退税": "Tax Refund"
+}
+
+# 英文到中文的翻译词典
+EN_TO_ZH_GLOSSARY = {
+    "hello": "你好",
+    "hi": "嗨",
+    "welcome": "欢迎",
+    "thank": "谢谢",
+    "thanks": "谢谢",
+    "please": "请",
+    "yes": "是",
+    "no": "不",
+    "good": "好",
+    "help": "帮助",
+    "service": "服务",
+    "freight": "运费",
+    "price": "价格",
+    "list": "清单",
+    "customs": "海关",
+    "certificate of origin": "原产地证书",
+    "import": "进口",
+    "export": "出口",
+    "tariff": "关税",
+    "goods": "货物",
+    "declaration": "申报",
+    "inspection": "检验",
+    "quarantine": "检疫",
+    "bonded": "保税",
+    "zone": "区域",
+    "time": "时间",
+    "name": "名称",
+    "code": "代码",
+    "number": "数字",
+    "type": "类型",
+    "status": "状态"
+}
+
+# 内置词典登记到术语库，与术语库合并后的匹配器在服务启动时预先构建，术语库更新后在后台重建
+BUILTIN_GLOSSARY = "builtin"
+BUILTIN_GLOSSARIES = {
+    ("zh", "en"): ZH_TO_EN_GLOSSARY,
+    ("en", "zh"): EN_TO_ZH_GLOSSARY,
+}
+for (glossary_source_lang, glossary_target_lang), builtin_glossary in BUILTIN_GLOSSARIES.items():
+    terminology_store.register_glossary(BUILTIN_GLOSSARY, glossary_source_lang, glossary_target_lang, builtin_glossary)
+
 async def enhanced_translate(text: str, source_lang: str, target_lang: str) -> dict:
     """
     增强的翻译函数 - 完整的海关术语翻译
     """
     logger.info(f"翻译请求: '{text}' 从 {source_lang} 到 {target_lang}")
     
-    # 海关术语对照表（中文到英文）
-    zh_to_en_dict = {
-        "原产地证书": "Certificate of Origin",
-        "海关申报": "Customs Declaration", 
-        "进出口": "Import and Export",
-        "关税": "Tariff",
-        "商品归类": "Goods Classification",
-        "HS编码": "HS Code",
-        "检验检疫": "Inspection and Quarantine",
-        "保税区": "Bonded Zone",
-        "报关单": "Customs Declaration Form",
-        "完税证明": "Tax Payment Certificate",
-        "运费": "Freight",
-        "价目": "Price List",
-        "运费价目": "Freight Price List",
-        "报关": "Customs Declaration",
-        "清关": "Customs Clearance",
-        "关税配额": "Tariff Quota",
-        "免税": "Duty Free",
-        "征税": "Taxation",
-        "退税": "Tax Refund"
-    }
-    
-    # 英文到中文的翻译词典
-    en_to_zh_dict = {
-        "hello": "你好",
-        "hi": "嗨",
-        "welcome": "欢迎",
-        "thank": "谢谢",
-        "thanks": "谢谢",
-        "please": "请",
-        "yes": "是",
-        "no": "不",
-        "good": "好",
-        "help": "帮助",
-        "service": "服务",
-        "freight": "运费",
-        "price": "价格",
-        "list": "清单",
-        "customs": "海关",
-        "certificate of origin": "原产地证书",
-        "import": "进口",
-        "export": "出口",
-        "tariff": "关税",
-        "goods": "货物",
-        "declaration": "申报",
-        "inspection": "检验",
-        "quarantine": "检疫",
-        "bonded": "保税",
-        "zone": "区域",
-        "time": "时间",
-        "name": "名称",
-        "code": "代码",
-        "number": "数字",
-        "type": "类型",
-        "status": "状态"
-    }
-    
     translated_text = text
     exact_match_found = False
     
-    # 处理中文到英文的翻译
-    if source_lang == "zh" and target_lang == "en":
-        # 首先尝试完整匹配
-        if text.strip() in zh_to_en_dict:
-            translated_text = zh_to_en_dict[text.strip()]
-            exact_match_found = True
-        else:
-            # 部分匹配
-            for zh_term, en_term in zh_to_en_dict.items():
-                if zh_term in text:
-                    translated_text = translated_text.replace(zh_term, en_term)
-                    exact_match_found = True
-                    
-    # 处理英文到中文的翻译
-    elif source_lang == "en" and target_lang == "zh":
-        text_lower = text.lower().strip()
-        translated_text = text  # 保持原始格式，后续做替换
-        # 首先尝试完整匹配（忽略大小写）
-        if text_lower in en_to_zh_dict:
-            translated_text = en_to_zh_dict[text_lower]
+    # 处理中英互译（英文源文本忽略大小写，整词匹配）
+    if (source_lang, target_lang) in BUILTIN_GLOSSARIES:
+        matcher = terminology_store.get_matcher(source_lang, target_lang, glossary=BUILTIN_GLOSSARY)
+        # 首先尝试完整匹配：术语库（含整句对照）优先，其次内置词典
+        exact_translation = terminology_store.lookup(text, source_lang, target_lang) or matcher.lookup(text)
+        if exact_translation is not None:
+            translated_text = exact_translation
             exact_match_found = True
         else:
-            # 部分匹配，忽略大小写，逐个单词替换
-            for en_word, zh_word in en_to_zh_dict.items():
-                # 构造正则，忽略大小写，整词匹配
-                pattern = re.compile(re.escape(en_word), re.IGNORECASE)
-                if re.search(pattern, translated_text):
-                    translated_text = pattern.sub(zh_word, translated_text)
-                    exact_match_found = True
+            # 部分匹配：单次扫描、最长术语优先，替换结果不会被再次匹配
+            translated_text, replaced_count = matcher.replace(text)
+            exact_match_found = replaced_count > 0
     
     # 构建说明信息
     explanation = "使用海关专业术语词典完成翻译"
@@ -491,14 +336,122 @@ async def enhanced_translate(text: str, source_lang: str, target_lang: str) -> d
         "model_used": "Enhanced-Dictionary"
     }
 
+def prepare_translation_request(message: str,
+                                requested_source_lang: Optional[str] = None,
+                                requested_target_lang: Optional[str] = None) -> dict:
+    """
+    分析翻译请求：识别用户意图、检测语言方向并清理消息文本
+    
+    Args:
+        message (str): 用户输入的原始消息
+        requested_source_lang (str, optional): 客户端指定的源语言
+        requested_target_lang (str, optional): 客户端指定的目标语言
+        
+    Returns:
+        dict: 包含 processed_message、source_lang、target_lang、
+              is_direct_translation_intent、is_show_sources_intent 的字典
+    """
+    # 一次匹配识别所有意图：直接翻译（不显示工作流）、显示上一次翻译的来源
+    intents = intent_classifier.classify(message)
+    is_direct_translation_intent = DIRECT_TRANSLATION in intents
+    is_show_sources_intent = SHOW_SOURCES in intents
+    if is_direct_translation_intent:
+        logger.info(f"检测到意图: 直接翻译（不显示工作流），匹配内容: '{intents[DIRECT_TRANSLATION].text}'")
+    if is_show_sources_intent:
+        logger.info(f"检测到意图: 显示上一次翻译的来源信息，匹配内容: '{intents[SHOW_SOURCES].text}'")
+
+    if is_show_sources_intent:
+        return {
+            "is_show_sources_intent": True,
+            "is_direct_translation_intent": is_direct_translation_intent,
+            "processed_message": message,
+            "source_lang": None,
+            "target_lang": None
+        }
+
+    # 基于文本内容的自动语言检测结果
+    detection = detect_language(message)
+    detected_source_lang, detected_target_lang = detection.language, target_language_for(detection.language)
+    logger.info(f"自动检测结果: 源语言 {detected_source_lang} (置信度 {detection.confidence})，目标语言 {detected_target_lang}")
+
+    # 确定最终使用的源语言和目标语言
+    actual_source_lang: str
+    actual_target_lang: str
+
+    if requested_source_lang and requested_target_lang:
+        # 客户端指定了语言，但我们会验证是否与检测结果一致
+        if requested_source_lang != detected_source_lang:
+            logger.warning(f"警告: 客户端指定的源语言 ({requested_source_lang}) 与自动检测的源语言 ({detected_source_lang}) 不一致")
+            # 选择使用检测结果而不是客户端指定的语言
+            actual_source_lang = detected_source_lang
+            actual_target_lang = detected_target_lang
+            logger.info(f"已覆盖客户端指定的语言，使用自动检测的语言: 源语言 {actual_source_lang}, 目标语言 {actual_target_lang}")
+        else:
+            actual_source_lang = requested_source_lang
+            actual_target_lang = requested_target_lang
+            logger.info(f"客户端指定的语言与自动检测一致: 源语言 {actual_source_lang}, 目标语言 {actual_target_lang}")
+    else:
+        # 客户端没有指定语言，使用自动检测的结果
+        actual_source_lang = detected_source_lang
+        actual_target_lang = detected_target_lang
+        logger.info(f"使用自动检测的语言: 源语言 {actual_source_lang}, 目标语言 {actual_target_lang}")
+
+    # 处理消息message，移除特定前缀
+    processed_message = message
+    if actual_source_lang == 'en' and message.startswith("翻译："):
+        processed_message = message[len("翻译："):].lstrip()
+        logger.info(f"源语言为英文且检测到中文'翻译：'前缀，已移除。处理后文本: '{processed_message[:100]}...'" )
+    elif actual_source_lang == 'zh' and message.lower().startswith("translate:"):
+        processed_message = message[len("translate:"):].lstrip()
+        logger.info(f"源语言为中文且检测到英文'translate:'前缀，已移除。处理后文本: '{processed_message[:100]}...'" )
+
+    # 如果检测到直接翻译意图，预处理文本，移除表达直接翻译意图的部分
+    if is_direct_translation_intent:
+        # 移除直接翻译的表述及其前后可能的标点符号
+        processed_message = intent_classifier.strip(processed_message, DIRECT_TRANSLATION)
+        logger.info(f"检测到直接翻译意图，移除相关表述后的文本: '{processed_message[:100]}...'")
+
+    return {
+        "is_show_sources_intent": False,
+        "is_direct_translation_intent": is_direct_translation_intent,
+        "processed_message": processed_message,
+        "source_lang": actual_source_lang,
+        "target_lang": actual_target_lang
+    }
+
+def finalize_translation_output(full_translation_output: str, is_direct_translation: bool, session_id: str) -> str:
+    """
+    解析并按会话保存DashScope翻译的完整输出，并生成返回给用户的内容
+    
+    Args:
+        full_translation_output (str): DashScope返回的完整输出（可能包含工作流）
+        is_direct_translation (bool): 是否为直接翻译模式（不含工作流）
+        session_id (str): 会话ID
+        
+    Returns:
+        str: 直接翻译模式下为原始译文，否则为格式化后的工作流输出
+    """
+    # 完整输出只解析一次，格式化结果、最终译文和来源明细都从同一个文档对象获取
+    document = WorkflowDocument(full_translation_output, is_direct=is_direct_translation)
+    session_store.set(session_id, document)
+    logger.info(f"已保存完整工作流输出到会话 {session_id}，长度: {len(full_translation_output)} 字符")
+    
+    if is_direct_translation:
+        logger.info(f"直接翻译模式：使用纯翻译结果，长度: {len(full_translation_output)} 字符")
+        return full_translation_output
+    
+    formatted_output = document.formatted
+    logger.info(f"使用格式化后的工作流输出，长度: {len(formatted_output)} 字符")
+    return formatted_output
+
 @app.post("/api/query")
 async def query_endpoint(request: Request):
     """统一查询端点"""
-    global last_translation_full_output_cache 
-    global last_translation_result_only_cache
+    session_id = resolve_session_id(request)
     try:
         data = await request.json()
         message = data.get('message', '')
+        session_id = resolve_session_id(request, data.get('translation_session_id'))
         
         requested_source_lang = data.get('sourceLang')
         requested_target_lang = data.get('targetLang')
@@ -511,8 +464,7 @@ async def query_endpoint(request: Request):
             logger.info("客户端未明确指定源语言或目标语言，将进行自动检测。")
         
         if not message.strip():
-            last_translation_full_output_cache = None # Clear cache on empty input
-            last_translation_result_only_cache = None
+            session_store.clear(session_id)
             return JSONResponse(
                 status_code=400,
                 content={
@@ -521,70 +473,14 @@ async def query_endpoint(request: Request):
                 }
             )
         
-        # 检测用户是否想要直接翻译（不显示工作流）
-        direct_translation_patterns = [
-            r'直接翻译',
-            r'只要翻译',
-            r'只需翻译',
-            r'仅翻译',
-            r'仅需要翻译',
-            r'不需要工作流',
-            r'不要工作流',
-            r'无需工作流',
-            r'不用显示工作流',
-            r'不显示工作流',
-            r'隐藏工作流',
-            r'无工作流',
-            r'direct.*translate',
-            r'just.*translate',
-            r'only.*translate',
-            r'translate.*only',
-            r'without.*workflow',
-            r'no.*workflow'
-        ]
-        
-        # 检查是否匹配直接翻译意图
-        is_direct_translation_intent = False
-        matched_pattern = None
-        for pattern in direct_translation_patterns:
-            if re.search(pattern, message.lower(), re.IGNORECASE):
-                is_direct_translation_intent = True
-                matched_pattern = pattern
-                logger.info(f"检测到意图: 直接翻译（不显示工作流），匹配模式: '{pattern}'")
-                break
-
-        # 意图识别：检测用户是否请求显示上一次翻译的来源
-        intent_patterns = [
-            r'显示.*上一.*回答.*来源',
-            r'显示.*上一.*翻译.*来源',
-            r'查看.*上一.*回答.*来源',
-            r'查看.*上一.*翻译.*来源',
-            r'上一.*回答.*来源.*是什么',
-            r'上一.*翻译.*来源.*是什么',
-            r'总结.*上一.*回答.*来源',
-            r'总结.*上一.*翻译.*来源',
-            r'上一.*回答.*引用',
-            r'上一.*翻译.*引用',
-            r'show.*previous.*translation.*source',
-            r'display.*previous.*translation.*source',
-            r'show.*last.*translation.*source',
-            r'display.*last.*translation.*source',
-            r'previous.*translation.*source',
-            r'last.*translation.*reference',
-        ]
-        
-        # 检查是否匹配任一意图模式
-        is_show_sources_intent = False
-        for pattern in intent_patterns:
-            if re.search(pattern, message.lower(), re.IGNORECASE):
-                is_show_sources_intent = True
-                logger.info(f"检测到意图: 显示上一次翻译的来源信息，匹配模式: '{pattern}'")
-                break
+        prepared = prepare_translation_request(message, requested_source_lang, requested_target_lang)
+        is_direct_translation_intent = prepared["is_direct_translation_intent"]
+        is_show_sources_intent = prepared["is_show_sources_intent"]
         
         # 如果是请求显示来源的意图，直接调用相应功能
         if is_show_sources_intent:
             logger.info("转发请求到 show_last_answer_sources_endpoint")
-            sources_response = await show_last_answer_sources_endpoint()
+            sources_response = await last_answer_sources_response(session_id)
             
             # 如果sources_response是一个Response对象，需要提取其内容
             if isinstance(sources_response, Response):
@@ -599,73 +495,9 @@ async def query_endpoint(request: Request):
             # 如果已经是一个字典或其他直接可返回的数据
             return sources_response
         
-        # 检测文本中是否包含中文或英文字符
-        is_chinese_char = any('\u4e00' <= char <= '\u9fff' for char in message)
-        is_english_char = any('a' <= char.lower() <= 'z' for char in message)
-        
-        # 基于文本内容的自动语言检测结果
-        detected_source_lang = None
-        detected_target_lang = None
-        
-        if is_chinese_char and not is_english_char:
-            detected_source_lang = 'zh'
-            detected_target_lang = 'en'
-            logger.info(f"自动检测结果: 输入语言为中文 (zh), 目标语言设定为英文 (en)")
-        elif is_english_char and not is_chinese_char:
-            detected_source_lang = 'en'
-            detected_target_lang = 'zh'
-            logger.info(f"自动检测结果: 输入语言为英文 (en), 目标语言设定为中文 (zh)")
-        else: # 混合或无法明确判断
-            # 统计中文字符和英文字符的数量，选择占比更高的作为源语言
-            chinese_count = sum(1 for char in message if '\u4e00' <= char <= '\u9fff')
-            english_count = sum(1 for char in message if 'a' <= char.lower() <= 'z')
-            
-            if chinese_count > english_count:
-                detected_source_lang = 'zh'
-                detected_target_lang = 'en'
-                logger.info(f"自动检测结果: 输入语言为混合文本，中文字符占比更高，判定为中文 (zh) -> 英文 (en)")
-            else:
-                detected_source_lang = 'en'
-                detected_target_lang = 'zh'
-                logger.info(f"自动检测结果: 输入语言为混合文本，英文字符占比更高或相等，判定为英文 (en) -> 中文 (zh)")
-
-        # 确定最终使用的源语言和目标语言
-        actual_source_lang: str
-        actual_target_lang: str
-
-        if requested_source_lang and requested_target_lang:
-            # 客户端指定了语言，但我们会验证是否与检测结果一致
-            if requested_source_lang != detected_source_lang:
-                logger.warning(f"警告: 客户端指定的源语言 ({requested_source_lang}) 与自动检测的源语言 ({detected_source_lang}) 不一致")
-                # 选择使用检测结果而不是客户端指定的语言
-                actual_source_lang = detected_source_lang
-                actual_target_lang = detected_target_lang
-                logger.info(f"已覆盖客户端指定的语言，使用自动检测的语言: 源语言 {actual_source_lang}, 目标语言 {actual_target_lang}")
-            else:
-                actual_source_lang = requested_source_lang
-                actual_target_lang = requested_target_lang
-                logger.info(f"客户端指定的语言与自动检测一致: 源语言 {actual_source_lang}, 目标语言 {actual_target_lang}")
-        else:
-            # 客户端没有指定语言，使用自动检测的结果
-            actual_source_lang = detected_source_lang
-            actual_target_lang = detected_target_lang
-            logger.info(f"使用自动检测的语言: 源语言 {actual_source_lang}, 目标语言 {actual_target_lang}")
-
-        # 处理消息message，移除特定前缀
-        processed_message = message
-        if actual_source_lang == 'en' and message.startswith("翻译："):
-            processed_message = message[len("翻译："):].lstrip()
-            logger.info(f"源语言为英文且检测到中文'翻译：'前缀，已移除。处理后文本: '{processed_message[:100]}...'" )
-        elif actual_source_lang == 'zh' and message.lower().startswith("translate:"):
-            processed_message = message[len("translate:"):].lstrip()
-            logger.info(f"源语言为中文且检测到英文'translate:'前缀，已移除。处理后文本: '{processed_message[:100]}...'" )
-        
-        # 如果检测到直接翻译意图，预处理文本，移除表达直接翻译意图的部分
-        if is_direct_translation_intent and matched_pattern:
-            # 移除匹配的模式及其前后可能的标点符号
-            processed_message = re.sub(r'[，,：:。.；;]?\s*' + matched_pattern + r'\s*[，,：:。.；;]?\s*', ' ', processed_message, flags=re.IGNORECASE)
-            processed_message = processed_message.strip()
-            logger.info(f"检测到直接翻译意图，移除相关表述后的文本: '{processed_message[:100]}...'")
+        processed_message = prepared["processed_message"]
+        actual_source_lang = prepared["source_lang"]
+        actual_target_lang = prepared["target_lang"]
         
         translation_type = "terminology" # 默认
         
@@ -685,43 +517,23 @@ async def query_endpoint(request: Request):
                     actual_target_lang,
                     show_workflow=not is_direct_translation_intent  # 如果是直接翻译意图，则不显示工作流
                 )
+                if translation_result.get("overloaded"):
+                    # 上游繁忙时不回退到词典翻译，让客户端稍后重试
+                    session_store.clear(session_id)
+                    return overloaded_response(translation_result)
                 if translation_result.get("success"):
                     logger.info("✅ DashScope翻译成功!")
                     
-                    # 保存完整的翻译输出
                     full_translation_output = translation_result.get('full_workflow') or translation_result.get('translation', '')
-                    last_translation_full_output_cache = full_translation_output
-                    logger.info(f"已保存完整工作流输出到缓存，长度: {len(full_translation_output)} 字符")
-                    
-                    if is_direct_translation_intent:
-                        # 直接使用翻译结果，不需要额外处理
-                        translation_result['translation'] = full_translation_output
-                        # 也缓存为最终结果
-                        last_translation_result_only_cache = full_translation_output
-                        logger.info(f"直接翻译模式：使用纯翻译结果，长度: {len(full_translation_output)} 字符")
-                    else:
-                        # 带工作流的情况，需要格式化和提取最终译文
-                        # 格式化翻译输出，将Markdown格式转换为易读格式，并删除不必要的空格
-                        formatted_output = format_translation_output(full_translation_output)
-                        
-                        # 提取最终译文部分（只包含翻译结果，不包含工作流）
-                        final_translation_only = extract_final_translation(full_translation_output)
-                        # 缓存最终译文
-                        if final_translation_only:
-                            last_translation_result_only_cache = final_translation_only
-                            logger.info(f"已提取并缓存最终译文，长度: {len(final_translation_only)} 字符")
-                        
-                        # 使用格式化后的完整输出
-                        translation_result['translation'] = formatted_output
-                        logger.info(f"使用格式化后的工作流输出，长度: {len(formatted_output)} 字符")
+                    translation_result['translation'] = finalize_translation_output(
+                        full_translation_output, is_direct_translation_intent, session_id
+                    )
                 else:
                     logger.warning(f"❌ DashScope翻译返回失败状态: {translation_result.get('explanation', '无具体错误')}")
-                    last_translation_full_output_cache = None 
-                    last_translation_result_only_cache = None
+                    session_store.clear(session_id)
             except Exception as e:
                 logger.warning(f"❌ DashScope翻译过程中发生严重错误: {e}")
-                last_translation_full_output_cache = None 
-                last_translation_result_only_cache = None
+                session_store.clear(session_id)
         
         if not translation_result or not translation_result.get("success"):
             if "Enhanced-Dictionary" not in services_attempted:
@@ -731,7 +543,7 @@ async def query_endpoint(request: Request):
                     translation_result = await enhanced_translate(processed_message, actual_source_lang, actual_target_lang)
                     if translation_result.get("success"):
                         logger.info("✅ 增强词典翻译成功!")
-                        # Not updating last_translation_full_output_cache as enhanced_translate lacks detailed workflow
+                        # 词典翻译没有工作流输出，不更新会话中保存的结果
                     else:
                         logger.warning(f"❌ 增强词典翻译未提供有效结果或失败: {translation_result.get('explanation', '无具体错误')}")
                 except Exception as e:
@@ -739,8 +551,7 @@ async def query_endpoint(request: Request):
 
         if not translation_result or not translation_result.get("success"):
             logger.error("所有翻译服务尝试均失败或未返回成功结果。")
-            last_translation_full_output_cache = None 
-            last_translation_result_only_cache = None
+            session_store.clear(session_id)
             return JSONResponse(
                 status_code=500,
                 content={
@@ -757,7 +568,8 @@ async def query_endpoint(request: Request):
                 "explanation": translation_result.get('explanation', ''),
                 "model_used": translation_result.get('model_used', 'Unknown'),
                 "services_attempted": services_attempted,
-                "is_direct_translation": is_direct_translation_intent  # 添加标志表明是否是直接翻译模式
+                "is_direct_translation": is_direct_translation_intent,  # 添加标志表明是否是直接翻译模式
+                "translation_session_id": session_id
             }
         }
         logger.info(f"=== 最终返回结果 ===")
@@ -769,8 +581,7 @@ async def query_endpoint(request: Request):
         
     except Exception as e:
         logger.error(f"Query endpoint error: {e}", exc_info=True)
-        last_translation_full_output_cache = None # Clear cache on any general error in endpoint
-        last_translation_result_only_cache = None
+        session_store.clear(session_id)
         return JSONResponse(
             status_code=500,
             content={
@@ -779,15 +590,587 @@ async def query_endpoint(request: Request):
             }
         )
 
+def _sse_event(event: str, data: dict) -> str:
+    """构造一条Server-Sent Events消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/query/stream")
+async def query_stream_endpoint(request: Request):
+    """
+    统一查询端点的流式版本（Server-Sent Events）
+    
+    事件类型：
+    - meta: 语言方向与翻译模式
+    - delta: 增量输出（工作流模式下已逐行格式化）
+    - done: 最终结果，结构与 /api/query 的返回一致，content 为完整格式化结果
+    - error: 处理失败
+    """
+    try:
+        data = await request.json()
+    except Exception:
+        return JSONResponse(status_code=400, content={"code": -1, "message": "请求体必须为JSON"})
+    
+    message = data.get('message', '')
+    session_id = resolve_session_id(request, data.get('translation_session_id'))
+    logger.info(f"=== 流式翻译请求 ===")
+    logger.info(f"文本: '{message}'")
+    
+    if not message.strip():
+        session_store.clear(session_id)
+        return JSONResponse(
+            status_code=400,
+            content={
+                "code": -1,
+                "message": "翻译内容不能为空"
+            }
+        )
+    
+    prepared = prepare_translation_request(message, data.get('sourceLang'), data.get('targetLang'))
+    is_direct_translation_intent = prepared["is_direct_translation_intent"]
+    
+    async def event_stream():
+        if prepared["is_show_sources_intent"]:
+            sources_response = await last_answer_sources_response(session_id)
+            if isinstance(sources_response, Response):
+                sources_response = json.loads(sources_response.body.decode('utf-8'))
+            yield _sse_event("done", sources_response)
+            return
+        
+        processed_message = prepared["processed_message"]
+        source_lang = prepared["source_lang"]
+        target_lang = prepared["target_lang"]
+        yield _sse_event("meta", {
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "is_direct_translation": is_direct_translation_intent
+        })
+        
+        services_attempted = []
+        streamed_any = False
+        if DASHSCOPE_AVAILABLE:
+            services_attempted.append("DashScope")
+            formatter = None if is_direct_translation_intent else StreamingTranslationFormatter()
+            final_event = None
+            async for event in translation_service.translate_text_stream(
+                text=processed_message,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                show_workflow=not is_direct_translation_intent
+            ):
+                if event["type"] == "delta":
+                    chunk = formatter.feed(event["text"]) if formatter else event["text"]
+                    if chunk:
+                        streamed_any = True
+                        yield _sse_event("delta", {"content": chunk})
+                else:
+                    final_event = event
+            
+            if final_event and final_event.get("success"):
+                if formatter:
+                    tail = formatter.flush()
+                    if tail:
+                        yield _sse_event("delta", {"content": tail})
+                content = finalize_translation_output(final_event.get("translation", ""), is_direct_translation_intent,
+                                                      session_id)
+                yield _sse_event("done", {
+                    "code": 0,
+                    "message": "success",
+                    "data": {
+                        "content": content,
+                        "explanation": "使用DashScope海关专业翻译模型完成翻译",
+                        "model_used": "DashScope-Customs",
+                        "services_attempted": services_attempted,
+                        "is_direct_translation": is_direct_translation_intent,
+                        "translation_session_id": session_id
+                    }
+                })
+                return
+            
+            error_msg = final_event.get("error") if final_event else "DashScope翻译失败"
+            logger.warning(f"❌ DashScope流式翻译失败: {error_msg}")
+            session_store.clear(session_id)
+            if final_event and final_event.get("overloaded"):
+                # 上游繁忙时不回退到词典翻译，让客户端稍后重试
+                yield _sse_event("error", {"code": -1, "message": error_msg,
+                                           "retry_after": math.ceil(final_event.get("retry_after") or 1)})
+                return
+            if streamed_any:
+                # 已经向客户端输出了部分内容，不再切换到词典翻译
+                yield _sse_event("error", {"code": -1, "message": f"翻译中断: {error_msg}"})
+                return
+        
+        # DashScope不可用或未输出任何内容时，回退到增强词典翻译
+        services_attempted.append("Enhanced-Dictionary")
+        translation_result = await enhanced_translate(processed_message, source_lang, target_lang)
+        if not translation_result.get("success"):
+            yield _sse_event("error", {"code": -1, "message": "翻译失败，所有服务均未能成功处理请求。"})
+            return
+        yield _sse_event("delta", {"content": translation_result.get('translation', '')})
+        yield _sse_event("done", {
+            "code": 0,
+            "message": "success",
+            "data": {
+                "content": translation_result.get('translation', ''),
+                "explanation": translation_result.get('explanation', ''),
+                "model_used": translation_result.get('model_used', 'Unknown'),
+                "services_attempted": services_attempted,
+                "is_direct_translation": is_direct_translation_intent,
+                "translation_session_id": session_id
+            }
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 单次批量翻译允许的最大文本数
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+@app.post("/api/query/batch")
+async def batch_query_endpoint(request: BatchQueryRequest):
+    """
+    批量翻译端点
+    多个文本并发翻译，以NDJSON流的形式每完成一个返回一行结果，最后一行为汇总信息
+    """
+    logger.info(f"=== 批量翻译请求 ===")
+    logger.info(f"文本数: {len(request.texts)}, 并发数: {request.max_concurrency}, 失败即停: {request.fail_fast}")
+    
+    if not request.texts:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "code": -1,
+                "message": "翻译内容不能为空"
+            }
+        )
+    
+    if len(request.texts) > BATCH_MAX_ITEMS:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "code": -1,
+                "message": f"单次批量翻译最多支持 {BATCH_MAX_ITEMS} 个文本"
+            }
+        )
+    
+    if not DASHSCOPE_AVAILABLE:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "code": -1,
+                "message": "DashScope服务不可用，无法进行批量翻译"
+            }
+        )
+    
+    # 未指定语言时逐条自动检测翻译方向
+    items = []
+    for text in request.texts:
+        if request.sourceLang and request.targetLang:
+            source_lang, target_lang = request.sourceLang, request.targetLang
+        else:
+            source_lang, target_lang = detect_language_direction(text)
+        items.append({"text": text, "source_lang": source_lang, "target_lang": target_lang})
+    
+    async def result_stream():
+        started_at = time.monotonic()
+        succeeded = 0
+        failed = 0
+        async for result in translation_service.iter_batch_translate(
+            items,
+            show_workflow=request.show_workflow,
+            max_concurrency=request.max_concurrency,
+            fail_fast=request.fail_fast
+        ):
+            if result.get("success"):
+                succeeded += 1
+                content = result.get("translation", "")
+                if request.show_workflow:
+                    content = WorkflowDocument(content).formatted
+            else:
+                failed += 1
+                content = None
+            line = {
+                "type": "result",
+                "index": result["index"],
+                "success": bool(result.get("success")),
+                "content": content,
+                "error": result.get("error"),
+                "source_lang": result.get("source_lang"),
+                "target_lang": result.get("target_lang"),
+                "elapsed_ms": result.get("elapsed_ms")
+            }
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        
+        summary = {
+            "type": "summary",
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": failed,
+            "cancelled": len(items) - succeeded - failed,
+            "elapsed_ms": round((time.monotonic() - started_at) * 1000, 1)
+        }
+        logger.info(f"=== 批量翻译完成 === {summary}")
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+# 单个翻译任务允许的最大字符数
+JOB_MAX_CHARS = int(os.getenv("JOB_MAX_CHARS", str(2 * 1024 * 1024)))
+
+async def translate_job_handler(job: JobContext) -> dict:
+    """
+    翻译任务处理函数：分块并发翻译，每完成一块保存检查点，重新执行时跳过已完成的块
+    
+    Args:
+        job (JobContext): 任务上下文，参数为 text、source_lang、target_lang、show_workflow
+        
+    Returns:
+        dict: 任务结果
+    """
+    params = job.params
+    text = params["text"]
+    source_lang, target_lang = params["source_lang"], params["target_lang"]
+    show_workflow = bool(params.get("show_workflow"))
+    if not DASHSCOPE_AVAILABLE or not translation_service:
+        raise RuntimeError("DashScope服务不可用")
+    
+    # 分块结果只与原文和预算有关，重新执行时切出的块与上次一致，检查点可以按下标复用
+    max_tokens = params.get("chunk_tokens") or 1000
+    chunks = split_chunks(text, source_lang, max_tokens)
+    await job.set_total(len(chunks))
+    result = await translation_service.translate_chunks(
+        text, chunks, source_lang, target_lang,
+        show_workflow=show_workflow,
+        completed=await job.checkpoints(),
+        on_chunk=job.save_checkpoint
+    )
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    
+    translation = translation_service.stitch_chunks(result["outputs"], chunks, target_lang, show_workflow)
+    document = WorkflowDocument(translation, is_direct=not show_workflow)
+    return {
+        "content": document.formatted if show_workflow else translation,
+        "final_translation": document.final_translation if show_workflow else translation,
+        "source_lang": source_lang,
+        "target_lang": target_lang,
+        "chunks_total": len(chunks),
+        "model_used": translation_service.model_name
+    }
+
+def bulk_job(handler):
+    """
+    包装任务处理函数：任务的上游调用按批量优先级排队，并归入提交任务的租户
+    
+    Args:
+        handler: 任务处理函数
+        
+    Returns:
+        包装后的任务处理函数
+    """
+    async def run(job: JobContext) -> dict:
+        with upstream_scope(priority=BULK, tenant=job.params.get("tenant") or f"job:{job.job_id}"):
+            return await handler(job)
+    return run
+
+job_queue.register("translate", bulk_job(translate_job_handler))
+
+def job_not_found_response(job_id: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=404,
+        content={"code": -1, "message": f"任务不存在或已过保留期: {job_id}"}
+    )
+
+@app.post("/api/jobs")
+async def submit_job_endpoint(request: JobRequest):
+    """
+    提交异步翻译任务，立即返回任务ID；通过 GET /api/jobs/{job_id} 查询进度，
+    GET /api/jobs/{job_id}/result 取回结果，POST /api/jobs/{job_id}/cancel 取消
+    """
+    text = request.message.strip()
+    if not text:
+        return JSONResponse(
+            status_code=400,
+            content={"code": -1, "message": "翻译内容不能为空"}
+        )
+    if len(text) > JOB_MAX_CHARS:
+        return JSONResponse(
+            status_code=413,
+            content={"code": -1, "message": f"单个翻译任务最多支持 {JOB_MAX_CHARS} 个字符"}
+        )
+    if not DASHSCOPE_AVAILABLE:
+        return JSONResponse(
+            status_code=503,
+            content={"code": -1, "message": "DashScope服务不可用，无法提交翻译任务"}
+        )
+    
+    if request.sourceLang and request.targetLang:
+        source_lang, target_lang = request.sourceLang, request.targetLang
+    else:
+        source_lang, target_lang = detect_language_direction(text)
+    
+    try:
+        job = await job_queue.submit("translate", {
+            "text": text,
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "show_workflow": request.show_workflow,
+            "chunk_tokens": translation_service.chunk_max_tokens if translation_service.chunk_max_tokens > 0 else None,
+            "tenant": current_tenant()
+        })
+    except JobQueueFull as e:
+        return JSONResponse(
+            status_code=429,
+            content={"code": -1, "message": f"翻译任务过多，请稍后再试: {e}"},
+            headers={"Retry-After": "30"}
+        )
+    logger.info(f"=== 提交翻译任务 {job['job_id']} === 长度: {len(text)} 字符，{source_lang} -> {target_lang}")
+    return JSONResponse(
+        status_code=202,
+        content={"code": 0, "message": "success", "data": job}
+    )
+
+@app.get("/api/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    """查询翻译任务的状态与进度"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        return job_not_found_response(job_id)
+    return {"code": 0, "message": "success", "data": job}
+
+@app.get("/api/jobs/{job_id}/result")
+async def job_result_endpoint(job_id: str):
+    """取回已完成翻译任务的结果"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        return job_not_found_response(job_id)
+    if job["status"] != SUCCEEDED:
+        message = "任务尚未完成" if job["status"] not in FINISHED_STATUSES else f"任务未成功完成: {job['status']}"
+        return JSONResponse(
+            status_code=409,
+            content={"code": -1, "message": message, "data": job}
+        )
+    result = await job_queue.get_result(job_id)
+    if result is None:
+        return job_not_found_response(job_id)
+    return {"code": 0, "message": "success", "data": dict(result, job_id=job_id, status=job["status"])}
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job_endpoint(job_id: str):
+    """取消排队中或执行中的翻译任务；已结束的任务保持原状态"""
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        return job_not_found_response(job_id)
+    return {"code": 0, "message": "success", "data": job}
+
+# 上传文件与译文文件的保存目录，随任务一起按保留期限清理
+FILE_JOB_DIR = os.getenv("FILE_TRANSLATION_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "file_jobs"))
+# 上传文件大小上限（字节）
+FILE_TRANSLATION_MAX_BYTES = int(os.getenv("FILE_TRANSLATION_MAX_BYTES", str(50 * 1024 * 1024)))
+# 未指定语言时，用于检测翻译方向的文本长度
+FILE_LANGUAGE_SAMPLE_CHARS = 4000
+
+def collect_document_texts(path: str) -> tuple:
+    """
+    读取文件中需要翻译的文本，按首次出现顺序去重
+    
+    Returns:
+        tuple: (去重后的文本列表, 出现总次数)
+    """
+    unique = {}
+    occurrences = 0
+    for text in iter_document_texts(path):
+        occurrences += 1
+        unique.setdefault(text, None)
+    return list(unique), occurrences
+
+async def translate_file_job_handler(job: JobContext) -> dict:
+    """
+    文件翻译任务处理函数：取出文件中所有单元格/段落并去重，重复的文本只翻译一次，
+    各文本并发翻译，每译完一条保存检查点，最后写出同格式的译文文件
+    
+    Args:
+        job (JobContext): 任务上下文，参数为 input_path、output_path、filename、source_lang、target_lang
+        
+    Returns:
+        dict: 任务结果
+    """
+    params = job.params
+    if not DASHSCOPE_AVAILABLE or not translation_service:
+        raise RuntimeError("DashScope服务不可用")
+    
+    loop = asyncio.get_running_loop()
+    started_at = time.monotonic()
+    unique_texts, occurrences = await loop.run_in_executor(None, collect_document_texts, params["input_path"])
+    
+    source_lang, target_lang = params.get("source_lang"), params.get("target_lang")
+    if not (source_lang and target_lang):
+        sample = "\n".join(unique_texts)[:FILE_LANGUAGE_SAMPLE_CHARS]
+        source_lang, target_lang = detect_language_direction(sample)
+    # 已是目标语言的文本（如双语对照表中的译文列）原样保留
+    to_translate = [text for text in unique_texts if detect_language(text).language != target_lang]
+    logger.info(f"文件翻译任务 {job.job_id}: {params['filename']}，共 {occurrences} 处文本，"
+                f"去重后 {len(unique_texts)} 条，需翻译 {len(to_translate)} 条，{source_lang} -> {target_lang}")
+    
+    # 去重后的文本顺序由文件内容决定，重新执行时与上次一致，检查点可以按下标复用
+    await job.set_total(len(to_translate))
+    translated = await job.checkpoints()
+    pending = [index for index in range(len(to_translate)) if index not in translated]
+    failed = []
+    if pending:
+        items = [{"text": to_translate[index], "source_lang": source_lang, "target_lang": target_lang}
+                 for index in pending]
+        async with aclosing(translation_service.iter_batch_translate(items, show_workflow=False)) as results:
+            async for result in results:
+                index = pending[result["index"]]
+                if result.get("success") and result.get("translation"):
+                    translated[index] = result["translation"]
+                    await job.save_checkpoint(index, result["translation"])
+                else:
+                    failed.append(result.get("error"))
+    if failed:
+        raise RuntimeError(f"{len(failed)} 条文本翻译失败，重试时从检查点继续: {failed[0]}")
+    
+    translations = {to_translate[index]: translation for index, translation in translated.items()}
+    replaced = await loop.run_in_executor(
+        None, write_translated_document, params["input_path"], params["output_path"], translations
+    )
+    # 上传的原文件在结果保存后才删除（见 remove_file_job_input），保存前中断的任务重新执行时仍需读取
+    return {
+        "filename": params["filename"],
+        "output_file": os.path.basename(params["output_path"]),
+        "download_url": f"/api/jobs/{job.job_id}/file",
+        "source_lang": source_lang,
+        "target_lang": target_lang,
+        "texts_total": occurrences,
+        "texts_unique": len(unique_texts),
+        "texts_translated": len(to_translate),
+        "texts_replaced": replaced,
+        "elapsed_ms": round((time.monotonic() - started_at) * 1000, 1)
+    }
+
+def remove_file_job_input(params: dict):
+    """文件翻译任务的结果保存后删除上传的原文件"""
+    path = params.get("input_path")
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def remove_file_job_files(params: dict):
+    """任务过保留期被清理时删除上传文件与译文文件"""
+    for key in ("input_path", "output_path"):
+        path = params.get(key)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+job_queue.register("translate_file", bulk_job(translate_file_job_handler),
+                   cleanup=remove_file_job_files, on_success=remove_file_job_input)
+
+@app.post("/api/translate/file")
+async def translate_file_endpoint(file: UploadFile = File(...),
+                                  sourceLang: Optional[str] = Form(None),
+                                  targetLang: Optional[str] = Form(None)):
+    """
+    上传 XLSX / DOCX / TXT 文件提交翻译任务；通过 GET /api/jobs/{job_id} 查询进度，
+    完成后从 GET /api/jobs/{job_id}/file 下载同格式的译文文件
+    """
+    filename = os.path.basename(file.filename or "")
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        return JSONResponse(
+            status_code=400,
+            content={"code": -1, "message": f"仅支持 {' / '.join(SUPPORTED_EXTENSIONS)} 文件"}
+        )
+    if not DASHSCOPE_AVAILABLE:
+        return JSONResponse(
+            status_code=503,
+            content={"code": -1, "message": "DashScope服务不可用，无法翻译文件"}
+        )
+    
+    os.makedirs(FILE_JOB_DIR, exist_ok=True)
+    file_id = uuid.uuid4().hex
+    input_path = os.path.join(FILE_JOB_DIR, f"{file_id}{extension}")
+    output_path = os.path.join(FILE_JOB_DIR, f"{file_id}_translated{extension}")
+    try:
+        # 分块写入磁盘，不把整个文件读入内存
+        size = 0
+        with open(input_path, "wb") as f:
+            while True:
+                chunk = await file.read(1024 * 1024)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > FILE_TRANSLATION_MAX_BYTES:
+                    raise ValueError(f"文件超过大小上限 {FILE_TRANSLATION_MAX_BYTES} 字节")
+                f.write(chunk)
+        job = await job_queue.submit("translate_file", {
+            "input_path": input_path,
+            "output_path": output_path,
+            "filename": f"{os.path.splitext(filename)[0]}_translated{extension}",
+            "source_lang": sourceLang if sourceLang and targetLang else None,
+            "target_lang": targetLang if sourceLang and targetLang else None,
+            "tenant": current_tenant()
+        })
+    except ValueError as e:
+        os.remove(input_path)
+        return JSONResponse(status_code=413, content={"code": -1, "message": str(e)})
+    except JobQueueFull as e:
+        os.remove(input_path)
+        return JSONResponse(
+            status_code=429,
+            content={"code": -1, "message": f"翻译任务过多，请稍后再试: {e}"},
+            headers={"Retry-After": "30"}
+        )
+    logger.info(f"=== 提交文件翻译任务 {job['job_id']} === {filename}，{size} 字节")
+    return JSONResponse(
+        status_code=202,
+        content={"code": 0, "message": "success", "data": job}
+    )
+
+@app.get("/api/jobs/{job_id}/file")
+async def job_file_endpoint(job_id: str):
+    """下载文件翻译任务的译文文件"""
+    job = await job_queue.get(job_id)
+    if job is None or job["kind"] != "translate_file":
+        return job_not_found_response(job_id)
+    result = await job_queue.get_result(job_id)
+    if result is None:
+        return JSONResponse(
+            status_code=409,
+            content={"code": -1, "message": "任务尚未成功完成", "data": job}
+        )
+    output_path = os.path.join(FILE_JOB_DIR, result["output_file"])
+    if not os.path.exists(output_path):
+        return job_not_found_response(job_id)
+    return FileResponse(output_path, filename=result["filename"])
+
+# 本地未提取到来源时是否回退到模型提取
+SOURCES_LLM_FALLBACK = os.getenv("SOURCES_LLM_FALLBACK", "true").lower() in ("1", "true", "yes")
+
 @app.post("/api/show_last_answer_sources")
-async def show_last_answer_sources_endpoint():
+async def show_last_answer_sources_endpoint(request: Request):
     """
-    提取并返回上一次成功翻译（通过DashScope且包含工作流）的知识库来源信息。
+    提取并返回当前会话上一次成功翻译（通过DashScope且包含工作流）的知识库来源信息。
     """
-    global last_translation_full_output_cache
-    logger.info("=== 请求上一回答来源 ===")
+    try:
+        data = await request.json()
+    except Exception:
+        data = {}
+    body_session_id = data.get('translation_session_id') if isinstance(data, dict) else None
+    return await last_answer_sources_response(resolve_session_id(request, body_session_id))
 
-    if not last_translation_full_output_cache:
+async def last_answer_sources_response(session_id: str):
+    """
+    生成会话上一次翻译的来源明细响应
+    
+    Args:
+        session_id (str): 会话ID
+    """
+    logger.info(f"=== 请求上一回答来源 (会话 {session_id}) ===")
+
+    document = session_store.get(session_id)
+    if not document or document.is_direct:
         logger.info("缓存中未找到上一次翻译的详细输出。")
         return JSONResponse(
             status_code=404,
@@ -797,6 +1180,43 @@ async def show_last_answer_sources_endpoint():
             }
         )
 
+    # 先在本地从术语表和带 [n] 引用的描述行中提取来源，提取到时不再调用模型
+    start_time = time.perf_counter()
+    entries = extract_source_entries(document)
+    rendered_sources = render_source_entries(entries)
+    elapsed_ms = round((time.perf_counter() - start_time) * 1000, 2)
+    if rendered_sources:
+        logger.info(f"✅ 本地提取来源明细: {len(entries)} 个术语，耗时 {elapsed_ms}ms")
+        return {
+            "code": 0,
+            "message": "success",
+            "data": {
+                "content": rendered_sources,
+                "formatted_sources": rendered_sources,
+                "sources": [
+                    {
+                        "term": entry.term,
+                        "translation": entry.translation,
+                        "citations": [citation._asdict() for citation in entry.citations]
+                    }
+                    for entry in entries
+                ],
+                "extraction": "local",
+                "elapsed_ms": elapsed_ms,
+                "model_used": "Workflow-Document"
+            }
+        }
+
+    if not SOURCES_LLM_FALLBACK:
+        logger.info("本地未提取到来源，且未启用模型回退")
+        return JSONResponse(
+            status_code=404,
+            content={
+                "code": -1,
+                "message": "未能在上一次翻译的详细输出中找到可提取的来源信息。"
+            }
+        )
+
     if not DASHSCOPE_AVAILABLE or not translation_service:
         logger.error("DashScope服务不可用，无法执行来源提取。")
         return JSONResponse(
@@ -807,12 +1227,9 @@ async def show_last_answer_sources_endpoint():
             }
         )
         
-    # 格式化上一次翻译的详细输出
-    formatted_output = format_translation_output(last_translation_full_output_cache)
-    
-    # It's important that last_translation_full_output_cache contains the part with the workflow.
-    # Our prompt for dashscope_translate was designed to output this.
-    workflow_text_from_cache = formatted_output
+    # 本地没有提取到任何来源时，退回到由模型从格式化后的工作流中提取来源
+    logger.info("本地未提取到来源，回退到模型提取")
+    workflow_text_from_cache = document.formatted
 
     source_extraction_prompt = f"""# 角色
 你是一个文本分析和总结助手，你的任务是从给定的文本中提取并格式化知识库来源信息。
@@ -869,9 +1286,12 @@ async def show_last_answer_sources_endpoint():
                 "data": {
                     "content": formatted_sources,
                     "formatted_sources": formatted_sources,
+                    "extraction": "llm",
                     "model_used": "DashScope-Knowledge-Extraction"
                 }
             }
+        elif extraction_result.get("overloaded"):
+            return overloaded_response(extraction_result)
         else:
             logger.error(f"❌ 来源提取失败: {extraction_result.get('error', '未知错误')}")
             return JSONResponse(
@@ -892,10 +1312,9 @@ async def show_last_answer_sources_endpoint():
         )
 
 @app.post("/api/chat")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """对话端点 - 支持单轮和多轮对话"""
-    global last_translation_full_output_cache
-    global last_translation_result_only_cache
+    translation_session_id = resolve_session_id(http_request, request.translation_session_id)
     try:
         logger.info(f"=== 对话请求详情 ===")
         logger.info(f"消息: '{request.message}'")
@@ -920,67 +1339,28 @@ async def chat_endpoint(request: ChatRequest):
                 }
             )
         
-        # 检测用户是否希望直接展示最终译文（不显示工作流）
-        show_final_translation_patterns = [
-            r'直接展示最终译文',
-            r'仅展示最终译文',
-            r'只展示最终译文',
-            r'只显示最终译文',
-            r'只要最终译文',
-            r'给我最终译文',
-            r'只要译文',
-            r'仅要译文',
-            r'去掉工作流',
-            r'不要工作流',
-            r'不显示工作流',
-            r'only.*final.*translation',
-            r'just.*translation',
-            r'show.*only.*translation',
-            r'without.*workflow'
-        ]
-        
-        # 检查是否匹配直接展示最终译文意图
-        is_show_final_translation_intent = False
-        for pattern in show_final_translation_patterns:
-            if re.search(pattern, request.message.lower(), re.IGNORECASE):
-                is_show_final_translation_intent = True
-                logger.info(f"检测到意图: 直接展示最终译文，匹配模式: '{pattern}'")
-                break
+        # 一次匹配识别所有意图：直接展示最终译文（不显示工作流）、以"翻译："开头的翻译请求
+        intents = intent_classifier.classify(request.message)
+        is_show_final_translation_intent = SHOW_FINAL_TRANSLATION in intents
+        if is_show_final_translation_intent:
+            logger.info(f"检测到意图: 直接展示最终译文，匹配内容: '{intents[SHOW_FINAL_TRANSLATION].text}'")
                 
         # 如果是请求直接展示最终译文
         if is_show_final_translation_intent:
             logger.info("用户要求直接展示最终译文")
             
-            # 检查是否有缓存的最终译文
-            if last_translation_result_only_cache:
-                logger.info(f"找到缓存的最终译文，长度: {len(last_translation_result_only_cache)} 字符")
-                return {
-                    "code": 0,
-                    "message": "success",
-                    "data": {
-                        "content": last_translation_result_only_cache,
-                        "explanation": "直接展示最终译文（不含工作流）",
-                        "model_used": "Cached-Final-Translation",
-                        "session_id": request.session_id
-                    }
-                }
-            # 如果没有专门缓存的最终译文，但有完整工作流，尝试提取最终译文
-            elif last_translation_full_output_cache:
-                logger.info("未找到缓存的最终译文，但找到完整工作流，尝试提取最终译文")
-                final_translation = extract_final_translation(last_translation_full_output_cache)
-                
+            document = session_store.get(translation_session_id)
+            if document:
+                final_translation = document.final_translation
                 if final_translation:
-                    logger.info(f"从完整工作流中提取出最终译文，长度: {len(final_translation)} 字符")
-                    # 缓存提取出的最终译文
-                    last_translation_result_only_cache = final_translation
-                    
+                    logger.info(f"找到上一次翻译的最终译文，长度: {len(final_translation)} 字符")
                     return {
                         "code": 0,
                         "message": "success",
                         "data": {
                             "content": final_translation,
-                            "explanation": "从上一次翻译中提取出的最终译文（不含工作流）",
-                            "model_used": "Extracted-Final-Translation",
+                            "explanation": "直接展示最终译文（不含工作流）",
+                            "model_used": "Cached-Final-Translation",
                             "session_id": request.session_id
                         }
                     }
@@ -1006,18 +1386,9 @@ async def chat_endpoint(request: ChatRequest):
                 }
         
         # 检测用户消息是否为翻译请求
-        translation_prefix_patterns = [
-            r'^翻译[：:]\s*',
-            r'^translate[：:]\s*',
-            r'^translation[：:]\s*'
-        ]
-        
-        is_translation_request = False
-        for pattern in translation_prefix_patterns:
-            if re.search(pattern, request.message, re.IGNORECASE):
-                is_translation_request = True
-                logger.info(f"检测到翻译请求前缀，将转发到翻译功能")
-                break
+        is_translation_request = TRANSLATION_PREFIX in intents
+        if is_translation_request:
+            logger.info(f"检测到翻译请求前缀，将转发到翻译功能")
         
         # 如果是翻译请求，重定向到翻译功能
         if is_translation_request:
@@ -1026,38 +1397,11 @@ async def chat_endpoint(request: ChatRequest):
                 
                 # 直接调用翻译函数，不使用query_endpoint
                 # 从消息中去除翻译前缀
-                clean_message = request.message
-                for pattern in translation_prefix_patterns:
-                    clean_message = re.sub(pattern, '', clean_message, flags=re.IGNORECASE)
+                clean_message = intent_classifier.strip_prefix(request.message, intents[TRANSLATION_PREFIX])
                 
                 # 检测语言
-                is_chinese_char = any('\u4e00' <= char <= '\u9fff' for char in clean_message)
-                is_english_char = any('a' <= char.lower() <= 'z' for char in clean_message)
-                
-                source_lang = None
-                target_lang = None
-                
-                if is_chinese_char and not is_english_char:
-                    source_lang = 'zh'
-                    target_lang = 'en'
-                    logger.info(f"自动检测结果: 输入语言为中文 (zh), 目标语言设定为英文 (en)")
-                elif is_english_char and not is_chinese_char:
-                    source_lang = 'en'
-                    target_lang = 'zh'
-                    logger.info(f"自动检测结果: 输入语言为英文 (en), 目标语言设定为中文 (zh)")
-                else:
-                    # 统计中文字符和英文字符的数量，选择占比更高的作为源语言
-                    chinese_count = sum(1 for char in clean_message if '\u4e00' <= char <= '\u9fff')
-                    english_count = sum(1 for char in clean_message if 'a' <= char.lower() <= 'z')
-                    
-                    if chinese_count > english_count:
-                        source_lang = 'zh'
-                        target_lang = 'en'
-                        logger.info(f"自动检测结果: 输入语言为混合文本，中文字符占比更高，判定为中文 (zh) -> 英文 (en)")
-                    else:
-                        source_lang = 'en'
-                        target_lang = 'zh'
-                        logger.info(f"自动检测结果: 输入语言为混合文本，英文字符占比更高或相等，判定为英文 (en) -> 中文 (zh)")
+                source_lang, target_lang = detect_language_direction(clean_message)
+                logger.info(f"自动检测结果: 源语言 {source_lang}, 目标语言 {target_lang}")
                 
                 # 调用翻译服务
                 translation_result = await dashscope_translate(clean_message, source_lang, target_lang)
@@ -1065,20 +1409,10 @@ async def chat_endpoint(request: ChatRequest):
                 if translation_result.get("success"):
                     logger.info("✅ 聊天中的翻译请求成功!")
                     
-                    # 保存完整的翻译输出（包含工作流）
+                    # 保存并格式化完整的翻译输出（包含工作流）
                     full_translation_output = translation_result.get('full_workflow') or translation_result.get('translation', '')
-                    last_translation_full_output_cache = full_translation_output
-                    logger.info(f"已保存完整工作流输出到缓存，长度: {len(full_translation_output)} 字符")
-                    
-                    # 提取最终译文部分（只包含翻译结果，不包含工作流）
-                    final_translation_only = extract_final_translation(full_translation_output)
-                    # 缓存最终译文
-                    if final_translation_only:
-                        last_translation_result_only_cache = final_translation_only
-                        logger.info(f"已提取并缓存最终译文，长度: {len(final_translation_only)} 字符")
-                    
-                    # 格式化翻译输出，将Markdown格式转换为易读格式，并删除不必要的空格
-                    formatted_output = format_translation_output(full_translation_output)
+                    formatted_output = finalize_translation_output(full_translation_output, False,
+                                                                   translation_session_id)
                     
                     # 构建响应
                     return {
@@ -1092,6 +1426,8 @@ async def chat_endpoint(request: ChatRequest):
                             "session_id": request.session_id
                         }
                     }
+                elif translation_result.get("overloaded"):
+                    return overloaded_response(translation_result)
                 else:
                     # 翻译失败，返回错误信息
                     error_msg = translation_result.get('error', 'DashScope翻译失败')
@@ -1143,6 +1479,8 @@ async def chat_endpoint(request: ChatRequest):
             logger.info(f"回答: {response_data['data']['content'][:50]}...")
             logger.info(f"会话ID: {response_data['data']['session_id']}")
             return response_data
+        elif result.get('overloaded'):
+            return overloaded_response(result)
         else:
             return JSONResponse(
                 status_code=500,
@@ -1206,6 +1544,8 @@ async def explain_endpoint(request: ExplainRequest):
             logger.info(f"=== 专业名词解释完成 ===")
             logger.info(f"解释: {response_data['data']['content'][:50]}...")
             return response_data
+        elif result.get('overloaded'):
+            return overloaded_response(result)
         else:
             return JSONResponse(
                 status_code=500,
@@ -1271,6 +1611,8 @@ async def knowledge_endpoint(request: KnowledgeRequest):
             logger.info(f"=== 知识库检索完成 ===")
             logger.info(f"结果: {response_data['data']['content'][:50]}...")
             return response_data
+        elif result.get('overloaded'):
+            return overloaded_response(result)
         else:
             return JSONResponse(
                 status_code=500,
@@ -1324,6 +1666,8 @@ async def create_memory_endpoint(request: MemoryRequest):
             logger.info(f"=== 记忆体创建完成 ===")
             logger.info(f"记忆体ID: {response_data['data']['memory_id']}")
             return response_data
+        elif result.get('overloaded'):
+            return overloaded_response(result)
         else:
             return JSONResponse(
                 status_code=500,
@@ -1390,6 +1734,8 @@ async def memory_chat_endpoint(request: MemoryChatRequest):
             logger.info(f"回答: {response_data['data']['content'][:50]}...")
             logger.info(f"记忆体ID: {response_data['data']['memory_id']}")
             return response_data
+        elif result.get('overloaded'):
+            return overloaded_response(result)
         else:
             return JSONResponse(
                 status_code=500,
@@ -1454,6 +1800,8 @@ async def save_memory_endpoint(request: SaveMemoryRequest):
             logger.info(f"=== 记忆信息保存完成 ===")
             logger.info(f"记忆体ID: {response_data['data']['memory_id']}")
             return response_data
+        elif result.get('overloaded'):
+            return overloaded_response(result)
         else:
             return JSONResponse(
                 status_code=500,
@@ -1482,6 +1830,171 @@ async def test_endpoint():
         "timestamp": "2024-05-24"
     }
 
+@app.get("/api/metrics")
+async def metrics_endpoint():
+    """运行指标端点 - 返回上游调用线程池等运行时指标"""
+    metrics = {}
+    if translation_service:
+        metrics.update(translation_service.get_metrics())
+    metrics["terminology"] = terminology_store.get_metrics()
+    metrics["sessions"] = session_store.get_metrics()
+    metrics["jobs"] = job_queue.get_metrics()
+    metrics["requests"] = request_deadlines.get_metrics()
+    return {
+        "code": 0,
+        "message": "success",
+        "data": metrics
+    }
+
+# 管理接口令牌，调用管理接口需在请求头 X-Admin-Token 中携带；未配置时管理接口一律拒绝访问
+ADMIN_TOKEN = os.getenv("WVC_ADMIN_TOKEN")
+
+def check_admin_token(request: Request) -> Optional[JSONResponse]:
+    """校验管理接口令牌，未配置令牌或令牌不符时返回错误响应"""
+    if not ADMIN_TOKEN:
+        return JSONResponse(
+            status_code=403,
+            content={"code": -1, "message": "管理接口未启用：未配置 WVC_ADMIN_TOKEN"}
+        )
+    token = request.headers.get("X-Admin-Token") or ""
+    if not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        return JSONResponse(
+            status_code=403,
+            content={"code": -1, "message": "无权访问管理接口"}
+        )
+    return None
+
+@app.post("/api/admin/cache/purge")
+async def purge_cache_endpoint(body: PurgeCacheRequest, request: Request):
+    """管理端点 - 清理翻译结果缓存，不带条件时清空全部缓存"""
+    denied = check_admin_token(request)
+    if denied:
+        return denied
+    
+    if not translation_service or translation_service.result_cache is None:
+        return JSONResponse(
+            status_code=503,
+            content={"code": -1, "message": "翻译缓存未启用"}
+        )
+    
+    try:
+        removed = translation_service.result_cache.purge(
+            text=body.text,
+            source_lang=body.sourceLang,
+            target_lang=body.targetLang,
+            expired_only=body.expired_only
+        )
+        logger.info(f"管理接口清理翻译缓存: {removed} 条")
+        return {
+            "code": 0,
+            "message": "success",
+            "data": {"removed": removed}
+        }
+    except Exception as e:
+        logger.error(f"清理翻译缓存失败: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={"code": -1, "message": f"清理翻译缓存失败: {str(e)}"}
+        )
+
+@app.get("/api/terminology/search")
+async def terminology_search_endpoint(q: str,
+                                      sourceLang: str = "en",
+                                      targetLang: str = "zh",
+                                      mode: str = "prefix",
+                                      limit: int = 20):
+    """术语库查询端点 - mode 为 exact（精确，忽略大小写）或 prefix（前缀）"""
+    if not q.strip():
+        return JSONResponse(
+            status_code=400,
+            content={"code": -1, "message": "查询内容不能为空"}
+        )
+    
+    if mode == "exact":
+        translation = terminology_store.lookup(q, sourceLang, targetLang)
+        results = [{"term": q.strip(), "translation": translation}] if translation is not None else []
+    elif mode == "prefix":
+        results = terminology_store.search_prefix(q, sourceLang, targetLang, limit=max(1, min(limit, 100)))
+    else:
+        return JSONResponse(
+            status_code=400,
+            content={"code": -1, "message": f"不支持的查询方式: {mode}"}
+        )
+    
+    return {
+        "code": 0,
+        "message": "success",
+        "data": {
+            "results": results,
+            "total": len(results)
+        }
+    }
+
+@app.post("/api/admin/terminology/import")
+async def terminology_import_endpoint(request: Request,
+                                      file: UploadFile = File(...),
+                                      sourceLang: str = Form("en"),
+                                      targetLang: str = Form("zh")):
+    """管理端点 - 上传 XLSX / CSV 术语表并导入术语库；导入的术语参与精确查询和提示词注入，必须配置管理接口令牌"""
+    denied = check_admin_token(request)
+    if denied:
+        return denied
+    
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in (".xlsx", ".xlsm", ".csv", ".txt"):
+        return JSONResponse(
+            status_code=400,
+            content={"code": -1, "message": "仅支持 .xlsx / .csv 术语文件"}
+        )
+    
+    temp_path = None
+    try:
+        # 分块写入临时文件，XLSX 需要可随机访问的文件才能以只读模式流式读取
+        with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as temp_file:
+            temp_path = temp_file.name
+            while True:
+                chunk = await file.read(1024 * 1024)
+                if not chunk:
+                    break
+                temp_file.write(chunk)
+        
+        loop = asyncio.get_running_loop()
+        imported = await loop.run_in_executor(
+            None,
+            lambda: terminology_store.import_file(temp_path, sourceLang, targetLang, origin=file.filename)
+        )
+        return {
+            "code": 0,
+            "message": "success",
+            "data": {
+                "imported": imported,
+                "total": terminology_store.count()
+            }
+        }
+    except Exception as e:
+        logger.error(f"导入术语表失败: {e}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={"code": -1, "message": f"导入术语表失败: {str(e)}"}
+        )
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+@app.on_event("startup")
+async def startup_event():
+    """服务启动时预先构建术语匹配器，并启动翻译任务的工作协程，继续执行上次未完成的任务"""
+    await asyncio.get_running_loop().run_in_executor(None, terminology_store.build_matchers)
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """服务关闭时释放上游调用资源，执行到一半的翻译任务重新排队"""
+    await job_queue.stop()
+    job_queue.close()
+    if translation_service:
+        await translation_service.close()
+
 @app.get("/")
 async def read_root():
     """返回主页"""
@@ -1509,60 +2022,6 @@ async def serve_static(path: str):
     except:
         return FileResponse('index.html')
 
-# 提取最终翻译结果的函数
-def extract_final_translation(text: str) -> Optional[str]:
-    """
-    从完整的翻译工作流中提取最终译文部分
-    
-    Args:
-        text (str): 完整的翻译工作流文本
-        
-    Returns:
-        Optional[str]: 提取出的最终译文，如果未找到则返回None
-    """
-    if not text:
-        return None
-    
-    # 尝试多种可能的最终译文标记
-    final_translation_markers = [
-        r'## 7\.\s+最终译文',
-        r'## 7[\.、]\s*最终译文',
-        r'##\s*7[\.、]?\s*最终译文',
-        r'# 7[\.、]?\s*最终译文',
-        r'7[\.、]\s*最终译文',
-        r'最终译文[:：]',
-        r'最终翻译[:：]',
-        r'Final Translation[:：]',
-    ]
-    
-    for marker in final_translation_markers:
-        match = re.search(marker, text, re.IGNORECASE)
-        if match:
-            # 找到标记后的文本
-            start_pos = match.end()
-            
-            # 查找下一个标题（以#开头的行）或文本结束
-            next_title_match = re.search(r'\n\s*#', text[start_pos:])
-            if next_title_match:
-                end_pos = start_pos + next_title_match.start()
-                final_translation = text[start_pos:end_pos].strip()
-            else:
-                # 如果没有下一个标题，取到文本结束
-                final_translation = text[start_pos:].strip()
-            
-            # 如果提取的文本过短，可能是提取错误，尝试下一个标记
-            if len(final_translation) < 5:
-                continue
-                
-            return final_translation
-    
-    # 如果所有标记都未匹配，尝试寻找最后一个段落作为译文
-    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-    if paragraphs and len(paragraphs[-1]) > 10:  # 确保段落不是太短
-        return paragraphs[-1]
-    
-    return None
-
 if __name__ == "__main__":
     import uvicorn
     logger.info("启动海关翻译服务...")